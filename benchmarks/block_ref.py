@@ -88,6 +88,7 @@ async def main(db_path: Path):
         print(f"get_block_generator(): {timing/REPETITIONS:0.3f}s")
 
         blockchain.shut_down()
+        blockchain.close()
 
 
 @click.command()
@@ -6,6 +6,7 @@ import random
 import sys
 from pathlib import Path
 from time import monotonic
+from typing import Iterator, Tuple
 
 from utils import (
     rand_bytes,
@@ -39,6 +40,189 @@ NUM_ITERS = 20000
 random.seed(123456789)
 
 
+def generate_blocks(count: int, block_height: int = 1) -> Iterator[Tuple[bytes32, FullBlock, BlockRecord]]:
+    """
+    Yields a chain of random blocks (with their header hash and block record), starting at block_height.
+    """
+    prev_block = bytes32([0] * 32)
+    prev_ses_hash = bytes32([0] * 32)
+    timestamp = uint64(1631794488)
+    weight = uint128(10)
+    iters = uint128(123456)
+    sp_index = uint8(0)
+    deficit = uint8(0)
+    sub_slot_iters = uint64(10)
+    required_iters = uint64(100)
+    transaction_block_counter = 0
+    prev_transaction_block = bytes32([0] * 32)
+    prev_transaction_height = uint32(0)
+    ses_counter = 0
+
+    for height in range(block_height, block_height + count):
+
+        is_transaction = transaction_block_counter == 0
+        fees = uint64(random.randint(0, 150000))
+        farmer_coin, pool_coin = rewards(uint32(height))
+        reward_claims_incorporated = [farmer_coin, pool_coin]
+
+        # TODO: increase fidelity by setting these as well
+        finished_challenge_slot_hashes = None
+        finished_infused_challenge_slot_hashes = None
+        finished_reward_slot_hashes = None
+
+        sub_epoch_summary_included = None
+        if ses_counter == 0:
+            sub_epoch_summary_included = SubEpochSummary(
+                prev_ses_hash,
+                rand_hash(),
+                uint8(random.randint(0, 255)),  # num_blocks_overflow: uint8
+                None,  # new_difficulty: Optional[uint64]
+                None,  # new_sub_slot_iters: Optional[uint64]
+            )
+
+        has_pool_pk = random.randint(0, 1)
+
+        proof_of_space = ProofOfSpace(
+            rand_hash(),  # challenge
+            rand_g1() if has_pool_pk else None,
+            rand_hash() if not has_pool_pk else None,
+            rand_g1(),  # plot_public_key
+            uint8(32),
+            rand_bytes(8 * 32),
+        )
+
+        reward_chain_block = RewardChainBlock(
+            weight,
+            uint32(height),
+            iters,
+            sp_index,
+            rand_hash(),  # pos_ss_cc_challenge_hash
+            proof_of_space,
+            None if sp_index == 0 else rand_vdf(),
+            rand_g2(),  # challenge_chain_sp_signature
+            rand_vdf(),  # challenge_chain_ip_vdf
+            rand_vdf() if sp_index != 0 else None,  # reward_chain_sp_vdf
+            rand_g2(),  # reward_chain_sp_signature
+            rand_vdf(),  # reward_chain_ip_vdf
+            rand_vdf() if deficit < 16 else None,
+            is_transaction,
+        )
+
+        pool_target = PoolTarget(
+            rand_hash(),  # puzzle_hash
+            uint32(0),  # max_height
+        )
+
+        foliage_block_data = FoliageBlockData(
+            rand_hash(),  # unfinished_reward_block_hash
+            pool_target,
+            rand_g2() if has_pool_pk else None,  # pool_signature
+            rand_hash(),  # farmer_reward_puzzle_hash
+            bytes32([0] * 32),  # extension_data
+        )
+
+        foliage = Foliage(
+            prev_block,
+            rand_hash(),  # reward_block_hash
+            foliage_block_data,
+            rand_g2(),  # foliage_block_data_signature
+            rand_hash() if is_transaction else None,  # foliage_transaction_block_hash
+            rand_g2() if is_transaction else None,  # foliage_transaction_block_signature
+        )
+
+        foliage_transaction_block = (
+            None
+            if not is_transaction
+            else FoliageTransactionBlock(
+                prev_transaction_block,
+                timestamp,
+                rand_hash(),  # filter_hash
+                rand_hash(),  # additions_root
+                rand_hash(),  # removals_root
+                rand_hash(),  # transactions_info_hash
+            )
+        )
+
+        transactions_info = (
+            None
+            if not is_transaction
+            else TransactionsInfo(
+                rand_hash(),  # generator_root
+                rand_hash(),  # generator_refs_root
+                rand_g2(),  # aggregated_signature
+                fees,
+                uint64(random.randint(0, 12000000000)),  # cost
+                reward_claims_incorporated,
+            )
+        )
+
+        full_block = FullBlock(
+            [],  # finished_sub_slots
+            reward_chain_block,
+            rand_vdf_proof() if sp_index > 0 else None,  # challenge_chain_sp_proof
+            rand_vdf_proof(),  # challenge_chain_ip_proof
+            rand_vdf_proof() if sp_index > 0 else None,  # reward_chain_sp_proof
+            rand_vdf_proof(),  # reward_chain_ip_proof
+            rand_vdf_proof() if deficit < 4 else None,  # infused_challenge_chain_ip_proof
+            foliage,
+            foliage_transaction_block,
+            transactions_info,
+            None if is_transaction else SerializedProgram.from_bytes(clvm_generator),  # transactions_generator
+            [],  # transactions_generator_ref_list
+        )
+
+        header_hash = full_block.header_hash
+
+        record = BlockRecord(
+            header_hash,
+            prev_block,
+            uint32(height),
+            weight,
+            iters,
+            sp_index,
+            rand_class_group_element(),
+            None if deficit > 3 else rand_class_group_element(),
+            rand_hash(),  # reward_infusion_new_challenge
+            rand_hash(),  # challenge_block_info_hash
+            sub_slot_iters,
+            rand_hash(),  # pool_puzzle_hash
+            rand_hash(),  # farmer_puzzle_hash
+            required_iters,
+            deficit,
+            deficit == 16,
+            prev_transaction_height,
+            timestamp if is_transaction else None,
+            prev_transaction_block if prev_transaction_block != bytes32([0] * 32) else None,
+            None if fees == 0 else fees,
+            reward_claims_incorporated,
+            finished_challenge_slot_hashes,
+            finished_infused_challenge_slot_hashes,
+            finished_reward_slot_hashes,
+            sub_epoch_summary_included,
+        )
+
+        yield header_hash, full_block, record
+
+        # 19 seconds per block
+        timestamp = uint64(timestamp + 19)
+        weight = uint128(weight + 10)
+        iters = uint128(iters + 123456)
+        sp_index = uint8((sp_index + 1) % 64)
+        deficit = uint8((deficit + 3) % 17)
+        ses_counter = (ses_counter + 1) % 384
+        prev_block = header_hash
+
+        # every 33 blocks is a transaction block
+        transaction_block_counter = (transaction_block_counter + 1) % 33
+
+        if is_transaction:
+            prev_transaction_block = header_hash
+            prev_transaction_height = uint32(height)
+
+        if ses_counter == 0:
+            prev_ses_hash = header_hash
+
+
 async def run_add_block_benchmark(version: int):
 
     verbose: bool = "--verbose" in sys.argv
@@ -47,174 +231,18 @@ async def run_add_block_benchmark(version: int):
     # keep track of benchmark total time
     all_test_time = 0.0
 
-    prev_block = bytes32([0] * 32)
-    prev_ses_hash = bytes32([0] * 32)
-
     header_hashes = []
 
     try:
         block_store = await BlockStore.create(db_wrapper)
 
         block_height = 1
-        timestamp = uint64(1631794488)
-        weight = uint128(10)
-        iters = uint128(123456)
-        sp_index = uint8(0)
-        deficit = uint8(0)
-        sub_slot_iters = uint64(10)
-        required_iters = uint64(100)
-        transaction_block_counter = 0
-        prev_transaction_block = bytes32([0] * 32)
-        prev_transaction_height = uint32(0)
         total_time = 0.0
-        ses_counter = 0
 
         if verbose:
             print("profiling add_full_block", end="")
 
-        for height in range(block_height, block_height + NUM_ITERS):
-
-            is_transaction = transaction_block_counter == 0
-            fees = uint64(random.randint(0, 150000))
-            farmer_coin, pool_coin = rewards(uint32(height))
-            reward_claims_incorporated = [farmer_coin, pool_coin]
-
-            # TODO: increase fidelity by setting these as well
-            finished_challenge_slot_hashes = None
-            finished_infused_challenge_slot_hashes = None
-            finished_reward_slot_hashes = None
-
-            sub_epoch_summary_included = None
-            if ses_counter == 0:
-                sub_epoch_summary_included = SubEpochSummary(
-                    prev_ses_hash,
-                    rand_hash(),
-                    uint8(random.randint(0, 255)),  # num_blocks_overflow: uint8
-                    None,  # new_difficulty: Optional[uint64]
-                    None,  # new_sub_slot_iters: Optional[uint64]
-                )
-
-            has_pool_pk = random.randint(0, 1)
-
-            proof_of_space = ProofOfSpace(
-                rand_hash(),  # challenge
-                rand_g1() if has_pool_pk else None,
-                rand_hash() if not has_pool_pk else None,
-                rand_g1(),  # plot_public_key
-                uint8(32),
-                rand_bytes(8 * 32),
-            )
-
-            reward_chain_block = RewardChainBlock(
-                weight,
-                uint32(height),
-                iters,
-                sp_index,
-                rand_hash(),  # pos_ss_cc_challenge_hash
-                proof_of_space,
-                None if sp_index == 0 else rand_vdf(),
-                rand_g2(),  # challenge_chain_sp_signature
-                rand_vdf(),  # challenge_chain_ip_vdf
-                rand_vdf() if sp_index != 0 else None,  # reward_chain_sp_vdf
-                rand_g2(),  # reward_chain_sp_signature
-                rand_vdf(),  # reward_chain_ip_vdf
-                rand_vdf() if deficit < 16 else None,
-                is_transaction,
-            )
-
-            pool_target = PoolTarget(
-                rand_hash(),  # puzzle_hash
-                uint32(0),  # max_height
-            )
-
-            foliage_block_data = FoliageBlockData(
-                rand_hash(),  # unfinished_reward_block_hash
-                pool_target,
-                rand_g2() if has_pool_pk else None,  # pool_signature
-                rand_hash(),  # farmer_reward_puzzle_hash
-                bytes32([0] * 32),  # extension_data
-            )
-
-            foliage = Foliage(
-                prev_block,
-                rand_hash(),  # reward_block_hash
-                foliage_block_data,
-                rand_g2(),  # foliage_block_data_signature
-                rand_hash() if is_transaction else None,  # foliage_transaction_block_hash
-                rand_g2() if is_transaction else None,  # foliage_transaction_block_signature
-            )
-
-            foliage_transaction_block = (
-                None
-                if not is_transaction
-                else FoliageTransactionBlock(
-                    prev_transaction_block,
-                    timestamp,
-                    rand_hash(),  # filter_hash
-                    rand_hash(),  # additions_root
-                    rand_hash(),  # removals_root
-                    rand_hash(),  # transactions_info_hash
-                )
-            )
-
-            transactions_info = (
-                None
-                if not is_transaction
-                else TransactionsInfo(
-                    rand_hash(),  # generator_root
-                    rand_hash(),  # generator_refs_root
-                    rand_g2(),  # aggregated_signature
-                    fees,
-                    uint64(random.randint(0, 12000000000)),  # cost
-                    reward_claims_incorporated,
-                )
-            )
-
-            full_block = FullBlock(
-                [],  # finished_sub_slots
-                reward_chain_block,
-                rand_vdf_proof() if sp_index > 0 else None,  # challenge_chain_sp_proof
-                rand_vdf_proof(),  # challenge_chain_ip_proof
-                rand_vdf_proof() if sp_index > 0 else None,  # reward_chain_sp_proof
-                rand_vdf_proof(),  # reward_chain_ip_proof
-                rand_vdf_proof() if deficit < 4 else None,  # infused_challenge_chain_ip_proof
-                foliage,
-                foliage_transaction_block,
-                transactions_info,
-                None if is_transaction else SerializedProgram.from_bytes(clvm_generator),  # transactions_generator
-                [],  # transactions_generator_ref_list
-            )
-
-            header_hash = full_block.header_hash
-
-            record = BlockRecord(
-                header_hash,
-                prev_block,
-                uint32(height),
-                weight,
-                iters,
-                sp_index,
-                rand_class_group_element(),
-                None if deficit > 3 else rand_class_group_element(),
-                rand_hash(),  # reward_infusion_new_challenge
-                rand_hash(),  # challenge_block_info_hash
-                sub_slot_iters,
-                rand_hash(),  # pool_puzzle_hash
-                rand_hash(),  # farmer_puzzle_hash
-                required_iters,
-                deficit,
-                deficit == 16,
-                prev_transaction_height,
-                timestamp if is_transaction else None,
-                prev_transaction_block if prev_transaction_block != bytes32([0] * 32) else None,
-                None if fees == 0 else fees,
-                reward_claims_incorporated,
-                finished_challenge_slot_hashes,
-                finished_infused_challenge_slot_hashes,
-                finished_reward_slot_hashes,
-                sub_epoch_summary_included,
-            )
-
+        for header_hash, full_block, record in generate_blocks(NUM_ITERS, block_height):
             start = monotonic()
             await block_store.add_full_block(header_hash, full_block, record)
             await block_store.set_in_chain([(header_hash,)])
@@ -224,25 +252,6 @@ async def run_add_block_benchmark(version: int):
             stop = monotonic()
             total_time += stop - start
 
-            # 19 seconds per block
-            timestamp = uint64(timestamp + 19)
-            weight = uint128(weight + 10)
-            iters = uint128(iters + 123456)
-            sp_index = uint8((sp_index + 1) % 64)
-            deficit = uint8((deficit + 3) % 17)
-            ses_counter = (ses_counter + 1) % 384
-            prev_block = header_hash
-
-            # every 33 blocks is a transaction block
-            transaction_block_counter = (transaction_block_counter + 1) % 33
-
-            if is_transaction:
-                prev_transaction_block = header_hash
-                prev_transaction_height = uint32(height)
-
-            if ses_counter == 0:
-                prev_ses_hash = header_hash
-
             if verbose:
                 print(".", end="")
                 sys.stdout.flush()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+from time import monotonic
+from typing import List, Tuple
+
+from block_store import generate_blocks
+from utils import setup_db
+
+from taco.consensus.block_record import BlockRecord
+from taco.full_node.block_store import BlockStore
+from taco.types.full_block import FullBlock
+from taco.util.db_wrapper import DBWrapper2
+
+NUM_BLOCKS = 5000
+BATCH_SIZES = [32, 128]
+
+# we need seeded random, to have reproducible benchmark runs
+random.seed(123456789)
+
+
+async def add_batch(block_store: BlockStore, blocks: List[Tuple[FullBlock, BlockRecord]]) -> None:
+    for block, record in blocks:
+        await block_store.add_full_block(block.header_hash, block, record)
+        await block_store.set_in_chain([(block.header_hash,)])
+        await block_store.set_peak(block.header_hash)
+
+
+async def run_ingest_benchmark(blocks: List[Tuple[FullBlock, BlockRecord]]) -> None:
+    """
+    Compares adding the blocks of a long sync batch the way they were before (each block compressed as it's added)
+    against compressing the whole batch up front on the thread pool (precompress_blocks), and against also
+    inserting them all at once (bulk_insert), like receive_block_batch_in_transaction does. Each batch is committed
+    in a single transaction either way. During sync the compression runs while the batch is pre-validated, so it's
+    timed separately.
+    """
+
+    for batch_size in BATCH_SIZES:
+        for precompress, bulk in [(False, False), (True, False), (True, True)]:
+            db_wrapper: DBWrapper2 = await setup_db("block-store-ingest-benchmark.db", 2)
+            try:
+                block_store = await BlockStore.create(db_wrapper)
+                add_time = 0.0
+                compress_time = 0.0
+                for i in range(0, len(blocks), batch_size):
+                    batch = blocks[i : i + batch_size]
+                    start = monotonic()
+                    if precompress:
+                        await block_store.precompress_blocks([block for block, _ in batch])
+                    compress_time += monotonic() - start
+                    start = monotonic()
+                    async with db_wrapper.writer():
+                        if bulk:
+                            async with block_store.bulk_insert():
+                                await add_batch(block_store, batch)
+                        else:
+                            await add_batch(block_store, batch)
+                    add_time += monotonic() - start
+                if bulk:
+                    print(f"{add_time:0.4f}s (+{compress_time:0.4f}s compressing), bulk_insert", end="")
+                elif precompress:
+                    print(f"{add_time:0.4f}s (+{compress_time:0.4f}s compressing), precompressed", end="")
+                else:
+                    print(f"{add_time:0.4f}s, add_full_block", end="")
+                print(f" (batches of {batch_size})")
+            finally:
+                await db_wrapper.close()
+
+
+if __name__ == "__main__":
+    verbose: bool = "--verbose" in sys.argv
+    if verbose:
+        print(f"generating {NUM_BLOCKS} blocks")
+    all_blocks = [(full_block, record) for _, full_block, record in generate_blocks(NUM_BLOCKS)]
+    asyncio.run(run_ingest_benchmark(all_blocks))
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import List, Tuple
+
+from blspy import AugSchemeMPL, G2Element
+
+from taco.types.blockchain_format.sized_bytes import bytes48
+from taco.util.cached_bls import BLSCache, aggregate_verify
+
+# about the number of signatures in a full transaction block
+NUM_SIGNATURES = 500
+REPETITIONS = 5
+
+
+def make_signatures(count: int) -> Tuple[List[bytes48], List[bytes], G2Element]:
+    sks = [AugSchemeMPL.key_gen(i.to_bytes(32, "big")) for i in range(count)]
+    pks = [bytes48(bytes(sk.get_g1())) for sk in sks]
+    msgs = [f"message {i}".encode() for i in range(count)]
+    agg_sig = AugSchemeMPL.aggregate([AugSchemeMPL.sign(sk, msg) for sk, msg in zip(sks, msgs)])
+    return pks, msgs, agg_sig
+
+
+def time_verify(pks: List[bytes48], msgs: List[bytes], agg_sig: G2Element, cache: BLSCache) -> float:
+    start = perf_counter()
+    # force_cache, like the validation of transactions and unfinished blocks
+    assert aggregate_verify(pks, msgs, agg_sig, True, cache)
+    return perf_counter() - start
+
+
+async def main() -> None:
+    pks, msgs, agg_sig = make_signatures(NUM_SIGNATURES)
+
+    cold = 0.0
+    warm = 0.0
+    for _ in range(REPETITIONS):
+        cache = BLSCache()
+        cold += time_verify(pks, msgs, agg_sig, cache)
+        warm += time_verify(pks, msgs, agg_sig, cache)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "bls-pairing-cache"
+        start = perf_counter()
+        await cache.save(path)
+        save_time = perf_counter() - start
+
+        warm_start = 0.0
+        load_time = 0.0
+        for _ in range(REPETITIONS):
+            cache = BLSCache()
+            start = perf_counter()
+            cache.load(path)
+            load_time += perf_counter() - start
+            warm_start += time_verify(pks, msgs, agg_sig, cache)
+
+    print(f"aggregate_verify() of {NUM_SIGNATURES} signatures")
+    print(f"  cold cache:      {cold / REPETITIONS:0.4f}s")
+    print(f"  warm cache:      {warm / REPETITIONS:0.4f}s")
+    print(f"  loaded from disk {warm_start / REPETITIONS:0.4f}s", end="")
+    print(f" (saving {save_time:0.4f}s, loading {load_time / REPETITIONS:0.4f}s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from time import perf_counter
+
+from blspy import AugSchemeMPL
+
+from taco.consensus.coinbase import create_puzzlehash_for_pk
+from taco.wallet.derive_keys import master_sk_to_wallet_sk_intermediate, master_sk_to_wallet_sk_unhardened_intermediate
+from taco.wallet.util import batch_derivation
+from taco.wallet.util.batch_derivation import derive_keys
+
+# like a wallet recovery with a large initial_num_public_keys
+NUM_INDEXES = 2000
+
+
+def derive_one_at_a_time(num_indexes: int) -> None:
+    # the way create_more_puzzle_hashes() used to derive the keys
+    private_key = AugSchemeMPL.key_gen(bytes([1] * 32))
+    intermediate_sk = master_sk_to_wallet_sk_intermediate(private_key)
+    intermediate_sk_un = master_sk_to_wallet_sk_unhardened_intermediate(private_key)
+    for index in range(num_indexes):
+        create_puzzlehash_for_pk(AugSchemeMPL.derive_child_sk(intermediate_sk, index).get_g1())
+        create_puzzlehash_for_pk(AugSchemeMPL.derive_child_sk_unhardened(intermediate_sk_un, index).get_g1())
+
+
+async def main() -> None:
+    private_key = AugSchemeMPL.key_gen(bytes([1] * 32))
+    # each index has a hardened and an unhardened key
+    num_derivations = 2 * NUM_INDEXES
+
+    start = perf_counter()
+    derive_one_at_a_time(NUM_INDEXES)
+    duration = perf_counter() - start
+    print(f"one at a time:        {num_derivations / duration:0.0f} derivations/s")
+
+    # always in the wallet process
+    min_parallel = batch_derivation.MIN_PARALLEL_DERIVATIONS
+    batch_derivation.MIN_PARALLEL_DERIVATIONS = NUM_INDEXES + 1
+    start = perf_counter()
+    await derive_keys(private_key, 0, NUM_INDEXES)
+    duration = perf_counter() - start
+    print(f"batches:              {num_derivations / duration:0.0f} derivations/s")
+    batch_derivation.MIN_PARALLEL_DERIVATIONS = min_parallel
+
+    context = multiprocessing.get_context("spawn")
+    start = perf_counter()
+    await derive_keys(private_key, 0, NUM_INDEXES, context)
+    duration = perf_counter() - start
+    # the pool isn't used on a single core
+    num_processes = min(batch_derivation.NUM_DERIVATION_PROCESSES, os.cpu_count() or 1)
+    print(
+        f"batches, {num_processes} processes: "
+        f"{num_derivations / duration:0.0f} derivations/s (including starting the processes)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
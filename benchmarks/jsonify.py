@@ -3,6 +3,7 @@ from __future__ import annotations
 import random
 from time import perf_counter
 
+from taco.util.json_util import dict_to_json_bytes, dict_to_json_str
 from tests.util.test_full_block_utils import get_full_blocks
 
 random.seed(123456789)
@@ -10,15 +11,31 @@ random.seed(123456789)
 
 def main() -> None:
     total_time = 0.0
+    str_time = 0.0
+    bytes_time = 0.0
     counter = 0
     for block in get_full_blocks():
         start = perf_counter()
         block.to_json_dict()
         end = perf_counter()
         total_time += end - start
+
+        # the whole RPC response, like get_blocks
+        start = perf_counter()
+        json_str = dict_to_json_str({"blocks": [block], "success": True})
+        end = perf_counter()
+        str_time += end - start
+
+        start = perf_counter()
+        json_bytes = dict_to_json_bytes({"blocks": [block], "success": True})
+        end = perf_counter()
+        bytes_time += end - start
+        assert json_bytes == json_str.encode()
         counter += 1
 
     print(f"total time: {total_time:0.2f}s ({counter} iterations)")
+    print(f"dict_to_json_str:   {str_time:0.2f}s")
+    print(f"dict_to_json_bytes: {bytes_time:0.2f}s")
 
 
 if __name__ == "__main__":
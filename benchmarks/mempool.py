@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import cProfile
+import dataclasses
 from contextlib import contextmanager
 from subprocess import check_call
 from time import monotonic
@@ -10,6 +11,7 @@ from typing import Iterator, List
 from utils import setup_db
 
 from taco.consensus.block_record import BlockRecord
+from taco.consensus.blockchain import StateChangeSummary
 from taco.consensus.coinbase import create_farmer_coin, create_pool_coin
 from taco.consensus.default_constants import DEFAULT_CONSTANTS
 from taco.full_node.coin_store import CoinStore
@@ -25,6 +27,7 @@ from taco.util.ints import uint8, uint32, uint64, uint128
 
 NUM_ITERS = 100
 NUM_PEERS = 5
+REORG_MEMPOOL_SIZES = [100, 500, 1000, 2000]
 
 
 @contextmanager
@@ -171,12 +174,83 @@ async def run_mempool_benchmark(single_threaded: bool) -> None:
             stop = monotonic()
         print(f"create_bundle_from_mempool time: {stop - start:0.4f}s")
 
-    # TODO: add benchmark for new_peak()
-
     finally:
         await db_wrapper.close()
 
 
+async def run_mempool_reorg_benchmark(single_threaded: bool) -> None:
+
+    suffix = "st" if single_threaded else "mt"
+    print("Profiling new_peak() for a one block reorg")
+    for mempool_size in REORG_MEMPOOL_SIZES:
+        db_wrapper: DBWrapper2 = await setup_db(f"mempool-reorg-benchmark-coins-{suffix}-{mempool_size}.db", 2)
+
+        try:
+            coin_store = await CoinStore.create(db_wrapper)
+            mempool = MempoolManager(coin_store, DEFAULT_CONSTANTS, single_threaded=single_threaded)
+
+            wt = WalletTool(DEFAULT_CONSTANTS)
+            timestamp = uint64(1631794488)
+            height = uint32(1)
+            unspent: List[Coin] = []
+            while len(unspent) < mempool_size:
+                height = uint32(height + 1)
+                farmer_coin = create_farmer_coin(
+                    height, wt.get_new_puzzlehash(), uint64(250000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE
+                )
+                pool_coin = create_pool_coin(
+                    height, wt.get_new_puzzlehash(), uint64(1750000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE
+                )
+                unspent.extend([farmer_coin, pool_coin])
+                await coin_store.new_block(height, timestamp, set([pool_coin, farmer_coin]), [], [])
+                timestamp = uint64(timestamp + 19)
+
+            # the block at the peak only has reward coins that none of the transactions spend, it's the one we
+            # replace in every reorg
+            fork_height = height
+            height = uint32(height + 1)
+            await coin_store.new_block(height, timestamp, set(), [], [])
+            await mempool.new_peak(fake_block_record(height, timestamp), None)
+
+            for coin in unspent[:mempool_size]:
+                tx: SpendBundle = wt.generate_signed_transaction(
+                    uint64(coin.amount // 2), wt.get_new_puzzlehash(), coin
+                )
+                npc = await mempool.pre_validate_spendbundle(tx, None, tx.name())
+                _, status, error = await mempool.add_spend_bundle(tx, npc, tx.name())
+                assert status == MempoolInclusionStatus.SUCCESS
+                assert error is None
+
+            durations: List[float] = []
+            for idx, incremental in enumerate([False, True]):
+                rolled_back = await coin_store.rollback_to_block(fork_height)
+                new_rewards = [
+                    create_farmer_coin(
+                        height, bytes32([idx] * 32), uint64(250000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE
+                    ),
+                    create_pool_coin(
+                        height, bytes32([idx] * 32), uint64(1750000000), DEFAULT_CONSTANTS.GENESIS_CHALLENGE
+                    ),
+                ]
+                await coin_store.new_block(height, timestamp, set(new_rewards), [], [])
+                rec = dataclasses.replace(fake_block_record(height, timestamp), header_hash=bytes32([idx] * 32))
+                summary = StateChangeSummary(rec, fork_height, rolled_back, [], new_rewards) if incremental else None
+
+                start = monotonic()
+                await mempool.new_peak(rec, None, summary)
+                stop = monotonic()
+                assert len(mempool.mempool.spends) == mempool_size
+                durations.append(stop - start)
+
+            print(
+                f"  {mempool_size} mempool items, full rebuild: {durations[0]:0.4f}s "
+                f"incremental: {durations[1]:0.4f}s"
+            )
+
+        finally:
+            await db_wrapper.close()
+
+
 if __name__ == "__main__":
     import logging
 
@@ -185,3 +259,4 @@ if __name__ == "__main__":
     logger.setLevel(logging.WARNING)
     asyncio.run(run_mempool_benchmark(True))
     asyncio.run(run_mempool_benchmark(False))
+    asyncio.run(run_mempool_reorg_benchmark(True))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import io
 import json
 import sys
 from dataclasses import dataclass
@@ -9,9 +10,19 @@ from time import process_time as clock
 from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple, Type, Union
 
 import click
-from utils import EnumType, get_commit_hash, rand_bytes, rand_full_block, rand_hash
-
+from utils import (
+    EnumType,
+    get_commit_hash,
+    rand_block_record,
+    rand_bytes,
+    rand_coin_record,
+    rand_full_block,
+    rand_hash,
+)
+
+from taco.consensus.block_record import BlockRecord
 from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.coin_record import CoinRecord
 from taco.types.full_block import FullBlock
 from taco.util.ints import uint8, uint64
 from taco.util.streamable import Streamable, streamable
@@ -112,6 +123,8 @@ class Data(str, Enum):
     all = "all"
     benchmark = "benchmark"
     full_block = "full_block"
+    block_record = "block_record"
+    coin_record = "coin_record"
 
 
 # The strings in this Enum are by purpose. See benchmark.utils.EnumType.
@@ -120,6 +133,8 @@ class Mode(str, Enum):
     creation = "creation"
     to_bytes = "to_bytes"
     from_bytes = "from_bytes"
+    stream = "stream"
+    parse = "parse"
     to_json = "to_json"
     from_json = "from_json"
 
@@ -128,6 +143,22 @@ def to_bytes(obj: Any) -> bytes:
     return bytes(obj)
 
 
+def stream(obj: Any) -> None:
+    obj.stream(io.BytesIO())
+
+
+def to_stream(obj: Any) -> io.BytesIO:
+    return io.BytesIO(bytes(obj))
+
+
+def parse_cb(cls: Type[Streamable]) -> Callable[[io.BytesIO], Streamable]:
+    def parse(f: io.BytesIO) -> Streamable:
+        f.seek(0)
+        return cls.parse(f)
+
+    return parse
+
+
 @dataclass
 class ModeParameter:
     conversion_cb: Callable[[Any], Any]
@@ -141,29 +172,25 @@ class BenchmarkParameter:
     mode_parameter: Dict[Mode, Optional[ModeParameter]]
 
 
+def streamable_mode_parameter(cls: Type[Streamable]) -> Dict[Mode, Optional[ModeParameter]]:
+    return {
+        Mode.creation: None,
+        Mode.to_bytes: ModeParameter(to_bytes),
+        Mode.from_bytes: ModeParameter(cls.from_bytes, to_bytes),
+        Mode.stream: ModeParameter(stream),
+        Mode.parse: ModeParameter(parse_cb(cls), to_stream),
+        Mode.to_json: ModeParameter(cls.to_json_dict),
+        Mode.from_json: ModeParameter(cls.from_json_dict, cls.to_json_dict),
+    }
+
+
 benchmark_parameter: Dict[Data, BenchmarkParameter] = {
     Data.benchmark: BenchmarkParameter(
-        BenchmarkClass,
-        get_random_benchmark_object,
-        {
-            Mode.creation: None,
-            Mode.to_bytes: ModeParameter(to_bytes),
-            Mode.from_bytes: ModeParameter(BenchmarkClass.from_bytes, to_bytes),
-            Mode.to_json: ModeParameter(BenchmarkClass.to_json_dict),
-            Mode.from_json: ModeParameter(BenchmarkClass.from_json_dict, BenchmarkClass.to_json_dict),
-        },
-    ),
-    Data.full_block: BenchmarkParameter(
-        FullBlock,
-        rand_full_block,
-        {
-            Mode.creation: None,
-            Mode.to_bytes: ModeParameter(to_bytes),
-            Mode.from_bytes: ModeParameter(FullBlock.from_bytes, to_bytes),
-            Mode.to_json: ModeParameter(FullBlock.to_json_dict),
-            Mode.from_json: ModeParameter(FullBlock.from_json_dict, FullBlock.to_json_dict),
-        },
+        BenchmarkClass, get_random_benchmark_object, streamable_mode_parameter(BenchmarkClass)
     ),
+    Data.full_block: BenchmarkParameter(FullBlock, rand_full_block, streamable_mode_parameter(FullBlock)),
+    Data.block_record: BenchmarkParameter(BlockRecord, rand_block_record, streamable_mode_parameter(BlockRecord)),
+    Data.coin_record: BenchmarkParameter(CoinRecord, rand_coin_record, streamable_mode_parameter(CoinRecord)),
 }
 
 
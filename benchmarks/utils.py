@@ -12,6 +12,7 @@ import aiosqlite
 import click
 from blspy import AugSchemeMPL, G1Element, G2Element
 
+from taco.consensus.block_record import BlockRecord
 from taco.consensus.coinbase import create_farmer_coin, create_pool_coin
 from taco.consensus.default_constants import DEFAULT_CONSTANTS
 from taco.types.blockchain_format.classgroup import ClassgroupElement
@@ -23,6 +24,7 @@ from taco.types.blockchain_format.proof_of_space import ProofOfSpace
 from taco.types.blockchain_format.reward_chain_block import RewardChainBlock
 from taco.types.blockchain_format.sized_bytes import bytes32, bytes100
 from taco.types.blockchain_format.vdf import VDFInfo, VDFProof
+from taco.types.coin_record import CoinRecord
 from taco.types.full_block import FullBlock
 from taco.util.db_wrapper import DBWrapper2
 from taco.util.ints import uint8, uint32, uint64, uint128
@@ -88,6 +90,47 @@ def rand_vdf_proof() -> VDFProof:
     )
 
 
+def rand_coin_record() -> CoinRecord:
+    return CoinRecord(
+        Coin(rand_hash(), rand_hash(), uint64(random.randint(1, 1000000000000))),
+        uint32(random.randint(1, 3000000)),  # confirmed_block_index
+        uint32(0),  # spent_block_index
+        bool(random.randint(0, 1)),  # coinbase
+        uint64(random.randint(1600000000, 1700000000)),  # timestamp
+    )
+
+
+def rand_block_record() -> BlockRecord:
+    height = uint32(random.randint(1, 3000000))
+    return BlockRecord(
+        rand_hash(),  # header_hash
+        rand_hash(),  # prev_hash
+        height,
+        uint128(random.randint(1000000, 100000000000)),  # weight
+        uint128(random.randint(1000000, 100000000000)),  # total_iters
+        uint8(random.randint(0, 63)),  # signage_point_index
+        rand_class_group_element(),  # challenge_vdf_output
+        None,  # infused_challenge_vdf_output
+        rand_hash(),  # reward_infusion_new_challenge
+        rand_hash(),  # challenge_block_info_hash
+        uint64(147849216),  # sub_slot_iters
+        rand_hash(),  # pool_puzzle_hash
+        rand_hash(),  # farmer_puzzle_hash
+        uint64(random.randint(1000, 1000000)),  # required_iters
+        uint8(16),  # deficit
+        False,  # overflow
+        uint32(height - 1),  # prev_transaction_block_height
+        uint64(random.randint(1600000000, 1700000000)),  # timestamp
+        rand_hash(),  # prev_transaction_block_hash
+        uint64(0),  # fees
+        [Coin(rand_hash(), rand_hash(), uint64(1750000000))],  # reward_claims_incorporated
+        None,  # finished_challenge_slot_hashes
+        None,  # finished_infused_challenge_slot_hashes
+        None,  # finished_reward_slot_hashes
+        None,  # sub_epoch_summary_included
+    )
+
+
 def rand_full_block() -> FullBlock:
     proof_of_space = ProofOfSpace(
         rand_hash(),
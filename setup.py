@@ -35,6 +35,7 @@ dependencies = [
     "dnslib==0.9.23",  # dns lib
     "typing-extensions==4.4.0",  # typing backports like Protocol and TypedDict
     "zstd==1.5.2.6",
+    "zstandard==0.19.0",  # Compresses blocks with a trained dictionary (taco db compress)
     "packaging==21.3",
     "psutil==5.9.1",
 ]
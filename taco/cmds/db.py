@@ -5,6 +5,7 @@ from pathlib import Path
 import click
 
 from taco.cmds.db_backup_func import db_backup_func
+from taco.cmds.db_compress_func import db_compress_func
 from taco.cmds.db_upgrade_func import db_upgrade_func
 from taco.cmds.db_validate_func import db_validate_func
 
@@ -82,3 +83,25 @@ def db_backup_cmd(ctx: click.Context, no_indexes: bool, **kwargs) -> None:
         )
     except RuntimeError as e:
         print(f"FAILED: {e}")
+
+
+@db_cmd.command(
+    "compress",
+    short_help="train a zstd dictionary from the blocks in the (v2) database and recompress them all with it. "
+    "The full node must not be running",
+)
+@click.option("--db", default=None, type=click.Path(), help="Specifies which database file to compress")
+@click.option("--sample-size", default=5000, type=int, help="Number of blocks to train the dictionary on")
+@click.option("--dictionary-size", default=112640, type=int, help="Size of the dictionary, in bytes")
+@click.pass_context
+def db_compress_cmd(ctx: click.Context, sample_size: int, dictionary_size: int, **kwargs) -> None:
+    try:
+        in_db_path = kwargs.get("db")
+        db_compress_func(
+            Path(ctx.obj["root_path"]),
+            None if in_db_path is None else Path(in_db_path),
+            sample_size=sample_size,
+            dictionary_size=dictionary_size,
+        )
+    except RuntimeError as e:
+        print(f"FAILED: {e}")
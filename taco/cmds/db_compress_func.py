@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from taco.util.config import load_config
+from taco.util.path import path_from_root
+
+
+def db_compress_func(
+    root_path: Path,
+    in_db_path: Optional[Path] = None,
+    *,
+    sample_size: int,
+    dictionary_size: int,
+) -> None:
+    if in_db_path is None:
+        config: Dict[str, Any] = load_config(root_path, "config.yaml")["full_node"]
+        selected_network: str = config["selected_network"]
+        db_pattern: str = config["database_path"]
+        db_path_replaced: str = db_pattern.replace("CHALLENGE", selected_network)
+        in_db_path = path_from_root(root_path, db_path_replaced)
+
+    compress_v2(in_db_path, sample_size=sample_size, dictionary_size=dictionary_size)
+
+    print(f"\n\nDatabase compressed: {in_db_path}\n")
+
+
+def compress_v2(in_path: Path, *, sample_size: int, dictionary_size: int) -> None:
+    import random
+    import sqlite3
+    from contextlib import closing
+    from time import monotonic
+
+    from taco.full_node.block_compression import CREATE_DICTIONARY_TABLE, BlockCompressor, train_dictionary
+
+    BATCH_SIZE = 1000
+
+    if not in_path.exists():
+        print(f"input file doesn't exist. {in_path}")
+        raise RuntimeError(f"can't find {in_path}")
+
+    print(f"opening file for writing: {in_path}")
+    with closing(sqlite3.connect(in_path)) as db:
+
+        try:
+            with closing(db.execute("SELECT * FROM database_version")) as cursor:
+                row = cursor.fetchone()
+                if row is None or row[0] != 2:
+                    raise RuntimeError("Only v2 databases can be compressed with a dictionary, run `taco db upgrade`")
+        except sqlite3.OperationalError:
+            raise RuntimeError("Database is missing version table")
+
+        old_compressor = BlockCompressor.load(db)
+
+        with closing(db.execute("SELECT MAX(height) FROM full_blocks")) as cursor:
+            row = cursor.fetchone()
+            if row is None or row[0] is None:
+                raise RuntimeError("Database has no blocks")
+            peak_height: int = row[0]
+
+        print(f"sampling {sample_size} blocks")
+        samples: List[bytes] = []
+        for height in random.sample(range(peak_height + 1), min(sample_size, peak_height + 1)):
+            with closing(
+                db.execute("SELECT block FROM full_blocks WHERE height=? AND in_main_chain=1", (height,))
+            ) as cursor:
+                row = cursor.fetchone()
+                if row is not None:
+                    samples.append(old_compressor.decompress(row[0]))
+
+        print(f"training a {dictionary_size} bytes dictionary")
+        with closing(db.execute(CREATE_DICTIONARY_TABLE)):
+            pass
+        with closing(db.execute("SELECT dict_id FROM compression_dictionaries")) as cursor:
+            existing_ids = [row[0] for row in cursor.fetchall()]
+        dict_id, dictionary = train_dictionary(samples, dictionary_size, existing_ids)
+
+        # The dictionary is committed first. Blocks record which dictionary they're compressed with, so the database
+        # stays readable if this is interrupted part way through
+        db.execute("INSERT INTO compression_dictionaries VALUES(?, ?)", (dict_id, dictionary))
+        db.commit()
+        new_compressor = BlockCompressor.load(db)
+        assert new_compressor.dict_id == dict_id
+        print(f"added zstd dictionary {dict_id}")
+
+        print("recompressing blocks")
+        size_before = 0
+        size_after = 0
+        block_count = 0
+        last_rowid = 0
+        start_time = monotonic()
+        while True:
+            with closing(
+                db.execute(
+                    "SELECT rowid, block FROM full_blocks WHERE rowid>? ORDER BY rowid LIMIT ?",
+                    (last_rowid, BATCH_SIZE),
+                )
+            ) as cursor:
+                rows = cursor.fetchall()
+            if len(rows) == 0:
+                break
+
+            updates = []
+            for rowid, block in rows:
+                compressed = new_compressor.compress(new_compressor.decompress(block))
+                size_before += len(block)
+                size_after += len(compressed)
+                updates.append((compressed, rowid))
+            db.executemany("UPDATE full_blocks SET block=? WHERE rowid=?", updates)
+            db.commit()
+
+            block_count += len(rows)
+            last_rowid = rows[-1][0]
+            print(f"\r{block_count} blocks {size_before / 1000000:.1f} MB -> {size_after / 1000000:.1f} MB", end="")
+
+        print(f"\nrecompressed {block_count} blocks in {monotonic() - start_time:0.2f}s")
+        if size_before > 0:
+            print(f"block data is {100 * size_after / size_before:.1f}% of its previous size")
+        print("the database file doesn't shrink by itself, `taco db backup` writes a compacted copy of it")
@@ -33,7 +33,7 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
     import sqlite3
     from contextlib import closing
 
-    import zstd
+    from taco.full_node.block_compression import BlockCompressor
 
     if not in_path.exists():
         print(f"input file doesn't exist. {in_path}")
@@ -64,6 +64,8 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
 
         print(f"peak hash: {peak}")
 
+        compressor = BlockCompressor.load(in_db)
+
         with closing(in_db.execute("SELECT height FROM full_blocks WHERE header_hash = ?", (peak,))) as cursor:
             peak_row = cursor.fetchone()
             if peak_row is None or peak_row == []:
@@ -105,7 +107,7 @@ def validate_v2(in_path: Path, *, validate_blocks: bool) -> None:
                     continue
 
                 if validate_blocks:
-                    block = FullBlock.from_bytes(zstd.decompress(row[4]))
+                    block = FullBlock.from_bytes(compressor.decompress(row[4]))
                     block_record = BlockRecord.from_bytes(row[5])
                     actual_header_hash = block.header_hash
                     actual_prev_hash = block.prev_header_hash
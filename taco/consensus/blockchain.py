@@ -10,7 +10,7 @@ from concurrent.futures.process import ProcessPoolExecutor
 from enum import Enum
 from multiprocessing.context import BaseContext
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 from taco.consensus.block_body_validation import validate_block_body
 from taco.consensus.block_header_validation import validate_unfinished_header_block
@@ -151,6 +151,12 @@ class Blockchain(BlockchainInterface):
         self._shut_down = True
         self.pool.shutdown(wait=True)
 
+    def close(self) -> None:
+        """
+        Closes the height to hash map's file. Call this once nothing uses the blockchain anymore, after shut_down().
+        """
+        self.__height_map.close()
+
     async def _load_chain_from_store(self, blockchain_dir: Path) -> None:
         """
         Initializes the state of the Blockchain class from the database.
@@ -284,6 +290,7 @@ class Blockchain(BlockchainInterface):
                     )
             except BaseException as e:
                 self.block_store.rollback_cache_block(header_hash)
+                self.coin_store.clear_cache()
                 log.error(
                     f"Error while adding block {block.header_hash} height {block.height},"
                     f" rolling back: {traceback.format_exc()} {e}"
@@ -632,15 +639,23 @@ class Blockchain(BlockchainInterface):
         wp_summaries: Optional[List[SubEpochSummary]] = None,
         *,
         validate_signatures: bool,
+        block_records: Optional[BlockchainInterface] = None,
+        get_block_generator: Optional[
+            Callable[[BlockInfo, Dict[bytes32, FullBlock]], Awaitable[Optional[BlockGenerator]]]
+        ] = None,
     ) -> List[PreValidationResult]:
+        """
+        block_records and get_block_generator default to this blockchain's. Other ones (e.g. a ChainExtension) can be
+        passed in to pre-validate blocks on top of blocks that haven't been added yet.
+        """
         return await pre_validate_blocks_multiprocessing(
             self.constants,
-            self,
+            self if block_records is None else block_records,
             blocks,
             self.pool,
             True,
             npc_results,
-            self.get_block_generator,
+            self.get_block_generator if get_block_generator is None else get_block_generator,
             batch_size,
             wp_summaries,
             validate_signatures=validate_signatures,
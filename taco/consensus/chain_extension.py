@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from taco.consensus.block_record import BlockRecord
+from taco.consensus.blockchain_interface import BlockchainInterface
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.blockchain_format.sub_epoch_summary import SubEpochSummary
+from taco.types.full_block import FullBlock
+from taco.util.ints import uint32
+
+
+class ChainExtension(BlockchainInterface):
+    """
+    A view of the blockchain extended with blocks that have been pre-validated but not added yet, assuming they become
+    the new peak. This is used to pre-validate the next batch of blocks while the current one is being added to the
+    blockchain. Block records added to it (e.g. temporarily, by pre-validation) are never added to the blockchain.
+    """
+
+    def __init__(self, base: BlockchainInterface) -> None:
+        self.base = base
+        self.start_height: Optional[uint32] = None
+        self.full_blocks: Dict[bytes32, FullBlock] = {}
+        self._block_records: Dict[bytes32, BlockRecord] = {}
+        self._height_to_hash: Dict[uint32, bytes32] = {}
+        self._sub_epoch_summaries: Dict[uint32, SubEpochSummary] = {}
+        self._peak: Optional[BlockRecord] = None
+
+    def extend(self, block: FullBlock, block_record: BlockRecord) -> None:
+        """
+        Adds a block on top of the extension (or of the blockchain, for the first one)
+        """
+        assert self._peak is None or block.prev_header_hash == self._peak.header_hash
+        if self.start_height is None:
+            self.start_height = block.height
+        self.full_blocks[block.header_hash] = block
+        self._block_records[block.header_hash] = block_record
+        self._height_to_hash[block.height] = block.header_hash
+        if block_record.sub_epoch_summary_included is not None:
+            self._sub_epoch_summaries[block.height] = block_record.sub_epoch_summary_included
+        self._peak = block_record
+
+    def block_records(self) -> List[BlockRecord]:
+        """
+        The block records of the blocks in the extension, in order
+        """
+        return [self._block_records[block.header_hash] for block in self.full_blocks.values()]
+
+    def get_peak(self) -> Optional[BlockRecord]:
+        if self._peak is not None:
+            return self._peak
+        return self.base.get_peak()
+
+    def get_peak_height(self) -> Optional[uint32]:
+        peak = self.get_peak()
+        return None if peak is None else peak.height
+
+    def block_record(self, header_hash: bytes32) -> BlockRecord:
+        block_record = self._block_records.get(header_hash)
+        if block_record is not None:
+            return block_record
+        return self.base.block_record(header_hash)
+
+    def height_to_block_record(self, height: uint32) -> BlockRecord:
+        header_hash: Optional[bytes32] = self.height_to_hash(height)
+        if header_hash is None:
+            raise ValueError(f"Height is not in blockchain: {height}")
+        return self.block_record(header_hash)
+
+    def get_ses_heights(self) -> List[uint32]:
+        # the blockchain's sub epoch summaries above the extension (if any) belong to the chain it replaces
+        heights = [h for h in self.base.get_ses_heights() if self.start_height is None or h < self.start_height]
+        return heights + sorted(self._sub_epoch_summaries.keys())
+
+    def get_ses(self, height: uint32) -> SubEpochSummary:
+        ses = self._sub_epoch_summaries.get(height)
+        if ses is not None:
+            return ses
+        return self.base.get_ses(height)
+
+    def height_to_hash(self, height: uint32) -> Optional[bytes32]:
+        if height in self._height_to_hash:
+            return self._height_to_hash[height]
+        if self.start_height is not None and height >= self.start_height:
+            return None
+        return self.base.height_to_hash(height)
+
+    def contains_block(self, header_hash: bytes32) -> bool:
+        return header_hash in self._block_records or self.base.contains_block(header_hash)
+
+    def contains_height(self, height: uint32) -> bool:
+        return self.height_to_hash(height) is not None
+
+    def remove_block_record(self, header_hash: bytes32) -> None:
+        del self._block_records[header_hash]
+
+    def add_block_record(self, block_record: BlockRecord) -> None:
+        self._block_records[block_record.header_hash] = block_record
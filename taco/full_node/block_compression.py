@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import random
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import zstandard
+import zstd
+
+# the level zstd.compress() uses by default
+COMPRESSION_LEVEL = 3
+# zstd's default dictionary size
+DEFAULT_DICTIONARY_SIZE = 112640
+
+# Dictionaries are never deleted, blocks compressed with any of them must remain readable. The one added last is used
+# to compress new blocks.
+CREATE_DICTIONARY_TABLE = (
+    "CREATE TABLE IF NOT EXISTS compression_dictionaries(dict_id bigint PRIMARY KEY, dictionary blob)"
+)
+SELECT_DICTIONARIES = "SELECT dict_id, dictionary FROM compression_dictionaries ORDER BY rowid"
+
+
+class BlockCompressor:
+    """
+    Compresses and decompresses the blocks stored in the full_blocks table (v2 databases).
+
+    Blocks are stored as zstd frames. Once a dictionary has been trained from a sample of blocks (`taco db compress`),
+    new blocks are compressed with it. Every frame records the id of the dictionary it was compressed with (0 for
+    none), so blocks written before a dictionary was added stay readable. Without any dictionary the plain zstd module
+    is used, as before.
+    """
+
+    def __init__(self, dictionaries: Iterable[Tuple[int, bytes]] = ()):
+        self._dictionaries: Dict[int, Any] = {}
+        self._active: Optional[Any] = None
+        self._local = threading.local()
+        for dict_id, dictionary in dictionaries:
+            compression_dict = zstandard.ZstdCompressionDict(dictionary)
+            if compression_dict.dict_id() != dict_id:
+                raise ValueError(f"zstd dictionary {dict_id} has a mismatching id: {compression_dict.dict_id()}")
+            self._dictionaries[dict_id] = compression_dict
+            self._active = compression_dict
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> BlockCompressor:
+        """
+        Loads the dictionaries from a (synchronous) database connection.
+        """
+        try:
+            rows = conn.execute(SELECT_DICTIONARIES).fetchall()
+        except sqlite3.OperationalError:
+            # the table doesn't exist, the database doesn't use dictionaries
+            rows = []
+        return cls((row[0], row[1]) for row in rows)
+
+    @property
+    def dict_id(self) -> int:
+        """
+        The id of the dictionary new blocks are compressed with, or 0 if there's none.
+        """
+        return 0 if self._active is None else int(self._active.dict_id())
+
+    def compress(self, block_bytes: bytes) -> bytes:
+        if self._active is None:
+            ret: bytes = zstd.compress(block_bytes)
+            return ret
+        # compressor and decompressor objects are not thread safe, each thread gets its own
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=self._active)
+            self._local.compressor = compressor
+        compressed: bytes = compressor.compress(block_bytes)
+        return compressed
+
+    def decompress(self, compressed: bytes) -> bytes:
+        if len(self._dictionaries) == 0:
+            ret: bytes = zstd.decompress(compressed)
+            return ret
+        dict_id = zstandard.get_frame_parameters(compressed).dict_id
+        if dict_id == 0:
+            ret = zstd.decompress(compressed)
+            return ret
+        decompressors: Optional[Dict[int, Any]] = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = {}
+            self._local.decompressors = decompressors
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            compression_dict = self._dictionaries.get(dict_id)
+            if compression_dict is None:
+                raise ValueError(f"block compressed with unknown zstd dictionary {dict_id}")
+            decompressor = zstandard.ZstdDecompressor(dict_data=compression_dict)
+            decompressors[dict_id] = decompressor
+        decompressed: bytes = decompressor.decompress(compressed)
+        return decompressed
+
+
+def train_dictionary(samples: List[bytes], dictionary_size: int, existing_ids: Iterable[int] = ()) -> Tuple[int, bytes]:
+    """
+    Trains a zstd dictionary from a sample of (uncompressed) blocks. Returns the id of the dictionary, which is
+    different from the existing ones, and its content.
+    """
+    taken = set(existing_ids)
+    dict_id = 0
+    while dict_id == 0 or dict_id in taken:
+        # ids below 32768 are reserved by zstd for registered dictionaries
+        dict_id = random.randint(32768, 2**31 - 1)
+    compression_dict = zstandard.train_dictionary(dictionary_size, samples, dict_id=dict_id, level=COMPRESSION_LEVEL)
+    return dict_id, compression_dict.as_bytes()
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import heapq
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from taco.protocols.full_node_protocol import RequestBlocks, RespondBlocks
+from taco.server.ws_connection import WSTacoConnection
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.full_block import FullBlock
+from taco.util.ints import uint32
+
+log = logging.getLogger(__name__)
+
+# the latency assumed for a peer we haven't received any blocks from yet
+DEFAULT_LATENCY = 2.0
+# weight of the most recent request in a peer's latency average
+LATENCY_SMOOTHING = 0.3
+# how often the per peer statistics are logged
+REPORT_INTERVAL = 10.0
+
+
+@dataclasses.dataclass
+class PeerDownloadStats:
+    peer: WSTacoConnection
+    start_time: float
+    start_bytes_read: int
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    blocks: int = 0
+    # exponential moving average of the time it takes the peer to respond
+    latency: Optional[float] = None
+
+    def expected_latency(self) -> float:
+        return DEFAULT_LATENCY if self.latency is None else self.latency
+
+    def expected_completion(self) -> float:
+        """
+        When a request sent to this peer now is expected to complete, given the ones already in flight
+        """
+        return (self.in_flight + 1) * self.expected_latency()
+
+    def record_response(self, seconds: float, block_count: int) -> None:
+        self.requests += 1
+        self.blocks += block_count
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * self.latency
+
+    def bandwidth(self, now: float) -> float:
+        """
+        The bytes per second received from this peer since the download started
+        """
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        return (self.peer.bytes_read - self.start_bytes_read) / elapsed
+
+
+@dataclasses.dataclass(frozen=True)
+class _BlockRequest:
+    stats: PeerDownloadStats
+    start_height: int
+    end_height: int
+    sent: float
+
+
+class BlockDownloadScheduler:
+    """
+    Downloads the block ranges [start, start + batch_size] from start_height up to end_height, for long sync. Several
+    ranges are kept in flight across all the peers, each request going to the peer expected to complete it first
+    (based on its measured latency and the requests it already has in flight). The range the consumer is waiting
+    for is requested from another peer as well if it's taking much longer than expected, the first response wins.
+    Ranges are put in the output queue in order, a None marks the end (or a failure to download).
+    """
+
+    def __init__(
+        self,
+        start_height: int,
+        end_height: int,
+        batch_size: int,
+        get_peers: Callable[[], List[WSTacoConnection]],
+        *,
+        requests_per_peer: int = 2,
+        window_size: int = 32,
+        request_timeout: int = 30,
+        max_failures: int = 3,
+        straggler_factor: float = 3.0,
+        straggler_min_seconds: float = 3.0,
+    ) -> None:
+        self.ranges: List[Tuple[int, int]] = [
+            (start, min(end_height, start + batch_size)) for start in range(start_height, end_height, batch_size)
+        ]
+        self.get_peers = get_peers
+        self.requests_per_peer = requests_per_peer
+        # the number of ranges past the one the consumer is waiting for that may be downloaded, this bounds the
+        # number of blocks held in memory
+        self.window_size = window_size
+        self.request_timeout = request_timeout
+        self.max_failures = max_failures
+        self.straggler_factor = straggler_factor
+        self.straggler_min_seconds = straggler_min_seconds
+        self.peer_stats: Dict[bytes32, PeerDownloadStats] = {}
+        # the peers that failed too many requests
+        self._dropped: Set[bytes32] = set()
+        # the index (into ranges) of the next range to hand to the consumer
+        self._next_index = 0
+        # the ranges not requested yet (or whose requests failed), a heap
+        self._pending: List[int] = list(range(len(self.ranges)))
+        # the requests in flight, for each range
+        self._in_flight: Dict[int, List[_BlockRequest]] = {}
+        self._tasks: Dict[asyncio.Task[Optional[List[FullBlock]]], Tuple[int, _BlockRequest]] = {}
+        # ranges downloaded, waiting to be handed to the consumer in order
+        self._completed: Dict[int, Tuple[WSTacoConnection, List[FullBlock]]] = {}
+        self._last_report = time.monotonic()
+
+    def _refresh_peers(self, now: float) -> None:
+        for peer in self.get_peers():
+            if peer.closed or peer.peer_node_id in self.peer_stats or peer.peer_node_id in self._dropped:
+                continue
+            self.peer_stats[peer.peer_node_id] = PeerDownloadStats(peer, now, peer.bytes_read)
+        for node_id, stats in list(self.peer_stats.items()):
+            if stats.peer.closed or stats.failures >= self.max_failures:
+                self._dropped.add(node_id)
+                del self.peer_stats[node_id]
+
+    def _best_peer(self, exclude: Set[bytes32]) -> Optional[PeerDownloadStats]:
+        best: Optional[PeerDownloadStats] = None
+        for node_id, stats in self.peer_stats.items():
+            if node_id in exclude or stats.in_flight >= self.requests_per_peer:
+                continue
+            if best is None or stats.expected_completion() < best.expected_completion():
+                best = stats
+        return best
+
+    def _send(self, index: int, stats: PeerDownloadStats, now: float) -> None:
+        start_height, end_height = self.ranges[index]
+        request = _BlockRequest(stats, start_height, end_height, now)
+        stats.in_flight += 1
+        task = asyncio.create_task(self._request_blocks(request))
+        self._tasks[task] = (index, request)
+        self._in_flight.setdefault(index, []).append(request)
+
+    async def _request_blocks(self, request: _BlockRequest) -> Optional[List[FullBlock]]:
+        peer = request.stats.peer
+        response = await peer.request_blocks(
+            RequestBlocks(uint32(request.start_height), uint32(request.end_height), True),
+            timeout=self.request_timeout,
+        )
+        if response is None:
+            # the request timed out
+            await peer.close()
+            return None
+        if not isinstance(response, RespondBlocks):
+            return None
+        blocks: List[FullBlock] = response.blocks
+        if (
+            len(blocks) != request.end_height - request.start_height + 1
+            or blocks[0].height != request.start_height
+            or blocks[-1].height != request.end_height
+        ):
+            log.warning(f"peer {peer.peer_host} responded with the wrong blocks for {request.start_height}")
+            return None
+        return blocks
+
+    def _schedule(self, now: float) -> None:
+        # assign the ranges in order, within the window
+        window_end = min(len(self.ranges), self._next_index + self.window_size)
+        while len(self._pending) > 0 and self._pending[0] < window_end:
+            stats = self._best_peer(set())
+            if stats is None:
+                break
+            self._send(heapq.heappop(self._pending), stats, now)
+
+        # if the range the consumer is waiting for is late, ask another peer for it as well
+        requests = self._in_flight.get(self._next_index, [])
+        if len(requests) != 1 or self._next_index in self._completed:
+            return
+        fastest = min((stats.expected_latency() for stats in self.peer_stats.values()), default=DEFAULT_LATENCY)
+        if now - requests[0].sent < max(self.straggler_min_seconds, self.straggler_factor * fastest):
+            return
+        stats = self._best_peer({requests[0].stats.peer.peer_node_id})
+        if stats is not None:
+            late = requests[0]
+            log.info(
+                f"blocks {late.start_height} to {late.end_height} from {late.stats.peer.peer_host} are late, "
+                f"requesting them from {stats.peer.peer_host}"
+            )
+            self._send(self._next_index, stats, now)
+
+    def _handle_done(self, task: asyncio.Task[Optional[List[FullBlock]]], now: float) -> None:
+        index, request = self._tasks.pop(task)
+        stats = request.stats
+        stats.in_flight -= 1
+        self._in_flight[index].remove(request)
+        blocks: Optional[List[FullBlock]] = None
+        if task.cancelled():
+            pass
+        elif task.exception() is not None:
+            log.warning(f"failed requesting blocks from {stats.peer.peer_host}: {task.exception()}")
+        else:
+            blocks = task.result()
+
+        if blocks is None:
+            stats.failures += 1
+        else:
+            stats.record_response(now - request.sent, len(blocks))
+            if index >= self._next_index and index not in self._completed:
+                self._completed[index] = (stats.peer, blocks)
+
+        if len(self._in_flight[index]) == 0:
+            del self._in_flight[index]
+            if index >= self._next_index and index not in self._completed:
+                # every request for this range failed, try again
+                heapq.heappush(self._pending, index)
+
+    def _report(self, now: float) -> None:
+        if now - self._last_report < REPORT_INTERVAL:
+            return
+        self._last_report = now
+        for stats in sorted(self.peer_stats.values(), key=lambda s: s.expected_latency()):
+            log.info(
+                f"sync download from {stats.peer.peer_host}: {stats.bandwidth(now) / 1000000:.2f} MB/s "
+                f"{stats.blocks} blocks, latency {stats.expected_latency():.2f}s, "
+                f"{stats.in_flight} in flight, {stats.failures} failures"
+            )
+
+    def bandwidth(self) -> Dict[str, float]:
+        """
+        Returns the bytes per second received from each peer, by host
+        """
+        now = time.monotonic()
+        return {stats.peer.peer_host: stats.bandwidth(now) for stats in self.peer_stats.values()}
+
+    async def run(self, output: asyncio.Queue[Optional[Tuple[WSTacoConnection, List[FullBlock]]]]) -> None:
+        try:
+            while self._next_index < len(self.ranges):
+                now = time.monotonic()
+                self._refresh_peers(now)
+                self._schedule(now)
+
+                # hand over the ranges downloaded, in order, as long as the consumer keeps up
+                while self._next_index in self._completed and not output.full():
+                    output.put_nowait(self._completed.pop(self._next_index))
+                    self._next_index += 1
+                if self._next_index == len(self.ranges):
+                    break
+
+                if len(self._tasks) == 0:
+                    if self._next_index not in self._completed and len(self.peer_stats) == 0:
+                        start_height, end_height = self.ranges[self._next_index]
+                        log.error(f"failed fetching {start_height} to {end_height} from peers")
+                        return
+                    # waiting for the consumer to catch up
+                    await asyncio.sleep(0.1)
+                    continue
+
+                # wake up regularly to check for late requests, and more often while the consumer is behind
+                timeout = min(1.0, self.straggler_min_seconds) if self._next_index not in self._completed else 0.1
+                done, _ = await asyncio.wait(self._tasks.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                now = time.monotonic()
+                for task in done:
+                    self._handle_done(task, now)
+                self._report(now)
+        finally:
+            # Requests still in flight (for ranges another peer was faster with) are left to complete or time out,
+            # cancelling them would leave their responses behind in the connection
+            # finished signal with None
+            await output.put(None)
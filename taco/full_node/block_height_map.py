@@ -1,5 +1,7 @@
 import logging
-from typing import Dict, List, Optional, Tuple
+import mmap
+import os
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from taco.util.ints import uint32
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.blockchain_format.sub_epoch_summary import SubEpochSummary
@@ -12,6 +14,9 @@ from taco.util.db_wrapper import DBWrapper2
 
 log = logging.getLogger(__name__)
 
+# the height-to-hash file is grown by this many heights at a time
+HEIGHT_TO_HASH_CHUNK = 65536
+
 
 @streamable
 @dataclass(frozen=True)
@@ -29,7 +34,14 @@ class BlockHeightMap:
     # this buffer contains all block hashes that are part of the current peak
     # ordered by height. i.e. __height_to_hash[0..32] is the genesis hash
     # __height_to_hash[32..64] is the hash for height 1 and so on
-    __height_to_hash: bytearray
+    # It's the height-to-hash file mapped into memory, so changes are written
+    # to it in place. The file is grown in chunks, the part past the peak is
+    # all zeros
+    __height_to_hash: mmap.mmap
+    __height_to_hash_file: BinaryIO
+
+    # the number of heights in __height_to_hash, i.e. the peak height + 1
+    __height_count: int
 
     # All sub-epoch summaries that have been included in the blockchain from the beginning until and including the peak
     # (height_included, SubEpochSummary). Note: ONLY for the blocks in the path to the peak
@@ -40,6 +52,11 @@ class BlockHeightMap:
     # disk
     __dirty: int
 
+    # the range of __height_to_hash (in bytes) changed since the cache was last
+    # written to disk
+    __dirty_start: int
+    __dirty_end: int
+
     # the file we're saving the height-to-hash cache to
     __height_to_hash_filename: Path
 
@@ -52,11 +69,18 @@ class BlockHeightMap:
         self.db = db
 
         self.__dirty = 0
-        self.__height_to_hash = bytearray()
+        self.__dirty_start = 0
+        self.__dirty_end = 0
+        self.__height_count = 0
         self.__sub_epoch_summaries = {}
         self.__height_to_hash_filename = blockchain_dir / "height-to-hash"
         self.__ses_filename = blockchain_dir / "sub-epoch-summaries"
 
+        blockchain_dir.mkdir(parents=True, exist_ok=True)
+        # this creates the file if it doesn't exist, without truncating it
+        self.__height_to_hash_file = open(self.__height_to_hash_filename, "a+b")
+        self.__height_to_hash = self.__map_height_to_hash()
+
         async with self.db.reader_no_transaction() as conn:
             if db.db_version == 2:
                 async with conn.execute("SELECT hash FROM current_peak WHERE key = 0") as cursor:
@@ -79,13 +103,6 @@ class BlockHeightMap:
                     if row is None:
                         return self
 
-        try:
-            async with aiofiles.open(self.__height_to_hash_filename, "rb") as f:
-                self.__height_to_hash = bytearray(await f.read())
-        except Exception:
-            # it's OK if this file doesn't exist, we can rebuild it
-            pass
-
         try:
             async with aiofiles.open(self.__ses_filename, "rb") as f:
                 self.__sub_epoch_summaries = {k: v for (k, v) in SesCache.from_bytes(await f.read()).content}
@@ -103,17 +120,17 @@ class BlockHeightMap:
             prev_hash = bytes32.fromhex(row[1])
         height = row[2]
 
-        # allocate memory for height to hash map
-        # this may also truncate it, if thie file on disk had an invalid size
-        new_size = (height + 1) * 32
-        size = len(self.__height_to_hash)
-        if size > new_size:
-            del self.__height_to_hash[new_size:]
-        else:
-            self.__height_to_hash += bytearray([0] * (new_size - size))
+        # resize the height to hash map to the peak. Anything past it in the
+        # file is dropped (it's not part of the chain in the DB), and the file
+        # is grown with zeros if it's shorter
+        self.__height_to_hash.close()
+        self.__height_to_hash_file.truncate((height + 1) * 32)
+        self.__height_to_hash = self.__map_height_to_hash()
+        self.__height_count = height + 1
 
         # if the peak hash is already in the height-to-hash map, we don't need
-        # to load anything more from the DB
+        # to load anything more from the DB. Otherwise only the tail that
+        # doesn't match the DB is loaded, back to a block that matches
         if self.get_hash(height) != peak:
             self.__set_hash(height, peak)
 
@@ -127,10 +144,35 @@ class BlockHeightMap:
 
         return self
 
+    def __map_height_to_hash(self) -> mmap.mmap:
+        # maps the height-to-hash file, after growing it to a whole number of
+        # chunks (an empty file can't be mapped)
+        f = self.__height_to_hash_file
+        size = os.fstat(f.fileno()).st_size
+        chunk_size = HEIGHT_TO_HASH_CHUNK * 32
+        capacity = max(chunk_size, (size + chunk_size - 1) // chunk_size * chunk_size)
+        if capacity != size:
+            f.truncate(capacity)
+        return mmap.mmap(f.fileno(), capacity)
+
+    def __reserve(self, height_count: int) -> None:
+        if height_count * 32 <= len(self.__height_to_hash):
+            return
+        # the file is grown in place, not every platform can resize a mapping
+        # so it's mapped again
+        self.__height_to_hash.close()
+        self.__height_to_hash_file.truncate(height_count * 32)
+        self.__height_to_hash = self.__map_height_to_hash()
+
+    def close(self) -> None:
+        # the changes since the last flush are written to the file by the OS
+        self.__height_to_hash.close()
+        self.__height_to_hash_file.close()
+
     def update_height(self, height: uint32, header_hash: bytes32, ses: Optional[SubEpochSummary]) -> None:
         # we're only updating the last hash. If we've reorged, we already rolled
         # back, making this the new peak
-        assert height * 32 <= len(self.__height_to_hash)
+        assert height <= self.__height_count
         self.__set_hash(height, header_hash)
         if ses is not None:
             self.__sub_epoch_summaries[height] = bytes(ses)
@@ -139,14 +181,17 @@ class BlockHeightMap:
         if self.__dirty < 1000:
             return
 
-        assert (len(self.__height_to_hash) % 32) == 0
-        map_buf = self.__height_to_hash.copy()
+        # only the pages that changed since the last flush are written
+        start = self.__dirty_start // mmap.ALLOCATIONGRANULARITY * mmap.ALLOCATIONGRANULARITY
+        if self.__dirty_end > start:
+            self.__height_to_hash.flush(start, self.__dirty_end - start)
 
         ses_buf = bytes(SesCache([(k, v) for (k, v) in self.__sub_epoch_summaries.items()]))
 
         self.__dirty = 0
+        self.__dirty_start = len(self.__height_to_hash)
+        self.__dirty_end = 0
 
-        await write_file_async(self.__height_to_hash_filename, map_buf)
         await write_file_async(self.__ses_filename, ses_buf)
 
     # load height-to-hash map entries from the DB starting at height back in
@@ -208,17 +253,29 @@ class BlockHeightMap:
                 prev_hash = entry[1]
 
     def __set_hash(self, height: int, block_hash: bytes32) -> None:
+        if height >= self.__height_count:
+            self.__reserve(height + 1)
+            self.__height_count = height + 1
         idx = height * 32
         self.__height_to_hash[idx : idx + 32] = block_hash
+        self.__mark_dirty(idx, idx + 32)
         self.__dirty += 1
 
+    def __mark_dirty(self, start: int, end: int) -> None:
+        if self.__dirty_start >= self.__dirty_end:
+            self.__dirty_start = start
+            self.__dirty_end = end
+        else:
+            self.__dirty_start = min(self.__dirty_start, start)
+            self.__dirty_end = max(self.__dirty_end, end)
+
     def get_hash(self, height: uint32) -> bytes32:
+        assert height < self.__height_count
         idx = height * 32
-        assert idx + 32 <= len(self.__height_to_hash)
         return bytes32(self.__height_to_hash[idx : idx + 32])
 
     def contains_height(self, height: uint32) -> bool:
-        return height * 32 < len(self.__height_to_hash)
+        return height < self.__height_count
 
     def rollback(self, fork_height: int) -> None:
         # fork height may be -1, in which case all blocks are different and we
@@ -229,7 +286,15 @@ class BlockHeightMap:
                 heights_to_delete.append(ses_included_height)
         for height in heights_to_delete:
             del self.__sub_epoch_summaries[height]
-        del self.__height_to_hash[(fork_height + 1) * 32 :]
+        # the hashes past the fork are cleared in the file as well, so that it
+        # doesn't look like they're part of the chain if the node stops before
+        # the new ones are written
+        start = (fork_height + 1) * 32
+        end = self.__height_count * 32
+        if end > start:
+            self.__height_to_hash[start:end] = bytes(end - start)
+            self.__mark_dirty(start, end)
+            self.__height_count = fork_height + 1
 
     def get_ses(self, height: uint32) -> SubEpochSummary:
         return SubEpochSummary.from_bytes(self.__sub_epoch_summaries[height])
@@ -1,21 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import dataclasses
 import logging
 import sqlite3
-from typing import Dict, List, Optional, Tuple, Any, Union, Sequence
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Any, Union, Sequence
 
 import typing_extensions
-import zstd
 
 from taco.consensus.block_record import BlockRecord
+from taco.full_node.block_compression import CREATE_DICTIONARY_TABLE, SELECT_DICTIONARIES, BlockCompressor
 from taco.types.blockchain_format.program import SerializedProgram
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.full_block import FullBlock
 from taco.types.weight_proof import SubEpochChallengeSegment, SubEpochSegments
 from taco.util.db_wrapper import DBWrapper2, execute_fetchone
 from taco.util.errors import Err
-from taco.util.full_block_utils import block_info_from_block, generator_from_block
+from taco.util.full_block_utils import BlockView, block_info_from_block, generator_from_block
 from taco.util.ints import uint32
 from taco.util.lru_cache import LRUCache
 from taco.util.full_block_utils import GeneratorBlockInfo
@@ -23,12 +25,30 @@ from taco.util.full_block_utils import GeneratorBlockInfo
 log = logging.getLogger(__name__)
 
 
+@dataclasses.dataclass
+class PendingBlock:
+    block: FullBlock
+    block_record: BlockRecord
+    in_main_chain: bool = False
+    # the pending peak before this block was added, restored if the block is rolled back
+    prev_peak: Optional[bytes32] = None
+
+
 @typing_extensions.final
 @dataclasses.dataclass
 class BlockStore:
     block_cache: LRUCache[bytes32, FullBlock]
     db_wrapper: DBWrapper2
     ses_challenge_cache: LRUCache[bytes32, List[SubEpochChallengeSegment]]
+    # Compressed blocks of the batches being synced, see precompress_blocks()
+    precompressed_blocks: Dict[bytes32, bytes] = dataclasses.field(default_factory=dict)
+    # header hashes of the last batch passed to precompress_blocks()
+    precompressed_batch: Set[bytes32] = dataclasses.field(default_factory=set)
+    # Blocks added while bulk_insert() is active, that haven't been inserted yet, see flush_blocks()
+    pending_blocks: Optional[Dict[bytes32, PendingBlock]] = None
+    # the peak set while bulk_insert() is active, if it's one of the pending blocks
+    pending_peak: Optional[bytes32] = None
+    compressor: BlockCompressor = dataclasses.field(default_factory=BlockCompressor)
 
     @classmethod
     async def create(cls, db_wrapper: DBWrapper2) -> BlockStore:
@@ -84,6 +104,13 @@ class BlockStore:
                     "CREATE INDEX IF NOT EXISTS main_chain ON full_blocks(height, in_main_chain) WHERE in_main_chain=1"
                 )
 
+                # zstd dictionaries the blocks may be compressed with, see "taco db compress"
+                await conn.execute(CREATE_DICTIONARY_TABLE)
+                async with conn.execute(SELECT_DICTIONARIES) as cursor:
+                    self.compressor = BlockCompressor((row[0], row[1]) for row in await cursor.fetchall())
+                if self.compressor.dict_id != 0:
+                    log.info(f"DB: Compressing blocks with zstd dictionary {self.compressor.dict_id}")
+
             else:
 
                 await conn.execute(
@@ -135,25 +162,59 @@ class BlockStore:
             return field.hex()
 
     def compress(self, block: FullBlock) -> bytes:
-        ret: bytes = zstd.compress(bytes(block))
+        ret: bytes = self.compressor.compress(bytes(block))
         return ret
 
+    async def compress_blocks(self, blocks: List[FullBlock]) -> List[bytes]:
+        """
+        Compresses the blocks in parallel, on the default thread pool (zstd releases the GIL while compressing).
+        """
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(loop.run_in_executor(None, self.compress, block) for block in blocks)))
+
+    async def precompress_blocks(self, blocks: List[FullBlock], *, keep_previous: bool = False) -> None:
+        """
+        Compresses a batch of blocks that is about to be added one by one with add_full_block(), so that they don't
+        get compressed serially as each block is added. Replaces the previous batches, except for the last one if
+        keep_previous is set (because it's still being added).
+        """
+        if self.db_wrapper.db_version != 2:
+            return None
+        compressed = await self.compress_blocks(blocks)
+        precompressed = {block.header_hash: block_bytes for block, block_bytes in zip(blocks, compressed)}
+        if keep_previous:
+            # the blocks of older batches that were never added are dropped
+            self.precompressed_blocks = {
+                header_hash: block_bytes
+                for header_hash, block_bytes in self.precompressed_blocks.items()
+                if header_hash in self.precompressed_batch
+            }
+            self.precompressed_blocks.update(precompressed)
+        else:
+            self.precompressed_blocks = precompressed
+        self.precompressed_batch = set(precompressed.keys())
+
     def maybe_decompress(self, block_bytes: bytes) -> FullBlock:
         if self.db_wrapper.db_version == 2:
-            ret: FullBlock = FullBlock.from_bytes(zstd.decompress(block_bytes))
+            ret: FullBlock = FullBlock.from_bytes(self.compressor.decompress(block_bytes))
         else:
             ret = FullBlock.from_bytes(block_bytes)
         return ret
 
     def maybe_decompress_blob(self, block_bytes: bytes) -> bytes:
         if self.db_wrapper.db_version == 2:
-            ret: bytes = zstd.decompress(block_bytes)
+            ret: bytes = self.compressor.decompress(block_bytes)
             return ret
         else:
             return block_bytes
 
     async def rollback(self, height: int) -> None:
         if self.db_wrapper.db_version == 2:
+            pending_blocks = self.get_pending_blocks()
+            if pending_blocks is not None:
+                for pending in pending_blocks.values():
+                    if pending.block.height > height:
+                        pending.in_main_chain = False
             async with self.db_wrapper.writer_maybe_transaction() as conn:
                 await conn.execute(
                     "UPDATE OR FAIL full_blocks SET in_main_chain=0 WHERE height>? AND in_main_chain=1", (height,)
@@ -161,6 +222,17 @@ class BlockStore:
 
     async def set_in_chain(self, header_hashes: List[Tuple[bytes32]]) -> None:
         if self.db_wrapper.db_version == 2:
+            pending_blocks = self.get_pending_blocks()
+            if pending_blocks is not None:
+                for (header_hash,) in header_hashes:
+                    pending = pending_blocks.get(header_hash)
+                    if pending is not None:
+                        pending.in_main_chain = True
+                header_hashes = [
+                    (header_hash,) for (header_hash,) in header_hashes if header_hash not in pending_blocks
+                ]
+                if len(header_hashes) == 0:
+                    return None
             async with self.db_wrapper.writer_maybe_transaction() as conn:
                 await conn.executemany(
                     "UPDATE OR FAIL full_blocks SET in_main_chain=1 WHERE header_hash=?", header_hashes
@@ -191,6 +263,11 @@ class BlockStore:
     async def add_full_block(self, header_hash: bytes32, block: FullBlock, block_record: BlockRecord) -> None:
         self.block_cache.put(header_hash, block)
 
+        pending_blocks = self.get_pending_blocks()
+        if pending_blocks is not None:
+            pending_blocks[header_hash] = PendingBlock(block, block_record, prev_peak=self.pending_peak)
+            return None
+
         if self.db_wrapper.db_version == 2:
 
             ses: Optional[bytes] = (
@@ -209,7 +286,7 @@ class BlockStore:
                         ses,
                         int(block.is_fully_compactified()),
                         False,  # in_main_chain
-                        self.compress(block),
+                        self.precompressed_blocks.pop(header_hash, None) or self.compress(block),
                         bytes(block_record),
                     ),
                 )
@@ -242,6 +319,129 @@ class BlockStore:
                     ),
                 )
 
+    async def add_full_blocks(self, blocks: List[Tuple[FullBlock, BlockRecord]], in_main_chain: bool = False) -> None:
+        """
+        Adds a batch of blocks at once, with a single executemany per table. The blocks that weren't precompressed are
+        compressed in parallel. With in_main_chain set, the blocks must be a contiguous chain extending the current
+        peak, they are all set in the main chain and the last one becomes the new peak.
+        """
+        if len(blocks) == 0:
+            return None
+        header_hashes: List[bytes32] = []
+        for block, _ in blocks:
+            header_hashes.append(block.header_hash)
+            self.block_cache.put(header_hashes[-1], block)
+
+        if self.db_wrapper.db_version == 2:
+            compressed: Dict[bytes32, bytes] = {}
+            to_compress: List[FullBlock] = []
+            for header_hash, (block, _) in zip(header_hashes, blocks):
+                block_bytes = self.precompressed_blocks.pop(header_hash, None)
+                if block_bytes is None:
+                    to_compress.append(block)
+                else:
+                    compressed[header_hash] = block_bytes
+            for block, block_bytes in zip(to_compress, await self.compress_blocks(to_compress)):
+                compressed[block.header_hash] = block_bytes
+
+            rows2 = []
+            for header_hash, (block, block_record) in zip(header_hashes, blocks):
+                rows2.append(
+                    (
+                        header_hash,
+                        block.prev_header_hash,
+                        block.height,
+                        None
+                        if block_record.sub_epoch_summary_included is None
+                        else bytes(block_record.sub_epoch_summary_included),
+                        int(block.is_fully_compactified()),
+                        False,  # in_main_chain
+                        compressed[header_hash],
+                        bytes(block_record),
+                    )
+                )
+            async with self.db_wrapper.writer_maybe_transaction() as conn:
+                await conn.executemany("INSERT OR IGNORE INTO full_blocks VALUES(?, ?, ?, ?, ?, ?, ?, ?)", rows2)
+                if in_main_chain:
+                    await self.set_in_chain([(header_hash,) for header_hash in header_hashes])
+                    await self.set_peak(header_hashes[-1])
+
+        else:
+            block_rows = []
+            record_rows = []
+            for header_hash, (block, block_record) in zip(header_hashes, blocks):
+                block_rows.append(
+                    (
+                        header_hash.hex(),
+                        block.height,
+                        int(block.is_transaction_block()),
+                        int(block.is_fully_compactified()),
+                        bytes(block),
+                    )
+                )
+                record_rows.append(
+                    (
+                        header_hash.hex(),
+                        block.prev_header_hash.hex(),
+                        block.height,
+                        bytes(block_record),
+                        None
+                        if block_record.sub_epoch_summary_included is None
+                        else bytes(block_record.sub_epoch_summary_included),
+                        False,
+                        block.is_transaction_block(),
+                    )
+                )
+            async with self.db_wrapper.writer_maybe_transaction() as conn:
+                await conn.executemany("INSERT OR IGNORE INTO full_blocks VALUES(?, ?, ?, ?, ?)", block_rows)
+                await conn.executemany("INSERT OR IGNORE INTO block_records VALUES(?, ?, ?, ?,?, ?, ?)", record_rows)
+                if in_main_chain:
+                    await self.set_peak(header_hashes[-1])
+
+    @contextlib.asynccontextmanager
+    async def bulk_insert(self) -> AsyncIterator[None]:
+        """
+        Must be entered within a write transaction. Until it exits, add_full_block() doesn't insert the blocks. They
+        are kept pending, and inserted all at once by flush_blocks(), which is called on exit. set_in_chain(),
+        set_peak() and rollback() update the pending blocks in memory, and get_block_record() and get_full_block()
+        return them, to the writer. The other queries don't see them, flush_blocks() must be called before they are
+        needed, outside of any savepoint that may still be rolled back (since the flushed blocks would be rolled back
+        with it).
+        This only has an effect with the v2 database schema.
+        """
+        if self.db_wrapper.db_version != 2 or self.pending_blocks is not None:
+            yield
+            return
+        assert self.db_wrapper.is_writer()
+        self.pending_blocks = {}
+        try:
+            yield
+        finally:
+            try:
+                await self.flush_blocks()
+            finally:
+                self.pending_blocks = None
+                self.pending_peak = None
+
+    async def flush_blocks(self) -> None:
+        """
+        Inserts the pending blocks of bulk_insert(), sets the ones that were set in the main chain, and sets the peak
+        if it was set to one of them.
+        """
+        if not self.pending_blocks:
+            return None
+        pending_blocks = list(self.pending_blocks.values())
+        peak = self.pending_peak
+        self.pending_blocks = {}
+        self.pending_peak = None
+        async with self.db_wrapper.writer():
+            await self.add_full_blocks([(pending.block, pending.block_record) for pending in pending_blocks])
+            await self.set_in_chain(
+                [(pending.block.header_hash,) for pending in pending_blocks if pending.in_main_chain]
+            )
+            if peak is not None:
+                await self.set_peak(peak)
+
     async def persist_sub_epoch_challenge_segments(
         self, ses_block_hash: bytes32, segments: List[SubEpochChallengeSegment]
     ) -> None:
@@ -279,12 +479,20 @@ class BlockStore:
             # this is best effort. When rolling back, we may not have added the
             # block to the cache yet
             pass
+        pending_blocks = self.get_pending_blocks()
+        if pending_blocks is not None:
+            pending = pending_blocks.pop(header_hash, None)
+            if pending is not None and self.pending_peak == header_hash:
+                self.pending_peak = pending.prev_peak
 
     async def get_full_block(self, header_hash: bytes32) -> Optional[FullBlock]:
         cached: Optional[FullBlock] = self.block_cache.get(header_hash)
         if cached is not None:
             log.debug(f"cache hit for block {header_hash.hex()}")
             return cached
+        pending = self.get_pending_block(header_hash)
+        if pending is not None:
+            return pending.block
         log.debug(f"cache miss for block {header_hash.hex()}")
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(
@@ -310,7 +518,7 @@ class BlockStore:
                 row = await cursor.fetchone()
         if row is not None:
             if self.db_wrapper.db_version == 2:
-                ret: bytes = zstd.decompress(row[0])
+                ret: bytes = self.compressor.decompress(row[0])
             else:
                 ret = row[0]
             return ret
@@ -329,6 +537,30 @@ class BlockStore:
                     ret.append(self.maybe_decompress(row[0]))
                 return ret
 
+    async def get_block_view(self, header_hash: bytes32) -> Optional[BlockView]:
+        """
+        Like get_full_block(), but the block is only parsed as far as the caller accesses its fields
+        """
+        block_bytes = await self.get_full_block_bytes(header_hash)
+        if block_bytes is None:
+            return None
+        return BlockView(block_bytes)
+
+    async def get_block_views_at(self, heights: List[uint32]) -> List[BlockView]:
+        if len(heights) == 0:
+            return []
+
+        formatted_str = f'SELECT block from full_blocks WHERE height in ({"?," * (len(heights) - 1)}?)'
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            async with conn.execute(formatted_str, heights) as cursor:
+                return [BlockView(self.maybe_decompress_blob(row[0])) for row in await cursor.fetchall()]
+
+    async def get_block_views_by_hash(self, header_hashes: List[bytes32]) -> List[BlockView]:
+        """
+        Like get_blocks_by_hash(), but the blocks are only parsed as far as the caller accesses their fields
+        """
+        return [BlockView(block_bytes) for block_bytes in await self.get_block_bytes_by_hash(header_hashes)]
+
     async def get_block_info(self, header_hash: bytes32) -> Optional[GeneratorBlockInfo]:
 
         cached = self.block_cache.get(header_hash)
@@ -344,7 +576,7 @@ class BlockStore:
             if row is None:
                 return None
             if self.db_wrapper.db_version == 2:
-                block_bytes = zstd.decompress(row[0])
+                block_bytes = self.compressor.decompress(row[0])
             else:
                 block_bytes = row[0]
 
@@ -373,7 +605,7 @@ class BlockStore:
             if row is None:
                 return None
             if self.db_wrapper.db_version == 2:
-                block_bytes = zstd.decompress(row[0])
+                block_bytes = self.compressor.decompress(row[0])
             else:
                 block_bytes = row[0]
 
@@ -401,7 +633,7 @@ class BlockStore:
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(formatted_str, heights) as cursor:
                 async for row in cursor:
-                    block_bytes = zstd.decompress(row[0])
+                    block_bytes = self.compressor.decompress(row[0])
 
                     try:
                         gen = generator_from_block(block_bytes)
@@ -519,7 +751,20 @@ class BlockStore:
             ret.append(all_blocks[hh])
         return ret
 
+    def get_pending_blocks(self) -> Optional[Dict[bytes32, PendingBlock]]:
+        # the pending blocks aren't committed, only the writer can see them
+        if self.pending_blocks is None or not self.db_wrapper.is_writer():
+            return None
+        return self.pending_blocks
+
+    def get_pending_block(self, header_hash: bytes32) -> Optional[PendingBlock]:
+        pending_blocks = self.get_pending_blocks()
+        return None if pending_blocks is None else pending_blocks.get(header_hash)
+
     async def get_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
+        pending = self.get_pending_block(header_hash)
+        if pending is not None:
+            return pending.block_record
 
         if self.db_wrapper.db_version == 2:
 
@@ -659,6 +904,13 @@ class BlockStore:
         # We need to be in a sqlite transaction here.
         # Note: we do not commit this to the database yet, as we need to also change the coin store
 
+        pending_blocks = self.get_pending_blocks()
+        if pending_blocks is not None:
+            if header_hash in pending_blocks:
+                self.pending_peak = header_hash
+                return None
+            self.pending_peak = None
+
         if self.db_wrapper.db_version == 2:
             # Note: we use the key field as 0 just to ensure all inserts replace the existing row
             async with self.db_wrapper.writer_maybe_transaction() as conn:
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Dict, List, Optional, Set, Tuple
+
+from taco.types.blockchain_format.coin import Coin
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.mempool_item import MempoolItem
+from taco.types.spend_bundle import SpendBundle
+
+# (negated fee per cost, arrival sequence number). Items with a smaller key are considered first.
+TemplateKey = Tuple[float, int]
+
+
+class BlockTemplate:
+    """
+    Keeps a running selection of mempool items for the next block, updated as items enter and leave the mempool.
+
+    Items are ranked by fee per cost (ties broken by arrival order). An item that ranks after everything already
+    selected is appended in place, so the next call to `create_bundle` only aggregates the new spend bundles. Any
+    other change marks the template dirty, and the selection is rebuilt from a heap of all items on the next call.
+
+    Items spending the additions of other mempool items are selected as packages: an item is ranked by the combined
+    fee per cost of itself and its not yet selected ancestors, which are included ahead of it (CPFP).
+
+    With `knapsack_fill` set, items that don't fit in the remaining block space are skipped and smaller items with a
+    lower fee per cost keep being packed. Otherwise selection stops at the first item that doesn't fit.
+    """
+
+    def __init__(self, max_block_cost: int, max_fee_sum: int, knapsack_fill: bool = False):
+        self.max_block_cost = max_block_cost
+        self.max_fee_sum = max_fee_sum
+        self.knapsack_fill = knapsack_fill
+        self._counter = itertools.count()
+        self._keys: Dict[bytes32, TemplateKey] = {}
+        self._items: Dict[bytes32, MempoolItem] = {}
+        # Dependency graph between items, owned and kept up to date by the mempool
+        self.parents: Dict[bytes32, Set[bytes32]] = {}
+        self.children: Dict[bytes32, Set[bytes32]] = {}
+        self._dirty = False
+        self._reset_selection()
+
+    def _reset_selection(self) -> None:
+        self._selected: Dict[bytes32, MempoolItem] = {}
+        self._last_selected_key: Optional[TemplateKey] = None
+        # The first item that didn't fit, only tracked when not using knapsack fill
+        self._miss_key: Optional[TemplateKey] = None
+        self._cost_sum = 0
+        self._fee_sum = 0
+        self._additions: List[Coin] = []
+        self._removals: List[Coin] = []
+        self._aggregate: Optional[SpendBundle] = None
+        self._pending_bundles: List[SpendBundle] = []
+
+    @property
+    def cost_sum(self) -> int:
+        if self._dirty:
+            self._rebuild()
+        return self._cost_sum
+
+    @property
+    def fee_sum(self) -> int:
+        if self._dirty:
+            self._rebuild()
+        return self._fee_sum
+
+    def selected_items(self) -> List[MempoolItem]:
+        if self._dirty:
+            self._rebuild()
+        return list(self._selected.values())
+
+    def add_item(self, item: MempoolItem) -> None:
+        if item.name in self._keys:
+            return None
+        key: TemplateKey = (-item.fee_per_cost, next(self._counter))
+        self._keys[item.name] = key
+        self._items[item.name] = item
+
+        if self._dirty:
+            return None
+        if item.name in self.parents:
+            # Changes the ranking of its ancestors' packages
+            self._dirty = True
+            return None
+        if self._last_selected_key is not None and key < self._last_selected_key:
+            # The item would have been considered before some of the selected items, and might push them out
+            self._dirty = True
+            return None
+        if self._miss_key is not None and key > self._miss_key:
+            # Selection already stopped before reaching this item
+            return None
+        if self._fits(item):
+            self._select(item, key)
+        elif not self.knapsack_fill:
+            self._miss_key = key
+
+    def remove_item(self, name: bytes32) -> None:
+        key = self._keys.pop(name, None)
+        if key is None:
+            return None
+        del self._items[name]
+        if name in self._selected or key == self._miss_key or name in self.parents or name in self.children:
+            self._dirty = True
+
+    def invalidate(self) -> None:
+        """
+        Forces a rebuild on the next call, for changes that affect the ranking of items already in the template.
+        """
+        self._dirty = True
+
+    def create_bundle(self) -> Optional[Tuple[SpendBundle, List[Coin], List[Coin]]]:
+        """
+        Returns the aggregated spend bundle of the selected items, along with their additions and removals.
+        """
+        if self._dirty:
+            self._rebuild()
+        if len(self._selected) == 0:
+            return None
+        if self._aggregate is None:
+            self._aggregate = SpendBundle.aggregate(self._pending_bundles)
+        elif len(self._pending_bundles) > 0:
+            self._aggregate = SpendBundle.aggregate([self._aggregate, *self._pending_bundles])
+        self._pending_bundles = []
+        return self._aggregate, list(self._additions), list(self._removals)
+
+    def _fits(self, item: MempoolItem) -> bool:
+        return self._package_fits([item])
+
+    def _select(self, item: MempoolItem, key: TemplateKey) -> None:
+        self._selected[item.name] = item
+        # With packages keys aren't selected in order, anything ranking after the worst one is safe to append
+        if self._last_selected_key is None or key > self._last_selected_key:
+            self._last_selected_key = key
+        self._cost_sum += item.cost
+        self._fee_sum += item.fee
+        self._additions.extend(item.additions)
+        self._removals.extend(item.removals)
+        self._pending_bundles.append(item.spend_bundle)
+
+    def _package(self, name: bytes32) -> List[MempoolItem]:
+        """
+        Returns the item with its ancestors that aren't selected yet, parents ahead of their children.
+        """
+        package: List[MempoolItem] = []
+        seen: Set[bytes32] = set()
+        to_visit: List[Tuple[bytes32, bool]] = [(name, False)]
+        while len(to_visit) > 0:
+            current, expanded = to_visit.pop()
+            if expanded:
+                package.append(self._items[current])
+                continue
+            if current in seen or current in self._selected or current not in self._items:
+                continue
+            seen.add(current)
+            to_visit.append((current, True))
+            for parent in self.parents.get(current, ()):
+                to_visit.append((parent, False))
+        return package
+
+    def _package_key(self, name: bytes32, package: List[MempoolItem]) -> TemplateKey:
+        fee = sum(item.fee for item in package)
+        cost = sum(item.cost for item in package)
+        return -fee / cost, self._keys[name][1]
+
+    def _rebuild(self) -> None:
+        self._reset_selection()
+        self._dirty = False
+        if len(self._items) == 0:
+            return None
+        min_cost = min(item.cost for item in self._items.values())
+        heap: List[Tuple[float, int, bytes32]] = []
+        for name, item_key in self._keys.items():
+            if name in self.parents:
+                item_key = self._package_key(name, self._package(name))
+            heap.append((item_key[0], item_key[1], name))
+        heapq.heapify(heap)
+
+        while len(heap) > 0:
+            neg_fpc, seq, name = heapq.heappop(heap)
+            if name in self._selected:
+                continue
+            key: TemplateKey = (neg_fpc, seq)
+            package = self._package(name)
+            if name in self.parents and self._package_key(name, package) != key:
+                # Stale, an up to date entry was pushed when one of its ancestors got selected
+                continue
+            if self._package_fits(package):
+                for item in package:
+                    self._select(item, key)
+                for item in package:
+                    for child in self.children.get(item.name, ()):
+                        if child in self._items and child not in self._selected:
+                            child_key = self._package_key(child, self._package(child))
+                            heapq.heappush(heap, (child_key[0], child_key[1], child))
+            elif not self.knapsack_fill:
+                self._miss_key = key
+                break
+            if self.knapsack_fill and self.max_block_cost - self._cost_sum < min_cost:
+                break
+
+    def _package_fits(self, package: List[MempoolItem]) -> bool:
+        cost = sum(item.cost for item in package)
+        fee = sum(item.fee for item in package)
+        return self._cost_sum + cost <= self.max_block_cost and self._fee_sum + fee <= self.max_fee_sum
@@ -31,10 +31,17 @@ class CoinStore:
 
     db_wrapper: DBWrapper2
     coins_added_at_height_cache: LRUCache[uint32, List[CoinRecord]]
+    # Coin records created (and possibly spent) by recent blocks, as committed to coin_record. It is only filled by
+    # writes, never by reads, which may come from a reader connection that doesn't see the latest commit yet.
+    coin_record_cache: LRUCache[bytes32, CoinRecord]
+    # Coin records written by the current write transaction. Only the writer sees them, they're moved to
+    # coin_record_cache when the transaction is committed, and dropped when it's rolled back.
+    pending_coin_records: Dict[bytes32, CoinRecord] = dataclasses.field(default_factory=dict)
 
     @classmethod
-    async def create(cls, db_wrapper: DBWrapper2) -> CoinStore:
-        self = CoinStore(db_wrapper, LRUCache(100))
+    async def create(cls, db_wrapper: DBWrapper2, coin_record_cache_size: int = 50000) -> CoinStore:
+        self = CoinStore(db_wrapper, LRUCache(100), LRUCache(coin_record_cache_size))
+        db_wrapper.add_transaction_callback(self._transaction_done)
 
         async with self.db_wrapper.writer_maybe_transaction() as conn:
 
@@ -167,8 +174,33 @@ class CoinStore:
 
         return additions
 
+    def clear_cache(self) -> None:
+        """
+        Drops the cached coin records. Must be called when a savepoint that went through new_block is rolled back,
+        since the enclosing transaction may still be committed.
+        """
+        self.coin_record_cache = LRUCache(self.coin_record_cache.capacity)
+        self.pending_coin_records = {}
+        self.coins_added_at_height_cache = LRUCache(self.coins_added_at_height_cache.capacity)
+
+    def _transaction_done(self, committed: bool) -> None:
+        if committed:
+            for name, record in self.pending_coin_records.items():
+                self.coin_record_cache.put(name, record)
+        self.pending_coin_records = {}
+
+    def _get_cached_record(self, coin_name: bytes32) -> Optional[CoinRecord]:
+        if self.db_wrapper.is_writer():
+            pending = self.pending_coin_records.get(coin_name)
+            if pending is not None:
+                return pending
+        return self.coin_record_cache.get(coin_name)
+
     # Checks DB and DiffStores for CoinRecord with coin_name and returns it
     async def get_coin_record(self, coin_name: bytes32) -> Optional[CoinRecord]:
+        cached = self._get_cached_record(coin_name)
+        if cached is not None:
+            return cached
         async with self.db_wrapper.reader_no_transaction() as conn:
             async with conn.execute(
                 "SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
@@ -186,10 +218,19 @@ class CoinStore:
             return []
 
         coins: List[CoinRecord] = []
+        names_to_fetch: List[bytes32] = []
+        for name in names:
+            cached = self._get_cached_record(name)
+            if cached is not None:
+                coins.append(cached)
+            else:
+                names_to_fetch.append(name)
+        if len(names_to_fetch) == 0:
+            return coins
 
         async with self.db_wrapper.reader_no_transaction() as conn:
             cursors: List[Cursor] = []
-            for names_chunk in chunks(names, SQLITE_MAX_VARIABLE_NUMBER):
+            for names_chunk in chunks(names_to_fetch, SQLITE_MAX_VARIABLE_NUMBER):
                 names_db: Tuple[Any, ...]
                 if self.db_wrapper.db_version == 2:
                     names_db = tuple(names_chunk)
@@ -497,7 +538,7 @@ class CoinStore:
                 await conn.execute(
                     "UPDATE coin_record SET spent_index = 0, spent = 0 WHERE spent_index>?", (block_index,)
                 )
-        self.coins_added_at_height_cache = LRUCache(self.coins_added_at_height_cache.capacity)
+        self.clear_cache()
         return list(coin_changes.values())
 
     # Store CoinRecord in DB
@@ -524,6 +565,7 @@ class CoinStore:
                         "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
                         values2,
                     )
+                    self.pending_coin_records.update((record.name, record) for record in records)
         else:
             values = []
             for record in records:
@@ -546,6 +588,7 @@ class CoinStore:
                         "INSERT INTO coin_record VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)",
                         values,
                     )
+                    self.pending_coin_records.update((record.name, record) for record in records)
 
     # Update coin_record to be spent in DB
     async def _set_spent(self, coin_names: List[bytes32], index: uint32) -> None:
@@ -580,3 +623,8 @@ class CoinStore:
                 raise ValueError(
                     f"Invalid operation to set spent, total updates {rows_updated} expected {len(coin_names)}"
                 )
+
+            for coin_name in coin_names:
+                cached = self._get_cached_record(coin_name)
+                if cached is not None:
+                    self.pending_coin_records[coin_name] = dataclasses.replace(cached, spent_block_index=index)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sortedcontainers import SortedDict
+
+from taco.types.blockchain_format.sized_bytes import bytes32
+
+KEY_BITS = 64
+
+
+def fee_rate_key(fee_rate: float) -> int:
+    """
+    Maps a fee rate to a 64 bit integer, preserving order. The bits of a non-negative double sort like its value.
+    """
+    assert fee_rate >= 0
+    key: int = struct.unpack(">Q", struct.pack(">d", fee_rate))[0]
+    return key
+
+
+def key_fee_rate(key: int) -> float:
+    fee_rate: float = struct.unpack(">d", struct.pack(">Q", key))[0]
+    return fee_rate
+
+
+class BinaryPrefixTree:
+    """
+    Sums of integer values by 64 bit key, in a sparse binary tree over the bits of the key. Point updates and prefix
+    sum searches take one step per bit, regardless of how many keys there are and how close they are.
+    """
+
+    def __init__(self) -> None:
+        # the sum of the values under each node, by depth (the number of leading key bits) and node prefix
+        self._sums: List[Dict[int, int]] = [{} for _ in range(KEY_BITS + 1)]
+
+    def add(self, key: int, delta: int) -> None:
+        for depth in range(KEY_BITS + 1):
+            level = self._sums[depth]
+            prefix = key >> (KEY_BITS - depth)
+            value = level.get(prefix, 0) + delta
+            if value == 0:
+                level.pop(prefix, None)
+            else:
+                level[prefix] = value
+
+    def total(self) -> int:
+        return self._sums[0].get(0, 0)
+
+    def lower_bound(self, target: int) -> Optional[int]:
+        """
+        Returns the lowest key whose prefix sum is at least target, or None if the total is lower. Values must not
+        be negative.
+        """
+        if target > self.total():
+            return None
+        prefix = 0
+        remaining = target
+        for depth in range(1, KEY_BITS + 1):
+            left = prefix << 1
+            left_sum = self._sums[depth].get(left, 0)
+            if left_sum >= remaining:
+                prefix = left
+            else:
+                remaining -= left_sum
+                prefix = left | 1
+        return prefix
+
+
+class FeeRateCostIndex:
+    """
+    Tracks the cost of mempool items by fee rate, to answer "at which fee rate does the cumulative cost reach N" in
+    logarithmic time, instead of walking all items.
+
+    The cost per fee rate is kept in a BinaryPrefixTree, the items themselves in a sorted dict keyed by fee rate so
+    that the cheapest items can be iterated in order.
+    """
+
+    def __init__(self) -> None:
+        self._tree = BinaryPrefixTree()
+        self._by_fee_rate: SortedDict = SortedDict()  # Dict[float, Dict[bytes32, int]]
+        self._entries: Dict[bytes32, Tuple[float, int]] = {}
+        self.total_cost: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: bytes32) -> bool:
+        return name in self._entries
+
+    def get_fee_rate(self, name: bytes32) -> Optional[float]:
+        entry = self._entries.get(name)
+        return None if entry is None else entry[0]
+
+    def add(self, name: bytes32, fee_rate: float, cost: int) -> None:
+        if name in self._entries:
+            self.remove(name)
+        self._entries[name] = (fee_rate, cost)
+        if fee_rate not in self._by_fee_rate:
+            self._by_fee_rate[fee_rate] = {}
+        self._by_fee_rate[fee_rate][name] = cost
+        self._tree.add(fee_rate_key(fee_rate), cost)
+        self.total_cost += cost
+
+    def remove(self, name: bytes32) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return None
+        fee_rate, cost = entry
+        items = self._by_fee_rate[fee_rate]
+        del items[name]
+        if len(items) == 0:
+            del self._by_fee_rate[fee_rate]
+        self._tree.add(fee_rate_key(fee_rate), -cost)
+        self.total_cost -= cost
+
+    def update_fee_rate(self, name: bytes32, fee_rate: float) -> None:
+        entry = self._entries.get(name)
+        if entry is None or entry[0] == fee_rate:
+            return None
+        self.add(name, fee_rate, entry[1])
+
+    def fee_rate_at_cost(self, cost: int) -> Optional[float]:
+        """
+        Returns the lowest fee rate such that the items with a fee rate lower than or equal to it add up to at
+        least cost, or None if all the items together don't.
+        """
+        if cost > self.total_cost:
+            return None
+        if cost <= 0:
+            return 0
+        key = self._tree.lower_bound(cost)
+        if key is None:
+            raise RuntimeError(f"Fee rate index out of sync, cannot find cost {cost} of {self.total_cost}")
+        return key_fee_rate(key)
+
+    def lowest(self) -> Iterator[Tuple[bytes32, float, int]]:
+        """
+        Iterates over the items in increasing fee rate. The index must not be modified while iterating.
+        """
+        for fee_rate, items in self._by_fee_rate.items():
+            for name, cost in items.items():
+                yield name, fee_rate, cost
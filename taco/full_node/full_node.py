@@ -19,12 +19,15 @@ from taco.consensus.block_creation import unfinished_block_to_full_block
 from taco.consensus.block_record import BlockRecord
 from taco.consensus.blockchain import Blockchain, ReceiveBlockResult, StateChangeSummary
 from taco.consensus.blockchain_interface import BlockchainInterface
+from taco.consensus.chain_extension import ChainExtension
 from taco.consensus.constants import ConsensusConstants
 from taco.consensus.cost_calculator import NPCResult
 from taco.consensus.difficulty_adjustment import get_next_sub_slot_iters_and_difficulty
+from taco.consensus.full_block_to_block_record import block_to_block_record
 from taco.consensus.make_sub_epoch_summary import next_sub_epoch_summary
 from taco.consensus.multiprocess_validation import PreValidationResult
 from taco.consensus.pot_iterations import calculate_sp_iters
+from taco.full_node.block_download_scheduler import BlockDownloadScheduler
 from taco.full_node.block_store import BlockStore
 from taco.full_node.hint_management import get_hints_and_subscription_coin_ids
 from taco.full_node.lock_queue import LockQueue, LockClient
@@ -40,7 +43,6 @@ from taco.protocols import farmer_protocol, full_node_protocol, timelord_protoco
 from taco.protocols.full_node_protocol import (
     RequestBlocks,
     RespondBlock,
-    RespondBlocks,
     RespondSignagePoint,
 )
 from taco.protocols.protocol_message_types import ProtocolMessageTypes
@@ -50,6 +52,7 @@ from taco.server.outbound_message import Message, NodeType, make_msg
 from taco.server.peer_store_resolver import PeerStoreResolver
 from taco.server.server import TacoServer
 from taco.server.ws_connection import WSTacoConnection
+from taco.types.block_protocol import BlockInfo
 from taco.types.blockchain_format.classgroup import ClassgroupElement
 from taco.types.blockchain_format.pool_target import PoolTarget
 from taco.types.blockchain_format.sized_bytes import bytes32
@@ -89,6 +92,14 @@ class PeakPostProcessingResult:
     lookup_coin_ids: List[bytes32]  # The coin IDs that we need to look up to notify wallets of changes
 
 
+# The pre-validation of a batch of blocks during long sync, started while the previous batch is being added
+@dataclasses.dataclass
+class SpeculativePreValidation:
+    extension: ChainExtension  # The previous batch, as it was assumed to be added
+    blocks: List[FullBlock]  # The blocks being pre-validated, the ones of the batch not in the previous one
+    task: asyncio.Task[List[PreValidationResult]]
+
+
 class FullNode:
     _segment_task: Optional[asyncio.Task[None]]
     initialized: bool
@@ -109,6 +120,7 @@ class FullNode:
     multiprocessing_context: Optional[BaseContext]
     _ui_tasks: Set[asyncio.Task[None]]
     db_path: Path
+    bls_cache_path: Path
     # TODO: use NewType all over to describe these various uses of the same types
     # Puzzle Hash : Set[Peer ID]
     coin_subscriptions: Dict[bytes32, Set[bytes32]]
@@ -182,6 +194,7 @@ class FullNode:
 
         db_path_replaced: str = config["database_path"].replace("CHALLENGE", config["selected_network"])
         self.db_path = path_from_root(root_path, db_path_replaced)
+        self.bls_cache_path = self.db_path.parent / "bls-pairing-cache"
         self.coin_subscriptions = {}
         self.ph_subscriptions = {}
         self.peer_coin_ids = {}
@@ -339,9 +352,11 @@ class FullNode:
         self._db_wrapper = await DBWrapper2.create(
             self.db_path,
             db_version=db_version,
-            reader_count=4,
+            reader_count=self.config.get("db_readers", 4),
             log_path=sql_log_path,
             synchronous=db_sync,
+            max_reader_count=self.config.get("db_max_readers", None),
+            metrics=self.config.get("db_metrics", False),
         )
 
         if self.db_wrapper.db_version != 2:
@@ -364,7 +379,14 @@ class FullNode:
         self._block_store = await BlockStore.create(self.db_wrapper)
         self.sync_store = SyncStore()
         self._hint_store = await HintStore.create(self.db_wrapper)
-        self._coin_store = await CoinStore.create(self.db_wrapper)
+        self._coin_store = await CoinStore.create(
+            self.db_wrapper, coin_record_cache_size=self.config.get("coin_record_cache_size", 50000)
+        )
+        cached_bls.LOCAL_CACHE.resize(self.config.get("bls_cache_size", cached_bls.DEFAULT_CACHE_SIZE))
+        if self.config.get("bls_cache_warm_start", False):
+            loaded = cached_bls.LOCAL_CACHE.load(self.bls_cache_path)
+            self.log.info(f"loaded {loaded} BLS pairings from {self.bls_cache_path}")
+
         self.log.info("Initializing blockchain from disk")
         start_time = time.time()
         reserved_cores = self.config.get("reserved_cores", 0)
@@ -386,6 +408,7 @@ class FullNode:
             consensus_constants=self.constants,
             multiprocessing_context=self.multiprocessing_context,
             single_threaded=single_threaded,
+            knapsack_fill=self.config.get("mempool_knapsack_fill", False),
         )
 
         # Blocks are validated under high priority, and transactions under low priority. This guarantees blocks will
@@ -433,7 +456,7 @@ class FullNode:
             assert full_peak is not None
             state_change_summary = StateChangeSummary(peak, uint32(max(peak.height - 1, 0)), [], [], [])
             ppp_result: PeakPostProcessingResult = await self.peak_post_processing(
-                full_peak, state_change_summary, None
+                full_peak, state_change_summary, None, rebuild_mempool=True
             )
             await self.peak_post_processing_2(full_peak, None, state_change_summary, ppp_result)
         if self.config["send_uncompact_interval"] != 0:
@@ -452,10 +475,16 @@ class FullNode:
         if self.full_node_peers is not None:
             asyncio.create_task(self.full_node_peers.start())
 
-    async def _handle_one_transaction(self, entry: TransactionQueueEntry) -> None:
+    async def _handle_one_transaction(
+        self,
+        entry: TransactionQueueEntry,
+        pre_validation: Optional[Tuple[Optional[Err], Optional[NPCResult]]] = None,
+    ) -> None:
         peer = entry.peer
         try:
-            inc_status, err = await self.respond_transaction(entry.transaction, entry.spend_name, peer, entry.test)
+            inc_status, err = await self.respond_transaction(
+                entry.transaction, entry.spend_name, peer, entry.test, pre_validation=pre_validation
+            )
             self.transaction_responses.append((entry.spend_name, inc_status, err))
             if len(self.transaction_responses) > 50:
                 self.transaction_responses = self.transaction_responses[1:]
@@ -465,19 +494,74 @@ class FullNode:
         except Exception:
             error_stack = traceback.format_exc()
             self.log.error(f"Error in _handle_one_transaction, closing: {error_stack}")
+            # Can be resubmitted
+            self.mempool_manager.remove_seen(entry.spend_name)
             if peer is not None:
                 await peer.close()
         finally:
             self.respond_transaction_semaphore.release()
 
+    async def _handle_transaction_batch(self, entries: List[TransactionQueueEntry]) -> None:
+        """
+        Pre-validates the transactions of the batch in a single call to the process pool, then handles each of them
+        on its own like _handle_one_transaction() does, closing the connection to the peer of a transaction that fails.
+        """
+        pre_validations: Dict[bytes32, Tuple[Optional[Err], Optional[NPCResult]]] = {}
+        try:
+            to_validate: Dict[bytes32, TransactionQueueEntry] = {}
+            if not self.sync_store.get_sync_mode():
+                for entry in entries:
+                    # These are answered without validating them
+                    if self.mempool_manager.seen(entry.spend_name):
+                        continue
+                    if self.mempool_manager.get_spendbundle(entry.spend_name) is not None:
+                        continue
+                    to_validate[entry.spend_name] = entry
+            results = await self.mempool_manager.pre_validate_spendbundles(
+                [(entry.transaction, entry.transaction_bytes, spend_name) for spend_name, entry in to_validate.items()]
+            )
+            pre_validations = dict(zip(to_validate.keys(), results))
+        except asyncio.CancelledError:
+            error_stack = traceback.format_exc()
+            self.log.debug(f"Cancelling _handle_transaction_batch: {error_stack}")
+            for _ in entries:
+                self.respond_transaction_semaphore.release()
+            return
+        except Exception:
+            # Each transaction is pre-validated on its own instead, to find the one that failed
+            error_stack = traceback.format_exc()
+            self.log.warning(f"Error pre-validating a batch of {len(entries)} transactions: {error_stack}")
+        for entry in entries:
+            await self._handle_one_transaction(entry, pre_validations.get(entry.spend_name))
+
     async def _handle_transactions(self) -> None:
+        batch_size: int = self.config.get("transaction_batch_size", 1)
+        max_latency: float = self.config.get("transaction_batch_max_latency", 0.05)
         try:
             while not self._shut_down:
                 # We use a semaphore to make sure we don't send more than 200 concurrent calls of respond_transaction.
                 # However, doing them one at a time would be slow, because they get sent to other processes.
                 await self.respond_transaction_semaphore.acquire()
                 item: TransactionQueueEntry = (await self.transaction_queue.get())[1]
-                asyncio.create_task(self._handle_one_transaction(item))
+                if batch_size <= 1:
+                    asyncio.create_task(self._handle_one_transaction(item))
+                    continue
+
+                # Keep collecting transactions for up to max_latency seconds, and pre-validate them together in a
+                # single round trip to the process pool
+                batch: List[TransactionQueueEntry] = [item]
+                deadline = time.monotonic() + max_latency
+                while len(batch) < batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    await self.respond_transaction_semaphore.acquire()
+                    try:
+                        batch.append((await asyncio.wait_for(self.transaction_queue.get(), timeout))[1])
+                    except asyncio.TimeoutError:
+                        self.respond_transaction_semaphore.release()
+                        break
+                asyncio.create_task(self._handle_transaction_batch(batch))
         except asyncio.CancelledError:
             raise
 
@@ -918,6 +1002,8 @@ class FullNode:
         # blockchain is created in _start and in certain cases it may not exist here during _close
         if self._blockchain is not None:
             self.blockchain.shut_down()
+        if self.weight_proof_handler is not None:
+            self.weight_proof_handler.shut_down()
         # same for mempool_manager
         if self._mempool_manager is not None:
             self.mempool_manager.shut_down()
@@ -943,6 +1029,15 @@ class FullNode:
         if self._sync_task is not None:
             with contextlib.suppress(asyncio.CancelledError):
                 await self._sync_task
+        if self._blockchain is not None:
+            self._blockchain.close()
+        if self.config.get("bls_cache_warm_start", False):
+            cache = cached_bls.LOCAL_CACHE
+            self.log.info(
+                f"saving {len(cache)} BLS pairings to {self.bls_cache_path} "
+                f"({cache.hits} cache hits, {cache.misses} misses)"
+            )
+            await cache.save(self.bls_cache_path)
 
     async def _sync(self) -> None:
         """
@@ -1095,74 +1190,91 @@ class FullNode:
         )
         batch_size = self.constants.MAX_BLOCK_COUNT_PER_REQUESTS
 
+        new_peers_with_peak: List[WSTacoConnection] = peers_with_peak[:]
+
+        def get_peers() -> List[WSTacoConnection]:
+            nonlocal new_peers_with_peak
+            if self.sync_store.peers_changed.is_set():
+                new_peers_with_peak = self.get_peers_with_peak(peak_hash)
+                self.sync_store.peers_changed.clear()
+            return new_peers_with_peak
+
+        scheduler = BlockDownloadScheduler(
+            fork_point_height,
+            target_peak_sb_height,
+            batch_size,
+            get_peers,
+            requests_per_peer=self.config.get("sync_requests_per_peer", 2),
+        )
+
         async def fetch_block_batches(
             batch_queue: asyncio.Queue[Optional[Tuple[WSTacoConnection, List[FullBlock]]]]
         ) -> None:
-            start_height, end_height = 0, 0
-            new_peers_with_peak: List[WSTacoConnection] = peers_with_peak[:]
             try:
-                for start_height in range(fork_point_height, target_peak_sb_height, batch_size):
-                    end_height = min(target_peak_sb_height, start_height + batch_size)
-                    request = RequestBlocks(uint32(start_height), uint32(end_height), True)
-                    fetched = False
-                    for peer in random.sample(new_peers_with_peak, len(new_peers_with_peak)):
-                        if peer.closed:
-                            peers_with_peak.remove(peer)
-                            continue
-                        response = await peer.request_blocks(request, timeout=30)
-                        if response is None:
-                            await peer.close()
-                            peers_with_peak.remove(peer)
-                        elif isinstance(response, RespondBlocks):
-                            await batch_queue.put((peer, response.blocks))
-                            fetched = True
-                            break
-                    if fetched is False:
-                        self.log.error(f"failed fetching {start_height} to {end_height} from peers")
-                        await batch_queue.put(None)
-                        return
-                    if self.sync_store.peers_changed.is_set():
-                        new_peers_with_peak = self.get_peers_with_peak(peak_hash)
-                        self.sync_store.peers_changed.clear()
+                # this puts the batches in the queue in order, followed by None
+                await scheduler.run(batch_queue)
             except Exception as e:
-                self.log.error(f"Exception fetching {start_height} to {end_height} from peer {e}")
-            finally:
-                # finished signal with None
-                await batch_queue.put(None)
+                self.log.error(f"Exception fetching blocks from peers {e}")
 
         async def validate_block_batches(
             inner_batch_queue: asyncio.Queue[Optional[Tuple[WSTacoConnection, List[FullBlock]]]]
         ) -> None:
             advanced_peak: bool = False
-            while True:
-                res: Optional[Tuple[WSTacoConnection, List[FullBlock]]] = await inner_batch_queue.get()
-                if res is None:
-                    self.log.debug("done fetching blocks")
-                    return None
-                peer, blocks = res
-                start_height = blocks[0].height
-                end_height = blocks[-1].height
-                success, state_change_summary = await self.receive_block_batch(
-                    blocks, peer, None if advanced_peak else uint32(fork_point_height), summaries
-                )
-                if success is False:
-                    if peer in peers_with_peak:
-                        peers_with_peak.remove(peer)
-                    await peer.close(600)
-                    raise ValueError(f"Failed to validate block batch {start_height} to {end_height}")
-                self.log.info(f"Added blocks {start_height} to {end_height}")
-                peak: Optional[BlockRecord] = self.blockchain.get_peak()
-                if state_change_summary is not None:
-                    advanced_peak = True
-                    assert peak is not None
-                    # Hints must be added to the DB. The other post-processing tasks are not required when syncing
-                    hints_to_add, lookup_coin_ids = get_hints_and_subscription_coin_ids(
-                        state_change_summary, self.coin_subscriptions, self.ph_subscriptions
+            # If the next batch has been downloaded already, it's pre-validated while the current one is being added
+            pipelined: bool = self.config.get("sync_pipelined_validation", True)
+            speculative: Optional[SpeculativePreValidation] = None
+            res: Optional[Tuple[WSTacoConnection, List[FullBlock]]] = await inner_batch_queue.get()
+            try:
+                while res is not None:
+                    peer, blocks = res
+                    start_height = blocks[0].height
+                    end_height = blocks[-1].height
+                    pre_validated: Optional[Tuple[List[FullBlock], List[PreValidationResult]]] = None
+                    if speculative is not None:
+                        pre_validated = await self.speculative_pre_validation_result(speculative, blocks)
+                        speculative = None
+                    if pre_validated is None:
+                        pre_validated = await self.pre_validate_block_batch(blocks, summaries)
+
+                    next_res: Optional[Tuple[WSTacoConnection, List[FullBlock]]] = None
+                    have_next = pipelined and not inner_batch_queue.empty()
+                    if have_next:
+                        next_res = inner_batch_queue.get_nowait()
+                        if next_res is not None:
+                            speculative = await self.start_speculative_pre_validation(
+                                pre_validated[0], pre_validated[1], next_res[1], summaries
+                            )
+
+                    success, state_change_summary = await self.receive_block_batch_in_transaction(
+                        blocks,
+                        peer,
+                        None if advanced_peak else uint32(fork_point_height),
+                        summaries,
+                        pre_validated=pre_validated,
                     )
-                    await self.hint_store.add_hints(hints_to_add)
-                    await self.update_wallets(state_change_summary, hints_to_add, lookup_coin_ids)
-                await self.send_peak_to_wallets()
-                self.blockchain.clean_block_record(end_height - self.constants.BLOCKS_CACHE_SIZE)
+                    if success is False:
+                        if peer in peers_with_peak:
+                            peers_with_peak.remove(peer)
+                        await peer.close(600)
+                        raise ValueError(f"Failed to validate block batch {start_height} to {end_height}")
+                    self.log.info(f"Added blocks {start_height} to {end_height}")
+                    peak: Optional[BlockRecord] = self.blockchain.get_peak()
+                    if state_change_summary is not None:
+                        advanced_peak = True
+                        assert peak is not None
+                        # Hints must be added to the DB. The other post-processing tasks are not required when syncing
+                        hints_to_add, lookup_coin_ids = get_hints_and_subscription_coin_ids(
+                            state_change_summary, self.coin_subscriptions, self.ph_subscriptions
+                        )
+                        await self.hint_store.add_hints(hints_to_add)
+                        await self.update_wallets(state_change_summary, hints_to_add, lookup_coin_ids)
+                    await self.send_peak_to_wallets()
+                    self.blockchain.clean_block_record(end_height - self.constants.BLOCKS_CACHE_SIZE)
+                    res = next_res if have_next else await inner_batch_queue.get()
+                self.log.debug("done fetching blocks")
+            finally:
+                if speculative is not None:
+                    speculative.task.cancel()
 
         batch_queue_input: asyncio.Queue[Optional[Tuple[WSTacoConnection, List[FullBlock]]]] = asyncio.Queue(
             maxsize=buffer_size
@@ -1240,29 +1352,37 @@ class FullNode:
             msg = make_msg(ProtocolMessageTypes.coin_state_update, state)
             await ws_peer.send_message(msg)
 
-    async def receive_block_batch(
+    @staticmethod
+    def blocks_to_validate(all_blocks: List[FullBlock], block_records: BlockchainInterface) -> List[FullBlock]:
+        # Returns the blocks of a batch starting with the first one that isn't in block_records
+        for i, block in enumerate(all_blocks):
+            if not block_records.contains_block(block.header_hash):
+                return all_blocks[i:]
+        return []
+
+    async def pre_validate_block_batch(
         self,
         all_blocks: List[FullBlock],
-        peer: WSTacoConnection,
-        fork_point: Optional[uint32],
         wp_summaries: Optional[List[SubEpochSummary]] = None,
-    ) -> Tuple[bool, Optional[StateChangeSummary]]:
-        # Precondition: All blocks must be contiguous blocks, index i+1 must be the parent of index i
-        # Returns a bool for success, as well as a StateChangeSummary if the peak was advanced
-
-        blocks_to_validate: List[FullBlock] = []
-        for i, block in enumerate(all_blocks):
-            if not self.blockchain.contains_block(block.header_hash):
-                blocks_to_validate = all_blocks[i:]
-                break
+    ) -> Tuple[List[FullBlock], List[PreValidationResult]]:
+        """
+        Pre-validates the blocks of a batch that are not in the blockchain yet. Returns these blocks and their
+        pre-validation results.
+        """
+        blocks_to_validate: List[FullBlock] = self.blocks_to_validate(all_blocks, self.blockchain)
         if len(blocks_to_validate) == 0:
-            return True, None
+            return [], []
 
         # Validates signatures in multiprocessing since they take a while, and we don't have cached transactions
         # for these blocks (unlike during normal operation where we validate one at a time)
+        # Blocks are compressed for storage at the same time, on threads
         pre_validate_start = time.monotonic()
-        pre_validation_results: List[PreValidationResult] = await self.blockchain.pre_validate_blocks_multiprocessing(
-            blocks_to_validate, {}, wp_summaries=wp_summaries, validate_signatures=True
+        pre_validation_results: List[PreValidationResult]
+        pre_validation_results, _ = await asyncio.gather(
+            self.blockchain.pre_validate_blocks_multiprocessing(
+                blocks_to_validate, {}, wp_summaries=wp_summaries, validate_signatures=True
+            ),
+            self.block_store.precompress_blocks(blocks_to_validate),
         )
         pre_validate_end = time.monotonic()
         pre_validate_time = pre_validate_end - pre_validate_start
@@ -1272,6 +1392,147 @@ class FullNode:
             f"Block pre-validation time: {pre_validate_end - pre_validate_start:0.2f} seconds "
             f"({len(blocks_to_validate)} blocks, start height: {blocks_to_validate[0].height})",
         )
+        return blocks_to_validate, pre_validation_results
+
+    async def start_speculative_pre_validation(
+        self,
+        blocks_to_validate: List[FullBlock],
+        pre_validation_results: List[PreValidationResult],
+        next_blocks: List[FullBlock],
+        wp_summaries: Optional[List[SubEpochSummary]] = None,
+    ) -> Optional[SpeculativePreValidation]:
+        """
+        Starts pre-validating the next batch of blocks on top of blocks_to_validate, which have been pre-validated
+        and are about to be added to the blockchain. Must be called before adding them. Returns None if the next
+        batch can't be pre-validated this way.
+        """
+        if len(blocks_to_validate) == 0 or any(result.error is not None for result in pre_validation_results):
+            return None
+        extension = ChainExtension(self.blockchain)
+        for block, result in zip(blocks_to_validate, pre_validation_results):
+            assert result.required_iters is not None
+            extension.extend(
+                block, block_to_block_record(self.constants, extension, result.required_iters, block, None)
+            )
+        next_to_validate = self.blocks_to_validate(next_blocks, extension)
+        if len(next_to_validate) == 0 or next_to_validate[0].prev_header_hash != blocks_to_validate[-1].header_hash:
+            return None
+
+        # The generators are looked up now, while the database and the blockchain don't have any of the blocks in
+        # the extension. Once they start being added, the main chain is only partly updated until they're committed
+        generators: Dict[bytes32, Optional[BlockGenerator]] = {}
+        additional_blocks = dict(extension.full_blocks)
+        try:
+            for block in next_to_validate:
+                generators[block.prev_header_hash] = await self.blockchain.get_block_generator(block, additional_blocks)
+                additional_blocks[block.header_hash] = block
+        except Exception as e:
+            self.log.debug(f"Not pre-validating blocks from {next_to_validate[0].height} ahead: {e}")
+            return None
+
+        async def get_block_generator(
+            block: BlockInfo, prev_blocks: Dict[bytes32, FullBlock]
+        ) -> Optional[BlockGenerator]:
+            return generators[block.prev_header_hash]
+
+        async def pre_validate() -> List[PreValidationResult]:
+            pre_validate_start = time.monotonic()
+            results: List[PreValidationResult]
+            results, _ = await asyncio.gather(
+                self.blockchain.pre_validate_blocks_multiprocessing(
+                    next_to_validate,
+                    {},
+                    wp_summaries=wp_summaries,
+                    validate_signatures=True,
+                    block_records=extension,
+                    get_block_generator=get_block_generator,
+                ),
+                self.block_store.precompress_blocks(next_to_validate, keep_previous=True),
+            )
+            self.log.debug(
+                f"Speculative block pre-validation time: {time.monotonic() - pre_validate_start:0.2f} seconds "
+                f"({len(next_to_validate)} blocks, start height: {next_to_validate[0].height})",
+            )
+            return results
+
+        return SpeculativePreValidation(extension, next_to_validate, asyncio.create_task(pre_validate()))
+
+    async def speculative_pre_validation_result(
+        self, speculative: SpeculativePreValidation, all_blocks: List[FullBlock]
+    ) -> Optional[Tuple[List[FullBlock], List[PreValidationResult]]]:
+        """
+        Returns the result of a speculative pre-validation of all_blocks, like pre_validate_block_batch() would, if
+        the blocks it was started on top of have been added as assumed. Otherwise the result is discarded and None
+        is returned, the blocks must be pre-validated again.
+        """
+        try:
+            results: List[PreValidationResult] = await speculative.task
+        except Exception as e:
+            self.log.warning(f"Speculative pre-validation failed: {e}")
+            return None
+        for block_record in speculative.extension.block_records():
+            if (
+                self.blockchain.height_to_hash(block_record.height) != block_record.header_hash
+                or self.blockchain.try_block_record(block_record.header_hash) != block_record
+            ):
+                self.log.info(f"Discarding speculative pre-validation, block {block_record.height} changed")
+                return None
+        if self.blocks_to_validate(all_blocks, self.blockchain) != speculative.blocks:
+            self.log.info("Discarding speculative pre-validation, the blocks to validate changed")
+            return None
+        if any(result.error is not None for result in results):
+            # the errors are reported by validating the blocks again, on top of the blocks actually added
+            return None
+        return speculative.blocks, results
+
+    async def receive_block_batch_in_transaction(
+        self,
+        all_blocks: List[FullBlock],
+        peer: WSTacoConnection,
+        fork_point: Optional[uint32],
+        wp_summaries: Optional[List[SubEpochSummary]] = None,
+        pre_validated: Optional[Tuple[List[FullBlock], List[PreValidationResult]]] = None,
+    ) -> Tuple[bool, Optional[StateChangeSummary]]:
+        """
+        Same as receive_block_batch, but commits the whole batch in a single database transaction instead of one per
+        block. Each block is still added in its own savepoint, so a failing block is rolled back alone and the blocks
+        before it (which are already in the in-memory state) are kept. The blocks are pre-validated before the
+        transaction is started, so the write lock isn't held while they are. They are inserted into the block store
+        all at once (see BlockStore.bulk_insert()).
+        """
+        if pre_validated is None:
+            pre_validated = await self.pre_validate_block_batch(all_blocks, wp_summaries)
+        error: Optional[BaseException] = None
+        result: Tuple[bool, Optional[StateChangeSummary]] = False, None
+        async with self.db_wrapper.writer():
+            try:
+                async with self.block_store.bulk_insert():
+                    result = await self.receive_block_batch(all_blocks, peer, fork_point, wp_summaries, pre_validated)
+            except BaseException as e:
+                error = e
+        if error is not None:
+            raise error
+        return result
+
+    async def receive_block_batch(
+        self,
+        all_blocks: List[FullBlock],
+        peer: WSTacoConnection,
+        fork_point: Optional[uint32],
+        wp_summaries: Optional[List[SubEpochSummary]] = None,
+        pre_validated: Optional[Tuple[List[FullBlock], List[PreValidationResult]]] = None,
+    ) -> Tuple[bool, Optional[StateChangeSummary]]:
+        # Precondition: All blocks must be contiguous blocks, index i+1 must be the parent of index i
+        # Returns a bool for success, as well as a StateChangeSummary if the peak was advanced
+        # pre_validated is the result of pre_validate_block_batch(all_blocks), if it was called already
+
+        pre_validate_start = time.monotonic()
+        if pre_validated is None:
+            pre_validated = await self.pre_validate_block_batch(all_blocks, wp_summaries)
+        blocks_to_validate, pre_validation_results = pre_validated
+        if len(blocks_to_validate) == 0:
+            return True, None
+
         for i, block in enumerate(blocks_to_validate):
             if pre_validation_results[i].error is not None:
                 self.log.error(
@@ -1283,6 +1544,15 @@ class FullNode:
 
         for i, block in enumerate(blocks_to_validate):
             assert pre_validation_results[i].required_iters is not None
+            peak = self.blockchain.get_peak()
+            if (
+                len(block.transactions_generator_ref_list) > 0
+                or peak is None
+                or block.prev_header_hash != peak.header_hash
+            ):
+                # The generators it refers to, or the blocks of a reorg, are read from the database. This must be
+                # done outside the block's savepoint
+                await self.block_store.flush_blocks()
             state_change_summary: Optional[StateChangeSummary]
             advanced_peak = agg_state_change_summary is not None
             result, error, state_change_summary = await self.blockchain.receive_block(
@@ -1311,6 +1581,7 @@ class FullNode:
             block_record = self.blockchain.block_record(block.header_hash)
             if block_record.sub_epoch_summary_included is not None:
                 if self.weight_proof_handler is not None:
+                    await self.block_store.flush_blocks()
                     await self.weight_proof_handler.create_prev_sub_epoch_segments()
         if agg_state_change_summary is not None:
             self._state_changed("new_peak")
@@ -1341,7 +1612,7 @@ class FullNode:
                 assert peak is not None
                 state_change_summary = StateChangeSummary(peak, uint32(max(peak.height - 1, 0)), [], [], [])
                 ppp_result: PeakPostProcessingResult = await self.peak_post_processing(
-                    peak_fb, state_change_summary, None
+                    peak_fb, state_change_summary, None, rebuild_mempool=True
                 )
                 await self.peak_post_processing_2(peak_fb, None, state_change_summary, ppp_result)
 
@@ -1428,10 +1699,13 @@ class FullNode:
         block: FullBlock,
         state_change_summary: StateChangeSummary,
         peer: Optional[WSTacoConnection],
+        rebuild_mempool: bool = False,
     ) -> PeakPostProcessingResult:
         """
         Must be called under self.blockchain.lock. This updates the internal state of the full node with the
-        latest peak information. It also notifies peers about the new peak.
+        latest peak information. It also notifies peers about the new peak. rebuild_mempool is set when the
+        state_change_summary doesn't have the coin set changes (after a long sync or at startup), the mempool is then
+        rebuilt from scratch.
         """
 
         record = state_change_summary.peak
@@ -1518,7 +1792,9 @@ class FullNode:
         # Update the mempool (returns successful pending transactions added to the mempool)
         new_npc_results: List[NPCResult] = state_change_summary.new_npc_results
         mempool_new_peak_result: List[Tuple[SpendBundle, NPCResult, bytes32]] = await self.mempool_manager.new_peak(
-            self.blockchain.get_peak(), new_npc_results[-1] if len(new_npc_results) > 0 else None
+            self.blockchain.get_peak(),
+            new_npc_results[-1] if len(new_npc_results) > 0 else None,
+            None if rebuild_mempool else state_change_summary,
         )
 
         # Check if we detected a spent transaction, to load up our generator cache
@@ -2215,7 +2491,39 @@ class FullNode:
         peer: Optional[WSTacoConnection] = None,
         test: bool = False,
         tx_bytes: Optional[bytes] = None,
+        pre_validation: Optional[Tuple[Optional[Err], Optional[NPCResult]]] = None,
     ) -> Tuple[MempoolInclusionStatus, Optional[Err]]:
+        """
+        pre_validation is the result of pre_validate_spendbundles() for this transaction, if it was pre-validated
+        in a batch already.
+        """
+        rejected = await self._check_new_transaction(spend_name, test)
+        if rejected is not None:
+            return rejected
+        if pre_validation is not None:
+            err, cost_result = pre_validation
+            if err is not None:
+                self.mempool_manager.remove_seen(spend_name)
+                return MempoolInclusionStatus.FAILED, err
+            assert cost_result is not None
+            return await self._add_pre_validated_transaction(transaction, spend_name, cost_result, peer)
+        try:
+            cost_result = await self.mempool_manager.pre_validate_spendbundle(transaction, tx_bytes, spend_name)
+        except ValidationError as e:
+            self.mempool_manager.remove_seen(spend_name)
+            return MempoolInclusionStatus.FAILED, e.code
+        except Exception:
+            self.mempool_manager.remove_seen(spend_name)
+            raise
+        return await self._add_pre_validated_transaction(transaction, spend_name, cost_result, peer)
+
+    async def _check_new_transaction(
+        self, spend_name: bytes32, test: bool
+    ) -> Optional[Tuple[MempoolInclusionStatus, Optional[Err]]]:
+        """
+        Returns the status for a transaction that doesn't need to be validated, or None (marking it as seen) if it
+        does.
+        """
         if self.sync_store.get_sync_mode():
             return MempoolInclusionStatus.FAILED, Err.NO_TRANSACTIONS_WHILE_SYNCING
         if not test and not (await self.synced()):
@@ -2230,54 +2538,51 @@ class FullNode:
         self.log.debug(f"Processing transaction: {spend_name}")
         # Ignore if syncing
         if self.sync_store.get_sync_mode():
-            status = MempoolInclusionStatus.FAILED
-            error: Optional[Err] = Err.NO_TRANSACTIONS_WHILE_SYNCING
             self.mempool_manager.remove_seen(spend_name)
-        else:
-            try:
-                cost_result = await self.mempool_manager.pre_validate_spendbundle(transaction, tx_bytes, spend_name)
-            except ValidationError as e:
-                self.mempool_manager.remove_seen(spend_name)
-                return MempoolInclusionStatus.FAILED, e.code
-            except Exception:
+            return MempoolInclusionStatus.FAILED, Err.NO_TRANSACTIONS_WHILE_SYNCING
+        return None
+
+    async def _add_pre_validated_transaction(
+        self,
+        transaction: SpendBundle,
+        spend_name: bytes32,
+        cost_result: NPCResult,
+        peer: Optional[WSTacoConnection],
+    ) -> Tuple[MempoolInclusionStatus, Optional[Err]]:
+        async with self._blockchain_lock_low_priority:
+            if self.mempool_manager.get_spendbundle(spend_name) is not None:
                 self.mempool_manager.remove_seen(spend_name)
-                raise
-            async with self._blockchain_lock_low_priority:
-                if self.mempool_manager.get_spendbundle(spend_name) is not None:
-                    self.mempool_manager.remove_seen(spend_name)
-                    return MempoolInclusionStatus.SUCCESS, None
-                cost, status, error = await self.mempool_manager.add_spend_bundle(transaction, cost_result, spend_name)
-            if status == MempoolInclusionStatus.SUCCESS:
-                self.log.debug(
-                    f"Added transaction to mempool: {spend_name} mempool size: "
-                    f"{self.mempool_manager.mempool.total_mempool_cost} normalized "
-                    f"{self.mempool_manager.mempool.total_mempool_cost / 5000000}"
-                )
+                return MempoolInclusionStatus.SUCCESS, None
+            cost, status, error = await self.mempool_manager.add_spend_bundle(transaction, cost_result, spend_name)
+        if status == MempoolInclusionStatus.SUCCESS:
+            self.log.debug(
+                f"Added transaction to mempool: {spend_name} mempool size: "
+                f"{self.mempool_manager.mempool.total_mempool_cost} normalized "
+                f"{self.mempool_manager.mempool.total_mempool_cost / 5000000}"
+            )
 
-                # Only broadcast successful transactions, not pending ones. Otherwise it's a DOS
-                # vector.
-                mempool_item = self.mempool_manager.get_mempool_item(spend_name)
-                assert mempool_item is not None
-                fees = mempool_item.fee
-                assert fees >= 0
-                assert cost is not None
-                new_tx = full_node_protocol.NewTransaction(
-                    spend_name,
-                    cost,
-                    fees,
-                )
-                msg = make_msg(ProtocolMessageTypes.new_transaction, new_tx)
-                if peer is None:
-                    await self.server.send_to_all([msg], NodeType.FULL_NODE)
-                else:
-                    await self.server.send_to_all_except([msg], NodeType.FULL_NODE, peer.peer_node_id)
-                if self.simulator_transaction_callback is not None:  # callback
-                    await self.simulator_transaction_callback(spend_name)  # pylint: disable=E1102
+            # Only broadcast successful transactions, not pending ones. Otherwise it's a DOS
+            # vector.
+            mempool_item = self.mempool_manager.get_mempool_item(spend_name)
+            assert mempool_item is not None
+            fees = mempool_item.fee
+            assert fees >= 0
+            assert cost is not None
+            new_tx = full_node_protocol.NewTransaction(
+                spend_name,
+                cost,
+                fees,
+            )
+            msg = make_msg(ProtocolMessageTypes.new_transaction, new_tx)
+            if peer is None:
+                await self.server.send_to_all([msg], NodeType.FULL_NODE)
             else:
-                self.mempool_manager.remove_seen(spend_name)
-                self.log.debug(
-                    f"Wasn't able to add transaction with id {spend_name}, " f"status {status} error: {error}"
-                )
+                await self.server.send_to_all_except([msg], NodeType.FULL_NODE, peer.peer_node_id)
+            if self.simulator_transaction_callback is not None:  # callback
+                await self.simulator_transaction_callback(spend_name)  # pylint: disable=E1102
+        else:
+            self.mempool_manager.remove_seen(spend_name)
+            self.log.debug(f"Wasn't able to add transaction with id {spend_name}, " f"status {status} error: {error}")
         return status, error
 
     async def _needs_compact_proof(
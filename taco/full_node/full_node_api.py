@@ -51,8 +51,8 @@ from taco.types.peer_info import PeerInfo
 from taco.types.transaction_queue_entry import TransactionQueueEntry
 from taco.types.unfinished_block import UnfinishedBlock
 from taco.util.api_decorators import api_request
-from taco.util.full_block_utils import header_block_from_block
-from taco.util.generator_tools import get_block_header, tx_removals_and_additions
+from taco.util.full_block_utils import BlockView, header_block_from_block
+from taco.util.generator_tools import tx_removals_and_additions
 from taco.util.hash import std_hash
 from taco.util.ints import uint8, uint32, uint64, uint128
 from taco.util.limited_semaphore import LimitedSemaphoreFullError
@@ -268,11 +268,11 @@ class FullNodeAPI:
         if request.tip in self.full_node.pow_creation:
             event = self.full_node.pow_creation[request.tip]
             await event.wait()
-            wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
+            wp = await self.full_node.weight_proof_handler.get_serialized_proof_of_weight(request.tip)
         else:
             event = asyncio.Event()
             self.full_node.pow_creation[request.tip] = event
-            wp = await self.full_node.weight_proof_handler.get_proof_of_weight(request.tip)
+            wp = await self.full_node.weight_proof_handler.get_serialized_proof_of_weight(request.tip)
             event.set()
         tips = list(self.full_node.pow_creation.keys())
 
@@ -285,18 +285,9 @@ class FullNodeAPI:
             self.log.error(f"failed creating weight proof for peak {request.tip}")
             return None
 
-        # Serialization of wp is slow
-        if (
-            self.full_node.full_node_store.serialized_wp_message_tip is not None
-            and self.full_node.full_node_store.serialized_wp_message_tip == request.tip
-        ):
-            return self.full_node.full_node_store.serialized_wp_message
-        message = make_msg(
-            ProtocolMessageTypes.respond_proof_of_weight, full_node_protocol.RespondProofOfWeight(wp, request.tip)
-        )
-        self.full_node.full_node_store.serialized_wp_message_tip = request.tip
-        self.full_node.full_node_store.serialized_wp_message = message
-        return message
+        # Serialization of wp is slow, the handler keeps it serialized. This is how RespondProofOfWeight(wp, tip) is
+        # serialized
+        return make_msg(ProtocolMessageTypes.respond_proof_of_weight, wp + request.tip)
 
     @api_request()
     async def respond_proof_of_weight(self, request: full_node_protocol.RespondProofOfWeight) -> Optional[Message]:
@@ -1081,7 +1072,8 @@ class FullNodeAPI:
         if header_hash is None:
             msg = make_msg(ProtocolMessageTypes.reject_header_request, RejectHeaderRequest(request.height))
             return msg
-        block: Optional[FullBlock] = await self.full_node.block_store.get_full_block(header_hash)
+        # the view only parses the transactions generator (if any) and the header block
+        block: Optional[BlockView] = await self.full_node.block_store.get_block_view(header_hash)
         if block is None:
             return None
 
@@ -1109,12 +1101,9 @@ class FullNodeAPI:
             )
 
             tx_removals, tx_additions = tx_removals_and_additions(npc_result.conds)
-        header_block = get_block_header(block, tx_additions, tx_removals)
-        msg = make_msg(
-            ProtocolMessageTypes.respond_block_header,
-            wallet_protocol.RespondBlockHeader(header_block),
-        )
-        return msg
+        # RespondBlockHeader only has the header block, its serialization is the same
+        header_block_bytes = block.header_block_bytes(tx_additions, tx_removals)
+        return make_msg(ProtocolMessageTypes.respond_block_header, header_block_bytes)
 
     @api_request()
     async def request_additions(self, request: wallet_protocol.RequestAdditions) -> Optional[Message]:
@@ -1375,8 +1364,8 @@ class FullNodeAPI:
                 return msg
             header_hashes.append(header_hash)
 
-        blocks: List[FullBlock] = await self.full_node.block_store.get_blocks_by_hash(header_hashes)
-        header_blocks = []
+        blocks: List[BlockView] = await self.full_node.block_store.get_block_views_by_hash(header_hashes)
+        header_blocks_bytes: List[bytes] = []
         for block in blocks:
             added_coins_records_coroutine = self.full_node.coin_store.get_coins_added_at_height(block.height)
             removed_coins_records_coroutine = self.full_node.coin_store.get_coins_removed_at_height(block.height)
@@ -1385,14 +1374,16 @@ class FullNodeAPI:
             )
             added_coins = [record.coin for record in added_coins_records if not record.coinbase]
             removal_names = [record.coin.name() for record in removed_coins_records]
-            header_block = get_block_header(block, added_coins, removal_names)
-            header_blocks.append(header_block)
+            header_blocks_bytes.append(block.header_block_bytes(added_coins, removal_names))
 
-        msg = make_msg(
-            ProtocolMessageTypes.respond_header_blocks,
-            wallet_protocol.RespondHeaderBlocks(request.start_height, request.end_height, header_blocks),
+        # like in request_block_headers(), RespondHeaderBlocks is streamed manually
+        respond_header_blocks_manually_streamed: bytes = (
+            bytes(uint32(request.start_height))
+            + bytes(uint32(request.end_height))
+            + len(header_blocks_bytes).to_bytes(4, "big", signed=False)
+            + b"".join(header_blocks_bytes)
         )
-        return msg
+        return make_msg(ProtocolMessageTypes.respond_header_blocks, respond_header_blocks_manually_streamed)
 
     @api_request()
     async def respond_compact_proof_of_time(self, request: timelord_protocol.RespondCompactProofOfTime) -> None:
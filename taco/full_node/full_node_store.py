@@ -15,7 +15,6 @@ from taco.consensus.multiprocess_validation import PreValidationResult
 from taco.consensus.pot_iterations import calculate_sp_interval_iters
 from taco.full_node.signage_point import SignagePoint
 from taco.protocols import timelord_protocol
-from taco.server.outbound_message import Message
 from taco.types.blockchain_format.classgroup import ClassgroupElement
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.blockchain_format.sub_epoch_summary import SubEpochSummary
@@ -84,8 +83,6 @@ class FullNodeStore:
     pending_tx_request: Dict[bytes32, bytes32]  # tx_id: peer_id
     peers_with_tx: Dict[bytes32, Set[bytes32]]  # tx_id: Set[peer_ids}
     tx_fetch_tasks: Dict[bytes32, asyncio.Task[None]]  # Task id: task
-    serialized_wp_message: Optional[Message]
-    serialized_wp_message_tip: Optional[bytes32]
 
     def __init__(self, constants: ConsensusConstants):
         self.candidate_blocks = {}
@@ -107,8 +104,6 @@ class FullNodeStore:
         self.pending_tx_request = {}
         self.peers_with_tx = {}
         self.tx_fetch_tasks = {}
-        self.serialized_wp_message = None
-        self.serialized_wp_message_tip = None
 
     def add_candidate_block(
         self, quality_string: bytes32, height: uint32, unfinished_block: UnfinishedBlock, backup: bool = False
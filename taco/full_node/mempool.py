@@ -2,31 +2,52 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 from sortedcontainers import SortedDict
 
 from taco.full_node.bitcoin_fee_estimator import create_bitcoin_fee_estimator
+from taco.full_node.block_template import BlockTemplate
 from taco.full_node.fee_estimation import FeeMempoolInfo
 from taco.full_node.fee_estimator_interface import FeeEstimatorInterface
+from taco.full_node.fee_rate_index import FeeRateCostIndex
 from taco.types.blockchain_format.coin import Coin
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.clvm_cost import CLVMCost
 from taco.types.fee_rate import FeeRate
 from taco.types.mempool_item import MempoolItem
+from taco.util.errors import Err
 from taco.util.ints import uint64
 
 
 class Mempool:
-    def __init__(self, max_size_in_cost: int, minimum_fee_per_cost_to_replace: uint64, max_block_cost_clvm: uint64):
+    def __init__(
+        self,
+        max_size_in_cost: int,
+        minimum_fee_per_cost_to_replace: uint64,
+        max_block_cost_clvm: uint64,
+        block_template: Optional[BlockTemplate] = None,
+    ):
         self.log = logging.getLogger(__name__)
         self.spends: Dict[bytes32, MempoolItem] = {}
         self.sorted_spends: SortedDict = SortedDict()
         self.removals: Dict[bytes32, List[bytes32]] = {}  # From removal coin id to spend bundle id
+        self.additions: Dict[bytes32, bytes32] = {}  # From addition coin id to spend bundle id
+        # Dependencies between items, from spend bundle id to the ids of the items whose additions it spends (parents)
+        # and of the items spending its additions (children). Only items with dependencies have an entry.
+        self.parents: Dict[bytes32, Set[bytes32]] = {}
+        self.children: Dict[bytes32, Set[bytes32]] = {}
+        # Cost of the items by eviction fee rate, for eviction and minimum fee rate queries
+        self.cost_index: FeeRateCostIndex = FeeRateCostIndex()
         self.max_size_in_cost: int = max_size_in_cost
         self.total_mempool_cost: int = 0
         self.minimum_fee_per_cost_to_replace: uint64 = minimum_fee_per_cost_to_replace
         self.fee_estimator: FeeEstimatorInterface = create_bitcoin_fee_estimator(max_block_cost_clvm, self.log)
+        # Kept up to date with every change to the pool, so that block creation only pays for the delta
+        self.block_template: Optional[BlockTemplate] = block_template
+        if block_template is not None:
+            block_template.parents = self.parents
+            block_template.children = self.children
 
     def get_min_fee_rate(self, cost: int) -> float:
         """
@@ -34,57 +55,236 @@ class Mempool:
         """
 
         if self.at_full_capacity(cost):
-            current_cost = self.total_mempool_cost
-
-            # Iterates through all spends in increasing fee per cost
-            fee_per_cost: float
-            for fee_per_cost, spends_with_fpc in self.sorted_spends.items():
-                for spend_name, item in spends_with_fpc.items():
-                    current_cost -= item.cost
-                    # Removing one at a time, until our transaction of size cost fits
-                    if current_cost + cost <= self.max_size_in_cost:
-                        return fee_per_cost
-            raise ValueError(
-                f"Transaction with cost {cost} does not fit in mempool of max cost {self.max_size_in_cost}"
-            )
+            # The lowest fee rate at which evicting all items up to it frees enough cost
+            fee_rate = self.cost_index.fee_rate_at_cost(self.total_mempool_cost + cost - self.max_size_in_cost)
+            if fee_rate is None:
+                raise ValueError(
+                    f"Transaction with cost {cost} does not fit in mempool of max cost {self.max_size_in_cost}"
+                )
+            return fee_rate
         else:
             return 0
 
+    def get_unconfirmed_coin(self, coin_id: bytes32) -> Optional[Coin]:
+        """
+        Returns the coin with the given id if it's created by an item in the mempool.
+        """
+        spend_bundle_id = self.additions.get(coin_id)
+        if spend_bundle_id is None:
+            return None
+        for coin in self.spends[spend_bundle_id].additions:
+            if coin.name() == coin_id:
+                return coin
+        return None
+
+    def get_ancestors(self, spend_bundle_id: bytes32) -> Set[bytes32]:
+        """
+        Returns the ids of all the items that need to be included in a block before this one can be.
+        """
+        ancestors: Set[bytes32] = set()
+        to_visit: List[bytes32] = list(self.parents.get(spend_bundle_id, ()))
+        while len(to_visit) > 0:
+            name = to_visit.pop()
+            if name in ancestors:
+                continue
+            ancestors.add(name)
+            to_visit.extend(self.parents.get(name, ()))
+        return ancestors
+
+    def get_descendants(self, spend_bundle_id: bytes32) -> Set[bytes32]:
+        """
+        Returns the ids of all the items that can't stay in the mempool without this one.
+        """
+        descendants: Set[bytes32] = set()
+        to_visit: List[bytes32] = list(self.children.get(spend_bundle_id, ()))
+        while len(to_visit) > 0:
+            name = to_visit.pop()
+            if name in descendants:
+                continue
+            descendants.add(name)
+            to_visit.extend(self.children.get(name, ()))
+        return descendants
+
+    def get_package_fee_and_cost(self, spend_bundle_ids: Set[bytes32]) -> Tuple[int, int]:
+        fee = 0
+        cost = 0
+        for name in spend_bundle_ids:
+            item = self.spends[name]
+            fee += item.fee
+            cost += item.cost
+        return fee, cost
+
+    def get_eviction_fee_rate(self, item: MempoolItem) -> float:
+        """
+        The fee per cost used to rank items for eviction. An item with children is worth at least as much as the
+        package of it and all of its descendants, so that a high fee child protects its parents (CPFP).
+        """
+        if item.name not in self.children:
+            return item.fee_per_cost
+        package = self.get_descendants(item.name)
+        package.add(item.name)
+        fee, cost = self.get_package_fee_and_cost(package)
+        return max(item.fee_per_cost, fee / cost)
+
+    def confirm_additions(self, coin_ids: List[bytes32]) -> None:
+        """
+        Called when coins created by mempool items got confirmed in a block. Items spending them no longer
+        depend on the items that created them.
+        """
+        unlinked = False
+        for coin_id in coin_ids:
+            parent = self.additions.pop(coin_id, None)
+            if parent is None:
+                continue
+            for child in self.removals.get(coin_id, []):
+                if child == parent:
+                    continue
+                if any(self.additions.get(rem.name()) == parent for rem in self.spends[child].removals):
+                    # Still spends other unconfirmed coins of the same parent
+                    continue
+                self._unlink(parent, child)
+                unlinked = True
+            self._update_eviction_fee_rates({parent} | self.get_ancestors(parent))
+        if unlinked and self.block_template is not None:
+            self.block_template.invalidate()
+
+    def _update_eviction_fee_rates(self, spend_bundle_ids: Set[bytes32]) -> None:
+        for name in spend_bundle_ids:
+            item = self.spends.get(name)
+            if item is not None:
+                self.cost_index.update_fee_rate(name, self.get_eviction_fee_rate(item))
+
+    def _link(self, parent: bytes32, child: bytes32) -> None:
+        self.parents.setdefault(child, set()).add(parent)
+        self.children.setdefault(parent, set()).add(child)
+
+    def _unlink(self, parent: bytes32, child: bytes32) -> None:
+        parents = self.parents.get(child)
+        if parents is not None:
+            parents.discard(parent)
+            if len(parents) == 0:
+                del self.parents[child]
+        children = self.children.get(parent)
+        if children is not None:
+            children.discard(child)
+            if len(children) == 0:
+                del self.children[parent]
+
     def remove_from_pool(self, items: List[bytes32]) -> None:
         """
-        Removes an item from the mempool.
+        Removes items from the mempool, along with all the items spending their additions.
         """
-        for spend_bundle_id in items:
+        to_remove: List[bytes32] = list(items)
+        # Packages of the remaining ancestors shrink, so their eviction fee rates need updating afterwards
+        ancestors: Set[bytes32] = set()
+        while len(to_remove) > 0:
+            spend_bundle_id = to_remove.pop()
             item: Optional[MempoolItem] = self.spends.get(spend_bundle_id)
             if item is None:
                 continue
             assert item.name == spend_bundle_id
+            if self.block_template is not None:
+                self.block_template.remove_item(item.name)
             removals: List[Coin] = item.removals
             for rem in removals:
                 rem_name: bytes32 = rem.name()
                 self.removals[rem_name].remove(spend_bundle_id)
                 if len(self.removals[rem_name]) == 0:
                     del self.removals[rem_name]
+            for add in item.additions:
+                # a replacement added before the item it replaces may create the same coin
+                if self.additions.get(add.name()) == spend_bundle_id:
+                    del self.additions[add.name()]
+            if spend_bundle_id in self.parents:
+                ancestors |= self.get_ancestors(spend_bundle_id)
+            for parent in list(self.parents.get(spend_bundle_id, ())):
+                self._unlink(parent, spend_bundle_id)
+            for child in list(self.children.get(spend_bundle_id, ())):
+                self._unlink(spend_bundle_id, child)
+                to_remove.append(child)
             del self.spends[item.name]
             del self.sorted_spends[item.fee_per_cost][item.name]
             dic = self.sorted_spends[item.fee_per_cost]
             if len(dic.values()) == 0:
                 del self.sorted_spends[item.fee_per_cost]
+            self.cost_index.remove(item.name)
             self.total_mempool_cost -= item.cost
             assert self.total_mempool_cost >= 0
             mempool_info = self.get_mempool_info()
             self.fee_estimator.remove_mempool_item(mempool_info, item)
+        self._update_eviction_fee_rates(ancestors)
 
-    def add_to_pool(self, item: MempoolItem) -> None:
+    def _get_parents(self, item: MempoolItem) -> Set[bytes32]:
+        """
+        Returns the mempool items creating the coins the item spends.
         """
-        Adds an item to the mempool by kicking out transactions (if it doesn't fit), in order of increasing fee per cost
+        # Ephemeral coins are created by the item itself, even when an item it replaces created the same coin
+        own_additions: Set[bytes32] = {coin.name() for coin in item.additions}
+        parents: Set[bytes32] = set()
+        for coin in item.removals:
+            coin_id = coin.name()
+            if coin_id in own_additions:
+                continue
+            parent = self.additions.get(coin_id)
+            if parent is not None:
+                parents.add(parent)
+        return parents
+
+    def _get_protected(self, parents: Set[bytes32]) -> Set[bytes32]:
         """
+        Returns the parents and all their ancestors, which can't be evicted to make room for their descendant.
+        """
+        protected: Set[bytes32] = set()
+        for parent in parents:
+            protected.add(parent)
+            protected |= self.get_ancestors(parent)
+        return protected
+
+    def check_add_to_pool(self, item: MempoolItem, remove_items: List[bytes32] = []) -> Optional[Err]:
+        """
+        Returns the error add_to_pool() would return for the item, once remove_items (and their descendants) are
+        removed from the mempool. This doesn't change the mempool.
+        """
+        removed: Set[bytes32] = set()
+        for name in remove_items:
+            if name in self.spends:
+                removed.add(name)
+                removed |= self.get_descendants(name)
+        _, removed_cost = self.get_package_fee_and_cost(removed)
+        if self.total_mempool_cost - removed_cost + item.cost <= self.max_size_in_cost:
+            return None
+        protected = self._get_protected(self._get_parents(item)) - removed
+        _, protected_cost = self.get_package_fee_and_cost(protected)
+        if protected_cost + item.cost > self.max_size_in_cost:
+            return Err.INVALID_FEE_LOW_FEE
+        return None
+
+    def add_to_pool(self, item: MempoolItem) -> Optional[Err]:
+        """
+        Adds an item to the mempool by kicking out transactions (if it doesn't fit), in order of increasing fee per
+        cost. Items are evicted together with their descendants, and the ancestors of the new item are never evicted.
+        Returns an error, without changing the mempool, if evicting everything else doesn't make room for the item.
+        """
+
+        err = self.check_add_to_pool(item)
+        if err is not None:
+            return err
+        parents = self._get_parents(item)
+        protected = self._get_protected(parents)
 
         while self.at_full_capacity(item.cost):
-            # Val is Dict[hash, MempoolItem]
-            fee_per_cost, val = self.sorted_spends.peekitem(index=0)
-            to_remove: MempoolItem = list(val.values())[0]
-            self.remove_from_pool([to_remove.name])
+            # Evict the cheapest items in one go, the removal of descendants can free more than we asked for
+            to_free = self.total_mempool_cost + item.cost - self.max_size_in_cost
+            to_remove: List[bytes32] = []
+            for name, _, cost in self.cost_index.lowest():
+                if name in protected:
+                    continue
+                to_remove.append(name)
+                to_free -= cost
+                if to_free <= 0:
+                    break
+            assert len(to_remove) > 0
+            self.remove_from_pool(to_remove)
 
         self.spends[item.name] = item
 
@@ -99,10 +299,19 @@ class Mempool:
             if coin_id not in self.removals:
                 self.removals[coin_id] = []
             self.removals[coin_id].append(item.name)
+        for coin in item.additions:
+            self.additions[coin.name()] = item.name
+        for parent in parents:
+            self._link(parent, item.name)
+        self.cost_index.add(item.name, self.get_eviction_fee_rate(item), item.cost)
+        self._update_eviction_fee_rates(protected)
         self.total_mempool_cost += item.cost
+        if self.block_template is not None:
+            self.block_template.add_item(item)
 
         mempool_info = self.get_mempool_info()
         self.fee_estimator.add_mempool_item(mempool_info, item)
+        return None
 
     def at_full_capacity(self, cost: int) -> bool:
         """
@@ -16,8 +16,10 @@ from chiabip158 import PyBIP158
 
 from taco.util import cached_bls
 from taco.consensus.block_record import BlockRecord
+from taco.consensus.blockchain import StateChangeSummary
 from taco.consensus.constants import ConsensusConstants
 from taco.consensus.cost_calculator import NPCResult
+from taco.full_node.block_template import BlockTemplate
 from taco.full_node.bundle_tools import simple_solution_generator
 from taco.full_node.coin_store import CoinStore
 from taco.full_node.mempool import Mempool
@@ -29,26 +31,25 @@ from taco.types.coin_record import CoinRecord
 from taco.types.mempool_inclusion_status import MempoolInclusionStatus
 from taco.types.mempool_item import MempoolItem
 from taco.types.spend_bundle import SpendBundle
-from taco.util.cached_bls import LOCAL_CACHE
+from taco.types.spend_bundle_conditions import SpendBundleConditions
+from taco.util.cached_bls import LOCAL_CACHE, PAIRING_ENTRY_SIZE, BLSCache
 from taco.util.condition_tools import pkm_pairs
 from taco.util.errors import Err, ValidationError
 from taco.util.generator_tools import additions_for_npc
 from taco.util.ints import uint32, uint64
-from taco.util.lru_cache import LRUCache
 from taco.util.setproctitle import getproctitle, setproctitle
 from taco.full_node.mempool_check_conditions import mempool_check_time_locks
 
 log = logging.getLogger(__name__)
 
 
-def validate_clvm_and_signature(
-    spend_bundle_bytes: bytes, max_cost: int, cost_per_byte: int, additional_data: bytes
-) -> Tuple[Optional[Err], bytes, Dict[bytes32, bytes]]:
-    """
-    Validates CLVM and aggregate signature for a spendbundle. This is meant to be called under a ProcessPoolExecutor
-    in order to validate the heavy parts of a transaction in a different thread. Returns an optional error,
-    the NPCResult and a cache of the new pairings validated (if not error)
-    """
+def _validate_clvm_and_signature(
+    spend_bundle_bytes: bytes,
+    max_cost: int,
+    cost_per_byte: int,
+    additional_data: bytes,
+    cache: BLSCache,
+) -> Tuple[Optional[Err], bytes]:
     try:
         bundle: SpendBundle = SpendBundle.from_bytes(spend_bundle_bytes)
         program = simple_solution_generator(bundle)
@@ -58,7 +59,7 @@ def validate_clvm_and_signature(
         )
 
         if result.error is not None:
-            return Err(result.error), b"", {}
+            return Err(result.error), b""
 
         pks: List[bytes48] = []
         msgs: List[bytes] = []
@@ -66,18 +67,71 @@ def validate_clvm_and_signature(
         pks, msgs = pkm_pairs(result.conds, additional_data)
 
         # Verify aggregated signature
-        cache: LRUCache[bytes32, GTElement] = LRUCache(10000)
         if not cached_bls.aggregate_verify(pks, msgs, bundle.aggregated_signature, True, cache):
-            return Err.BAD_AGGREGATE_SIGNATURE, b"", {}
-        new_cache_entries: Dict[bytes32, bytes] = {}
-        for k, v in cache.cache.items():
-            new_cache_entries[k] = bytes(v)
+            return Err.BAD_AGGREGATE_SIGNATURE, b""
     except ValidationError as e:
-        return e.code, b"", {}
+        return e.code, b""
     except Exception:
-        return Err.UNKNOWN, b"", {}
+        return Err.UNKNOWN, b""
+
+    return None, bytes(result)
+
+
+def validate_clvm_and_signature(
+    spend_bundle_bytes: bytes, max_cost: int, cost_per_byte: int, additional_data: bytes
+) -> Tuple[Optional[Err], bytes, Dict[bytes32, bytes]]:
+    """
+    Validates CLVM and aggregate signature for a spendbundle. This is meant to be called under a ProcessPoolExecutor
+    in order to validate the heavy parts of a transaction in a different thread. Returns an optional error,
+    the NPCResult and a cache of the new pairings validated (if not error)
+    """
+    cache = BLSCache(10000 * PAIRING_ENTRY_SIZE)
+    err, result_bytes = _validate_clvm_and_signature(
+        spend_bundle_bytes, max_cost, cost_per_byte, additional_data, cache
+    )
+    if err is not None:
+        return err, b"", {}
+    new_cache_entries: Dict[bytes32, bytes] = {}
+    for k, v in cache.items():
+        new_cache_entries[k] = bytes(v)
+    return None, result_bytes, new_cache_entries
+
+
+def validate_clvm_and_signature_batch(
+    spend_bundles_bytes: List[bytes], max_cost: int, cost_per_byte: int, additional_data: bytes
+) -> Tuple[List[Tuple[Optional[Err], bytes]], Dict[bytes32, bytes]]:
+    """
+    Same as validate_clvm_and_signature, for several spendbundles in a single call to the ProcessPoolExecutor.
+    Pairings computed for one spendbundle are reused for the others. Returns an optional error and the NPCResult
+    for each spendbundle, in order, and a cache of the new pairings validated.
 
-    return None, bytes(result), new_cache_entries
+    Each signature is verified on its own. Verifying the aggregate of the whole batch at once would let invalid
+    signatures that cancel each other out through.
+    """
+    cache = BLSCache(10000 * PAIRING_ENTRY_SIZE * max(1, len(spend_bundles_bytes)))
+    results: List[Tuple[Optional[Err], bytes]] = []
+    for spend_bundle_bytes in spend_bundles_bytes:
+        results.append(
+            _validate_clvm_and_signature(spend_bundle_bytes, max_cost, cost_per_byte, additional_data, cache)
+        )
+    new_cache_entries: Dict[bytes32, bytes] = {}
+    for k, v in cache.items():
+        new_cache_entries[k] = bytes(v)
+    return results, new_cache_entries
+
+
+def has_time_locks(conds: Optional[SpendBundleConditions]) -> bool:
+    """
+    Returns whether the validity of the conditions depends on the height or timestamp of the peak.
+    """
+    if conds is None:
+        return False
+    if conds.height_absolute > 0 or conds.seconds_absolute > 0:
+        return True
+    for spend in conds.spends:
+        if spend.height_relative is not None or spend.seconds_relative > 0:
+            return True
+    return False
 
 
 class MempoolManager:
@@ -90,6 +144,7 @@ class MempoolManager:
         multiprocessing_context: Optional[BaseContext] = None,
         *,
         single_threaded: bool = False,
+        knapsack_fill: bool = False,
     ):
         self.constants: ConsensusConstants = consensus_constants
 
@@ -104,6 +159,8 @@ class MempoolManager:
         self.nonzero_fee_minimum_fpc = 5
 
         self.limit_factor = 0.5
+        # Keep packing smaller transactions into a block after the first one that doesn't fit
+        self.knapsack_fill = knapsack_fill
         self.mempool_max_total_cost = int(self.constants.MAX_BLOCK_COST_CLVM * self.constants.MEMPOOL_BLOCK_BUFFER)
 
         # Transactions that were unable to enter mempool, used for retry. (they were invalid)
@@ -121,10 +178,21 @@ class MempoolManager:
 
         # The mempool will correspond to a certain peak
         self.peak: Optional[BlockRecord] = None
-        self.mempool: Mempool = Mempool(
+        # Set when the coin set changed at a peak that wasn't a transaction block, the state change summary of the
+        # next transaction block then doesn't have all the changes since self.peak
+        self.missed_state_change: bool = False
+        self.mempool: Mempool = self.create_mempool()
+
+    def create_mempool(self) -> Mempool:
+        return Mempool(
             self.mempool_max_total_cost,
             uint64(self.nonzero_fee_minimum_fpc),
             uint64(self.constants.MAX_BLOCK_COST_CLVM),
+            BlockTemplate(
+                int(self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM),
+                self.constants.MAX_COIN_AMOUNT,
+                knapsack_fill=self.knapsack_fill,
+            ),
         )
 
     def shut_down(self) -> None:
@@ -140,39 +208,17 @@ class MempoolManager:
         if self.peak is None or self.peak.header_hash != last_tb_header_hash:
             return None
 
-        cost_sum = 0  # Checks that total cost does not exceed block maximum
-        fee_sum = 0  # Checks that total fees don't exceed 64 bits
-        spend_bundles: List[SpendBundle] = []
-        removals = []
-        additions = []
-        broke_from_inner_loop = False
+        assert self.mempool.block_template is not None
         log.info(f"Starting to make block, max cost: {self.constants.MAX_BLOCK_COST_CLVM}")
-        for dic in reversed(self.mempool.sorted_spends.values()):
-            if broke_from_inner_loop:
-                break
-            for item in dic.values():
-                log.info(f"Cumulative cost: {cost_sum}, fee per cost: {item.fee / item.cost}")
-                if (
-                    item.cost + cost_sum <= self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM
-                    and item.fee + fee_sum <= self.constants.MAX_COIN_AMOUNT
-                ):
-                    spend_bundles.append(item.spend_bundle)
-                    cost_sum += item.cost
-                    fee_sum += item.fee
-                    removals.extend(item.removals)
-                    additions.extend(item.additions)
-                else:
-                    broke_from_inner_loop = True
-                    break
-        if len(spend_bundles) > 0:
-            log.info(
-                f"Cumulative cost of block (real cost should be less) {cost_sum}. Proportion "
-                f"full: {cost_sum / self.constants.MAX_BLOCK_COST_CLVM}"
-            )
-            agg = SpendBundle.aggregate(spend_bundles)
-            return agg, additions, removals
-        else:
+        result = self.mempool.block_template.create_bundle()
+        if result is None:
             return None
+        cost_sum = self.mempool.block_template.cost_sum
+        log.info(
+            f"Cumulative cost of block (real cost should be less) {cost_sum}. Proportion "
+            f"full: {cost_sum / self.constants.MAX_BLOCK_COST_CLVM}"
+        )
+        return result
 
     def get_filter(self) -> bytes:
         all_transactions: Set[bytes32] = set()
@@ -292,6 +338,46 @@ class MempoolManager:
         )
         return ret
 
+    async def pre_validate_spendbundles(
+        self, spend_bundles: List[Tuple[SpendBundle, Optional[bytes], bytes32]]
+    ) -> List[Tuple[Optional[Err], Optional[NPCResult]]]:
+        """
+        Same as pre_validate_spendbundle for a batch of (spend bundle, serialized spend bundle, spend name), validated
+        in a single call to the process pool. Instead of raising, returns either an error or the NPCResult for each
+        spend bundle, in order.
+        """
+        if len(spend_bundles) == 0:
+            return []
+        start_time = time.time()
+        spend_bundles_bytes: List[bytes] = [
+            bytes(new_spend) if new_spend_bytes is None else new_spend_bytes
+            for new_spend, new_spend_bytes, _ in spend_bundles
+        ]
+
+        results, new_cache_entries = await asyncio.get_running_loop().run_in_executor(
+            self.pool,
+            validate_clvm_and_signature_batch,
+            spend_bundles_bytes,
+            int(self.limit_factor * self.constants.MAX_BLOCK_COST_CLVM),
+            self.constants.COST_PER_BYTE,
+            self.constants.AGG_SIG_ME_ADDITIONAL_DATA,
+        )
+
+        for cache_entry_key, cached_entry_value in new_cache_entries.items():
+            LOCAL_CACHE.put(cache_entry_key, GTElement.from_bytes_unchecked(cached_entry_value))
+        ret: List[Tuple[Optional[Err], Optional[NPCResult]]] = []
+        for err, cached_result_bytes in results:
+            if err is not None:
+                ret.append((err, None))
+            else:
+                ret.append((None, NPCResult.from_bytes(cached_result_bytes)))
+        duration = time.time() - start_time
+        log.log(
+            logging.DEBUG if duration < 2 else logging.WARNING,
+            f"pre_validate_spendbundles took {duration:0.4f} seconds for {len(spend_bundles)} spend bundles",
+        )
+        return ret
+
     async def add_spend_bundle(
         self,
         new_spend: SpendBundle,
@@ -325,8 +411,13 @@ class MempoolManager:
         if err is None:
             # No error, immediately add to mempool, after removing conflicting TXs.
             assert item is not None
-            self.mempool.add_to_pool(item)
+            # The conflicting TXs are only removed if the item can be added once they're gone
+            err = self.mempool.check_add_to_pool(item, remove_items)
+            if err is not None:
+                return None, MempoolInclusionStatus.FAILED, err
             self.mempool.remove_from_pool(remove_items)
+            err = self.mempool.add_to_pool(item)
+            assert err is None
             return item.cost, MempoolInclusionStatus.SUCCESS, None
         elif item is not None:
             # There is an error,  but we still returned a mempool item, this means we should add to the pending pool.
@@ -409,10 +500,14 @@ class MempoolManager:
         removal_amount: int = 0
         for name in removal_names:
             removal_record = await self.coin_store.get_coin_record(name)
+            unconfirmed_coin: Optional[Coin] = None
             if removal_record is None and name not in additions_dict:
-                return Err.UNKNOWN_UNSPENT, None, []
-            elif name in additions_dict:
-                removal_coin = additions_dict[name]
+                # Spending the output of another item in the mempool, both will have to be in the same block
+                unconfirmed_coin = self.mempool.get_unconfirmed_coin(name)
+                if unconfirmed_coin is None:
+                    return Err.UNKNOWN_UNSPENT, None, []
+            if name in additions_dict or unconfirmed_coin is not None:
+                removal_coin = additions_dict[name] if unconfirmed_coin is None else unconfirmed_coin
                 # The timestamp and block-height of this coin being spent needs
                 # to be consistent with what we use to check time-lock
                 # conditions (below). All spends (including ephemeral coins) are
@@ -546,14 +641,28 @@ class MempoolManager:
         return None
 
     async def new_peak(
-        self, new_peak: Optional[BlockRecord], last_npc_result: Optional[NPCResult]
+        self,
+        new_peak: Optional[BlockRecord],
+        last_npc_result: Optional[NPCResult],
+        state_change_summary: Optional[StateChangeSummary] = None,
     ) -> List[Tuple[SpendBundle, NPCResult, bytes32]]:
         """
         Called when a new peak is available, we try to recreate a mempool for the new tip.
+
+        If the new peak doesn't simply extend the previous one, and the state_change_summary describing the switch
+        from the previous peak is available, only the items affected by the coin set changes are re-validated.
+        Otherwise the mempool is rebuilt from scratch. Only pass a state_change_summary that has all the coin set
+        changes, the ones made up after a long sync or at startup don't.
         """
         if new_peak is None:
             return []
         if new_peak.is_transaction_block is False:
+            if state_change_summary is None or (
+                len(state_change_summary.rolled_back_records) > 0
+                or len(state_change_summary.new_npc_results) > 0
+                or len(state_change_summary.new_rewards) > 0
+            ):
+                self.missed_state_change = True
             return []
         if self.peak == new_peak:
             return []
@@ -561,25 +670,34 @@ class MempoolManager:
         included_items = []
 
         use_optimization: bool = self.peak is not None and new_peak.prev_transaction_block_hash == self.peak.header_hash
+        use_reorg_optimization: bool = (
+            self.peak is not None
+            and not self.missed_state_change
+            and state_change_summary is not None
+            and state_change_summary.peak.header_hash == new_peak.header_hash
+            and state_change_summary.fork_height <= self.peak.height
+        )
         self.peak = new_peak
+        self.missed_state_change = False
 
         if use_optimization and last_npc_result is not None:
             # We don't reinitialize a mempool, just kick removed items
             if last_npc_result.conds is not None:
+                # Items spending coins that other mempool items created don't depend on those items anymore
+                self.mempool.confirm_additions([coin.name() for coin in additions_for_npc(last_npc_result)])
                 for spend in last_npc_result.conds.spends:
                     if spend.coin_id in self.mempool.removals:
                         c_ids: List[bytes32] = self.mempool.removals[bytes32(spend.coin_id)]
                         self.mempool.remove_from_pool(c_ids)
                         for c_id in c_ids:
                             self.remove_seen(c_id)
+        elif use_reorg_optimization:
+            assert state_change_summary is not None
+            included_items = await self.revalidate_after_reorg(state_change_summary)
         else:
             old_pool = self.mempool
 
-            self.mempool = Mempool(
-                self.mempool_max_total_cost,
-                uint64(self.nonzero_fee_minimum_fpc),
-                uint64(self.constants.MAX_BLOCK_COST_CLVM),
-            )
+            self.mempool = self.create_mempool()
             self.seen_bundle_hashes = {}
             for item in old_pool.spends.values():
                 _, result, err = await self.add_spend_bundle(item.spend_bundle, item.npc_result, item.spend_bundle_name)
@@ -608,6 +726,46 @@ class MempoolManager:
         self.mempool.fee_estimator.new_block(FeeBlockInfo(new_peak.height, included_items))
         return txs_added
 
+    async def revalidate_after_reorg(self, state_change_summary: StateChangeSummary) -> List[MempoolItem]:
+        """
+        Re-validates the mempool items whose validity could have changed when switching to the peak of the
+        state_change_summary: the ones spending coins created or spent in the rolled back or applied blocks, the ones
+        with time locks, and their descendants. All other items are still valid and stay in the mempool untouched.
+        Returns the items that are now double spends (most likely included in the applied blocks).
+        """
+        touched_coins: Set[bytes32] = {record.name for record in state_change_summary.rolled_back_records}
+        for npc_result in state_change_summary.new_npc_results:
+            if npc_result.conds is None:
+                continue
+            for spend in npc_result.conds.spends:
+                touched_coins.add(bytes32(spend.coin_id))
+            touched_coins.update(coin.name() for coin in additions_for_npc(npc_result))
+        touched_coins.update(coin.name() for coin in state_change_summary.new_rewards)
+
+        affected: Set[bytes32] = set()
+        for coin_id in touched_coins:
+            affected.update(self.mempool.removals.get(coin_id, []))
+        for item in self.mempool.spends.values():
+            if has_time_locks(item.npc_result.conds):
+                affected.add(item.name)
+        for spend_bundle_id in list(affected):
+            affected |= self.mempool.get_descendants(spend_bundle_id)
+
+        # Re-add in the order the items entered the mempool, so that parents are added before their children
+        to_revalidate = [item for item in self.mempool.spends.values() if item.name in affected]
+        self.mempool.remove_from_pool([item.name for item in to_revalidate])
+        log.info(f"Re-validating {len(to_revalidate)} of {len(to_revalidate) + len(self.mempool.spends)} mempool items")
+
+        included_items: List[MempoolItem] = []
+        for item in to_revalidate:
+            _, result, err = await self.add_spend_bundle(item.spend_bundle, item.npc_result, item.spend_bundle_name)
+            if result != MempoolInclusionStatus.SUCCESS:
+                # Can be resubmitted in case of another reorg
+                self.remove_seen(item.spend_bundle_name)
+            if result == MempoolInclusionStatus.FAILED and err == Err.DOUBLE_SPEND:
+                included_items.append(item)
+        return included_items
+
     async def get_items_not_in_filter(self, mempool_filter: PyBIP158, limit: int = 100) -> List[MempoolItem]:
         items: List[MempoolItem] = []
         counter = 0
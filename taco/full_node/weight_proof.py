@@ -5,9 +5,10 @@ import math
 from multiprocessing.context import BaseContext
 import pathlib
 import random
+from concurrent.futures import Executor
 from concurrent.futures.process import ProcessPoolExecutor
 import tempfile
-from typing import Dict, IO, List, Optional, Tuple, Awaitable
+from typing import Awaitable, Callable, Dict, IO, Iterator, List, Optional, Tuple
 
 from taco.consensus.block_header_validation import validate_finished_header_block
 from taco.consensus.block_record import BlockRecord
@@ -21,7 +22,6 @@ from taco.consensus.pot_iterations import (
     calculate_sp_iters,
     is_overflow_block,
 )
-from taco.util.chunks import chunks
 from taco.consensus.vdf_info_computation import get_signage_point_vdf_info
 from taco.types.blockchain_format.classgroup import ClassgroupElement
 from taco.types.blockchain_format.sized_bytes import bytes32
@@ -41,21 +41,41 @@ from taco.types.weight_proof import (
 from taco.util.block_cache import BlockCache
 from taco.util.hash import std_hash
 from taco.util.ints import uint8, uint32, uint64, uint128
+from taco.util.lru_cache import LRUCache
 from taco.util.setproctitle import getproctitle, setproctitle
 from taco.types.blockchain_format.proof_of_space import verify_and_get_quality_string
 
 log = logging.getLogger(__name__)
 
 
+# the number of VDFs validated in a single task on a worker process
+VDF_BATCH_SIZE = 16
+
+# the consensus constants of a worker process, set when it's started by init_validation_worker()
+_worker_constants: Optional[ConsensusConstants] = None
+
+
 def _create_shutdown_file() -> IO:
     return tempfile.NamedTemporaryFile(prefix="taco_full_node_weight_proof_handler_executor_shutdown_trigger")
 
 
+def init_validation_worker(constants: ConsensusConstants, process_title: str) -> None:
+    """
+    The initializer of the worker processes weight proofs are validated on. The constants are sent to every worker
+    once, instead of with every batch of VDFs.
+    """
+    global _worker_constants
+    _worker_constants = constants
+    setproctitle(process_title)
+
+
 class WeightProofHandler:
 
     LAMBDA_L = 100
     C = 0.5
     MAX_SAMPLES = 20
+    # the number of tips the serialized weight proof is kept for
+    SERIALIZED_PROOFS = 4
 
     def __init__(
         self,
@@ -70,6 +90,39 @@ class WeightProofHandler:
         self.lock = asyncio.Lock()
         self._num_processes = 4
         self.multiprocessing_context = multiprocessing_context
+        # used to create sub epoch segments and validate weight proofs, started the first time it's needed
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._serialized_proofs: LRUCache[bytes32, bytes] = LRUCache(self.SERIALIZED_PROOFS)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._num_processes,
+                mp_context=self.multiprocessing_context,
+                initializer=init_validation_worker,
+                initargs=(self.constants, f"{getproctitle()}_worker"),
+            )
+        return self._executor
+
+    def shut_down(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def get_serialized_proof_of_weight(self, tip: bytes32) -> Optional[bytes]:
+        """
+        Returns the serialized weight proof for tip. Serializing a weight proof is slow, so it's kept for the last few
+        tips it was asked for
+        """
+        serialized = self._serialized_proofs.get(tip)
+        if serialized is not None:
+            return serialized
+        wp = await self.get_proof_of_weight(tip)
+        if wp is None:
+            return None
+        serialized = bytes(wp)
+        self._serialized_proofs.put(tip, serialized)
+        return serialized
 
     async def get_proof_of_weight(self, tip: bytes32) -> Optional[WeightProof]:
 
@@ -86,13 +139,33 @@ class WeightProofHandler:
             if self.proof is not None:
                 if self.proof.recent_chain_data[-1].header_hash == tip:
                     return self.proof
-            wp = await self._create_proof_of_weight(tip)
+            serialized = self._serialized_proofs.get(tip)
+            if serialized is not None:
+                wp = WeightProof.from_bytes(serialized)
+            else:
+                wp = await self._create_proof_of_weight(tip, self._extendable_proof(tip_rec))
             if wp is None:
                 return None
             self.proof = wp
             self.tip = tip
             return wp
 
+    def _extendable_proof(self, tip_rec: BlockRecord) -> Optional[WeightProof]:
+        """
+        Returns the last weight proof created if tip extends its tip on the main chain, so that the new proof can be
+        created from it instead of from scratch
+        """
+        if self.proof is None:
+            return None
+        prev_tip = self.proof.recent_chain_data[-1]
+        if prev_tip.height >= tip_rec.height:
+            return None
+        if self.blockchain.height_to_hash(tip_rec.height) != tip_rec.header_hash:
+            return None
+        if self.blockchain.height_to_hash(prev_tip.height) != prev_tip.header_hash:
+            return None
+        return self.proof
+
     def get_sub_epoch_data(self, tip_height: uint32, summary_heights: List[uint32]) -> List[SubEpochData]:
         sub_epoch_data: List[SubEpochData] = []
         for sub_epoch_n, ses_height in enumerate(summary_heights):
@@ -103,9 +176,10 @@ class WeightProofHandler:
             sub_epoch_data.append(_create_sub_epoch_data(ses))
         return sub_epoch_data
 
-    async def _create_proof_of_weight(self, tip: bytes32) -> Optional[WeightProof]:
+    async def _create_proof_of_weight(self, tip: bytes32, base: Optional[WeightProof] = None) -> Optional[WeightProof]:
         """
-        Creates a weight proof object
+        Creates a weight proof object. If base is the proof of an ancestor of tip, its recent chain is extended and its
+        segments are reused instead of loading them again
         """
         assert self.blockchain is not None
         sub_epoch_segments: List[SubEpochChallengeSegment] = []
@@ -114,9 +188,12 @@ class WeightProofHandler:
             log.error("failed not tip in cache")
             return None
         log.info(f"create weight proof peak {tip} {tip_rec.height}")
-        recent_chain = await self._get_recent_chain(tip_rec.height)
+        recent_chain = await self._get_recent_chain(tip_rec.height, None if base is None else base.recent_chain_data)
         if recent_chain is None:
             return None
+        base_segments: Dict[int, List[SubEpochChallengeSegment]] = {}
+        if base is not None:
+            base_segments = map_segments_by_sub_epoch(base.sub_epoch_segments)
 
         summary_heights = self.blockchain.get_ses_heights()
         zero_hash = self.blockchain.height_to_hash(uint32(0))
@@ -151,7 +228,9 @@ class WeightProofHandler:
 
             if _sample_sub_epoch(prev_ses_block.weight, ses_block.weight, weight_to_check):  # type: ignore
                 sample_n += 1
-                segments = await self.blockchain.get_sub_epoch_challenge_segments(ses_block.header_hash)
+                segments = base_segments.get(sub_epoch_n)
+                if segments is None:
+                    segments = await self.blockchain.get_sub_epoch_challenge_segments(ses_block.header_hash)
                 if segments is None:
                     segments = await self.__create_sub_epoch_segments(ses_block, prev_ses_block, uint32(sub_epoch_n))
                     if segments is None:
@@ -178,7 +257,9 @@ class WeightProofHandler:
         seed = ses.get_hash()
         return seed
 
-    async def _get_recent_chain(self, tip_height: uint32) -> Optional[List[HeaderBlock]]:
+    async def _get_recent_chain(
+        self, tip_height: uint32, base: Optional[List[HeaderBlock]] = None
+    ) -> Optional[List[HeaderBlock]]:
         recent_chain: List[HeaderBlock] = []
         ses_heights = self.blockchain.get_ses_heights()
         min_height = 0
@@ -190,6 +271,11 @@ class WeightProofHandler:
                 min_height = ses_height - 1
                 break
         log.debug(f"start {min_height} end {tip_height}")
+        if base is not None and base[0].height == min_height:
+            # the recent chain starts at the same height, only the blocks past the end of base are missing
+            extension = await self._get_chain_extension(base[-1], tip_height)
+            if extension is not None:
+                return base + extension
         headers = await self.blockchain.get_header_blocks_in_range(min_height, tip_height, tx_filter=False)
         blocks = await self.blockchain.get_block_records_in_range(min_height, tip_height)
         ses_count = 0
@@ -224,6 +310,24 @@ class WeightProofHandler:
         )
         return recent_chain
 
+    async def _get_chain_extension(self, prev: HeaderBlock, tip_height: uint32) -> Optional[List[HeaderBlock]]:
+        """
+        Returns the header blocks of the main chain from the one after prev to tip_height, if prev is in it
+        """
+        headers = await self.blockchain.get_header_blocks_in_range(prev.height + 1, tip_height, tx_filter=False)
+        extension: List[HeaderBlock] = []
+        prev_hash = prev.header_hash
+        for height in range(prev.height + 1, tip_height + 1):
+            header_hash = self.blockchain.height_to_hash(uint32(height))
+            if header_hash is None or header_hash not in headers:
+                return None
+            header_block = headers[header_hash]
+            if header_block.prev_header_hash != prev_hash:
+                return None
+            extension.append(header_block)
+            prev_hash = header_hash
+        return extension
+
     async def create_prev_sub_epoch_segments(self) -> None:
         log.debug("create prev sub_epoch_segments")
         heights = self.blockchain.get_ses_heights()
@@ -262,6 +366,8 @@ class WeightProofHandler:
         if ses_blocks is None:
             return None
 
+        # the segments are created in the process pool, a sub epoch per process at a time
+        pending: List[Awaitable[None]] = []
         for sub_epoch_n, ses_height in enumerate(summary_heights):
             log.debug(f"check db for sub epoch {sub_epoch_n}")
             if ses_height > peak_height:
@@ -269,10 +375,14 @@ class WeightProofHandler:
             ses_block = ses_blocks[sub_epoch_n]
             if ses_block is None or ses_block.sub_epoch_summary_included is None:
                 log.error("error while building proof")
-                return None
-            await self.__create_persist_segment(prev_ses_block, ses_block, ses_height, sub_epoch_n)
+                break
+            pending.append(self.__create_persist_segment(prev_ses_block, ses_block, ses_height, sub_epoch_n))
             prev_ses_block = ses_block
-            await asyncio.sleep(2)
+            if len(pending) == self._num_processes:
+                await asyncio.gather(*pending)
+                pending = []
+                await asyncio.sleep(2)
+        await asyncio.gather(*pending)
         log.debug("done checking segments")
         return None
 
@@ -288,39 +398,34 @@ class WeightProofHandler:
     async def __create_sub_epoch_segments(
         self, ses_block: BlockRecord, se_start: BlockRecord, sub_epoch_n: uint32
     ) -> Optional[List[SubEpochChallengeSegment]]:
-        segments: List[SubEpochChallengeSegment] = []
         start_height = await self.get_prev_two_slots_height(se_start)
+        end_height = ses_block.height + self.constants.MAX_SUB_SLOT_BLOCKS
 
-        blocks = await self.blockchain.get_block_records_in_range(
-            start_height, ses_block.height + self.constants.MAX_SUB_SLOT_BLOCKS
-        )
-        header_blocks = await self.blockchain.get_header_blocks_in_range(
-            start_height, ses_block.height + self.constants.MAX_SUB_SLOT_BLOCKS, tx_filter=False
-        )
-        curr: Optional[HeaderBlock] = header_blocks[se_start.header_hash]
-        height = se_start.height
-        assert curr is not None
-        first = True
-        idx = 0
-        while curr.height < ses_block.height:
-            if blocks[curr.header_hash].is_challenge_block(self.constants):
-                log.debug(f"challenge segment {idx}, starts at {curr.height} ")
-                seg, height = await self._create_challenge_segment(curr, sub_epoch_n, header_blocks, blocks, first)
-                if seg is None:
-                    log.error(f"failed creating segment {curr.header_hash} ")
-                    return None
-                segments.append(seg)
-                idx += 1
-                first = False
-            else:
-                height = height + uint32(1)  # type: ignore
-            header_hash = self.blockchain.height_to_hash(height)
+        blocks = await self.blockchain.get_block_records_in_range(start_height, end_height)
+        header_blocks = await self.blockchain.get_header_blocks_in_range(start_height, end_height, tx_filter=False)
+        height_to_hash: Dict[uint32, bytes32] = {}
+        for height in range(start_height, end_height + 1):
+            if not self.blockchain.contains_height(uint32(height)):
+                break
+            header_hash = self.blockchain.height_to_hash(uint32(height))
             assert header_hash is not None
-            curr = header_blocks[header_hash]
-            if curr is None:
-                return None
-        log.debug(f"next sub epoch starts at {height}")
-        return segments
+            height_to_hash[uint32(height)] = header_hash
+
+        # the segments are created in a separate process, the blocks are passed to it serialized
+        segments_bytes: Optional[List[bytes]] = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(),
+            _create_sub_epoch_segments,
+            self.constants,
+            bytes(ses_block),
+            bytes(se_start),
+            sub_epoch_n,
+            [bytes(block) for block in blocks.values()],
+            [bytes(header) for header in header_blocks.values() if start_height <= header.height <= end_height],
+            height_to_hash,
+        )
+        if segments_bytes is None:
+            return None
+        return [SubEpochChallengeSegment.from_bytes(segment) for segment in segments_bytes]
 
     async def get_prev_two_slots_height(self, se_start: BlockRecord) -> uint32:
         # find prev 2 slots height
@@ -340,223 +445,6 @@ class WeightProofHandler:
             curr_rec = blocks[header_hash]
         return curr_rec.height
 
-    async def _create_challenge_segment(
-        self,
-        header_block: HeaderBlock,
-        sub_epoch_n: uint32,
-        header_blocks: Dict[bytes32, HeaderBlock],
-        blocks: Dict[bytes32, BlockRecord],
-        first_segment_in_sub_epoch: bool,
-    ) -> Tuple[Optional[SubEpochChallengeSegment], uint32]:
-        assert self.blockchain is not None
-        sub_slots: List[SubSlotData] = []
-        log.debug(f"create challenge segment block {header_block.header_hash} block height {header_block.height} ")
-        # VDFs from sub slots before challenge block
-        first_sub_slots, first_rc_end_of_slot_vdf = await self.__first_sub_slot_vdfs(
-            header_block, header_blocks, blocks, first_segment_in_sub_epoch
-        )
-        if first_sub_slots is None:
-            log.error("failed building first sub slots")
-            return None, uint32(0)
-
-        sub_slots.extend(first_sub_slots)
-
-        ssd = await _challenge_block_vdfs(
-            self.constants,
-            header_block,
-            blocks[header_block.header_hash],
-            blocks,
-        )
-
-        sub_slots.append(ssd)
-
-        # # VDFs from slot after challenge block to end of slot
-        log.debug(f"create slot end vdf for block {header_block.header_hash} height {header_block.height} ")
-
-        challenge_slot_end_sub_slots, end_height = await self.__slot_end_vdf(
-            uint32(header_block.height + 1), header_blocks, blocks
-        )
-        if challenge_slot_end_sub_slots is None:
-            log.error("failed building slot end ")
-            return None, uint32(0)
-        sub_slots.extend(challenge_slot_end_sub_slots)
-        if first_segment_in_sub_epoch and sub_epoch_n != 0:
-            return (
-                SubEpochChallengeSegment(sub_epoch_n, sub_slots, first_rc_end_of_slot_vdf),
-                end_height,
-            )
-        return SubEpochChallengeSegment(sub_epoch_n, sub_slots, None), end_height
-
-    # returns a challenge chain vdf from slot start to signage point
-    async def __first_sub_slot_vdfs(
-        self,
-        header_block: HeaderBlock,
-        header_blocks: Dict[bytes32, HeaderBlock],
-        blocks: Dict[bytes32, BlockRecord],
-        first_in_sub_epoch: bool,
-    ) -> Tuple[Optional[List[SubSlotData]], Optional[VDFInfo]]:
-        # combine cc vdfs of all reward blocks from the start of the sub slot to end
-        header_block_sub_rec = blocks[header_block.header_hash]
-        # find slot start
-        curr_sub_rec = header_block_sub_rec
-        first_rc_end_of_slot_vdf = None
-        if first_in_sub_epoch and curr_sub_rec.height > 0:
-            while not curr_sub_rec.sub_epoch_summary_included:
-                curr_sub_rec = blocks[curr_sub_rec.prev_hash]
-            first_rc_end_of_slot_vdf = self.first_rc_end_of_slot_vdf(header_block, blocks, header_blocks)
-        else:
-            if header_block_sub_rec.overflow and header_block_sub_rec.first_in_sub_slot:
-                sub_slots_num = 2
-                while sub_slots_num > 0 and curr_sub_rec.height > 0:
-                    if curr_sub_rec.first_in_sub_slot:
-                        assert curr_sub_rec.finished_challenge_slot_hashes is not None
-                        sub_slots_num -= len(curr_sub_rec.finished_challenge_slot_hashes)
-                    curr_sub_rec = blocks[curr_sub_rec.prev_hash]
-            else:
-                while not curr_sub_rec.first_in_sub_slot and curr_sub_rec.height > 0:
-                    curr_sub_rec = blocks[curr_sub_rec.prev_hash]
-
-        curr = header_blocks[curr_sub_rec.header_hash]
-        sub_slots_data: List[SubSlotData] = []
-        tmp_sub_slots_data: List[SubSlotData] = []
-        while curr.height < header_block.height:
-            if curr is None:
-                log.error("failed fetching block")
-                return None, None
-            if curr.first_in_sub_slot:
-                # if not blue boxed
-                if not blue_boxed_end_of_slot(curr.finished_sub_slots[0]):
-                    sub_slots_data.extend(tmp_sub_slots_data)
-
-                for idx, sub_slot in enumerate(curr.finished_sub_slots):
-                    curr_icc_info = None
-                    if sub_slot.infused_challenge_chain is not None:
-                        curr_icc_info = sub_slot.infused_challenge_chain.infused_challenge_chain_end_of_slot_vdf
-                    sub_slots_data.append(handle_finished_slots(sub_slot, curr_icc_info))
-                tmp_sub_slots_data = []
-            ssd = SubSlotData(
-                None,
-                None,
-                None,
-                None,
-                None,
-                curr.reward_chain_block.signage_point_index,
-                None,
-                None,
-                None,
-                None,
-                curr.reward_chain_block.challenge_chain_ip_vdf,
-                curr.reward_chain_block.infused_challenge_chain_ip_vdf,
-                curr.total_iters,
-            )
-            tmp_sub_slots_data.append(ssd)
-            header_hash = self.blockchain.height_to_hash(uint32(curr.height + 1))
-            assert header_hash is not None
-            curr = header_blocks[header_hash]
-
-        if len(tmp_sub_slots_data) > 0:
-            sub_slots_data.extend(tmp_sub_slots_data)
-
-        for idx, sub_slot in enumerate(header_block.finished_sub_slots):
-            curr_icc_info = None
-            if sub_slot.infused_challenge_chain is not None:
-                curr_icc_info = sub_slot.infused_challenge_chain.infused_challenge_chain_end_of_slot_vdf
-            sub_slots_data.append(handle_finished_slots(sub_slot, curr_icc_info))
-
-        return sub_slots_data, first_rc_end_of_slot_vdf
-
-    def first_rc_end_of_slot_vdf(
-        self,
-        header_block,
-        blocks: Dict[bytes32, BlockRecord],
-        header_blocks: Dict[bytes32, HeaderBlock],
-    ) -> Optional[VDFInfo]:
-        curr = blocks[header_block.header_hash]
-        while curr.height > 0 and not curr.sub_epoch_summary_included:
-            curr = blocks[curr.prev_hash]
-        return header_blocks[curr.header_hash].finished_sub_slots[-1].reward_chain.end_of_slot_vdf
-
-    async def __slot_end_vdf(
-        self, start_height: uint32, header_blocks: Dict[bytes32, HeaderBlock], blocks: Dict[bytes32, BlockRecord]
-    ) -> Tuple[Optional[List[SubSlotData]], uint32]:
-        # gets all vdfs first sub slot after challenge block to last sub slot
-        log.debug(f"slot end vdf start height {start_height}")
-        header_hash = self.blockchain.height_to_hash(start_height)
-        assert header_hash is not None
-        curr = header_blocks[header_hash]
-        curr_header_hash = curr.header_hash
-        sub_slots_data: List[SubSlotData] = []
-        tmp_sub_slots_data: List[SubSlotData] = []
-        while not blocks[curr_header_hash].is_challenge_block(self.constants):
-            if curr.first_in_sub_slot:
-                sub_slots_data.extend(tmp_sub_slots_data)
-
-                curr_prev_header_hash = curr.prev_header_hash
-                # add collected vdfs
-                for idx, sub_slot in enumerate(curr.finished_sub_slots):
-                    prev_rec = blocks[curr_prev_header_hash]
-                    eos_vdf_iters = prev_rec.sub_slot_iters
-                    if idx == 0:
-                        eos_vdf_iters = uint64(prev_rec.sub_slot_iters - prev_rec.ip_iters(self.constants))
-                    sub_slots_data.append(handle_end_of_slot(sub_slot, eos_vdf_iters))
-                tmp_sub_slots_data = []
-            tmp_sub_slots_data.append(self.handle_block_vdfs(curr, blocks))
-            header_hash = self.blockchain.height_to_hash(uint32(curr.height + 1))
-            assert header_hash is not None
-            curr = header_blocks[header_hash]
-            curr_header_hash = curr.header_hash
-
-        if len(tmp_sub_slots_data) > 0:
-            sub_slots_data.extend(tmp_sub_slots_data)
-        log.debug(f"slot end vdf end height {curr.height} slots {len(sub_slots_data)} ")
-        return sub_slots_data, curr.height
-
-    def handle_block_vdfs(self, curr: HeaderBlock, blocks: Dict[bytes32, BlockRecord]):
-        cc_sp_proof = None
-        icc_ip_proof = None
-        cc_sp_info = None
-        icc_ip_info = None
-        block_record = blocks[curr.header_hash]
-        if curr.infused_challenge_chain_ip_proof is not None:
-            assert curr.reward_chain_block.infused_challenge_chain_ip_vdf
-            icc_ip_proof = curr.infused_challenge_chain_ip_proof
-            icc_ip_info = curr.reward_chain_block.infused_challenge_chain_ip_vdf
-        if curr.challenge_chain_sp_proof is not None:
-            assert curr.reward_chain_block.challenge_chain_sp_vdf
-            cc_sp_vdf_info = curr.reward_chain_block.challenge_chain_sp_vdf
-            if not curr.challenge_chain_sp_proof.normalized_to_identity:
-                (_, _, _, _, cc_vdf_iters, _,) = get_signage_point_vdf_info(
-                    self.constants,
-                    curr.finished_sub_slots,
-                    block_record.overflow,
-                    None if curr.height == 0 else blocks[curr.prev_header_hash],
-                    BlockCache(blocks),
-                    block_record.sp_total_iters(self.constants),
-                    block_record.sp_iters(self.constants),
-                )
-                cc_sp_vdf_info = VDFInfo(
-                    curr.reward_chain_block.challenge_chain_sp_vdf.challenge,
-                    cc_vdf_iters,
-                    curr.reward_chain_block.challenge_chain_sp_vdf.output,
-                )
-            cc_sp_proof = curr.challenge_chain_sp_proof
-            cc_sp_info = cc_sp_vdf_info
-        return SubSlotData(
-            None,
-            cc_sp_proof,
-            curr.challenge_chain_ip_proof,
-            icc_ip_proof,
-            cc_sp_info,
-            curr.reward_chain_block.signage_point_index,
-            None,
-            None,
-            None,
-            None,
-            curr.reward_chain_block.challenge_chain_ip_vdf,
-            icc_ip_info,
-            curr.total_iters,
-        )
-
     def validate_weight_proof_single_proc(self, weight_proof: WeightProof) -> Tuple[bool, uint32]:
         assert self.blockchain is not None
         assert len(weight_proof.sub_epochs) > 0
@@ -599,7 +487,9 @@ class WeightProofHandler:
         fork_height, _ = self.get_fork_point(summaries)
         return True, fork_height
 
-    async def validate_weight_proof(self, weight_proof: WeightProof) -> Tuple[bool, uint32, List[SubEpochSummary]]:
+    async def validate_weight_proof(
+        self, weight_proof: WeightProof, progress: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[bool, uint32, List[SubEpochSummary]]:
         assert self.blockchain is not None
         if len(weight_proof.sub_epochs) == 0:
             return False, uint32(0), []
@@ -614,30 +504,22 @@ class WeightProofHandler:
 
         fork_point, ses_fork_idx = self.get_fork_point(summaries)
         # timing reference: 1 second
-        # TODO: Consider implementing an async polling closer for the executor.
-        with ProcessPoolExecutor(
-            max_workers=self._num_processes,
-            mp_context=self.multiprocessing_context,
-            initializer=setproctitle,
-            initargs=(f"{getproctitle()}_worker",),
-        ) as executor:
-            # The shutdown file manager must be inside of the executor manager so that
-            # we request the workers close prior to waiting for them to close.
-            with _create_shutdown_file() as shutdown_file:
-                task: asyncio.Task = asyncio.create_task(
-                    validate_weight_proof_inner(
-                        self.constants,
-                        executor,
-                        shutdown_file.name,
-                        self._num_processes,
-                        weight_proof,
-                        summaries,
-                        sub_epoch_weight_list,
-                        False,
-                        ses_fork_idx,
-                    )
+        # the workers stop what's left of this validation once the shutdown file is removed
+        with _create_shutdown_file() as shutdown_file:
+            task: asyncio.Task = asyncio.create_task(
+                validate_weight_proof_inner(
+                    self.constants,
+                    self._get_executor(),
+                    shutdown_file.name,
+                    weight_proof,
+                    summaries,
+                    sub_epoch_weight_list,
+                    False,
+                    ses_fork_idx,
+                    progress,
                 )
-                valid, _ = await task
+            )
+            valid, _ = await task
         return valid, fork_point, summaries
 
     def get_fork_point(self, received_summaries: List[SubEpochSummary]) -> Tuple[uint32, int]:
@@ -724,7 +606,7 @@ def _create_sub_epoch_data(
     return SubEpochData(reward_chain_hash, previous_sub_epoch_overflows, sub_slot_iters, new_difficulty)
 
 
-async def _challenge_block_vdfs(
+def _challenge_block_vdfs(
     constants: ConsensusConstants,
     header_block: HeaderBlock,
     block_rec: BlockRecord,
@@ -768,6 +650,284 @@ async def _challenge_block_vdfs(
     return ssd
 
 
+def _create_sub_epoch_segments(
+    constants: ConsensusConstants,
+    ses_block_bytes: bytes,
+    se_start_bytes: bytes,
+    sub_epoch_n: uint32,
+    blocks_bytes: List[bytes],
+    header_blocks_bytes: List[bytes],
+    height_to_hash: Dict[uint32, bytes32],
+) -> Optional[List[bytes]]:
+    """
+    Creates the challenge segments of a sub epoch, this runs in the weight proof handler's process pool. The blocks
+    are passed serialized, and height_to_hash covers the heights of the header blocks (of the main chain).
+    """
+    ses_block = BlockRecord.from_bytes(ses_block_bytes)
+    se_start = BlockRecord.from_bytes(se_start_bytes)
+    blocks: Dict[bytes32, BlockRecord] = {}
+    for block_bytes in blocks_bytes:
+        block = BlockRecord.from_bytes(block_bytes)
+        blocks[block.header_hash] = block
+    header_blocks: Dict[bytes32, HeaderBlock] = {}
+    for header_block_bytes in header_blocks_bytes:
+        header_block = HeaderBlock.from_bytes(header_block_bytes)
+        header_blocks[header_block.header_hash] = header_block
+
+    segments: List[SubEpochChallengeSegment] = []
+    curr: Optional[HeaderBlock] = header_blocks[se_start.header_hash]
+    height = se_start.height
+    assert curr is not None
+    first = True
+    idx = 0
+    while curr.height < ses_block.height:
+        if blocks[curr.header_hash].is_challenge_block(constants):
+            log.debug(f"challenge segment {idx}, starts at {curr.height} ")
+            seg, height = _create_challenge_segment(
+                constants, height_to_hash, curr, sub_epoch_n, header_blocks, blocks, first
+            )
+            if seg is None:
+                log.error(f"failed creating segment {curr.header_hash} ")
+                return None
+            segments.append(seg)
+            idx += 1
+            first = False
+        else:
+            height = height + uint32(1)  # type: ignore
+        header_hash = height_to_hash.get(height)
+        assert header_hash is not None
+        curr = header_blocks[header_hash]
+        if curr is None:
+            return None
+    log.debug(f"next sub epoch starts at {height}")
+    return [bytes(segment) for segment in segments]
+
+
+def _create_challenge_segment(
+    constants: ConsensusConstants,
+    height_to_hash: Dict[uint32, bytes32],
+    header_block: HeaderBlock,
+    sub_epoch_n: uint32,
+    header_blocks: Dict[bytes32, HeaderBlock],
+    blocks: Dict[bytes32, BlockRecord],
+    first_segment_in_sub_epoch: bool,
+) -> Tuple[Optional[SubEpochChallengeSegment], uint32]:
+    sub_slots: List[SubSlotData] = []
+    log.debug(f"create challenge segment block {header_block.header_hash} block height {header_block.height} ")
+    # VDFs from sub slots before challenge block
+    first_sub_slots, first_rc_end_of_slot_vdf = _first_sub_slot_vdfs(
+        height_to_hash, header_block, header_blocks, blocks, first_segment_in_sub_epoch
+    )
+    if first_sub_slots is None:
+        log.error("failed building first sub slots")
+        return None, uint32(0)
+
+    sub_slots.extend(first_sub_slots)
+
+    ssd = _challenge_block_vdfs(
+        constants,
+        header_block,
+        blocks[header_block.header_hash],
+        blocks,
+    )
+
+    sub_slots.append(ssd)
+
+    # # VDFs from slot after challenge block to end of slot
+    log.debug(f"create slot end vdf for block {header_block.header_hash} height {header_block.height} ")
+
+    challenge_slot_end_sub_slots, end_height = _slot_end_vdf(
+        constants, height_to_hash, uint32(header_block.height + 1), header_blocks, blocks
+    )
+    if challenge_slot_end_sub_slots is None:
+        log.error("failed building slot end ")
+        return None, uint32(0)
+    sub_slots.extend(challenge_slot_end_sub_slots)
+    if first_segment_in_sub_epoch and sub_epoch_n != 0:
+        return (
+            SubEpochChallengeSegment(sub_epoch_n, sub_slots, first_rc_end_of_slot_vdf),
+            end_height,
+        )
+    return SubEpochChallengeSegment(sub_epoch_n, sub_slots, None), end_height
+
+
+# returns a challenge chain vdf from slot start to signage point
+def _first_sub_slot_vdfs(
+    height_to_hash: Dict[uint32, bytes32],
+    header_block: HeaderBlock,
+    header_blocks: Dict[bytes32, HeaderBlock],
+    blocks: Dict[bytes32, BlockRecord],
+    first_in_sub_epoch: bool,
+) -> Tuple[Optional[List[SubSlotData]], Optional[VDFInfo]]:
+    # combine cc vdfs of all reward blocks from the start of the sub slot to end
+    header_block_sub_rec = blocks[header_block.header_hash]
+    # find slot start
+    curr_sub_rec = header_block_sub_rec
+    first_rc_end_of_slot_vdf = None
+    if first_in_sub_epoch and curr_sub_rec.height > 0:
+        while not curr_sub_rec.sub_epoch_summary_included:
+            curr_sub_rec = blocks[curr_sub_rec.prev_hash]
+        first_rc_end_of_slot_vdf = _first_rc_end_of_slot_vdf(header_block, blocks, header_blocks)
+    else:
+        if header_block_sub_rec.overflow and header_block_sub_rec.first_in_sub_slot:
+            sub_slots_num = 2
+            while sub_slots_num > 0 and curr_sub_rec.height > 0:
+                if curr_sub_rec.first_in_sub_slot:
+                    assert curr_sub_rec.finished_challenge_slot_hashes is not None
+                    sub_slots_num -= len(curr_sub_rec.finished_challenge_slot_hashes)
+                curr_sub_rec = blocks[curr_sub_rec.prev_hash]
+        else:
+            while not curr_sub_rec.first_in_sub_slot and curr_sub_rec.height > 0:
+                curr_sub_rec = blocks[curr_sub_rec.prev_hash]
+
+    curr = header_blocks[curr_sub_rec.header_hash]
+    sub_slots_data: List[SubSlotData] = []
+    tmp_sub_slots_data: List[SubSlotData] = []
+    while curr.height < header_block.height:
+        if curr is None:
+            log.error("failed fetching block")
+            return None, None
+        if curr.first_in_sub_slot:
+            # if not blue boxed
+            if not blue_boxed_end_of_slot(curr.finished_sub_slots[0]):
+                sub_slots_data.extend(tmp_sub_slots_data)
+
+            for idx, sub_slot in enumerate(curr.finished_sub_slots):
+                curr_icc_info = None
+                if sub_slot.infused_challenge_chain is not None:
+                    curr_icc_info = sub_slot.infused_challenge_chain.infused_challenge_chain_end_of_slot_vdf
+                sub_slots_data.append(handle_finished_slots(sub_slot, curr_icc_info))
+            tmp_sub_slots_data = []
+        ssd = SubSlotData(
+            None,
+            None,
+            None,
+            None,
+            None,
+            curr.reward_chain_block.signage_point_index,
+            None,
+            None,
+            None,
+            None,
+            curr.reward_chain_block.challenge_chain_ip_vdf,
+            curr.reward_chain_block.infused_challenge_chain_ip_vdf,
+            curr.total_iters,
+        )
+        tmp_sub_slots_data.append(ssd)
+        header_hash = height_to_hash.get(uint32(curr.height + 1))
+        assert header_hash is not None
+        curr = header_blocks[header_hash]
+
+    if len(tmp_sub_slots_data) > 0:
+        sub_slots_data.extend(tmp_sub_slots_data)
+
+    for idx, sub_slot in enumerate(header_block.finished_sub_slots):
+        curr_icc_info = None
+        if sub_slot.infused_challenge_chain is not None:
+            curr_icc_info = sub_slot.infused_challenge_chain.infused_challenge_chain_end_of_slot_vdf
+        sub_slots_data.append(handle_finished_slots(sub_slot, curr_icc_info))
+
+    return sub_slots_data, first_rc_end_of_slot_vdf
+
+
+def _first_rc_end_of_slot_vdf(
+    header_block: HeaderBlock,
+    blocks: Dict[bytes32, BlockRecord],
+    header_blocks: Dict[bytes32, HeaderBlock],
+) -> Optional[VDFInfo]:
+    curr = blocks[header_block.header_hash]
+    while curr.height > 0 and not curr.sub_epoch_summary_included:
+        curr = blocks[curr.prev_hash]
+    return header_blocks[curr.header_hash].finished_sub_slots[-1].reward_chain.end_of_slot_vdf
+
+
+def _slot_end_vdf(
+    constants: ConsensusConstants,
+    height_to_hash: Dict[uint32, bytes32],
+    start_height: uint32,
+    header_blocks: Dict[bytes32, HeaderBlock],
+    blocks: Dict[bytes32, BlockRecord],
+) -> Tuple[Optional[List[SubSlotData]], uint32]:
+    # gets all vdfs first sub slot after challenge block to last sub slot
+    log.debug(f"slot end vdf start height {start_height}")
+    header_hash = height_to_hash.get(start_height)
+    assert header_hash is not None
+    curr = header_blocks[header_hash]
+    curr_header_hash = curr.header_hash
+    sub_slots_data: List[SubSlotData] = []
+    tmp_sub_slots_data: List[SubSlotData] = []
+    while not blocks[curr_header_hash].is_challenge_block(constants):
+        if curr.first_in_sub_slot:
+            sub_slots_data.extend(tmp_sub_slots_data)
+
+            curr_prev_header_hash = curr.prev_header_hash
+            # add collected vdfs
+            for idx, sub_slot in enumerate(curr.finished_sub_slots):
+                prev_rec = blocks[curr_prev_header_hash]
+                eos_vdf_iters = prev_rec.sub_slot_iters
+                if idx == 0:
+                    eos_vdf_iters = uint64(prev_rec.sub_slot_iters - prev_rec.ip_iters(constants))
+                sub_slots_data.append(handle_end_of_slot(sub_slot, eos_vdf_iters))
+            tmp_sub_slots_data = []
+        tmp_sub_slots_data.append(_handle_block_vdfs(constants, curr, blocks))
+        header_hash = height_to_hash.get(uint32(curr.height + 1))
+        assert header_hash is not None
+        curr = header_blocks[header_hash]
+        curr_header_hash = curr.header_hash
+
+    if len(tmp_sub_slots_data) > 0:
+        sub_slots_data.extend(tmp_sub_slots_data)
+    log.debug(f"slot end vdf end height {curr.height} slots {len(sub_slots_data)} ")
+    return sub_slots_data, curr.height
+
+
+def _handle_block_vdfs(constants: ConsensusConstants, curr: HeaderBlock, blocks: Dict[bytes32, BlockRecord]):
+    cc_sp_proof = None
+    icc_ip_proof = None
+    cc_sp_info = None
+    icc_ip_info = None
+    block_record = blocks[curr.header_hash]
+    if curr.infused_challenge_chain_ip_proof is not None:
+        assert curr.reward_chain_block.infused_challenge_chain_ip_vdf
+        icc_ip_proof = curr.infused_challenge_chain_ip_proof
+        icc_ip_info = curr.reward_chain_block.infused_challenge_chain_ip_vdf
+    if curr.challenge_chain_sp_proof is not None:
+        assert curr.reward_chain_block.challenge_chain_sp_vdf
+        cc_sp_vdf_info = curr.reward_chain_block.challenge_chain_sp_vdf
+        if not curr.challenge_chain_sp_proof.normalized_to_identity:
+            (_, _, _, _, cc_vdf_iters, _,) = get_signage_point_vdf_info(
+                constants,
+                curr.finished_sub_slots,
+                block_record.overflow,
+                None if curr.height == 0 else blocks[curr.prev_header_hash],
+                BlockCache(blocks),
+                block_record.sp_total_iters(constants),
+                block_record.sp_iters(constants),
+            )
+            cc_sp_vdf_info = VDFInfo(
+                curr.reward_chain_block.challenge_chain_sp_vdf.challenge,
+                cc_vdf_iters,
+                curr.reward_chain_block.challenge_chain_sp_vdf.output,
+            )
+        cc_sp_proof = curr.challenge_chain_sp_proof
+        cc_sp_info = cc_sp_vdf_info
+    return SubSlotData(
+        None,
+        cc_sp_proof,
+        curr.challenge_chain_ip_proof,
+        icc_ip_proof,
+        cc_sp_info,
+        curr.reward_chain_block.signage_point_index,
+        None,
+        None,
+        None,
+        None,
+        curr.reward_chain_block.challenge_chain_ip_vdf,
+        icc_ip_info,
+        curr.total_iters,
+    )
+
+
 def handle_finished_slots(end_of_slot: EndOfSubSlotBundle, icc_end_of_slot_info):
     return SubSlotData(
         None,
@@ -949,14 +1109,31 @@ def _validate_sub_epoch_segments(
 ):
     summaries = summaries_from_bytes(summaries_bytes)
     sub_epoch_segments: SubEpochSegments = SubEpochSegments.from_bytes(weight_proof_bytes)
+    vdfs_to_validate = []
+    for vdf_list in _sub_epoch_segments_vdfs(
+        constants, rng, sub_epoch_segments.challenge_segments, summaries, validate_from
+    ):
+        if vdf_list is None:
+            return False
+        vdfs_to_validate.extend(vdf_list)
+    return True, vdfs_to_validate
+
+
+def _sub_epoch_segments_vdfs(
+    constants: ConsensusConstants,
+    rng: random.Random,
+    challenge_segments: List[SubEpochChallengeSegment],
+    summaries: List[SubEpochSummary],
+    validate_from: int = 0,
+) -> Iterator[Optional[List[Tuple[VDFProof, ClassgroupElement, VDFInfo]]]]:
+    """
+    Validates the segments one sub epoch at a time, and yields the VDFs of each sub epoch that still have to be
+    validated. Yields None, and stops, if a sub epoch is invalid.
+    """
     rc_sub_slot_hash = constants.GENESIS_CHALLENGE
-    total_blocks, total_ip_iters = 0, 0
-    total_slot_iters, total_slots = 0, 0
-    total_ip_iters = 0
     prev_ses: Optional[SubEpochSummary] = None
-    segments_by_sub_epoch = map_segments_by_sub_epoch(sub_epoch_segments.challenge_segments)
+    segments_by_sub_epoch = map_segments_by_sub_epoch(challenge_segments)
     curr_ssi = constants.SUB_SLOT_ITERS_STARTING
-    vdfs_to_validate = []
     for sub_epoch_n, segments in segments_by_sub_epoch.items():
         prev_ssi = curr_ssi
         curr_difficulty, curr_ssi = _get_curr_diff_ssi(constants, sub_epoch_n, summaries)
@@ -969,12 +1146,14 @@ def _validate_sub_epoch_segments(
             rc_sub_slot_hash = rc_sub_slot.get_hash()
         if not summaries[sub_epoch_n].reward_chain_hash == rc_sub_slot_hash:
             log.error(f"failed reward_chain_hash validation sub_epoch {sub_epoch_n}")
-            return False
+            yield None
+            return
 
         # skip validation up to fork height
         if sub_epoch_n < validate_from:
             continue
 
+        vdfs_to_validate: List[Tuple[VDFProof, ClassgroupElement, VDFInfo]] = []
         for idx, segment in enumerate(segments):
             valid_segment, ip_iters, slot_iters, slots, vdf_list = _validate_segment(
                 constants, segment, curr_ssi, prev_ssi, curr_difficulty, prev_ses, idx == 0, sampled_seg_index == idx
@@ -982,13 +1161,10 @@ def _validate_sub_epoch_segments(
             vdfs_to_validate.extend(vdf_list)
             if not valid_segment:
                 log.error(f"failed to validate sub_epoch {segment.sub_epoch_n} segment {idx} slots")
-                return False
+                yield None
+                return
             prev_ses = None
-            total_blocks += 1
-            total_slot_iters += slot_iters
-            total_slots += slots
-            total_ip_iters += ip_iters
-    return True, vdfs_to_validate
+        yield vdfs_to_validate
 
 
 def _validate_segment(
@@ -1640,11 +1816,11 @@ def validate_total_iters(
 
 
 def _validate_vdf_batch(
-    constants: ConsensusConstants,
     vdf_list: List[Tuple[bytes, bytes, bytes]],
     shutdown_file_path: Optional[pathlib.Path] = None,
-):
-
+) -> bool:
+    constants = _worker_constants
+    assert constants is not None, "the worker wasn't started by init_validation_worker()"
     for vdf_proof_bytes, class_group_bytes, info in vdf_list:
         vdf = VDFProof.from_bytes(vdf_proof_bytes)
         class_group = ClassgroupElement.from_bytes(class_group_bytes)
@@ -1659,17 +1835,101 @@ def _validate_vdf_batch(
     return True
 
 
+class VDFBatchValidator:
+    """
+    Validates the VDFs of a weight proof on the worker processes of an executor started with init_validation_worker().
+    VDFs are added as the sub epoch segments they come from are validated, and sent to the workers serialized, in
+    batches of VDF_BATCH_SIZE, so they are checked while the remaining segments still are. Once a batch fails the
+    batches that haven't started yet are cancelled. progress is called with the number of VDFs validated and the
+    number sent to the workers so far, every time a batch is done.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        shutdown_file_path: pathlib.Path,
+        progress: Optional[Callable[[int, int], None]] = None,
+        batch_size: int = VDF_BATCH_SIZE,
+    ) -> None:
+        self._executor = executor
+        self._shutdown_file_path = shutdown_file_path
+        self._progress = progress
+        self._batch_size = batch_size
+        self._pending: List[Tuple[bytes, bytes, bytes]] = []
+        # the batches sent to the workers that aren't done, and how many VDFs they have
+        self._running: List[Tuple["asyncio.Future[bool]", int]] = []
+        self.queued = 0
+        self.validated = 0
+        self.failed = False
+
+    def add(self, vdf_list: List[Tuple[VDFProof, ClassgroupElement, VDFInfo]]) -> bool:
+        """
+        Returns False if a batch failed validation already
+        """
+        for vdf_proof, classgroup, vdf_info in vdf_list:
+            self._pending.append((bytes(vdf_proof), bytes(classgroup), bytes(vdf_info)))
+            if len(self._pending) >= self._batch_size:
+                self._send_batch()
+        self._check_done()
+        return not self.failed
+
+    async def finish(self) -> bool:
+        """
+        Waits for all VDFs to be validated, returns False as soon as one is invalid
+        """
+        if len(self._pending) > 0:
+            self._send_batch()
+        self._check_done()
+        while not self.failed and len(self._running) > 0:
+            await asyncio.wait([future for future, _ in self._running], return_when=asyncio.FIRST_COMPLETED)
+            self._check_done()
+        return not self.failed
+
+    def cancel(self) -> None:
+        # batches that are already running on a worker can't be cancelled, they run until the shutdown file is removed
+        for future, _ in self._running:
+            future.cancel()
+        self._running = []
+
+    def _send_batch(self) -> None:
+        batch = self._pending
+        self._pending = []
+        self.queued += len(batch)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, _validate_vdf_batch, batch, self._shutdown_file_path
+        )
+        self._running.append((future, len(batch)))
+
+    def _check_done(self) -> None:
+        running: List[Tuple["asyncio.Future[bool]", int]] = []
+        for future, count in self._running:
+            if not future.done():
+                running.append((future, count))
+            elif not future.result():
+                self.failed = True
+            else:
+                self.validated += count
+                if self._progress is not None:
+                    self._progress(self.validated, self.queued)
+        self._running = running
+        if self.failed:
+            self.cancel()
+
+
 async def validate_weight_proof_inner(
-    constants,
-    executor,
-    shutdown_file_name,
-    num_processes,
+    constants: ConsensusConstants,
+    executor: Executor,
+    shutdown_file_name: str,
     weight_proof: WeightProof,
     summaries: List[SubEpochSummary],
     sub_epoch_weight_list: List[uint128],
     skip_segment_validation: bool,
     validate_from: int,
+    progress: Optional[Callable[[int, int], None]] = None,
 ) -> Tuple[bool, List[BlockRecord]]:
+    """
+    executor must have been started with init_validation_worker() as its initializer
+    """
     assert len(weight_proof.sub_epochs) > 0
     if len(weight_proof.sub_epochs) == 0:
         return False, []
@@ -1683,46 +1943,30 @@ async def validate_weight_proof_inner(
         return False, []
 
     loop = asyncio.get_running_loop()
-    summary_bytes, wp_segment_bytes, wp_recent_chain_bytes = vars_to_bytes(summaries, weight_proof)
+    summary_bytes = [bytes(summary) for summary in summaries]
     recent_blocks_validation_task = loop.run_in_executor(
         executor,
         validate_recent_blocks,
         constants,
-        wp_recent_chain_bytes,
+        bytes(RecentChainData(weight_proof.recent_chain_data)),
         summary_bytes,
         pathlib.Path(shutdown_file_name),
     )
 
     if not skip_segment_validation:
-        segments_validated, vdfs_to_validate = _validate_sub_epoch_segments(
-            constants, rng, wp_segment_bytes, summary_bytes, validate_from
-        )
-        await asyncio.sleep(0)  # break up otherwise multi-second sync code
-
-        if not segments_validated:
-            return False, []
-
-        vdf_chunks = chunks(vdfs_to_validate, num_processes)
-        vdf_tasks: List[Awaitable] = []
-        for chunk in vdf_chunks:
-            byte_chunks = []
-            for vdf_proof, classgroup, vdf_info in chunk:
-                byte_chunks.append((bytes(vdf_proof), bytes(classgroup), bytes(vdf_info)))
-            vdf_task = asyncio.get_running_loop().run_in_executor(
-                executor,
-                _validate_vdf_batch,
-                constants,
-                byte_chunks,
-                pathlib.Path(shutdown_file_name),
-            )
-            vdf_tasks.append(vdf_task)
-            # give other stuff a turn
-            await asyncio.sleep(0)
-
-        for vdf_task in asyncio.as_completed(fs=vdf_tasks):
-            validated = await vdf_task
-            if not validated:
+        # the segments are validated here, one sub epoch at a time, while the workers validate the VDFs found so far
+        vdf_validator = VDFBatchValidator(executor, pathlib.Path(shutdown_file_name), progress)
+        try:
+            for vdf_list in _sub_epoch_segments_vdfs(
+                constants, rng, weight_proof.sub_epoch_segments, summaries, validate_from
+            ):
+                if vdf_list is None or not vdf_validator.add(vdf_list):
+                    return False, []
+                await asyncio.sleep(0)  # break up otherwise multi-second sync code
+            if not await vdf_validator.finish():
                 return False, []
+        finally:
+            vdf_validator.cancel()
 
     valid_recent_blocks, records_bytes = await recent_blocks_validation_task
 
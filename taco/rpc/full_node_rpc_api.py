@@ -24,15 +24,16 @@ from taco.types.mempool_inclusion_status import MempoolInclusionStatus
 from taco.types.spend_bundle import SpendBundle
 from taco.types.unfinished_header_block import UnfinishedHeaderBlock
 from taco.util.byte_types import hexstr_to_bytes
+from taco.util.full_block_utils import BlockView
 from taco.util.ints import uint32, uint64, uint128
+from taco.util.json_util import JsonWithExtraFields
 from taco.util.log_exceptions import log_exceptions
 from taco.util.ws_message import WsRpcMessage, create_payload_dict
 from taco.wallet.puzzles.decompress_block_spends import DECOMPRESS_BLOCK_SPENDS
 
 
-def coin_record_dict_backwards_compat(coin_record: Dict[str, Any]):
-    coin_record["spent"] = coin_record["spent_block_index"] > 0
-    return coin_record
+def coin_record_backwards_compat(coin_record: CoinRecord) -> JsonWithExtraFields:
+    return JsonWithExtraFields(coin_record, {"spent": coin_record.spent_block_index > 0})
 
 
 class FullNodeRpcApi:
@@ -48,6 +49,7 @@ class FullNodeRpcApi:
             "/get_block": self.get_block,
             "/get_blocks": self.get_blocks,
             "/get_block_count_metrics": self.get_block_count_metrics,
+            "/get_db_metrics": self.get_db_metrics,
             "/get_block_record_by_height": self.get_block_record_by_height,
             "/get_block_record": self.get_block_record,
             "/get_block_records": self.get_block_records,
@@ -353,17 +355,18 @@ class FullNodeRpcApi:
         block_range = []
         for a in range(start, end):
             block_range.append(uint32(a))
-        blocks: List[FullBlock] = await self.service.block_store.get_full_blocks_at(block_range)
+        # the views let us skip reorged blocks without parsing them
+        blocks: List[BlockView] = await self.service.block_store.get_block_views_at(block_range)
         json_blocks = []
         for block in blocks:
             hh: bytes32 = block.header_hash
             if exclude_reorged and self.service.blockchain.height_to_hash(block.height) != hh:
                 # Don't include forked (reorged) blocks
                 continue
-            json = block.to_json_dict()
-            if not exclude_hh:
-                json["header_hash"] = hh.hex()
-            json_blocks.append(json)
+            if exclude_hh:
+                json_blocks.append(block.to_full_block())
+            else:
+                json_blocks.append(JsonWithExtraFields(block.to_full_block(), {"header_hash": hh.hex()}))
         return {"blocks": json_blocks}
 
     async def get_block_count_metrics(self, request: Dict) -> EndpointResult:
@@ -420,7 +423,7 @@ class FullNodeRpcApi:
         if "header_hash" not in request:
             raise ValueError("No header_hash in request")
         header_hash = bytes32.from_hexstr(request["header_hash"])
-        full_block: Optional[FullBlock] = await self.service.block_store.get_full_block(header_hash)
+        full_block: Optional[BlockView] = await self.service.block_store.get_block_view(header_hash)
         if full_block is None:
             raise ValueError(f"Block {header_hash.hex()} not found")
 
@@ -442,6 +445,19 @@ class FullNodeRpcApi:
 
         return {"block_spends": spends}
 
+    async def get_db_metrics(self, request: Dict) -> EndpointResult:
+        """
+        Returns the blockchain database's connection wait and hold times and statement latencies, in total and per
+        store. Pass "reset": True to start over after reading them.
+        """
+        db_wrapper = self.service.db_wrapper
+        if db_wrapper.metrics is None:
+            raise ValueError("Database metrics are disabled, set full_node.db_metrics in config.yaml to enable them")
+        metrics = db_wrapper.metrics.to_json_dict()
+        if request.get("reset", False):
+            db_wrapper.metrics.reset()
+        return {"metrics": metrics, "reader_count": db_wrapper.reader_count}
+
     async def get_block_record_by_height(self, request: Dict) -> EndpointResult:
         if "height" not in request:
             raise ValueError("No height in request")
@@ -553,7 +569,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_puzzle_hash(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_records_by_puzzle_hashes(self, request: Dict) -> EndpointResult:
         """
@@ -575,7 +591,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_puzzle_hashes(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_record_by_name(self, request: Dict) -> EndpointResult:
         """
@@ -589,7 +605,7 @@ class FullNodeRpcApi:
         if coin_record is None:
             raise ValueError(f"Coin record 0x{name.hex()} not found")
 
-        return {"coin_record": coin_record_dict_backwards_compat(coin_record.to_json_dict())}
+        return {"coin_record": coin_record_backwards_compat(coin_record)}
 
     async def get_coin_records_by_names(self, request: Dict) -> EndpointResult:
         """
@@ -611,7 +627,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_names(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_records_by_parent_ids(self, request: Dict) -> EndpointResult:
         """
@@ -633,7 +649,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_parent_ids(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_backwards_compat(cr) for cr in coin_records]}
 
     async def get_coin_records_by_hint(self, request: Dict) -> EndpointResult:
         """
@@ -662,7 +678,7 @@ class FullNodeRpcApi:
 
         coin_records = await self.service.blockchain.coin_store.get_coin_records_by_names(**kwargs)
 
-        return {"coin_records": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in coin_records]}
+        return {"coin_records": [coin_record_backwards_compat(cr) for cr in coin_records]}
 
     async def push_tx(self, request: Dict) -> EndpointResult:
         if "spend_bundle" not in request:
@@ -698,7 +714,7 @@ class FullNodeRpcApi:
 
         header_hash = self.service.blockchain.height_to_hash(height)
         assert header_hash is not None
-        block: Optional[FullBlock] = await self.service.block_store.get_full_block(header_hash)
+        block: Optional[BlockView] = await self.service.block_store.get_block_view(header_hash)
 
         if block is None or block.transactions_generator is None:
             raise ValueError("Invalid block or block generator")
@@ -719,7 +735,7 @@ class FullNodeRpcApi:
             raise ValueError("No header_hash in request")
         header_hash = bytes32.from_hexstr(request["header_hash"])
 
-        block: Optional[FullBlock] = await self.service.block_store.get_full_block(header_hash)
+        block: Optional[BlockView] = await self.service.block_store.get_block_view(header_hash)
         if block is None:
             raise ValueError(f"Block {header_hash.hex()} not found")
 
@@ -730,8 +746,8 @@ class FullNodeRpcApi:
             removals: List[CoinRecord] = await self.service.coin_store.get_coins_removed_at_height(block.height)
 
         return {
-            "additions": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in additions],
-            "removals": [coin_record_dict_backwards_compat(cr.to_json_dict()) for cr in removals],
+            "additions": [coin_record_backwards_compat(cr) for cr in additions],
+            "removals": [coin_record_backwards_compat(cr) for cr in removals],
         }
 
     async def get_all_mempool_tx_ids(self, request: Dict) -> EndpointResult:
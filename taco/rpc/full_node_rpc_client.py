@@ -63,6 +63,9 @@ class FullNodeRpcClient(RpcClient):
             return None
         return BlockRecord.from_json_dict(response["block_record"])
 
+    async def get_db_metrics(self, reset: bool = False) -> Dict:
+        return await self.fetch("get_db_metrics", {"reset": reset})
+
     async def get_unfinished_block_headers(self) -> List[UnfinishedHeaderBlock]:
         response = await self.fetch("get_unfinished_block_headers", {})
         return [UnfinishedHeaderBlock.from_json_dict(r) for r in response["headers"]]
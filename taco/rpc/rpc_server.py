@@ -151,10 +151,18 @@ class RpcServer:
     shut_down: bool = False
     websocket: Optional[ClientWebSocketResponse] = None
     client_session: Optional[ClientSession] = None
+    # write the responses with dict_to_json_bytes(), without converting the streamable objects in them to dicts
+    fast_json: bool = False
 
     @classmethod
     def create(
-        cls, rpc_api: Any, service_name: str, stop_cb: Callable[[], None], root_path: Path, net_config: Dict[str, Any]
+        cls,
+        rpc_api: Any,
+        service_name: str,
+        stop_cb: Callable[[], None],
+        root_path: Path,
+        net_config: Dict[str, Any],
+        fast_json: bool = False,
     ) -> RpcServer:
         crt_path = root_path / net_config["daemon_ssl"]["private_crt"]
         key_path = root_path / net_config["daemon_ssl"]["private_key"]
@@ -162,7 +170,7 @@ class RpcServer:
         ca_key_path = root_path / net_config["private_ssl_ca"]["key"]
         ssl_context = ssl_context_for_server(ca_cert_path, ca_key_path, crt_path, key_path, log=log)
         ssl_client_context = ssl_context_for_client(ca_cert_path, ca_key_path, crt_path, key_path, log=log)
-        return cls(rpc_api, stop_cb, service_name, ssl_context, ssl_client_context)
+        return cls(rpc_api, stop_cb, service_name, ssl_context, ssl_client_context, fast_json=fast_json)
 
     async def start(self, self_hostname: str, rpc_port: uint16, max_request_body_size: int, prefer_ipv6: bool) -> None:
         if self.webserver is not None:
@@ -171,7 +179,9 @@ class RpcServer:
             hostname=self_hostname,
             port=rpc_port,
             max_request_body_size=max_request_body_size,
-            routes=[web.post(route, wrap_http_handler(func)) for (route, func) in self.get_routes().items()],
+            routes=[
+                web.post(route, wrap_http_handler(func, self.fast_json)) for (route, func) in self.get_routes().items()
+            ],
             ssl_context=self.ssl_context,
             prefer_ipv6=prefer_ipv6,
         )
@@ -404,6 +414,7 @@ async def start_rpc_server(
     net_config: Dict[str, object],
     connect_to_daemon: bool = True,
     max_request_body_size: Optional[int] = None,
+    fast_json: bool = False,
 ) -> RpcServer:
     """
     Starts an HTTP server with the following RPC methods, to be used by local clients to
@@ -413,7 +424,7 @@ async def start_rpc_server(
         if max_request_body_size is None:
             max_request_body_size = 1024**2
 
-        rpc_server = RpcServer.create(rpc_api, rpc_api.service_name, stop_cb, root_path, net_config)
+        rpc_server = RpcServer.create(rpc_api, rpc_api.service_name, stop_cb, root_path, net_config, fast_json)
         rpc_server.rpc_api.service._set_state_changed_callback(rpc_server.state_changed)
         prefer_ipv6 = str2bool(str(net_config.get("prefer_ipv6", False)))
         await rpc_server.start(self_hostname, rpc_port, max_request_body_size, prefer_ipv6)
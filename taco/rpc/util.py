@@ -11,7 +11,7 @@ from taco.util.json_util import obj_to_response
 log = logging.getLogger(__name__)
 
 
-def wrap_http_handler(f) -> Callable:
+def wrap_http_handler(f, fast_json: bool = False) -> Callable:
     async def inner(request) -> aiohttp.web.Response:
         request_data = await request.json()
         try:
@@ -28,6 +28,6 @@ def wrap_http_handler(f) -> Callable:
             else:
                 res_object = {"success": False, "error": f"{e}"}
 
-        return obj_to_response(res_object)
+        return obj_to_response(res_object, fast_json)
 
     return inner
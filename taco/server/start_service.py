@@ -172,6 +172,7 @@ class Service(Generic[_T_RpcServiceProtocol]):
                 self.config,
                 self._connect_to_daemon,
                 max_request_body_size=self.max_request_body_size,
+                fast_json=self.service_config.get("rpc_fast_json", False),
             )
 
     async def run(self) -> None:
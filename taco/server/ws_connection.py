@@ -400,11 +400,13 @@ class WSTacoConnection:
         self.pending_requests[message.id] = event
         await self.outgoing_queue.put(message)
 
-        # Either the result is available below or not, no need to detect the timeout error
-        with contextlib.suppress(asyncio.TimeoutError):
-            await asyncio.wait_for(event.wait(), timeout=timeout)
-
-        self.pending_requests.pop(message.id)
+        try:
+            # Either the result is available below or not, no need to detect the timeout error
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+        finally:
+            # also when the request is cancelled, a late response is dropped then
+            self.pending_requests.pop(message.id)
         result: Optional[Message] = None
         if message.id in self.request_results:
             result = self.request_results[message.id]
@@ -1,18 +1,98 @@
 from __future__ import annotations
 
 import functools
-from typing import Dict, List, Optional, Sequence
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 from blspy import AugSchemeMPL, G1Element, G2Element, GTElement
 
 from taco.types.blockchain_format.sized_bytes import bytes32, bytes48
+from taco.util.files import write_file_async
 from taco.util.hash import std_hash
 from taco.util.lru_cache import LRUCache
 
+log = logging.getLogger(__name__)
 
-def get_pairings(
-    cache: LRUCache[bytes32, GTElement], pks: List[bytes48], msgs: Sequence[bytes], force_cache: bool
-) -> List[GTElement]:
+# the memory a cached pairing takes, as measured: the GTElement, its key and the cache entry
+PAIRING_ENTRY_SIZE = 900
+
+# the size of a pairing and its key in the cache file
+PAIRING_RECORD_SIZE = 32 + GTElement.SIZE
+
+# Increasing this number will increase RAM usage, but decrease BLS validation time for blocks and unfinished blocks.
+DEFAULT_CACHE_SIZE = 50000 * PAIRING_ENTRY_SIZE
+
+
+class BLSCache:
+    """
+    A cache of the pairings of public keys with messages, which are expensive to compute. Pairings are keyed by the
+    hash of the public key and the message. The size of the cache is given in bytes, once it's full the least recently
+    used pairings are evicted. Lookups are counted as hits and misses. The cache can be saved to a file and loaded
+    back, so a node that restarts doesn't start out with a cold cache.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._cache: LRUCache[bytes32, GTElement] = LRUCache(max(1, max_size // PAIRING_ENTRY_SIZE))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache.cache)
+
+    @property
+    def max_size(self) -> int:
+        return self._cache.capacity * PAIRING_ENTRY_SIZE
+
+    def resize(self, max_size: int) -> None:
+        self._cache.capacity = max(1, max_size // PAIRING_ENTRY_SIZE)
+        while len(self._cache.cache) > self._cache.capacity:
+            self._cache.cache.popitem(last=False)
+
+    def get(self, key: bytes32) -> Optional[GTElement]:
+        pairing = self._cache.get(key)
+        if pairing is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return pairing
+
+    def put(self, key: bytes32, pairing: GTElement) -> None:
+        self._cache.put(key, pairing)
+
+    def items(self) -> Iterator[Tuple[bytes32, GTElement]]:
+        """
+        From the least to the most recently used
+        """
+        return iter(self._cache.cache.items())
+
+    async def save(self, path: Path) -> None:
+        """
+        Writes the pairings to path, behind a hash of them
+        """
+        data = b"".join(key + bytes(pairing) for key, pairing in self.items())
+        await write_file_async(path, std_hash(data) + data)
+
+    def load(self, path: Path) -> int:
+        """
+        Adds the pairings saved in path, returns how many there were. A missing or corrupt file is ignored.
+        """
+        try:
+            with open(path, "rb") as f:
+                contents = f.read()
+        except FileNotFoundError:
+            return 0
+        data = memoryview(contents)[32:]
+        if len(contents) < 32 or len(data) % PAIRING_RECORD_SIZE != 0 or std_hash(data) != contents[:32]:
+            log.warning(f"ignoring the corrupt BLS cache file {path}")
+            return 0
+        for offset in range(0, len(data), PAIRING_RECORD_SIZE):
+            key = bytes32(data[offset : offset + 32])
+            self.put(key, GTElement.from_bytes_unchecked(data[offset + 32 : offset + PAIRING_RECORD_SIZE]))
+        return len(data) // PAIRING_RECORD_SIZE
+
+
+def get_pairings(cache: BLSCache, pks: List[bytes48], msgs: Sequence[bytes], force_cache: bool) -> List[GTElement]:
     pairings: List[Optional[GTElement]] = []
     missing_count: int = 0
     for pk, msg in zip(pks, msgs):
@@ -50,8 +130,7 @@ def get_pairings(
     return pairings
 
 
-# Increasing this number will increase RAM usage, but decrease BLS validation time for blocks and unfinished blocks.
-LOCAL_CACHE: LRUCache[bytes32, GTElement] = LRUCache(50000)
+LOCAL_CACHE: BLSCache = BLSCache()
 
 
 def aggregate_verify(
@@ -59,7 +138,7 @@ def aggregate_verify(
     msgs: Sequence[bytes],
     sig: G2Element,
     force_cache: bool = False,
-    cache: LRUCache[bytes32, GTElement] = LOCAL_CACHE,
+    cache: BLSCache = LOCAL_CACHE,
 ) -> bool:
     pairings: List[GTElement] = get_pairings(cache, pks, msgs, force_cache)
     if len(pairings) == 0:
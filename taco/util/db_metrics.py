@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List
+
+import aiosqlite
+from aiosqlite.context import Result
+
+# the buckets are powers of 2 microseconds, the last one is everything over ~34 seconds
+NUM_BUCKETS = 26
+
+# the kinds of latencies recorded, per store and in total
+METRIC_KINDS = ["reader_wait", "reader_hold", "writer_wait", "writer_hold", "statement"]
+
+# the store (module) the current task is using the database connection for
+current_store: ContextVar[str] = ContextVar("current_store", default="unknown")
+
+_SKIPPED_MODULES = {__name__, "taco.util.db_wrapper", "contextlib"}
+
+
+class LatencyHistogram:
+    """
+    A histogram of durations, with exponentially sized buckets (1us, 2us, 4us, ...). Percentiles are reported as the
+    upper bound of the bucket they fall in.
+    """
+
+    def __init__(self) -> None:
+        self.buckets: List[int] = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = min(int(seconds * 1000000).bit_length(), NUM_BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Returns the upper bound (in seconds) of the bucket the given fraction of samples are at or below
+        """
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= target:
+                return min((1 << index) / 1000000, self.max)
+        return self.max
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        # durations are in milliseconds
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": 0.0 if self.count == 0 else self.total * 1000 / self.count,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p90_ms": self.percentile(0.9) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "buckets": [[(1 << index) / 1000, count] for index, count in enumerate(self.buckets) if count > 0],
+        }
+
+
+class DBMetrics:
+    """
+    Latency histograms for a DBWrapper2: how long tasks wait for a connection, how long they hold it and how long
+    individual statements take. They are recorded in total and per store, the store being the module that asked for
+    the connection (e.g. "coin_store").
+    """
+
+    start_time: float
+    totals: Dict[str, LatencyHistogram]
+    stores: Dict[str, Dict[str, LatencyHistogram]]
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def record(self, kind: str, store: str, seconds: float) -> None:
+        self.totals[kind].record(seconds)
+        store_metrics = self.stores.get(store)
+        if store_metrics is None:
+            store_metrics = {k: LatencyHistogram() for k in METRIC_KINDS}
+            self.stores[store] = store_metrics
+        store_metrics[kind].record(seconds)
+
+    def reset(self) -> None:
+        self.start_time = time.monotonic()
+        self.totals = {kind: LatencyHistogram() for kind in METRIC_KINDS}
+        self.stores = {}
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": time.monotonic() - self.start_time,
+            "totals": {kind: histogram.to_json_dict() for kind, histogram in self.totals.items()},
+            "stores": {
+                store: {kind: histogram.to_json_dict() for kind, histogram in store_metrics.items() if histogram.count}
+                for store, store_metrics in sorted(self.stores.items())
+            },
+        }
+
+
+def calling_store() -> str:
+    """
+    Returns the name of the module that called into DBWrapper2, skipping the wrapper's and contextlib's frames
+    """
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__") in _SKIPPED_MODULES:
+        frame = frame.f_back  # type: ignore[assignment]
+    if frame is None:
+        return "unknown"
+    module: str = frame.f_globals.get("__name__", "unknown")
+    return module.rsplit(".", 1)[-1]
+
+
+def instrument_connection(connection: aiosqlite.Connection, metrics: DBMetrics) -> None:
+    """
+    Records the time it takes to execute each statement on this connection. For queries, this is the time until the
+    first row is available. The store is the one that holds the connection.
+    """
+
+    execute = connection.execute
+    executemany = connection.executemany
+    execute_fetchall = connection.execute_fetchall
+    execute_insert = connection.execute_insert
+
+    def timed(method: Any) -> Any:
+        async def timed_method(*args: Any, **kwargs: Any) -> Any:
+            start = time.monotonic()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                metrics.record("statement", current_store.get(), time.monotonic() - start)
+
+        # the result must support both "await" and "async with", like aiosqlite's own methods
+        return lambda *args, **kwargs: Result(timed_method(*args, **kwargs))
+
+    # these shadow the methods of this connection object only
+    connection.execute = timed(execute)  # type: ignore[assignment]
+    connection.executemany = timed(executemany)  # type: ignore[assignment]
+    connection.execute_fetchall = timed(execute_fetchall)  # type: ignore[assignment]
+    connection.execute_insert = timed(execute_insert)  # type: ignore[assignment]
@@ -3,19 +3,40 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import functools
+import logging
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, AsyncIterator, Dict, Iterable, Optional, TextIO, Type, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Type,
+    Union,
+)
 
 import aiosqlite
 from typing_extensions import final
 
+from taco.util.db_metrics import DBMetrics, calling_store, current_store, instrument_connection
+
 if aiosqlite.sqlite_version_info < (3, 32, 0):
     SQLITE_MAX_VARIABLE_NUMBER = 900
 else:
     SQLITE_MAX_VARIABLE_NUMBER = 32700
 
+log = logging.getLogger(__name__)
+
 
 async def execute_fetchone(
     c: aiosqlite.Connection, sql: str, parameters: Iterable[Any] = None
@@ -79,11 +100,34 @@ class DBWrapper2:
     _current_writer: Optional[asyncio.Task]
     _savepoint_name: int
     _log_file: Optional[TextIO]
+    # latency histograms, if enabled
+    metrics: Optional[DBMetrics]
+    # when the reader pool is adaptive, it grows up to _max_read_connections
+    # while tasks have to wait for a connection, and shrinks back down to
+    # _min_read_connections once they no longer do
+    _min_read_connections: int
+    _max_read_connections: int
+    _open_read_connection: Optional[Callable[[str], Awaitable[aiosqlite.Connection]]]
+    _last_reader_wait: float
+    _last_pool_resize: float
+    _pool_tasks: Set[asyncio.Task]
+    _closing: bool
+    # called with True when a top level transaction is committed, and with
+    # False when it's rolled back
+    _transaction_callbacks: List[Callable[[bool], None]]
+
+    # a task waiting this long for a reader connection grows the pool
+    READER_GROW_WAIT = 0.01
+    # the pool shrinks by one connection when no task has waited for a reader
+    # connection (and the pool hasn't changed size) for this long
+    READER_SHRINK_IDLE = 60.0
 
     async def add_connection(self, c: aiosqlite.Connection) -> None:
         # this guarantees that reader connections can only be used for reading
         assert c != self._write_connection
         await c.execute("pragma query_only")
+        if self.metrics is not None:
+            instrument_connection(c, self.metrics)
         self._read_connections.put_nowait(c)
         self._num_read_connections += 1
 
@@ -92,6 +136,7 @@ class DBWrapper2:
         connection: aiosqlite.Connection,
         db_version: int = 1,
         log_file: Optional[TextIO] = None,
+        metrics: Optional[DBMetrics] = None,
     ) -> None:
         self._read_connections = asyncio.Queue()
         self._write_connection = connection
@@ -102,6 +147,17 @@ class DBWrapper2:
         self._current_writer = None
         self._savepoint_name = 0
         self._log_file = log_file
+        self.metrics = metrics
+        if metrics is not None:
+            instrument_connection(connection, metrics)
+        self._min_read_connections = 0
+        self._max_read_connections = 0
+        self._open_read_connection = None
+        self._last_reader_wait = time.monotonic()
+        self._last_pool_resize = time.monotonic()
+        self._pool_tasks = set()
+        self._closing = False
+        self._transaction_callbacks = []
 
     @classmethod
     async def create(
@@ -116,7 +172,15 @@ class DBWrapper2:
         synchronous: Optional[str] = None,
         foreign_keys: bool = False,
         row_factory: Optional[Type[aiosqlite.Row]] = None,
+        max_reader_count: Optional[int] = None,
+        metrics: bool = False,
     ) -> DBWrapper2:
+        """
+        If max_reader_count is larger than reader_count, the pool of reader
+        connections adapts to the load, between those two sizes. If metrics is
+        True, connection wait and hold times and statement latencies are
+        recorded in the metrics member.
+        """
         if log_path is None:
             log_file = None
         else:
@@ -130,22 +194,83 @@ class DBWrapper2:
 
         write_connection.row_factory = row_factory
 
-        self = cls(connection=write_connection, db_version=db_version, log_file=log_file)
+        self = cls(
+            connection=write_connection,
+            db_version=db_version,
+            log_file=log_file,
+            metrics=DBMetrics() if metrics else None,
+        )
 
-        for index in range(reader_count):
-            read_connection = await _create_connection(
-                database=database,
-                uri=uri,
-                log_file=log_file,
-                name=f"reader-{index}",
-            )
+        async def open_read_connection(name: str) -> aiosqlite.Connection:
+            read_connection = await _create_connection(database=database, uri=uri, log_file=log_file, name=name)
             read_connection.row_factory = row_factory
-            await self.add_connection(c=read_connection)
+            return read_connection
+
+        for index in range(reader_count):
+            await self.add_connection(c=await open_read_connection(f"reader-{index}"))
+
+        if max_reader_count is not None and max_reader_count > reader_count:
+            self._min_read_connections = reader_count
+            self._max_read_connections = max_reader_count
+            self._open_read_connection = open_read_connection
 
         return self
 
+    @property
+    def reader_count(self) -> int:
+        return self._num_read_connections
+
+    async def _grow_readers(self) -> None:
+        assert self._open_read_connection is not None
+        try:
+            c = await self._open_read_connection(f"reader-{self._num_read_connections}")
+            if self._closing:
+                await c.close()
+                return
+            await self.add_connection(c)
+        except Exception as e:
+            log.warning(f"failed to open another database reader connection: {e}")
+        finally:
+            self._last_pool_resize = time.monotonic()
+
+    def _start_pool_task(self, coroutine: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coroutine)
+        self._pool_tasks.add(task)
+        task.add_done_callback(self._pool_tasks.discard)
+
+    def _adapt_pool(self, wait: float) -> None:
+        """
+        Called when a reader connection was acquired, after waiting for this
+        long. Opens one more connection if tasks are waiting for them.
+        """
+        now = time.monotonic()
+        if wait < self.READER_GROW_WAIT:
+            return
+        self._last_reader_wait = now
+        growing = len(self._pool_tasks)
+        if not self._closing and self._num_read_connections + growing < self._max_read_connections and growing == 0:
+            self._start_pool_task(self._grow_readers())
+
+    def _maybe_shrink_pool(self, c: aiosqlite.Connection) -> bool:
+        """
+        Called when a reader connection is released. Closes it, instead of
+        returning it to the pool, if the pool is larger than needed.
+        """
+        if self._num_read_connections <= self._min_read_connections or len(self._pool_tasks) > 0:
+            return False
+        now = time.monotonic()
+        if min(now - self._last_reader_wait, now - self._last_pool_resize) < self.READER_SHRINK_IDLE:
+            return False
+        self._num_read_connections -= 1
+        self._last_pool_resize = now
+        self._start_pool_task(c.close())
+        return True
+
     async def close(self) -> None:
+        self._closing = True
         try:
+            if len(self._pool_tasks) > 0:
+                await asyncio.gather(*self._pool_tasks, return_exceptions=True)
             while self._num_read_connections > 0:
                 await (await self._read_connections.get()).close()
                 self._num_read_connections -= 1
@@ -173,6 +298,39 @@ class DBWrapper2:
             # just rolls back the state. We need to cancel it regardless
             await self._write_connection.execute(f"RELEASE {name}")
 
+    def add_transaction_callback(self, callback: Callable[[bool], None]) -> None:
+        """
+        Registers a callback that is called with True when a top level write
+        transaction has been committed, and with False when it has been rolled
+        back. It's called before the write lock is released, so no other write
+        transaction can start in between.
+        """
+        self._transaction_callbacks.append(callback)
+
+    def is_writer(self) -> bool:
+        """
+        Returns whether the current task is in a write transaction, i.e. whether
+        its reads see the changes that haven't been committed yet.
+        """
+        task = asyncio.current_task()
+        return task is not None and self._current_writer == task
+
+    @contextlib.asynccontextmanager
+    async def _transaction_ctx(self, task: asyncio.Task) -> AsyncIterator[None]:
+        # must be called with the write lock held
+        committed = False
+        try:
+            async with self._savepoint_ctx():
+                self._current_writer = task
+                try:
+                    yield
+                finally:
+                    self._current_writer = None
+            committed = True
+        finally:
+            for callback in self._transaction_callbacks:
+                callback(committed)
+
     @contextlib.asynccontextmanager
     async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
         """
@@ -193,13 +351,30 @@ class DBWrapper2:
                 yield self._write_connection
             return
 
+        wait_start = time.monotonic()
         async with self._lock:
-            async with self._savepoint_ctx():
-                self._current_writer = task
-                try:
+            with self._measure("writer", wait_start):
+                async with self._transaction_ctx(task):
                     yield self._write_connection
-                finally:
-                    self._current_writer = None
+
+    @contextlib.contextmanager
+    def _measure(self, role: str, wait_start: float) -> Iterator[None]:
+        """
+        Records how long the current task waited for the connection, and how
+        long it holds it, if metrics are enabled
+        """
+        if self.metrics is None:
+            yield
+            return
+        acquired = time.monotonic()
+        store = calling_store()
+        token = current_store.set(store)
+        self.metrics.record(f"{role}_wait", store, acquired - wait_start)
+        try:
+            yield
+        finally:
+            current_store.reset(token)
+            self.metrics.record(f"{role}_hold", store, time.monotonic() - acquired)
 
     @contextlib.asynccontextmanager
     async def writer_maybe_transaction(self) -> AsyncIterator[aiosqlite.Connection]:
@@ -217,13 +392,11 @@ class DBWrapper2:
             yield self._write_connection
             return
 
+        wait_start = time.monotonic()
         async with self._lock:
-            async with self._savepoint_ctx():
-                self._current_writer = task
-                try:
+            with self._measure("writer", wait_start):
+                async with self._transaction_ctx(task):
                     yield self._write_connection
-                finally:
-                    self._current_writer = None
 
     @contextlib.asynccontextmanager
     async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
@@ -262,12 +435,17 @@ class DBWrapper2:
         if task in self._in_use:
             yield self._in_use[task]
         else:
+            wait_start = time.monotonic()
             c = await self._read_connections.get()
+            if self._max_read_connections > 0:
+                self._adapt_pool(time.monotonic() - wait_start)
             try:
                 # record our connection in this dict to allow nested calls in
                 # the same task to use the same connection
                 self._in_use[task] = c
-                yield c
+                with self._measure("reader", wait_start):
+                    yield c
             finally:
                 del self._in_use[task]
-                self._read_connections.put_nowait(c)
+                if self._max_read_connections == 0 or not self._maybe_shrink_pool(c):
+                    self._read_connections.put_nowait(c)
@@ -2,17 +2,23 @@ from __future__ import annotations
 
 import io
 from dataclasses import dataclass
-from typing import Callable, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from blspy import G1Element, G2Element
 from chia_rs import serialized_length
 from chiabip158 import PyBIP158
 
 from taco.types.blockchain_format.coin import Coin
-from taco.types.blockchain_format.foliage import TransactionsInfo
+from taco.types.blockchain_format.foliage import Foliage, FoliageTransactionBlock, TransactionsInfo
 from taco.types.blockchain_format.program import SerializedProgram
+from taco.types.blockchain_format.reward_chain_block import RewardChainBlock
 from taco.types.blockchain_format.sized_bytes import bytes32
-from taco.util.ints import uint32
+from taco.types.blockchain_format.vdf import VDFProof
+from taco.types.end_of_slot_bundle import EndOfSubSlotBundle
+from taco.types.full_block import FullBlock
+from taco.types.header_block import HeaderBlock
+from taco.util.hash import std_hash
+from taco.util.ints import uint32, uint128
 
 
 def skip_list(buf: memoryview, skip_item: Callable[[memoryview], memoryview]) -> memoryview:
@@ -207,6 +213,18 @@ def skip_transactions_info(buf: memoryview) -> memoryview:
     return skip_list(buf, skip_coin)
 
 
+def program_length(buf: Union[bytes, memoryview]) -> int:
+    # serialized_length() only accepts bytes
+    if isinstance(buf, memoryview):
+        buf = bytes(buf)
+    length: int = serialized_length(buf)
+    return length
+
+
+def skip_program(buf: memoryview) -> memoryview:
+    return buf[program_length(buf) :]
+
+
 def generator_from_block(buf: memoryview) -> Optional[SerializedProgram]:
     buf = skip_list(buf, skip_end_of_sub_slot_bundle)  # finished_sub_slots
     buf = skip_reward_chain_block(buf)  # reward_chain_block
@@ -224,7 +242,7 @@ def generator_from_block(buf: memoryview) -> Optional[SerializedProgram]:
         return None
 
     buf = buf[1:]
-    length = serialized_length(buf)
+    length = program_length(buf)
     return SerializedProgram.from_bytes(bytes(buf[:length]))
 
 
@@ -252,7 +270,7 @@ def block_info_from_block(buf: memoryview) -> GeneratorBlockInfo:
     generator = None
     if buf[0] != 0:
         buf = buf[1:]
-        length = serialized_length(buf)
+        length = program_length(buf)
         generator = SerializedProgram.from_bytes(bytes(buf[:length]))
         buf = buf[length:]
     else:
@@ -323,3 +341,162 @@ def header_block_from_block(
         header_block += bytes(transactions_info)
 
     return header_block
+
+
+# the functions skipping over each of the fields of a FullBlock, in the order they're serialized
+FULL_BLOCK_FIELD_SKIPPERS: List[Callable[[memoryview], memoryview]] = [
+    lambda buf: skip_list(buf, skip_end_of_sub_slot_bundle),  # finished_sub_slots
+    skip_reward_chain_block,  # reward_chain_block
+    lambda buf: skip_optional(buf, skip_vdf_proof),  # challenge_chain_sp_proof
+    skip_vdf_proof,  # challenge_chain_ip_proof
+    lambda buf: skip_optional(buf, skip_vdf_proof),  # reward_chain_sp_proof
+    skip_vdf_proof,  # reward_chain_ip_proof
+    lambda buf: skip_optional(buf, skip_vdf_proof),  # infused_challenge_chain_ip_proof
+    skip_foliage,  # foliage
+    lambda buf: skip_optional(buf, skip_foliage_transaction_block),  # foliage_transaction_block
+    lambda buf: skip_optional(buf, skip_transactions_info),  # transactions_info
+    lambda buf: skip_optional(buf, skip_program),  # transactions_generator
+    lambda buf: skip_list(buf, skip_uint32),  # transactions_generator_ref_list
+]
+
+FULL_BLOCK_FIELD_INDEX: Dict[str, int] = {field.name: i for i, field in enumerate(FullBlock.streamable_fields())}
+
+
+class BlockView:
+    """
+    A read-only view of a serialized FullBlock. Fields are located by skipping over the serialized data, only as far
+    as needed, and parsed the first time they are accessed. Callers that only need a few fields (the header hash, the
+    generator, the header block) don't pay for parsing the whole block. This implements the BlockInfo protocol.
+    """
+
+    def __init__(self, buf: Union[bytes, memoryview]):
+        self._buf = memoryview(buf)
+        # _offsets[i] is where field i starts, _offsets[i + 1] where it ends
+        self._offsets: List[int] = [0]
+        self._fields: Dict[int, Any] = {}
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._buf)
+
+    def field_bytes(self, name: str) -> memoryview:
+        """
+        Returns the serialized bytes of the named FullBlock field, without parsing them.
+        """
+        index = FULL_BLOCK_FIELD_INDEX[name]
+        while len(self._offsets) <= index + 1:
+            start = self._offsets[-1]
+            rest = FULL_BLOCK_FIELD_SKIPPERS[len(self._offsets) - 1](self._buf[start:])
+            self._offsets.append(len(self._buf) - len(rest))
+        return self._buf[self._offsets[index] : self._offsets[index + 1]]
+
+    def field(self, name: str) -> Any:
+        """
+        Returns the named FullBlock field, parsing it on first access.
+        """
+        index = FULL_BLOCK_FIELD_INDEX[name]
+        if index not in self._fields:
+            f = io.BytesIO(self.field_bytes(name))
+            self._fields[index] = FullBlock.streamable_fields()[index].parse_function(f)
+        return self._fields[index]
+
+    @property
+    def finished_sub_slots(self) -> List[EndOfSubSlotBundle]:
+        ret: List[EndOfSubSlotBundle] = self.field("finished_sub_slots")
+        return ret
+
+    @property
+    def reward_chain_block(self) -> RewardChainBlock:
+        ret: RewardChainBlock = self.field("reward_chain_block")
+        return ret
+
+    @property
+    def challenge_chain_sp_proof(self) -> Optional[VDFProof]:
+        ret: Optional[VDFProof] = self.field("challenge_chain_sp_proof")
+        return ret
+
+    @property
+    def challenge_chain_ip_proof(self) -> VDFProof:
+        ret: VDFProof = self.field("challenge_chain_ip_proof")
+        return ret
+
+    @property
+    def reward_chain_sp_proof(self) -> Optional[VDFProof]:
+        ret: Optional[VDFProof] = self.field("reward_chain_sp_proof")
+        return ret
+
+    @property
+    def reward_chain_ip_proof(self) -> VDFProof:
+        ret: VDFProof = self.field("reward_chain_ip_proof")
+        return ret
+
+    @property
+    def infused_challenge_chain_ip_proof(self) -> Optional[VDFProof]:
+        ret: Optional[VDFProof] = self.field("infused_challenge_chain_ip_proof")
+        return ret
+
+    @property
+    def foliage(self) -> Foliage:
+        ret: Foliage = self.field("foliage")
+        return ret
+
+    @property
+    def foliage_transaction_block(self) -> Optional[FoliageTransactionBlock]:
+        ret: Optional[FoliageTransactionBlock] = self.field("foliage_transaction_block")
+        return ret
+
+    @property
+    def transactions_info(self) -> Optional[TransactionsInfo]:
+        ret: Optional[TransactionsInfo] = self.field("transactions_info")
+        return ret
+
+    @property
+    def transactions_generator(self) -> Optional[SerializedProgram]:
+        ret: Optional[SerializedProgram] = self.field("transactions_generator")
+        return ret
+
+    @property
+    def transactions_generator_ref_list(self) -> List[uint32]:
+        ret: List[uint32] = self.field("transactions_generator_ref_list")
+        return ret
+
+    @property
+    def height(self) -> uint32:
+        # weight (uint128) comes first in the reward chain block
+        start = len(self.field_bytes("finished_sub_slots"))
+        return uint32.from_bytes(self._buf[start + 16 : start + 16 + 4])
+
+    @property
+    def weight(self) -> uint128:
+        start = len(self.field_bytes("finished_sub_slots"))
+        return uint128.from_bytes(self._buf[start : start + 16])
+
+    @property
+    def prev_header_hash(self) -> bytes32:
+        return bytes32(self.field_bytes("foliage")[:32])
+
+    @property
+    def header_hash(self) -> bytes32:
+        # the header hash is the hash of the serialized foliage
+        return std_hash(self.field_bytes("foliage"), skip_bytes_conversion=True)
+
+    def is_transaction_block(self) -> bool:
+        return self.field_bytes("foliage_transaction_block")[0] != 0
+
+    def get_included_reward_coins(self) -> Set[Coin]:
+        if not self.is_transaction_block():
+            return set()
+        assert self.transactions_info is not None
+        return set(self.transactions_info.reward_claims_incorporated)
+
+    def header_block_bytes(self, tx_addition_coins: List[Coin] = [], removal_names: List[bytes32] = []) -> bytes:
+        """
+        Returns the serialized HeaderBlock for this block, the transactions filter is computed from the additions and
+        removals passed in. This doesn't parse anything but the transactions info.
+        """
+        return header_block_from_block(self._buf, True, tx_addition_coins, removal_names)
+
+    def header_block(self, tx_addition_coins: List[Coin] = [], removal_names: List[bytes32] = []) -> HeaderBlock:
+        return HeaderBlock.from_bytes(self.header_block_bytes(tx_addition_coins, removal_names))
+
+    def to_full_block(self) -> FullBlock:
+        return FullBlock.from_bytes(self._buf)
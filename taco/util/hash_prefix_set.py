@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+from taco.types.blockchain_format.sized_bytes import bytes32
+
+
+def hash_prefix(h: bytes32) -> int:
+    return int.from_bytes(h[:8], "big")
+
+
+class HashPrefixSet:
+    """
+    An in-memory set of the first 8 bytes of hashes, kept in a sorted array. Membership can have false positives
+    (when two hashes share their prefix, about len(self) in 2**64) but no false negatives, so a negative answer
+    doesn't need to be confirmed by the database. Hashes are never removed, they only cause false positives.
+    """
+
+    def __init__(self, hashes: Iterable[bytes32] = ()) -> None:
+        self.prefixes: array[int] = array("Q", sorted(set(hash_prefix(h) for h in hashes)))
+
+    def __len__(self) -> int:
+        return len(self.prefixes)
+
+    def may_contain(self, h: bytes32) -> bool:
+        prefix = hash_prefix(h)
+        index = bisect_left(self.prefixes, prefix)
+        return index < len(self.prefixes) and self.prefixes[index] == prefix
+
+    def add(self, h: bytes32) -> None:
+        prefix = hash_prefix(h)
+        index = bisect_left(self.prefixes, prefix)
+        if index == len(self.prefixes) or self.prefixes[index] != prefix:
+            self.prefixes.insert(index, prefix)
+
+    def add_many(self, hashes: Iterable[bytes32]) -> None:
+        new_hashes = list(hashes)
+        if len(new_hashes) < 10:
+            for h in new_hashes:
+                self.add(h)
+        else:
+            # Each insert moves the rest of the array, re-sorting is cheaper for larger batches
+            self.prefixes = array("Q", sorted(set(hash_prefix(h) for h in new_hashes).union(self.prefixes)))
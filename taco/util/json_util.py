@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import dataclasses
 import json
-from typing import Any
+from enum import Enum
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Type
 
 from aiohttp import web
 
+from taco.util.streamable import Streamable, UnsupportedType, unhashable_types
 from taco.wallet.util.wallet_types import WalletType
 
 
@@ -26,6 +29,22 @@ class EnhancedJSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+@dataclasses.dataclass(frozen=True)
+class JsonWithExtraFields:
+    """
+    A dataclass object that's converted to json with some extra fields. Lets RPC endpoints add fields to the json of
+    an object, without converting it into a dict first.
+    """
+
+    obj: Any
+    extra_fields: Dict[str, Any]
+
+    def to_json_dict(self) -> Dict[str, Any]:
+        ret: Dict[str, Any] = self.obj.to_json_dict()
+        ret.update(self.extra_fields)
+        return ret
+
+
 def dict_to_json_str(o: Any) -> str:
     """
     Converts a python object into json.
@@ -34,9 +53,239 @@ def dict_to_json_str(o: Any) -> str:
     return json_str
 
 
-def obj_to_response(o: Any) -> web.Response:
+def dict_to_json_bytes(o: Any) -> bytes:
+    """
+    Converts a python object into the same json as dict_to_json_str(). The streamable objects in it are written
+    directly, instead of being converted into dicts by to_json_dict() and then encoded by json.dumps().
+    """
+    out: List[str] = []
+    write_json(o, out)
+    return "".join(out).encode()
+
+
+def obj_to_response(o: Any, fast_json: bool = False) -> web.Response:
     """
     Converts a python object into json. Used for RPC server which returns JSON.
     """
+    if fast_json:
+        return web.Response(body=dict_to_json_bytes(o), content_type="application/json")
     json_str = dict_to_json_str(o)
     return web.Response(body=json_str, content_type="application/json")
+
+
+# Appends the json of an object to a list of strings. The writers are looked up once per type: one set follows the
+# rules of json.dumps() with EnhancedJSONEncoder, the other the rules of recurse_jsonify() inside to_json_dict()
+JsonWriter = Callable[[Any, List[str]], None]
+
+_json_writers: Dict[Type[Any], JsonWriter] = {}
+_jsonify_writers: Dict[Type[Any], JsonWriter] = {}
+
+
+def write_json(o: Any, out: List[str]) -> None:
+    """
+    Appends json.dumps(o, cls=EnhancedJSONEncoder, sort_keys=True) to out
+    """
+    writer = _json_writers.get(type(o))
+    if writer is None:
+        writer = _json_writers[type(o)] = json_writer(type(o))
+    writer(o, out)
+
+
+def write_jsonified(d: Any, out: List[str]) -> None:
+    """
+    Appends the json of recurse_jsonify(d) to out, without creating the intermediate dicts and lists
+    """
+    writer = _jsonify_writers.get(type(d))
+    if writer is None:
+        writer = _jsonify_writers[type(d)] = jsonify_writer(type(d))
+    writer(d, out)
+
+
+def write_null(o: None, out: List[str]) -> None:
+    out.append("null")
+
+
+def write_bool(o: bool, out: List[str]) -> None:
+    out.append("true" if o else "false")
+
+
+def write_int(o: int, out: List[str]) -> None:
+    out.append(int.__repr__(o))
+
+
+def float_to_json(o: float) -> str:
+    # like json.dumps(), which allows NaN and infinity
+    if o != o:
+        return "NaN"
+    if o == float("inf"):
+        return "Infinity"
+    if o == float("-inf"):
+        return "-Infinity"
+    return float.__repr__(o)
+
+
+def write_float(o: float, out: List[str]) -> None:
+    out.append(float_to_json(o))
+
+
+def write_str(o: str, out: List[str]) -> None:
+    out.append(encode_basestring_ascii(o))
+
+
+def write_hex(o: Any, out: List[str]) -> None:
+    out.append(f'"0x{bytes(o).hex()}"')
+
+
+def write_enum_name(o: Enum, out: List[str]) -> None:
+    out.append(encode_basestring_ascii(o.name))
+
+
+def write_to_json_dict(o: Any, out: List[str]) -> None:
+    write_json(o.to_json_dict(), out)
+
+
+def key_to_json(key: Any) -> str:
+    # the keys json.dumps() accepts
+    if isinstance(key, str):
+        return encode_basestring_ascii(key)
+    if key is None or isinstance(key, bool):
+        return '"null"' if key is None else f'"{str(key).lower()}"'
+    if isinstance(key, int):
+        return f'"{int.__repr__(key)}"'
+    if isinstance(key, float):
+        return f'"{float_to_json(key)}"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def array_writer(write_item: JsonWriter) -> JsonWriter:
+    def write_array(o: Any, out: List[str]) -> None:
+        separator = "["
+        for item in o:
+            out.append(separator)
+            write_item(item, out)
+            separator = ", "
+        out.append("[]" if separator == "[" else "]")
+
+    return write_array
+
+
+def object_writer(write_value: JsonWriter) -> JsonWriter:
+    def write_object(o: Dict[Any, Any], out: List[str]) -> None:
+        separator = "{"
+        for key, value in sorted(o.items()):
+            out.append(separator)
+            out.append(key_to_json(key))
+            out.append(": ")
+            write_value(value, out)
+            separator = ", "
+        out.append("{}" if separator == "{" else "}")
+
+    return write_object
+
+
+def dataclass_writer(cls: Type[Any]) -> JsonWriter:
+    """
+    Writes the fields of a dataclass like recurse_jsonify(), sorted by name like json.dumps(sort_keys=True)
+    """
+    names = sorted(field.name for field in dataclasses.fields(cls))
+    prefixes = [
+        ("{" if index == 0 else ", ") + encode_basestring_ascii(name) + ": " for index, name in enumerate(names)
+    ]
+    fields = list(zip(names, prefixes))
+
+    def write_dataclass(d: Any, out: List[str]) -> None:
+        for name, prefix in fields:
+            out.append(prefix)
+            write_jsonified(getattr(d, name), out)
+        out.append("}" if len(fields) > 0 else "{}")
+
+    return write_dataclass
+
+
+def uses_jsonify(cls: Type[Any]) -> bool:
+    """
+    True if the to_json_dict() of the class is the one of Streamable, which converts it with recurse_jsonify()
+    """
+    return getattr(cls, "to_json_dict", None) is Streamable.to_json_dict
+
+
+def write_with_extra_fields(o: JsonWithExtraFields, out: List[str]) -> None:
+    if not uses_jsonify(type(o.obj)):
+        write_json(o.to_json_dict(), out)
+        return
+    values: Dict[str, Any] = {
+        field.name: (write_jsonified, getattr(o.obj, field.name)) for field in dataclasses.fields(o.obj)
+    }
+    values.update((name, (write_json, value)) for name, value in o.extra_fields.items())
+    separator = "{"
+    for name in sorted(values):
+        write_value, value = values[name]
+        out.append(separator)
+        out.append(key_to_json(name))
+        out.append(": ")
+        write_value(value, out)
+        separator = ", "
+    out.append("{}" if separator == "{" else "}")
+
+
+def write_unsupported(d: Any, out: List[str]) -> None:
+    raise UnsupportedType(f"failed to jsonify {d} (type: {type(d)})")
+
+
+def write_not_serializable(o: Any, out: List[str]) -> None:
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def json_writer(cls: Type[Any]) -> JsonWriter:
+    """
+    Returns the function that writes objects of the type like json.dumps(cls=EnhancedJSONEncoder, sort_keys=True)
+    """
+    if issubclass(cls, str):
+        return write_str
+    elif cls is type(None):
+        return write_null
+    elif cls is bool:
+        return write_bool
+    elif issubclass(cls, int):
+        return write_int
+    elif issubclass(cls, float):
+        return write_float
+    elif issubclass(cls, (list, tuple)):
+        return array_writer(write_json)
+    elif issubclass(cls, dict):
+        return object_writer(write_json)
+    # EnhancedJSONEncoder.default()
+    elif cls is JsonWithExtraFields:
+        return write_with_extra_fields
+    elif dataclasses.is_dataclass(cls):
+        return dataclass_writer(cls) if uses_jsonify(cls) else write_to_json_dict
+    elif hasattr(cls, "__bytes__") or issubclass(cls, bytes):
+        return write_hex
+    return write_not_serializable
+
+
+def jsonify_writer(cls: Type[Any]) -> JsonWriter:
+    """
+    Returns the function that writes objects of the type like json.dumps(recurse_jsonify(d), sort_keys=True)
+    """
+    if dataclasses.is_dataclass(cls):
+        return dataclass_writer(cls)
+    elif issubclass(cls, (list, tuple)):
+        return array_writer(write_jsonified)
+    elif issubclass(cls, dict):
+        return object_writer(write_jsonified)
+    elif cls.__name__ in unhashable_types or issubclass(cls, bytes):
+        return write_hex
+    elif issubclass(cls, Enum):
+        return write_enum_name
+    elif cls is bool:
+        return write_bool
+    elif issubclass(cls, int):
+        return write_int
+    elif cls is type(None):
+        return write_null
+    elif cls is str:
+        return write_str
+    elif hasattr(cls, "to_json_dict"):
+        return write_to_json_dict
+    return write_unsupported
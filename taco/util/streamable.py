@@ -4,6 +4,7 @@ import dataclasses
 import io
 import os
 import pprint
+import struct
 import traceback
 from enum import Enum
 from typing import (
@@ -14,6 +15,7 @@ from typing import (
     Collection,
     Dict,
     List,
+    NoReturn,
     Optional,
     Tuple,
     Type,
@@ -26,9 +28,10 @@ from blspy import G1Element, G2Element, PrivateKey
 from typing_extensions import Literal, get_args, get_origin
 
 from taco.types.blockchain_format.sized_bytes import bytes32
-from taco.util.byte_types import hexstr_to_bytes
+from taco.util.byte_types import SizedBytes, hexstr_to_bytes
 from taco.util.hash import std_hash
 from taco.util.ints import uint32
+from taco.util.struct_stream import StructStream
 
 pp = pprint.PrettyPrinter(indent=1, width=120, compact=True)
 
@@ -526,6 +529,135 @@ def function_to_stream_one_item(f_type: Type[Any]) -> StreamFunctionType:
         raise UnsupportedType(f"can't stream {f_type}")
 
 
+# struct formats of the fixed size types, by size. 16 byte ints are split into two 8 byte halves
+_UNSIGNED_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q", 16: "QQ"}
+_SIGNED_FORMATS = {1: "b", 2: "h", 4: "i", 8: "q"}
+
+
+def fixed_size_format(f_type: Type[Any]) -> Optional[str]:
+    """
+    Returns the struct format of a type that's always serialized to the same number of bytes, and can be parsed and
+    streamed with struct: sized ints, sized bytes and bool. None for any other type.
+    """
+    if f_type is bool:
+        return "B"
+    if not isinstance(f_type, type):
+        return None
+    if issubclass(f_type, StructStream) and f_type.parse.__func__ is StructStream.parse.__func__:  # type: ignore
+        return (_SIGNED_FORMATS if f_type.SIGNED else _UNSIGNED_FORMATS).get(f_type.SIZE)
+    if issubclass(f_type, SizedBytes) and f_type.parse.__func__ is SizedBytes.parse.__func__:  # type: ignore
+        return f"{f_type._size}s"
+    return None
+
+
+def fixed_size_runs(fields: StreamableFields) -> List[List[int]]:
+    """
+    Groups the indexes of the fields into runs of consecutive fixed size fields, every other field is a run of its own
+    """
+    runs: List[List[int]] = []
+    previous_fixed = False
+    for index, field in enumerate(fields):
+        fixed = fixed_size_format(field.type) is not None
+        if fixed and previous_fixed:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+        previous_fixed = fixed
+    return runs
+
+
+def raise_truncated(field_types: Tuple[Type[Any], ...], available: int) -> NoReturn:
+    """
+    Raises the error parsing the fixed size fields one at a time raises, when there are only `available` bytes left.
+    """
+    offset = 0
+    for f_type in field_types:
+        offset += struct.calcsize(">" + str(fixed_size_format(f_type)))
+        if offset > available:
+            # like parse_bool()
+            assert f_type is not bool, "unexpected end of data"
+            raise ValueError(f"not enough bytes to parse a {f_type.__name__}")
+    raise ValueError(f"expected more than {available} bytes")
+
+
+def create_parse_function(fields: StreamableFields) -> Callable[[Type[_T_Streamable], BinaryIO], _T_Streamable]:
+    """
+    Generates the parse function of a streamable class: one function that parses all the fields in order, without
+    looping over them. Runs of two or more fixed size fields are read and unpacked with a single struct call, and
+    their objects are created without validation, struct already guarantees their size and range.
+    """
+    namespace: Dict[str, Any] = {
+        "new_object": object.__new__,
+        "new_int": int.__new__,
+        "new_bytes": bytes.__new__,
+        "raise_truncated": raise_truncated,
+    }
+    lines = ["def parse(cls, f):", "    obj = new_object(cls)", "    d = obj.__dict__"]
+    for run in fixed_size_runs(fields):
+        if len(run) == 1:
+            field = fields[run[0]]
+            namespace[f"parse_{run[0]}"] = field.parse_function
+            lines.append(f"    d[{field.name!r}] = parse_{run[0]}(f)")
+            continue
+        run_format = ">" + "".join(str(fixed_size_format(fields[index].type)) for index in run)
+        size = struct.calcsize(run_format)
+        namespace[f"unpack_{run[0]}"] = struct.Struct(run_format).unpack
+        namespace[f"types_{run[0]}"] = tuple(fields[index].type for index in run)
+        lines.append(f"    b = f.read({size})")
+        lines.append(f"    if len(b) != {size}:")
+        lines.append(f"        raise_truncated(types_{run[0]}, len(b))")
+        lines.append(f"    v = unpack_{run[0]}(b)")
+        value_index = 0
+        for index in run:
+            field = fields[index]
+            namespace[f"type_{index}"] = field.type
+            value = f"v[{value_index}]"
+            if field.type is bool:
+                lines.append(f"    if {value} > 1:")
+                lines.append('        raise ValueError("Bool byte must be 0 or 1")')
+                lines.append(f"    d[{field.name!r}] = {value} == 1")
+            elif issubclass(field.type, SizedBytes):
+                lines.append(f"    d[{field.name!r}] = new_bytes(type_{index}, {value})")
+            elif field.type.SIZE == 16:
+                lines.append(f"    d[{field.name!r}] = new_int(type_{index}, ({value} << 64) | v[{value_index + 1}])")
+                value_index += 1
+            else:
+                lines.append(f"    d[{field.name!r}] = new_int(type_{index}, {value})")
+            value_index += 1
+    lines.append("    return obj")
+    exec("\n".join(lines), namespace)
+    return namespace["parse"]  # type: ignore[no-any-return]
+
+
+def create_stream_function(fields: StreamableFields) -> Callable[[Any, BinaryIO], None]:
+    """
+    Generates the stream function of a streamable class, the counterpart of create_parse_function()
+    """
+    namespace: Dict[str, Any] = {}
+    lines = ["def stream(self, f):", "    d = self.__dict__"]
+    for run in fixed_size_runs(fields):
+        if len(run) == 1:
+            field = fields[run[0]]
+            namespace[f"stream_{run[0]}"] = field.stream_function
+            lines.append(f"    stream_{run[0]}(d[{field.name!r}], f)")
+            continue
+        run_format = ">" + "".join(str(fixed_size_format(fields[index].type)) for index in run)
+        namespace[f"pack_{run[0]}"] = struct.Struct(run_format).pack
+        values = []
+        for index in run:
+            field = fields[index]
+            if field.type is not bool and issubclass(field.type, StructStream) and field.type.SIZE == 16:
+                values.append(f"d[{field.name!r}] >> 64")
+                values.append(f"d[{field.name!r}] & 0xFFFFFFFFFFFFFFFF")
+            else:
+                values.append(f"d[{field.name!r}]")
+        lines.append(f"    f.write(pack_{run[0]}({', '.join(values)}))")
+    if len(fields) == 0:
+        lines.append("    pass")
+    exec("\n".join(lines), namespace)
+    return namespace["stream"]  # type: ignore[no-any-return]
+
+
 def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
     """
     This decorator forces correct streamable protocol syntax/usage and populates the caches for types hints and
@@ -558,6 +690,11 @@ def streamable(cls: Type[_T_Streamable]) -> Type[_T_Streamable]:
         raise DefinitionError("Streamable inheritance required.", cls)
 
     cls._streamable_fields = create_fields(cls)
+    # generated for the class and its fields, unless it has its own
+    if "parse" not in cls.__dict__:
+        setattr(cls, "parse", classmethod(create_parse_function(cls._streamable_fields)))
+    if "stream" not in cls.__dict__:
+        setattr(cls, "stream", create_stream_function(cls._streamable_fields))
 
     return cls
 
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures.process import ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import List, Optional, Tuple
+
+from blspy import AugSchemeMPL, G1Element, PrivateKey
+
+from taco.consensus.coinbase import create_puzzlehash_for_pk
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.util.chunks import chunks
+from taco.wallet.derive_keys import master_sk_to_wallet_sk_intermediate, master_sk_to_wallet_sk_unhardened_intermediate
+
+# the number of indexes derived at a time, by a worker process or between yielding to the event loop
+DERIVATION_BATCH_SIZE = 100
+# starting the worker processes takes longer than deriving fewer keys than this in the wallet process
+MIN_PARALLEL_DERIVATIONS = 1000
+NUM_DERIVATION_PROCESSES = 4
+
+
+def derive_keys_batch(
+    intermediate_sk: PrivateKey, hardened: bool, indexes: List[int]
+) -> List[Tuple[G1Element, bytes32]]:
+    """
+    Derives the wallet public keys at the indexes under the hardened or unhardened wallet intermediate key, with the
+    standard puzzle hashes of them.
+    """
+    derive_child_sk = AugSchemeMPL.derive_child_sk if hardened else AugSchemeMPL.derive_child_sk_unhardened
+    ret: List[Tuple[G1Element, bytes32]] = []
+    for index in indexes:
+        pubkey = derive_child_sk(intermediate_sk, index).get_g1()
+        ret.append((pubkey, create_puzzlehash_for_pk(pubkey)))
+    return ret
+
+
+def derive_keys_batch_in_worker(
+    intermediate_sk: bytes, hardened: bool, indexes: List[int]
+) -> List[Tuple[bytes, bytes32]]:
+    # runs in the worker processes, so the keys are passed as bytes
+    keys = derive_keys_batch(PrivateKey.from_bytes(intermediate_sk), hardened, indexes)
+    return [(bytes(pubkey), puzzle_hash) for pubkey, puzzle_hash in keys]
+
+
+async def derive_keys(
+    private_key: PrivateKey,
+    start_index: int,
+    end_index: int,
+    multiprocessing_context: Optional[BaseContext] = None,
+) -> Tuple[List[Tuple[G1Element, bytes32]], List[Tuple[G1Element, bytes32]]]:
+    """
+    Returns the hardened and the unhardened wallet public keys from start_index to end_index (exclusive), with their
+    standard puzzle hashes. Large ranges are split into batches that are derived by a pool of worker processes.
+    """
+    intermediate_sks = {
+        True: master_sk_to_wallet_sk_intermediate(private_key),
+        False: master_sk_to_wallet_sk_unhardened_intermediate(private_key),
+    }
+    batches = [
+        (intermediate_sks[hardened], hardened, batch)
+        for hardened in [True, False]
+        for batch in chunks(list(range(start_index, end_index)), DERIVATION_BATCH_SIZE)
+    ]
+    keys: List[Tuple[G1Element, bytes32]] = []
+    num_processes = min(NUM_DERIVATION_PROCESSES, os.cpu_count() or 1)
+    if end_index - start_index < MIN_PARALLEL_DERIVATIONS or num_processes < 2:
+        for batch in batches:
+            keys.extend(derive_keys_batch(*batch))
+            # Lets the networking layer respond to pings in between
+            await asyncio.sleep(0)
+    else:
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(num_processes, mp_context=multiprocessing_context) as executor:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, derive_keys_batch_in_worker, bytes(sk), hardened, batch)
+                    for sk, hardened, batch in batches
+                )
+            )
+        # the keys were derived by our own workers, so the subgroup check of from_bytes() isn't needed
+        keys = [
+            (G1Element.from_bytes_unchecked(pubkey), puzzle_hash)
+            for result in results
+            for pubkey, puzzle_hash in result
+        ]
+    return keys[: len(keys) // 2], keys[len(keys) // 2 :]
@@ -19,6 +19,7 @@ class PeerRequestCache:
     _blocks_validated: LRUCache[bytes32, uint32]  # header_hash -> height
     _block_signatures_validated: LRUCache[bytes32, uint32]  # sig_hash -> height
     _additions_in_block: LRUCache[Tuple[bytes32, bytes32], uint32]  # header_hash, puzzle_hash -> height
+    _removals_in_block: LRUCache[Tuple[bytes32, bytes32], uint32]  # header_hash, coin_name -> height
 
     def __init__(self) -> None:
         self._blocks = LRUCache(100)
@@ -27,7 +28,8 @@ class PeerRequestCache:
         self._timestamps = LRUCache(1000)
         self._blocks_validated = LRUCache(1000)
         self._block_signatures_validated = LRUCache(1000)
-        self._additions_in_block = LRUCache(200)
+        self._additions_in_block = LRUCache(1000)
+        self._removals_in_block = LRUCache(1000)
 
     def get_block(self, height: uint32) -> Optional[HeaderBlock]:
         return self._blocks.get(height)
@@ -87,6 +89,12 @@ class PeerRequestCache:
     def in_additions_in_block(self, header_hash: bytes32, addition_ph: bytes32) -> bool:
         return self._additions_in_block.get((header_hash, addition_ph)) is not None
 
+    def add_to_removals_in_block(self, header_hash: bytes32, coin_name: bytes32, height: uint32) -> None:
+        self._removals_in_block.put((header_hash, coin_name), height)
+
+    def in_removals_in_block(self, header_hash: bytes32, coin_name: bytes32) -> bool:
+        return self._removals_in_block.get((header_hash, coin_name)) is not None
+
     def clear_after_height(self, height: int) -> None:
         # Remove any cached item which relates to an event that happened at a height above height.
         new_blocks = LRUCache[uint32, HeaderBlock](self._blocks.capacity)
@@ -131,6 +139,12 @@ class PeerRequestCache:
                 new_additions_in_block.put((hh, ph), h)
         self._additions_in_block = new_additions_in_block
 
+        new_removals_in_block: LRUCache[Tuple[bytes32, bytes32], uint32] = LRUCache(self._removals_in_block.capacity)
+        for (hh, name), h in self._removals_in_block.cache.items():
+            if h <= height:
+                new_removals_in_block.put((hh, name), h)
+        self._removals_in_block = new_removals_in_block
+
 
 async def can_use_peer_request_cache(
     coin_state: CoinState, peer_request_cache: PeerRequestCache, fork_height: Optional[uint32]
@@ -3,8 +3,10 @@ import asyncio
 from taco.protocols.shared_protocol import Capability
 import logging
 import random
-from typing import List, Optional, Tuple, Union, Dict
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple, Union, Dict
 
+from blspy import AugSchemeMPL, G1Element, G2Element
 from chia_rs import compute_merkle_set_root
 
 from taco.consensus.constants import ConsensusConstants
@@ -31,9 +33,11 @@ from taco.types.blockchain_format.coin import hash_coin_ids, Coin
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.full_block import FullBlock
 from taco.types.header_block import HeaderBlock
+from taco.util.chunks import chunks
 from taco.util.ints import uint32
 from taco.util.merkle_set import confirm_not_included_already_hashed, confirm_included_already_hashed, MerkleSet
 from taco.wallet.util.peer_request_cache import PeerRequestCache
+from taco.wallet.wallet_proof_store import WalletProofStore
 
 log = logging.getLogger(__name__)
 
@@ -91,6 +95,36 @@ async def subscribe_to_coin_updates(
     return all_coins_state.coin_states
 
 
+async def subscribe_in_chunks(
+    items: List[bytes32],
+    subscribe: Callable[[List[bytes32]], Awaitable[List[CoinState]]],
+    receive: Callable[[List[CoinState]], Awaitable[bool]],
+    chunk_size: int,
+    max_outstanding: int,
+) -> bool:
+    """
+    Subscribes to the items in chunks. Up to max_outstanding subscriptions are sent ahead, while the responses to the
+    earlier ones are received, one at a time and in order. Returns False as soon as receiving a response fails.
+    """
+    requests = chunks(items, chunk_size)
+    in_flight: Deque[asyncio.Task[List[CoinState]]] = deque()
+    try:
+        while True:
+            # a new subscription is only sent when a response has been received, so they can't pile up
+            while len(in_flight) < max_outstanding:
+                chunk = next(requests, None)
+                if chunk is None:
+                    break
+                in_flight.append(asyncio.create_task(subscribe(chunk)))
+            if len(in_flight) == 0:
+                return True
+            if not await receive(await in_flight.popleft()):
+                return False
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
 def validate_additions(
     coins: List[Tuple[bytes32, List[Coin]]],
     proofs: Optional[List[Tuple[bytes32, bytes, Optional[bytes]]]],
@@ -203,9 +237,26 @@ def validate_removals(
 
 
 async def request_and_validate_removals(
-    peer: WSTacoConnection, height: uint32, header_hash: bytes32, coin_name: bytes32, removals_root: bytes32
+    peer: WSTacoConnection,
+    peer_request_cache: PeerRequestCache,
+    height: uint32,
+    header_hash: bytes32,
+    coin_names: List[bytes32],
+    removals_root: bytes32,
+    proof_store: Optional[WalletProofStore] = None,
 ) -> bool:
-    removals_request = RequestRemovals(height, header_hash, [coin_name])
+    """
+    Validates the removals proofs of the coins in the block, with one request for the ones that aren't cached.
+    """
+    coin_names = [name for name in coin_names if not peer_request_cache.in_removals_in_block(header_hash, name)]
+    if len(coin_names) > 0 and proof_store is not None:
+        stored = await proof_store.get_proofs(header_hash, coin_names, True)
+        for name in stored:
+            peer_request_cache.add_to_removals_in_block(header_hash, name, height)
+        coin_names = [name for name in coin_names if name not in stored]
+    if len(coin_names) == 0:
+        return True
+    removals_request = RequestRemovals(height, header_hash, coin_names)
 
     removals_res: Optional[Union[RespondRemovals, RejectRemovalsRequest]] = await peer.request_removals(
         removals_request
@@ -213,7 +264,11 @@ async def request_and_validate_removals(
     if removals_res is None or isinstance(removals_res, RejectRemovalsRequest):
         return False
     assert removals_res.proofs is not None
-    return validate_removals(removals_res.coins, removals_res.proofs, removals_root)
+    result: bool = validate_removals(removals_res.coins, removals_res.proofs, removals_root)
+    if result:
+        for name, _ in removals_res.coins:
+            peer_request_cache.add_to_removals_in_block(header_hash, name, height)
+    return result
 
 
 async def request_and_validate_additions(
@@ -221,12 +276,22 @@ async def request_and_validate_additions(
     peer_request_cache: PeerRequestCache,
     height: uint32,
     header_hash: bytes32,
-    puzzle_hash: bytes32,
+    puzzle_hashes: List[bytes32],
     additions_root: bytes32,
+    proof_store: Optional[WalletProofStore] = None,
 ) -> bool:
-    if peer_request_cache.in_additions_in_block(header_hash, puzzle_hash):
+    """
+    Validates the additions proofs of the puzzle hashes in the block, with one request for the ones that aren't cached.
+    """
+    puzzle_hashes = [ph for ph in puzzle_hashes if not peer_request_cache.in_additions_in_block(header_hash, ph)]
+    if len(puzzle_hashes) > 0 and proof_store is not None:
+        stored = await proof_store.get_proofs(header_hash, puzzle_hashes, False)
+        for puzzle_hash in stored:
+            peer_request_cache.add_to_additions_in_block(header_hash, puzzle_hash, height)
+        puzzle_hashes = [ph for ph in puzzle_hashes if ph not in stored]
+    if len(puzzle_hashes) == 0:
         return True
-    additions_request = RequestAdditions(height, header_hash, [puzzle_hash])
+    additions_request = RequestAdditions(height, header_hash, puzzle_hashes)
     additions_res: Optional[Union[RespondAdditions, RejectAdditionsRequest]] = await peer.request_additions(
         additions_request
     )
@@ -237,10 +302,34 @@ async def request_and_validate_additions(
         additions_res.proofs,
         additions_root,
     )
-    peer_request_cache.add_to_additions_in_block(header_hash, puzzle_hash, height)
+    if result:
+        for puzzle_hash, _ in additions_res.coins:
+            peer_request_cache.add_to_additions_in_block(header_hash, puzzle_hash, height)
     return result
 
 
+def foliage_transaction_block_matches(block: HeaderBlock) -> bool:
+    """
+    True if the transaction block (with the additions and removals roots) is the one the foliage commits to, so it's
+    the one of the header hash.
+    """
+    return (
+        block.foliage_transaction_block is not None
+        and block.foliage.foliage_transaction_block_hash == block.foliage_transaction_block.get_hash()
+    )
+
+
+def aggregate_verify_bytes(public_keys: List[bytes], messages: List[bytes], signatures: List[bytes]) -> bool:
+    """
+    AugSchemeMPL.aggregate_verify() of the signatures, which are passed as bytes so this can run in a worker process.
+    They are parsed unchecked, like streamable parses them.
+    """
+    aggregate_signature = AugSchemeMPL.aggregate([G2Element.from_bytes_unchecked(sig) for sig in signatures])
+    return AugSchemeMPL.aggregate_verify(
+        [G1Element.from_bytes_unchecked(pk) for pk in public_keys], messages, aggregate_signature
+    )
+
+
 def get_block_challenge(
     constants: ConsensusConstants,
     header_block: FullBlock,
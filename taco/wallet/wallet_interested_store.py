@@ -2,6 +2,7 @@ from typing import List, Tuple, Optional
 
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.util.db_wrapper import DBWrapper2
+from taco.util.hash_prefix_set import HashPrefixSet
 from taco.util.ints import uint32
 
 
@@ -11,6 +12,8 @@ class WalletInterestedStore:
     """
 
     db_wrapper: DBWrapper2
+    # the interested puzzle hashes, lookups of other ones don't need to query the db
+    puzzle_hash_index: HashPrefixSet
 
     @classmethod
     async def create(cls, wrapper: DBWrapper2):
@@ -28,6 +31,9 @@ class WalletInterestedStore:
             fields = "asset_id text PRIMARY KEY, name text, first_seen_height integer, sender_puzzle_hash text"
             await conn.execute(f"CREATE TABLE IF NOT EXISTS unacknowledged_asset_tokens({fields})")
 
+            rows = await conn.execute_fetchall("SELECT puzzle_hash FROM interested_puzzle_hashes")
+            self.puzzle_hash_index = HashPrefixSet(bytes32.fromhex(row[0]) for row in rows)
+
         return self
 
     async def get_interested_coin_ids(self) -> List[bytes32]:
@@ -49,6 +55,8 @@ class WalletInterestedStore:
         return [(bytes32(bytes.fromhex(row[0])), row[1]) for row in rows_hex]
 
     async def get_interested_puzzle_hash_wallet_id(self, puzzle_hash: bytes32) -> Optional[int]:
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return None
         async with self.db_wrapper.reader_no_transaction() as conn:
             cursor = await conn.execute(
                 "SELECT wallet_id FROM interested_puzzle_hashes WHERE puzzle_hash=?", (puzzle_hash.hex(),)
@@ -59,7 +67,7 @@ class WalletInterestedStore:
         return row[0]
 
     async def add_interested_puzzle_hash(self, puzzle_hash: bytes32, wallet_id: int) -> None:
-
+        self.puzzle_hash_index.add(puzzle_hash)
         async with self.db_wrapper.writer_maybe_transaction() as conn:
             cursor = await conn.execute(
                 "INSERT OR REPLACE INTO interested_puzzle_hashes VALUES (?, ?)", (puzzle_hash.hex(), wallet_id)
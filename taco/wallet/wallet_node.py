@@ -7,9 +7,9 @@ import sys
 import time
 import traceback
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from blspy import AugSchemeMPL, PrivateKey, G2Element, G1Element
+from blspy import PrivateKey, G2Element, G1Element
 from packaging.version import Version
 
 from taco.consensus.block_record import BlockRecord
@@ -54,13 +54,16 @@ from taco.wallet.transaction_record import TransactionRecord
 from taco.wallet.util.new_peak_queue import NewPeakItem, NewPeakQueue, NewPeakQueueTypes
 from taco.wallet.util.peer_request_cache import PeerRequestCache, can_use_peer_request_cache
 from taco.wallet.util.wallet_sync_utils import (
+    aggregate_verify_bytes,
     fetch_header_blocks_in_range,
     fetch_last_tx_from_peer,
+    foliage_transaction_block_matches,
     last_change_height_cs,
     PeerRequestException,
     request_and_validate_additions,
     request_and_validate_removals,
     request_header_blocks,
+    subscribe_in_chunks,
     subscribe_to_coin_updates,
     subscribe_to_phs,
 )
@@ -590,6 +593,7 @@ class WalletNode:
             try:
                 removed_wallet_ids = await self.wallet_state_manager.reorg_rollback(fork_height)
                 await self.wallet_state_manager.blockchain.set_finished_sync_up_to(fork_height, in_rollback=True)
+                await self.wallet_state_manager.proof_store.rollback_to_block(fork_height)
                 if cache is None:
                     self.rollback_request_caches(fork_height)
                 else:
@@ -645,55 +649,60 @@ class WalletNode:
             await self.perform_atomic_rollback(fork_height)
             await self.update_ui()
 
-        # We only process new state updates to avoid slow reprocessing. We set the sync height after adding
-        # Things, so we don't have to reprocess these later. There can be many things in ph_update_res.
+        # Several subscriptions are sent ahead, the full node works on them while we process the earlier responses
+        max_outstanding: int = self.config.get("max_outstanding_subscriptions", 4)
+
+        async def receive_ph_updates(ph_update_res: List[CoinState]) -> bool:
+            # We only process new state updates to avoid slow reprocessing. We set the sync height after adding
+            # Things, so we don't have to reprocess these later. There can be many things in ph_update_res.
+            ph_update_res = list(filter(is_new_state_update, ph_update_res))
+            return await self.receive_state_from_peer(ph_update_res, full_node, update_finished_height=True)
+
         already_checked_ph: Set[bytes32] = set()
-        continue_while: bool = True
-        all_puzzle_hashes: List[bytes32] = await self.get_puzzle_hashes_to_subscribe()
-        while continue_while:
-            # Get all phs from puzzle store
-            ph_chunks: Iterator[List[bytes32]] = chunks(all_puzzle_hashes, 1000)
-            for chunk in ph_chunks:
-                ph_update_res: List[CoinState] = await subscribe_to_phs(
-                    [p for p in chunk if p not in already_checked_ph], full_node, 0
-                )
-                ph_update_res = list(filter(is_new_state_update, ph_update_res))
-                if not await self.receive_state_from_peer(ph_update_res, full_node, update_finished_height=True):
-                    # If something goes wrong, abort sync
-                    return
-                already_checked_ph.update(chunk)
+        new_puzzle_hashes: List[bytes32] = await self.get_puzzle_hashes_to_subscribe()
+        while len(new_puzzle_hashes) > 0:
+            if not await subscribe_in_chunks(
+                new_puzzle_hashes,
+                lambda chunk: subscribe_to_phs(chunk, full_node, 0),
+                receive_ph_updates,
+                1000,
+                max_outstanding,
+            ):
+                # If something goes wrong, abort sync
+                return
+            already_checked_ph.update(new_puzzle_hashes)
 
-            # Check if new puzzle hashed have been created
+            # Check if new puzzle hashes have been created, only those are subscribed to in the next round
             await self.wallet_state_manager.create_more_puzzle_hashes()
-            all_puzzle_hashes = await self.get_puzzle_hashes_to_subscribe()
-            continue_while = False
-            for ph in all_puzzle_hashes:
-                if ph not in already_checked_ph:
-                    continue_while = True
-                    break
+            new_puzzle_hashes = [
+                ph for ph in await self.get_puzzle_hashes_to_subscribe() if ph not in already_checked_ph
+            ]
         self.log.info(f"Successfully subscribed and updated {len(already_checked_ph)} puzzle hashes")
 
+        async def receive_coin_updates(c_update_res: List[CoinState]) -> bool:
+            return await self.receive_state_from_peer(c_update_res, full_node)
+
         # The number of coin id updates are usually going to be significantly less than ph updates, so we can
         # sync from 0 every time.
-        continue_while = True
-        all_coin_ids: List[bytes32] = await self.get_coin_ids_to_subscribe(0)
         already_checked_coin_ids: Set[bytes32] = set()
-        while continue_while:
-            one_k_chunks = chunks(all_coin_ids, 1000)
-            for chunk in one_k_chunks:
-                c_update_res: List[CoinState] = await subscribe_to_coin_updates(chunk, full_node, 0)
-
-                if not await self.receive_state_from_peer(c_update_res, full_node):
-                    # If something goes wrong, abort sync
-                    return
-                already_checked_coin_ids.update(chunk)
+        new_coin_ids: List[bytes32] = await self.get_coin_ids_to_subscribe(0)
+        while len(new_coin_ids) > 0:
+            if not await subscribe_in_chunks(
+                new_coin_ids,
+                lambda chunk: subscribe_to_coin_updates(chunk, full_node, 0),
+                receive_coin_updates,
+                1000,
+                max_outstanding,
+            ):
+                # If something goes wrong, abort sync
+                return
+            already_checked_coin_ids.update(new_coin_ids)
 
-            all_coin_ids = await self.get_coin_ids_to_subscribe(0)
-            continue_while = False
-            for coin_id in all_coin_ids:
-                if coin_id not in already_checked_coin_ids:
-                    continue_while = True
-                    break
+            new_coin_ids = [
+                coin_id
+                for coin_id in await self.get_coin_ids_to_subscribe(0)
+                if coin_id not in already_checked_coin_ids
+            ]
         self.log.info(f"Successfully subscribed and updated {len(already_checked_coin_ids)} coin ids")
 
         # Only update this fully when the entire sync has completed
@@ -773,6 +782,7 @@ class WalletNode:
                         for inner_state in inner_states:
                             self.add_state_to_race_cache(header_hash, height, inner_state)
                             self.log.info(f"Added to race cache: {height}, {inner_state}")
+                    await self.prefetch_state_proofs(inner_states, peer, cache, fork_height)
                     valid_states = [
                         inner_state
                         for inner_state in inner_states
@@ -988,6 +998,10 @@ class WalletNode:
             if cache_ts is not None:
                 return cache_ts
 
+        stored_ts = await self.wallet_state_manager.proof_store.get_timestamp(height)
+        if stored_ts is not None:
+            return stored_ts
+
         peers: List[WSTacoConnection] = self.get_full_node_peers_in_order()
         last_tx_block: Optional[HeaderBlock] = None
         for peer in peers:
@@ -1272,11 +1286,15 @@ class WalletNode:
             old_proof = self.wallet_state_manager.blockchain.synced_weight_proof
             fork_point = get_wp_fork_point(self.constants, old_proof, weight_proof)
             start_validation = time.time()
+
+            def log_progress(validated: int, queued: int) -> None:
+                self.log.debug(f"validated {validated} of the {queued} weight proof VDFs found so far")
+
             (
                 valid,
                 summaries,
                 block_records,
-            ) = await self._weight_proof_handler.validate_weight_proof(weight_proof, False, old_proof)
+            ) = await self._weight_proof_handler.validate_weight_proof(weight_proof, False, old_proof, log_progress)
             if not valid:
                 raise Exception("weight proof failed validation")
             self.valid_wp_cache[weight_proof.get_hash()] = valid, fork_point, summaries, block_records
@@ -1301,6 +1319,76 @@ class WalletNode:
         all_coin_names.update(await self.wallet_state_manager.interested_store.get_interested_coin_ids())
         return list(all_coin_names)
 
+    async def prefetch_state_proofs(
+        self,
+        coin_states: List[CoinState],
+        peer: WSTacoConnection,
+        peer_request_cache: PeerRequestCache,
+        fork_height: Optional[uint32],
+    ) -> None:
+        """
+        Fetches the header blocks of the heights the coin states were created and spent at, with the additions and
+        removals proofs of all the coins of each height in one request, so validate_received_state_from_peer() finds
+        them in the peer request cache instead of requesting them one coin at a time. Failures are left for it to
+        handle.
+        """
+        puzzle_hashes_at: Dict[uint32, List[bytes32]] = {}
+        coin_names_at: Dict[uint32, List[bytes32]] = {}
+        for coin_state in coin_states:
+            if await can_use_peer_request_cache(coin_state, peer_request_cache, fork_height):
+                continue
+            if coin_state.created_height is not None:
+                puzzle_hashes_at.setdefault(uint32(coin_state.created_height), []).append(coin_state.coin.puzzle_hash)
+            if coin_state.spent_height is not None:
+                coin_names_at.setdefault(uint32(coin_state.spent_height), []).append(coin_state.coin.name())
+
+        async def prefetch_height(height: uint32) -> None:
+            block = await self.get_cached_header_block(height, peer_request_cache, fork_height)
+            if block is None:
+                blocks = await request_header_blocks(peer, height, height)
+                if blocks is None:
+                    return
+                block = blocks[0]
+                peer_request_cache.add_to_blocks(block)
+            if block.foliage_transaction_block is None:
+                return
+            if height in puzzle_hashes_at:
+                await request_and_validate_additions(
+                    peer,
+                    peer_request_cache,
+                    height,
+                    block.header_hash,
+                    puzzle_hashes_at[height],
+                    block.foliage_transaction_block.additions_root,
+                    self.wallet_state_manager.proof_store,
+                )
+            if height in coin_names_at:
+                await request_and_validate_removals(
+                    peer,
+                    peer_request_cache,
+                    height,
+                    block.header_hash,
+                    coin_names_at[height],
+                    block.foliage_transaction_block.removals_root,
+                    self.wallet_state_manager.proof_store,
+                )
+
+        await asyncio.gather(*(prefetch_height(h) for h in puzzle_hashes_at.keys() | coin_names_at.keys()))
+
+    async def get_cached_header_block(
+        self, height: uint32, peer_request_cache: PeerRequestCache, fork_height: Optional[uint32]
+    ) -> Optional[HeaderBlock]:
+        """
+        Returns the header block at the height from the peer request cache, or from the blocks that were validated
+        before. Those are only used up to the fork point, above it they might not be in the chain of the peer.
+        """
+        block = peer_request_cache.get_block(height)
+        if block is None and (fork_height is None or height <= fork_height):
+            block = await self.wallet_state_manager.proof_store.get_header_block(height)
+            if block is not None:
+                peer_request_cache.add_to_blocks(block)
+        return block
+
     async def validate_received_state_from_peer(
         self,
         coin_state: CoinState,
@@ -1350,8 +1438,10 @@ class WalletNode:
             confirmed_height = current.confirmed_block_height
 
         # request header block for created height
-        state_block: Optional[HeaderBlock] = peer_request_cache.get_block(confirmed_height)
-        if state_block is None or reorg_mode:
+        state_block: Optional[HeaderBlock] = None
+        if not reorg_mode:
+            state_block = await self.get_cached_header_block(confirmed_height, peer_request_cache, fork_height)
+        if state_block is None:
             state_blocks = await request_header_blocks(peer, confirmed_height, confirmed_height)
             if state_blocks is None:
                 return False
@@ -1366,8 +1456,9 @@ class WalletNode:
             peer_request_cache,
             state_block.height,
             state_block.header_hash,
-            coin_state.coin.puzzle_hash,
+            [coin_state.coin.puzzle_hash],
             state_block.foliage_transaction_block.additions_root,
+            self.wallet_state_manager.proof_store,
         )
 
         if validate_additions_result is False:
@@ -1378,7 +1469,7 @@ class WalletNode:
         # If spent_height is None, we need to validate that the creation block is actually in the longest blockchain.
         # Otherwise, we don't have to, since we will validate the spent block later.
         if coin_state.spent_height is None:
-            validated = await self.validate_block_inclusion(state_block, peer, peer_request_cache)
+            validated = await self.validate_block_inclusion(state_block, peer, peer_request_cache, fork_height)
             if not validated:
                 return False
 
@@ -1400,22 +1491,26 @@ class WalletNode:
 
                 validate_removals_result: bool = await request_and_validate_removals(
                     peer,
+                    peer_request_cache,
                     current.spent_block_height,
                     spent_state_block.header_hash,
-                    coin_state.coin.name(),
+                    [coin_state.coin.name()],
                     spent_state_block.foliage_transaction_block.removals_root,
+                    self.wallet_state_manager.proof_store,
                 )
                 if validate_removals_result is False:
                     self.log.warning("Validate false 2")
                     await peer.close(9999)
                     return False
-                validated = await self.validate_block_inclusion(spent_state_block, peer, peer_request_cache)
+                validated = await self.validate_block_inclusion(
+                    spent_state_block, peer, peer_request_cache, fork_height
+                )
                 if not validated:
                     return False
 
         if spent_height is not None:
             # request header block for created height
-            cached_spent_state_block = peer_request_cache.get_block(spent_height)
+            cached_spent_state_block = await self.get_cached_header_block(spent_height, peer_request_cache, fork_height)
             if cached_spent_state_block is None:
                 spent_state_blocks = await request_header_blocks(peer, spent_height, spent_height)
                 if spent_state_blocks is None:
@@ -1430,24 +1525,45 @@ class WalletNode:
             assert spent_state_block.foliage_transaction_block is not None
             validate_removals_result = await request_and_validate_removals(
                 peer,
+                peer_request_cache,
                 spent_state_block.height,
                 spent_state_block.header_hash,
-                coin_state.coin.name(),
+                [coin_state.coin.name()],
                 spent_state_block.foliage_transaction_block.removals_root,
+                self.wallet_state_manager.proof_store,
             )
             if validate_removals_result is False:
                 self.log.warning("Validate false 3")
                 await peer.close(9999)
                 return False
-            validated = await self.validate_block_inclusion(spent_state_block, peer, peer_request_cache)
+            validated = await self.validate_block_inclusion(spent_state_block, peer, peer_request_cache, fork_height)
             if not validated:
                 return False
+
+        # What was validated is kept for the next time it's needed, after a restart or with another peer. The blocks
+        # are checked against their foliage, so the stored roots are the ones of their header hash
+        blocks_in_chain: List[HeaderBlock] = []
+        proofs: List[Tuple[bytes32, bytes32, bool, uint32]] = []
+        if not reorg_mode and foliage_transaction_block_matches(state_block):
+            proofs.append((state_block.header_hash, coin_state.coin.puzzle_hash, False, state_block.height))
+            if spent_height is None:
+                blocks_in_chain.append(state_block)
+        if spent_height is not None and foliage_transaction_block_matches(spent_state_block):
+            proofs.append((spent_state_block.header_hash, coin_state.coin.name(), True, spent_state_block.height))
+            blocks_in_chain.append(spent_state_block)
+        async with self.wallet_state_manager.db_wrapper.writer_maybe_transaction():
+            await self.wallet_state_manager.proof_store.add_header_blocks(blocks_in_chain)
+            await self.wallet_state_manager.proof_store.add_proofs(proofs)
         peer_request_cache.add_to_states_validated(coin_state)
 
         return True
 
     async def validate_block_inclusion(
-        self, block: HeaderBlock, peer: WSTacoConnection, peer_request_cache: PeerRequestCache
+        self,
+        block: HeaderBlock,
+        peer: WSTacoConnection,
+        peer_request_cache: PeerRequestCache,
+        fork_height: Optional[uint32] = None,
     ) -> bool:
         if self.wallet_state_manager.blockchain.contains_height(block.height):
             stored_hash = self.wallet_state_manager.blockchain.height_to_hash(block.height)
@@ -1470,6 +1586,13 @@ class WalletNode:
                 return False
             return True
 
+        # validated before, after the last rollback. Like in get_cached_header_block(), only up to the fork point,
+        # above it the block might not be in the chain of the peer
+        if (
+            fork_height is None or block.height <= fork_height
+        ) and await self.wallet_state_manager.proof_store.contains_header_block(block.header_hash):
+            return True
+
         # block is not included in wp recent chain
         start = block.height + 1
         compare_to_recent = False
@@ -1587,8 +1710,7 @@ class WalletNode:
                         return False
                 blocks_to_cache.append((reward_chain_hash, en_block.height))
 
-        agg_sig: G2Element = AugSchemeMPL.aggregate([sig for (_, _, sig) in pk_m_sig])
-        if not AugSchemeMPL.aggregate_verify([pk for (pk, _, _) in pk_m_sig], [m for (_, m, _) in pk_m_sig], agg_sig):
+        if not await self.validate_signatures(pk_m_sig):
             self.log.error("Failed signature validation")
             return False
         for header_block in sigs_to_cache:
@@ -1597,6 +1719,18 @@ class WalletNode:
             peer_request_cache.add_to_blocks_validated(reward_chain_hash, height)
         return True
 
+    async def validate_signatures(self, pk_m_sig: List[Tuple[G1Element, bytes32, G2Element]]) -> bool:
+        # The pairings are the most expensive part of validating the states of untrusted peers, they run in the
+        # worker processes of the weight proof handler while the event loop fetches the proofs of the next states
+        args = (
+            [bytes(pk) for pk, _, _ in pk_m_sig],
+            [bytes(m) for _, m, _ in pk_m_sig],
+            [bytes(sig) for _, _, sig in pk_m_sig],
+        )
+        if len(pk_m_sig) == 0 or self._weight_proof_handler is None:
+            return aggregate_verify_bytes(*args)
+        return await self._weight_proof_handler.run_in_executor(aggregate_verify_bytes, *args)
+
     async def fetch_puzzle_solution(self, height: uint32, coin: Coin, peer: WSTacoConnection) -> CoinSpend:
         solution_response = await peer.request_puzzle_solution(
             wallet_protocol.RequestPuzzleSolution(coin.name(), height)
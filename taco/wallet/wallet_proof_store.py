@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from typing import List, Optional, Set, Tuple
+
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.header_block import HeaderBlock
+from taco.util.chunks import chunks
+from taco.util.db_wrapper import DBWrapper2, execute_fetchone
+from taco.util.ints import uint32, uint64
+
+
+class WalletProofStore:
+    """
+    Persistent cache of what was validated with untrusted peers: the header blocks that were validated to be in the
+    chain, and the additions and removals proofs that were validated against the roots of a block. A PeerRequestCache
+    only lives as long as the connection to its peer, this lets the validation skip the requests to the peers after a
+    restart or when switching peers. Both tables are bounded, the oldest entries are evicted first.
+    """
+
+    db_wrapper: DBWrapper2
+    max_blocks: int
+    max_proofs: int
+    # upper bounds of the number of rows, they are counted again when they exceed the maximum
+    num_blocks: int
+    num_proofs: int
+
+    @classmethod
+    async def create(cls, db_wrapper: DBWrapper2, max_blocks: int = 2000, max_proofs: int = 100000) -> WalletProofStore:
+        self = cls()
+        self.db_wrapper = db_wrapper
+        self.max_blocks = max_blocks
+        self.max_proofs = max_proofs
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS proof_header_blocks("
+                " header_hash blob PRIMARY KEY,"
+                " height int,"
+                " timestamp int,"
+                " block blob)"
+            )
+            await conn.execute("CREATE INDEX IF NOT EXISTS proof_header_blocks_height on proof_header_blocks(height)")
+            # the puzzle hashes of the additions proofs and the coin names of the removals proofs
+            await conn.execute(
+                "CREATE TABLE IF NOT EXISTS proofs("
+                " header_hash blob,"
+                " name blob,"
+                " removal tinyint,"
+                " height int,"
+                " PRIMARY KEY(header_hash, name, removal))"
+            )
+            await conn.execute("CREATE INDEX IF NOT EXISTS proofs_height on proofs(height)")
+
+            row = await execute_fetchone(conn, "SELECT COUNT(*) FROM proof_header_blocks")
+            self.num_blocks = 0 if row is None else row[0]
+            row = await execute_fetchone(conn, "SELECT COUNT(*) FROM proofs")
+            self.num_proofs = 0 if row is None else row[0]
+        return self
+
+    async def add_header_blocks(self, blocks: List[HeaderBlock]) -> None:
+        """
+        Adds header blocks whose inclusion in the chain was validated.
+        """
+        if len(blocks) == 0:
+            return
+        rows = [
+            (
+                block.header_hash,
+                block.height,
+                None if block.foliage_transaction_block is None else block.foliage_transaction_block.timestamp,
+                bytes(block),
+            )
+            for block in blocks
+        ]
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await conn.executemany("INSERT OR REPLACE INTO proof_header_blocks VALUES(?, ?, ?, ?)", rows)
+            self.num_blocks += len(rows)
+            if self.num_blocks > self.max_blocks:
+                # A replaced row gets a new rowid, so the rows that were added again are evicted last
+                await conn.execute(
+                    "DELETE FROM proof_header_blocks WHERE rowid IN "
+                    "(SELECT rowid FROM proof_header_blocks ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_blocks,),
+                )
+                row = await execute_fetchone(conn, "SELECT COUNT(*) FROM proof_header_blocks")
+                self.num_blocks = 0 if row is None else row[0]
+
+    async def get_header_block(self, height: uint32) -> Optional[HeaderBlock]:
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            row = await execute_fetchone(
+                conn, "SELECT block FROM proof_header_blocks WHERE height=? ORDER BY rowid DESC LIMIT 1", (height,)
+            )
+        return None if row is None else HeaderBlock.from_bytes(row[0])
+
+    async def contains_header_block(self, header_hash: bytes32) -> bool:
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            row = await execute_fetchone(
+                conn, "SELECT header_hash FROM proof_header_blocks WHERE header_hash=?", (header_hash,)
+            )
+        return row is not None
+
+    async def get_timestamp(self, height: uint32) -> Optional[uint64]:
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            row = await execute_fetchone(
+                conn, "SELECT timestamp FROM proof_header_blocks WHERE height=? AND timestamp IS NOT NULL", (height,)
+            )
+        return None if row is None else uint64(row[0])
+
+    async def add_proofs(self, proofs: List[Tuple[bytes32, bytes32, bool, uint32]]) -> None:
+        """
+        Adds the (header hash, puzzle hash or coin name, removal, height) of additions and removals proofs that were
+        validated against the roots of the block.
+        """
+        if len(proofs) == 0:
+            return
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await conn.executemany(
+                "INSERT OR REPLACE INTO proofs VALUES(?, ?, ?, ?)",
+                [(header_hash, name, int(removal), height) for header_hash, name, removal, height in proofs],
+            )
+            self.num_proofs += len(proofs)
+            if self.num_proofs > self.max_proofs:
+                await conn.execute(
+                    "DELETE FROM proofs WHERE rowid IN "
+                    "(SELECT rowid FROM proofs ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_proofs,),
+                )
+                row = await execute_fetchone(conn, "SELECT COUNT(*) FROM proofs")
+                self.num_proofs = 0 if row is None else row[0]
+
+    async def get_proofs(self, header_hash: bytes32, names: List[bytes32], removal: bool) -> Set[bytes32]:
+        """
+        Returns the puzzle hashes (or the coin names, for removals) that have a validated proof in the block.
+        """
+        ret: Set[bytes32] = set()
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            # windows has sqlite limits of 999 per query
+            for batch in chunks(names, 900):
+                rows = await conn.execute_fetchall(
+                    f"SELECT name FROM proofs WHERE header_hash=? AND removal=? "
+                    f"AND name IN ({','.join('?' * len(batch))})",
+                    (header_hash, int(removal), *batch),
+                )
+                ret.update(bytes32(row[0]) for row in rows)
+        return ret
+
+    async def rollback_to_block(self, height: int) -> None:
+        """
+        Removes the blocks and proofs above the height, they might not be in the chain anymore.
+        """
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            await conn.execute("DELETE FROM proof_header_blocks WHERE height>?", (height,))
+            await conn.execute("DELETE FROM proofs WHERE height>?", (height,))
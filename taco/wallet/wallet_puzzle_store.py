@@ -8,6 +8,7 @@ from blspy import G1Element
 
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.util.db_wrapper import DBWrapper2, execute_fetchone
+from taco.util.hash_prefix_set import HashPrefixSet
 from taco.util.ints import uint32
 from taco.util.lru_cache import LRUCache
 from taco.wallet.derivation_record import DerivationRecord
@@ -26,6 +27,8 @@ class WalletPuzzleStore:
     lock: asyncio.Lock
     db_wrapper: DBWrapper2
     wallet_info_for_ph_cache: LRUCache
+    # all the puzzle hashes in derivation_paths, lookups of other puzzle hashes don't need to query the db
+    puzzle_hash_index: HashPrefixSet
     # maps wallet_id -> last_derivation_index
     last_wallet_derivation_index: Dict[uint32, uint32]
     last_derivation_index: Optional[uint32]
@@ -62,6 +65,9 @@ class WalletPuzzleStore:
 
             await conn.execute("CREATE INDEX IF NOT EXISTS used on derivation_paths(wallet_type)")
 
+            rows = await conn.execute_fetchall("SELECT puzzle_hash FROM derivation_paths")
+            self.puzzle_hash_index = HashPrefixSet(bytes32.fromhex(row[0]) for row in rows)
+
         # the lock is locked by the users of this class
         self.lock = asyncio.Lock()
         self.wallet_info_for_ph_cache = LRUCache(100)
@@ -75,6 +81,8 @@ class WalletPuzzleStore:
         """
         if len(records) == 0:
             return
+        # Before the insert, so a lookup never misses a puzzle hash that's in the db
+        self.puzzle_hash_index.add_many(record.puzzle_hash for record in records)
         sql_records = []
         for record in records:
             log.debug("Adding derivation record: %s", record)
@@ -138,6 +146,9 @@ class WalletPuzzleStore:
         """
         Returns the derivation record by index and wallet id.
         """
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return None
+
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(
                 conn,
@@ -166,6 +177,8 @@ class WalletPuzzleStore:
         """
         Checks if passed puzzle_hash is present in the db.
         """
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return False
 
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(
@@ -222,6 +235,9 @@ class WalletPuzzleStore:
         Returns the derivation path for the puzzle_hash.
         Returns None if not present.
         """
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return None
+
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(
                 conn, "SELECT derivation_index FROM derivation_paths WHERE puzzle_hash=?", (puzzle_hash.hex(),)
@@ -233,6 +249,9 @@ class WalletPuzzleStore:
         Returns the derivation path for the puzzle_hash.
         Returns None if not present.
         """
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return None
+
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(
                 conn,
@@ -252,6 +271,9 @@ class WalletPuzzleStore:
         Returns the derivation path for the puzzle_hash.
         Returns None if not present.
         """
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return None
+
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(
                 conn,
@@ -275,6 +297,8 @@ class WalletPuzzleStore:
         cached = self.wallet_info_for_ph_cache.get(puzzle_hash)
         if cached is not None:
             return cached
+        if not self.puzzle_hash_index.may_contain(puzzle_hash):
+            return None
 
         async with self.db_wrapper.reader_no_transaction() as conn:
             row = await execute_fetchone(
@@ -31,6 +31,7 @@ from taco.types.coin_spend import CoinSpend
 from taco.types.full_block import FullBlock
 from taco.types.mempool_inclusion_status import MempoolInclusionStatus
 from taco.util.bech32m import encode_puzzle_hash
+from taco.util.config import process_config_start_method
 from taco.util.db_synchronous import db_synchronous_on
 from taco.util.db_wrapper import DBWrapper2
 from taco.util.errors import Err
@@ -42,14 +43,7 @@ from taco.wallet.cat_wallet.cat_utils import construct_cat_puzzle, match_cat_puz
 from taco.wallet.cat_wallet.cat_wallet import CATWallet
 from taco.wallet.db_wallet.db_wallet_puzzles import MIRROR_PUZZLE_HASH
 from taco.wallet.derivation_record import DerivationRecord
-from taco.wallet.derive_keys import (
-    master_sk_to_wallet_sk,
-    master_sk_to_wallet_sk_unhardened,
-    master_sk_to_wallet_sk_intermediate,
-    _derive_path,
-    master_sk_to_wallet_sk_unhardened_intermediate,
-    _derive_path_unhardened,
-)
+from taco.wallet.derive_keys import master_sk_to_wallet_sk, master_sk_to_wallet_sk_unhardened
 from taco.wallet.did_wallet.did_info import DIDInfo
 from taco.wallet.wallet_protocol import WalletProtocol
 from taco.wallet.did_wallet.did_wallet import DIDWallet
@@ -67,6 +61,7 @@ from taco.wallet.settings.user_settings import UserSettings
 from taco.wallet.trade_manager import TradeManager
 from taco.wallet.transaction_record import TransactionRecord
 from taco.wallet.util.address_type import AddressType
+from taco.wallet.util.batch_derivation import derive_keys
 from taco.wallet.util.compute_hints import compute_coin_hints
 from taco.wallet.util.transaction_type import TransactionType
 from taco.wallet.util.wallet_sync_utils import last_change_height_cs, PeerRequestException
@@ -79,6 +74,7 @@ from taco.wallet.wallet_info import WalletInfo
 from taco.wallet.wallet_interested_store import WalletInterestedStore
 from taco.wallet.wallet_nft_store import WalletNftStore
 from taco.wallet.wallet_pool_store import WalletPoolStore
+from taco.wallet.wallet_proof_store import WalletProofStore
 from taco.wallet.wallet_puzzle_store import WalletPuzzleStore
 from taco.wallet.wallet_retry_store import WalletRetryStore
 from taco.wallet.wallet_transaction_store import WalletTransactionStore
@@ -125,6 +121,7 @@ class WalletStateManager:
     coin_store: WalletCoinStore
     interested_store: WalletInterestedStore
     retry_store: WalletRetryStore
+    proof_store: WalletProofStore
     multiprocessing_context: multiprocessing.context.BaseContext
     server: TacoServer
     root_path: Path
@@ -168,6 +165,9 @@ class WalletStateManager:
             synchronous=db_synchronous_on(self.config.get("db_sync", "auto")),
         )
 
+        self.multiprocessing_context = multiprocessing.get_context(
+            method=process_config_start_method(config=self.config, log=self.log)
+        )
         self.initial_num_public_keys = config["initial_num_public_keys"]
         min_num_public_keys = 425
         if not config.get("testing", False) and self.initial_num_public_keys < min_num_public_keys:
@@ -186,6 +186,11 @@ class WalletStateManager:
         self.dl_store = await DataLayerStore.create(self.db_wrapper)
         self.interested_store = await WalletInterestedStore.create(self.db_wrapper)
         self.retry_store = await WalletRetryStore.create(self.db_wrapper)
+        self.proof_store = await WalletProofStore.create(
+            self.db_wrapper,
+            self.config.get("proof_cache_max_blocks", 2000),
+            self.config.get("proof_cache_max_proofs", 100000),
+        )
         self.default_cats = DEFAULT_CATS
 
         self.wallet_node = wallet_node
@@ -295,8 +300,11 @@ class WalletStateManager:
         self.log.debug(f"Requested to generate puzzle hashes to at least index {unused}")
         start_t = time.time()
         to_generate = num_additional_phs if num_additional_phs is not None else self.initial_num_public_keys
+        last_index = unused + to_generate
         new_paths: bool = False
 
+        # The keys are the same for all the wallets, they are derived once, from the lowest index any wallet needs
+        start_indexes: Dict[uint32, int] = {}
         for wallet_id in targets:
             target_wallet = self.wallets[wallet_id]
             if not target_wallet.require_derivation_paths():
@@ -307,7 +315,6 @@ class WalletStateManager:
                 "Fetched last record for wallet %r:  %s (from_zero=%r, unused=%r)", wallet_id, last, from_zero, unused
             )
             start_index = 0
-            derivation_paths: List[DerivationRecord] = []
 
             if last is not None:
                 start_index = last + 1
@@ -315,68 +322,61 @@ class WalletStateManager:
             # If the key was replaced (from_zero=True), we should generate the puzzle hashes for the new key
             if from_zero:
                 start_index = 0
-            last_index = unused + to_generate
             if start_index >= last_index:
                 self.log.debug(f"Nothing to create for for wallet_id: {wallet_id}, index: {start_index}")
-            else:
-                creating_msg = (
-                    f"Creating puzzle hashes from {start_index} to {last_index - 1} for wallet_id: {wallet_id}"
-                )
-                self.log.info(f"Start: {creating_msg}")
-                intermediate_sk = master_sk_to_wallet_sk_intermediate(self.private_key)
-                intermediate_sk_un = master_sk_to_wallet_sk_unhardened_intermediate(self.private_key)
-                for index in range(start_index, last_index):
-                    if WalletType(target_wallet.type()) == WalletType.POOLING_WALLET:
-                        continue
+            elif WalletType(target_wallet.type()) != WalletType.POOLING_WALLET:
+                start_indexes[wallet_id] = start_index
 
-                    # Hardened
-                    pubkey: G1Element = _derive_path(intermediate_sk, [index]).get_g1()
-                    puzzlehash: Optional[bytes32] = target_wallet.puzzle_hash_for_pk(pubkey)
+        derivation_paths: List[DerivationRecord] = []
+        new_derivation_indexes: List[uint32] = []
+        if len(start_indexes) > 0:
+            first_index = min(start_indexes.values())
+            keys = await derive_keys(self.private_key, first_index, last_index, self.multiprocessing_context)
+        for wallet_id, start_index in start_indexes.items():
+            target_wallet = self.wallets[wallet_id]
+            wallet_type = WalletType(target_wallet.type())
+            creating_msg = f"Creating puzzle hashes from {start_index} to {last_index - 1} for wallet_id: {wallet_id}"
+            self.log.info(f"Start: {creating_msg}")
+            wallet_paths: List[DerivationRecord] = []
+            failed = False
+            for index in range(start_index, last_index):
+                # Hardened and unhardened
+                for hardened, (pubkey, puzzlehash) in [
+                    (True, keys[0][index - first_index]),
+                    (False, keys[1][index - first_index]),
+                ]:
+                    if wallet_type != WalletType.STANDARD_WALLET:
+                        # The derived puzzle hashes are the ones of the standard wallet
+                        puzzlehash = target_wallet.puzzle_hash_for_pk(pubkey)
                     if puzzlehash is None:
                         self.log.error(f"Unable to create puzzles with wallet {target_wallet}")
+                        failed = True
                         break
                     self.log.debug(f"Puzzle at index {index} wallet ID {wallet_id} puzzle hash {puzzlehash.hex()}")
                     new_paths = True
-                    derivation_paths.append(
-                        DerivationRecord(
-                            uint32(index),
-                            puzzlehash,
-                            pubkey,
-                            WalletType(target_wallet.type()),
-                            uint32(target_wallet.id()),
-                            True,
-                        )
-                    )
-                    # Unhardened
-                    pubkey_unhardened: G1Element = _derive_path_unhardened(intermediate_sk_un, [index]).get_g1()
-                    puzzlehash_unhardened: Optional[bytes32] = target_wallet.puzzle_hash_for_pk(pubkey_unhardened)
-                    if puzzlehash_unhardened is None:
-                        self.log.error(f"Unable to create puzzles with wallet {target_wallet}")
-                        break
-                    self.log.debug(
-                        f"Puzzle at index {index} wallet ID {wallet_id} puzzle hash {puzzlehash_unhardened.hex()}"
-                    )
-                    # We await sleep here to allow an asyncio context switch (since the other parts of this loop do
-                    # not have await and therefore block). This can prevent networking layer from responding to ping.
-                    await asyncio.sleep(0)
-                    derivation_paths.append(
+                    wallet_paths.append(
                         DerivationRecord(
-                            uint32(index),
-                            puzzlehash_unhardened,
-                            pubkey_unhardened,
-                            WalletType(target_wallet.type()),
-                            uint32(target_wallet.id()),
-                            False,
+                            uint32(index), puzzlehash, pubkey, wallet_type, uint32(target_wallet.id()), hardened
                         )
                     )
-                self.log.info(f"Done: {creating_msg} Time: {time.time() - start_t} seconds")
-            await self.puzzle_store.add_derivation_paths(derivation_paths)
-            await self.add_interested_puzzle_hashes(
-                [record.puzzle_hash for record in derivation_paths],
-                [record.wallet_id for record in derivation_paths],
-            )
-            if len(derivation_paths) > 0:
-                self.state_changed("new_derivation_index", data_object={"index": derivation_paths[-1].index})
+                if failed:
+                    break
+                # We await sleep here to allow an asyncio context switch (since the other parts of this loop do
+                # not have await and therefore block). This can prevent networking layer from responding to ping.
+                await asyncio.sleep(0)
+            self.log.info(f"Done: {creating_msg} Time: {time.time() - start_t} seconds")
+            derivation_paths.extend(wallet_paths)
+            if len(wallet_paths) > 0:
+                new_derivation_indexes.append(wallet_paths[-1].index)
+
+        # The paths of all the wallets are added at once
+        await self.puzzle_store.add_derivation_paths(derivation_paths)
+        await self.add_interested_puzzle_hashes(
+            [record.puzzle_hash for record in derivation_paths],
+            [record.wallet_id for record in derivation_paths],
+        )
+        for index in new_derivation_indexes:
+            self.state_changed("new_derivation_index", data_object={"index": index})
         # By default, we'll mark previously generated unused puzzle hashes as used if we have new paths
         if mark_existing_as_used and unused > 0 and new_paths:
             self.log.info(f"Updating last used derivation index: {unused - 1}")
@@ -3,12 +3,13 @@ import logging
 import tempfile
 from concurrent.futures.process import ProcessPoolExecutor
 from multiprocessing.context import BaseContext
-from typing import IO, List, Tuple, Optional
+from typing import IO, Any, Callable, List, Tuple, Optional, TypeVar
 
 from taco.consensus.block_record import BlockRecord
 from taco.consensus.constants import ConsensusConstants
 from taco.full_node.weight_proof import (
     _validate_sub_epoch_summaries,
+    init_validation_worker,
     validate_weight_proof_inner,
 )
 from taco.types.blockchain_format.sub_epoch_summary import SubEpochSummary
@@ -18,10 +19,12 @@ from taco.types.weight_proof import (
 )
 
 from taco.util.ints import uint32
-from taco.util.setproctitle import getproctitle, setproctitle
+from taco.util.setproctitle import getproctitle
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 def _create_shutdown_file() -> IO:
     return tempfile.NamedTemporaryFile(prefix="taco_wallet_weight_proof_handler_executor_shutdown_trigger")
@@ -39,8 +42,8 @@ class WalletWeightProofHandler:
         self._executor: ProcessPoolExecutor = ProcessPoolExecutor(
             self._num_processes,
             mp_context=multiprocessing_context,
-            initializer=setproctitle,
-            initargs=(f"{getproctitle()}_worker",),
+            initializer=init_validation_worker,
+            initargs=(constants, f"{getproctitle()}_worker"),
         )
         self._weight_proof_tasks: List[asyncio.Task] = []
 
@@ -53,7 +56,11 @@ class WalletWeightProofHandler:
         self._executor.shutdown(wait=True)
 
     async def validate_weight_proof(
-        self, weight_proof: WeightProof, skip_segment_validation: bool = False, old_proof: Optional[WeightProof] = None
+        self,
+        weight_proof: WeightProof,
+        skip_segment_validation: bool = False,
+        old_proof: Optional[WeightProof] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
     ) -> Tuple[bool, List[SubEpochSummary], List[BlockRecord]]:
         summaries, sub_epoch_weight_list = _validate_sub_epoch_summaries(self._constants, weight_proof)
         await asyncio.sleep(0)  # break up otherwise multi-second sync code
@@ -66,12 +73,12 @@ class WalletWeightProofHandler:
                 self._constants,
                 self._executor,
                 self._executor_shutdown_tempfile.name,
-                self._num_processes,
                 weight_proof,
                 summaries,
                 sub_epoch_weight_list,
                 skip_segment_validation,
                 validate_from,
+                progress,
             )
         )
         self._weight_proof_tasks.append(task)
@@ -79,6 +86,13 @@ class WalletWeightProofHandler:
         self._weight_proof_tasks.remove(task)
         return valid, summaries, block_records
 
+    async def run_in_executor(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Runs a CPU bound check in one of the worker processes, like the signature checks of the blocks received from
+        untrusted peers.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
 
 def get_wp_fork_point(constants: ConsensusConstants, old_wp: Optional[WeightProof], new_wp: WeightProof) -> uint32:
     """
@@ -12,7 +12,9 @@ from clvm.casts import int_to_bytes
 from taco.consensus.block_header_validation import validate_finished_header_block
 from taco.consensus.block_rewards import calculate_base_farmer_reward
 from taco.consensus.blockchain import ReceiveBlockResult
+from taco.consensus.chain_extension import ChainExtension
 from taco.consensus.coinbase import create_farmer_coin
+from taco.consensus.full_block_to_block_record import block_to_block_record
 from taco.consensus.multiprocess_validation import PreValidationResult
 from taco.consensus.pot_iterations import is_overflow_block
 from taco.full_node.bundle_tools import detect_potential_template_generator
@@ -608,6 +610,7 @@ class TestBlockHeaderValidation:
 
         await db_wrapper.close()
         bc1.shut_down()
+        bc1.close()
         db_path.unlink()
 
     @pytest.mark.asyncio
@@ -1729,6 +1732,44 @@ class TestPreValidation:
         log.info(f"Average pv: {sum(times_pv)/(len(blocks)/n_at_a_time)}")
         log.info(f"Average rb: {sum(times_rb)/(len(blocks))}")
 
+    @pytest.mark.asyncio
+    async def test_pre_validation_on_chain_extension(self, empty_blockchain, default_400_blocks):
+        # Like long sync, each batch is pre-validated on top of the previous one, before that one is added
+        b = empty_blockchain
+        for block in default_400_blocks[:100]:
+            await _validate_and_add_block(b, block)
+        batches = [default_400_blocks[i : i + 50] for i in range(100, 400, 50)]
+        results = await b.pre_validate_blocks_multiprocessing(batches[0], {}, validate_signatures=True)
+        for batch, next_batch in zip(batches, batches[1:] + [[]]):
+            extension = ChainExtension(b)
+            for block, result in zip(batch, results):
+                assert result.error is None
+                assert result.required_iters is not None
+                block_record = block_to_block_record(b.constants, extension, result.required_iters, block, None)
+                extension.extend(block, block_record)
+            assert extension.get_peak().header_hash == batch[-1].header_hash
+            next_results = []
+            if len(next_batch) > 0:
+                next_results = await b.pre_validate_blocks_multiprocessing(
+                    next_batch, {}, validate_signatures=True, block_records=extension
+                )
+            # the blockchain itself is left alone
+            assert not b.contains_block(batch[0].header_hash)
+            assert b.get_peak().height == batch[0].height - 1
+
+            for block, result in zip(batch, results):
+                receive_result, err, _ = await b.receive_block(block, result)
+                assert err is None
+                assert receive_result == ReceiveBlockResult.NEW_PEAK
+                assert b.block_record(block.header_hash) == extension.block_record(block.header_hash)
+            assert b.get_ses_heights() == extension.get_ses_heights()
+            if len(next_batch) > 0:
+                assert next_results == await b.pre_validate_blocks_multiprocessing(
+                    next_batch, {}, validate_signatures=True
+                )
+            results = next_results
+        assert len(b.get_ses_heights()) > 0
+
 
 class TestBodyValidation:
 
@@ -122,6 +122,7 @@ async def empty_blockchain(request):
 
     await db_wrapper.close()
     bc1.shut_down()
+    bc1.close()
     db_path.unlink()
 
 
@@ -5,6 +5,9 @@ import logging
 import random
 import sqlite3
 import dataclasses
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
 
 import pytest
 from clvm.casts import int_to_bytes
@@ -15,6 +18,7 @@ from taco.consensus.default_constants import DEFAULT_CONSTANTS
 from taco.full_node.block_store import BlockStore
 from taco.full_node.coin_store import CoinStore
 from taco.util.ints import uint8
+from taco.util.lru_cache import LRUCache
 from taco.types.blockchain_format.vdf import VDFProof
 from taco.types.blockchain_format.program import SerializedProgram
 from tests.blockchain.blockchain_test_utils import _validate_and_add_block
@@ -25,6 +29,16 @@ from taco.simulator.block_tools import test_constants
 log = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def open_blockchain(coin_store: CoinStore, block_store: BlockStore, tmp_dir: Path) -> AsyncIterator[Blockchain]:
+    bc = await Blockchain.create(coin_store, block_store, test_constants, tmp_dir, 2)
+    try:
+        yield bc
+    finally:
+        bc.shut_down()
+        bc.close()
+
+
 @pytest.mark.asyncio
 async def test_block_store(tmp_dir, db_version, bt):
     assert sqlite3.threadsafety == 1
@@ -35,47 +49,46 @@ async def test_block_store(tmp_dir, db_version, bt):
         # Use a different file for the blockchain
         coin_store_2 = await CoinStore.create(db_wrapper_2)
         store_2 = await BlockStore.create(db_wrapper_2)
-        bc = await Blockchain.create(coin_store_2, store_2, test_constants, tmp_dir, 2)
-
-        store = await BlockStore.create(db_wrapper)
-        await BlockStore.create(db_wrapper_2)
-
-        # Save/get block
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
-            block_record = bc.block_record(block.header_hash)
-            block_record_hh = block_record.header_hash
-            await store.add_full_block(block.header_hash, block, block_record)
-            await store.add_full_block(block.header_hash, block, block_record)
-            assert block == await store.get_full_block(block.header_hash)
-            assert block == await store.get_full_block(block.header_hash)
-            assert block_record == (await store.get_block_record(block_record_hh))
-            await store.set_in_chain([(block_record.header_hash,)])
-            await store.set_peak(block_record.header_hash)
-            await store.set_peak(block_record.header_hash)
-
-        assert len(await store.get_full_blocks_at([1])) == 1
-        assert len(await store.get_full_blocks_at([0])) == 1
-        assert len(await store.get_full_blocks_at([100])) == 0
-
-        # get_block_records_in_range
-        block_record_records = await store.get_block_records_in_range(0, 0xFFFFFFFF)
-        assert len(block_record_records) == len(blocks)
-        for b in blocks:
-            assert block_record_records[b.header_hash].header_hash == b.header_hash
+        async with open_blockchain(coin_store_2, store_2, tmp_dir) as bc:
+            store = await BlockStore.create(db_wrapper)
+            await BlockStore.create(db_wrapper_2)
 
-        # get_block_records_by_hash
-        block_records = await store.get_block_records_by_hash([])
-        assert block_records == []
-
-        block_records = await store.get_block_records_by_hash([blocks[0].header_hash])
-        assert len(block_records) == 1
-        assert block_records[0].header_hash == blocks[0].header_hash
-
-        block_records = await store.get_block_records_by_hash([b.header_hash for b in blocks])
-        assert len(block_records) == len(blocks)
-        for br, b in zip(block_records, blocks):
-            assert br.header_hash == b.header_hash
+            # Save/get block
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
+                block_record = bc.block_record(block.header_hash)
+                block_record_hh = block_record.header_hash
+                await store.add_full_block(block.header_hash, block, block_record)
+                await store.add_full_block(block.header_hash, block, block_record)
+                assert block == await store.get_full_block(block.header_hash)
+                assert block == await store.get_full_block(block.header_hash)
+                assert block_record == (await store.get_block_record(block_record_hh))
+                await store.set_in_chain([(block_record.header_hash,)])
+                await store.set_peak(block_record.header_hash)
+                await store.set_peak(block_record.header_hash)
+
+            assert len(await store.get_full_blocks_at([1])) == 1
+            assert len(await store.get_full_blocks_at([0])) == 1
+            assert len(await store.get_full_blocks_at([100])) == 0
+
+            # get_block_records_in_range
+            block_record_records = await store.get_block_records_in_range(0, 0xFFFFFFFF)
+            assert len(block_record_records) == len(blocks)
+            for b in blocks:
+                assert block_record_records[b.header_hash].header_hash == b.header_hash
+
+            # get_block_records_by_hash
+            block_records = await store.get_block_records_by_hash([])
+            assert block_records == []
+
+            block_records = await store.get_block_records_by_hash([blocks[0].header_hash])
+            assert len(block_records) == 1
+            assert block_records[0].header_hash == blocks[0].header_hash
+
+            block_records = await store.get_block_records_by_hash([b.header_hash for b in blocks])
+            assert len(block_records) == len(blocks)
+            for br, b in zip(block_records, blocks):
+                assert br.header_hash == b.header_hash
 
 
 @pytest.mark.asyncio
@@ -91,24 +104,24 @@ async def test_deadlock(tmp_dir, db_version, bt):
         store = await BlockStore.create(wrapper)
         coin_store_2 = await CoinStore.create(wrapper_2)
         store_2 = await BlockStore.create(wrapper_2)
-        bc = await Blockchain.create(coin_store_2, store_2, test_constants, tmp_dir, 2)
-        block_records = []
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
-            block_records.append(bc.block_record(block.header_hash))
-        tasks = []
-
-        for i in range(10000):
-            rand_i = random.randint(0, 9)
-            if random.random() < 0.5:
-                tasks.append(
-                    asyncio.create_task(
-                        store.add_full_block(blocks[rand_i].header_hash, blocks[rand_i], block_records[rand_i])
+        async with open_blockchain(coin_store_2, store_2, tmp_dir) as bc:
+            block_records = []
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
+                block_records.append(bc.block_record(block.header_hash))
+            tasks = []
+
+            for i in range(10000):
+                rand_i = random.randint(0, 9)
+                if random.random() < 0.5:
+                    tasks.append(
+                        asyncio.create_task(
+                            store.add_full_block(blocks[rand_i].header_hash, blocks[rand_i], block_records[rand_i])
+                        )
                     )
-                )
-            if random.random() < 0.5:
-                tasks.append(asyncio.create_task(store.get_full_block(blocks[rand_i].header_hash)))
-        await asyncio.gather(*tasks)
+                if random.random() < 0.5:
+                    tasks.append(asyncio.create_task(store.get_full_block(blocks[rand_i].header_hash)))
+            await asyncio.gather(*tasks)
 
 
 @pytest.mark.asyncio
@@ -120,41 +133,41 @@ async def test_rollback(bt, tmp_dir):
         # Use a different file for the blockchain
         coin_store = await CoinStore.create(db_wrapper)
         block_store = await BlockStore.create(db_wrapper)
-        bc = await Blockchain.create(coin_store, block_store, test_constants, tmp_dir, 2)
-
-        # insert all blocks
-        count = 0
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
-            count += 1
-            ret = await block_store.get_random_not_compactified(count)
-            assert len(ret) == count
-            # make sure all block heights are unique
-            assert len(set(ret)) == count
-
-        async with db_wrapper.reader_no_transaction() as conn:
-            for block in blocks:
-                async with conn.execute(
-                    "SELECT in_main_chain FROM full_blocks WHERE header_hash=?", (block.header_hash,)
-                ) as cursor:
-                    rows = await cursor.fetchall()
-                    assert len(rows) == 1
-                    assert rows[0][0]
-
-        await block_store.rollback(5)
+        async with open_blockchain(coin_store, block_store, tmp_dir) as bc:
 
-        count = 0
-        async with db_wrapper.reader_no_transaction() as conn:
+            # insert all blocks
+            count = 0
             for block in blocks:
-                async with conn.execute(
-                    "SELECT in_main_chain FROM full_blocks WHERE header_hash=? ORDER BY height",
-                    (block.header_hash,),
-                ) as cursor:
-                    rows = await cursor.fetchall()
-                    print(count, rows)
-                    assert len(rows) == 1
-                    assert rows[0][0] == (count <= 5)
+                await _validate_and_add_block(bc, block)
                 count += 1
+                ret = await block_store.get_random_not_compactified(count)
+                assert len(ret) == count
+                # make sure all block heights are unique
+                assert len(set(ret)) == count
+
+            async with db_wrapper.reader_no_transaction() as conn:
+                for block in blocks:
+                    async with conn.execute(
+                        "SELECT in_main_chain FROM full_blocks WHERE header_hash=?", (block.header_hash,)
+                    ) as cursor:
+                        rows = await cursor.fetchall()
+                        assert len(rows) == 1
+                        assert rows[0][0]
+
+            await block_store.rollback(5)
+
+            count = 0
+            async with db_wrapper.reader_no_transaction() as conn:
+                for block in blocks:
+                    async with conn.execute(
+                        "SELECT in_main_chain FROM full_blocks WHERE header_hash=? ORDER BY height",
+                        (block.header_hash,),
+                    ) as cursor:
+                        rows = await cursor.fetchall()
+                        print(count, rows)
+                        assert len(rows) == 1
+                        assert rows[0][0] == (count <= 5)
+                    count += 1
 
 
 @pytest.mark.asyncio
@@ -164,16 +177,16 @@ async def test_count_compactified_blocks(bt, tmp_dir, db_version):
     async with DBConnection(db_version) as db_wrapper:
         coin_store = await CoinStore.create(db_wrapper)
         block_store = await BlockStore.create(db_wrapper)
-        bc = await Blockchain.create(coin_store, block_store, test_constants, tmp_dir, 2)
+        async with open_blockchain(coin_store, block_store, tmp_dir) as bc:
 
-        count = await block_store.count_compactified_blocks()
-        assert count == 0
+            count = await block_store.count_compactified_blocks()
+            assert count == 0
 
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
 
-        count = await block_store.count_compactified_blocks()
-        assert count == 0
+            count = await block_store.count_compactified_blocks()
+            assert count == 0
 
 
 @pytest.mark.asyncio
@@ -183,16 +196,16 @@ async def test_count_uncompactified_blocks(bt, tmp_dir, db_version):
     async with DBConnection(db_version) as db_wrapper:
         coin_store = await CoinStore.create(db_wrapper)
         block_store = await BlockStore.create(db_wrapper)
-        bc = await Blockchain.create(coin_store, block_store, test_constants, tmp_dir, 2)
+        async with open_blockchain(coin_store, block_store, tmp_dir) as bc:
 
-        count = await block_store.count_uncompactified_blocks()
-        assert count == 0
+            count = await block_store.count_uncompactified_blocks()
+            assert count == 0
 
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
 
-        count = await block_store.count_uncompactified_blocks()
-        assert count == 10
+            count = await block_store.count_uncompactified_blocks()
+            assert count == 10
 
 
 @pytest.mark.asyncio
@@ -215,28 +228,28 @@ async def test_replace_proof(bt, tmp_dir, db_version):
     async with DBConnection(db_version) as db_wrapper:
         coin_store = await CoinStore.create(db_wrapper)
         block_store = await BlockStore.create(db_wrapper)
-        bc = await Blockchain.create(coin_store, block_store, test_constants, tmp_dir, 2)
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
+        async with open_blockchain(coin_store, block_store, tmp_dir) as bc:
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
 
-        replaced = []
+            replaced = []
 
-        for block in blocks:
-            assert block.challenge_chain_ip_proof is not None
-            proof = rand_vdf_proof()
-            replaced.append(proof)
-            new_block = dataclasses.replace(block, challenge_chain_ip_proof=proof)
-            await block_store.replace_proof(block.header_hash, new_block)
+            for block in blocks:
+                assert block.challenge_chain_ip_proof is not None
+                proof = rand_vdf_proof()
+                replaced.append(proof)
+                new_block = dataclasses.replace(block, challenge_chain_ip_proof=proof)
+                await block_store.replace_proof(block.header_hash, new_block)
 
-        for block, proof in zip(blocks, replaced):
-            b = await block_store.get_full_block(block.header_hash)
-            assert b.challenge_chain_ip_proof == proof
+            for block, proof in zip(blocks, replaced):
+                b = await block_store.get_full_block(block.header_hash)
+                assert b.challenge_chain_ip_proof == proof
 
-            # make sure we get the same result when we hit the database
-            # itself (and not just the block cache)
-            block_store.rollback_cache_block(block.header_hash)
-            b = await block_store.get_full_block(block.header_hash)
-            assert b.challenge_chain_ip_proof == proof
+                # make sure we get the same result when we hit the database
+                # itself (and not just the block cache)
+                block_store.rollback_cache_block(block.header_hash)
+                b = await block_store.get_full_block(block.header_hash)
+                assert b.challenge_chain_ip_proof == proof
 
 
 @pytest.mark.asyncio
@@ -289,32 +302,32 @@ async def test_get_blocks_by_hash(tmp_dir, bt, db_version):
         # Use a different file for the blockchain
         coin_store_2 = await CoinStore.create(db_wrapper_2)
         store_2 = await BlockStore.create(db_wrapper_2)
-        bc = await Blockchain.create(coin_store_2, store_2, test_constants, tmp_dir, 2)
+        async with open_blockchain(coin_store_2, store_2, tmp_dir) as bc:
 
-        store = await BlockStore.create(db_wrapper)
-        await BlockStore.create(db_wrapper_2)
+            store = await BlockStore.create(db_wrapper)
+            await BlockStore.create(db_wrapper_2)
 
-        hashes = []
-        # Save/get block
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
-            block_record = bc.block_record(block.header_hash)
-            await store.add_full_block(block.header_hash, block, block_record)
-            hashes.append(block.header_hash)
+            hashes = []
+            # Save/get block
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
+                block_record = bc.block_record(block.header_hash)
+                await store.add_full_block(block.header_hash, block, block_record)
+                hashes.append(block.header_hash)
 
-        full_blocks_by_hash = await store.get_blocks_by_hash(hashes)
-        assert full_blocks_by_hash == blocks
+            full_blocks_by_hash = await store.get_blocks_by_hash(hashes)
+            assert full_blocks_by_hash == blocks
 
-        full_block_bytes_by_hash = await store.get_block_bytes_by_hash(hashes)
+            full_block_bytes_by_hash = await store.get_block_bytes_by_hash(hashes)
 
-        assert [FullBlock.from_bytes(x) for x in full_block_bytes_by_hash] == blocks
+            assert [FullBlock.from_bytes(x) for x in full_block_bytes_by_hash] == blocks
 
-        assert not await store.get_block_bytes_by_hash([])
-        with pytest.raises(ValueError):
-            await store.get_block_bytes_by_hash([bytes32.from_bytes(b"yolo" * 8)])
+            assert not await store.get_block_bytes_by_hash([])
+            with pytest.raises(ValueError):
+                await store.get_block_bytes_by_hash([bytes32.from_bytes(b"yolo" * 8)])
 
-        with pytest.raises(AssertionError):
-            await store.get_block_bytes_by_hash([bytes32.from_bytes(b"yolo" * 8)] * 1000)
+            with pytest.raises(AssertionError):
+                await store.get_block_bytes_by_hash([bytes32.from_bytes(b"yolo" * 8)] * 1000)
 
 
 @pytest.mark.asyncio
@@ -327,20 +340,121 @@ async def test_get_block_bytes_in_range(tmp_dir, bt, db_version):
         # Use a different file for the blockchain
         coin_store_2 = await CoinStore.create(db_wrapper_2)
         store_2 = await BlockStore.create(db_wrapper_2)
-        bc = await Blockchain.create(coin_store_2, store_2, test_constants, tmp_dir, 2)
+        async with open_blockchain(coin_store_2, store_2, tmp_dir) as bc:
 
-        await BlockStore.create(db_wrapper_2)
+            await BlockStore.create(db_wrapper_2)
 
-        # Save/get block
-        for block in blocks:
-            await _validate_and_add_block(bc, block)
+            # Save/get block
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
 
-        if db_version < 2:
-            with pytest.raises(AssertionError):
-                await store_2.get_block_bytes_in_range(0, 9)
-        else:
-            full_blocks_by_height = await store_2.get_block_bytes_in_range(0, 9)
-            assert full_blocks_by_height == [bytes(b) for b in blocks]
+            if db_version < 2:
+                with pytest.raises(AssertionError):
+                    await store_2.get_block_bytes_in_range(0, 9)
+            else:
+                full_blocks_by_height = await store_2.get_block_bytes_in_range(0, 9)
+                assert full_blocks_by_height == [bytes(b) for b in blocks]
 
-            with pytest.raises(ValueError):
-                await store_2.get_block_bytes_in_range(0, 10)
+                with pytest.raises(ValueError):
+                    await store_2.get_block_bytes_in_range(0, 10)
+
+
+@pytest.mark.asyncio
+async def test_precompress_blocks(bt):
+    blocks = bt.get_consecutive_blocks(3)
+
+    async with DBConnection(2) as db_wrapper:
+        store = await BlockStore.create(db_wrapper)
+        await store.precompress_blocks(blocks)
+        assert len(store.precompressed_blocks) == 3
+
+        block_record = header_block_to_sub_block_record(
+            test_constants, 0, blocks[0], 0, False, 0, max(0, blocks[0].height - 1), None
+        )
+        await store.add_full_block(blocks[0].header_hash, blocks[0], block_record)
+        assert blocks[0].header_hash not in store.precompressed_blocks
+        store.block_cache = LRUCache(1000)
+        assert await store.get_full_block_bytes(blocks[0].header_hash) == bytes(blocks[0])
+
+        # the next batch replaces the previous one
+        await store.precompress_blocks(blocks[2:])
+        assert list(store.precompressed_blocks.keys()) == [blocks[2].header_hash]
+
+        # with keep_previous, only the previous batch is kept
+        await store.precompress_blocks(blocks[:1], keep_previous=True)
+        assert set(store.precompressed_blocks.keys()) == {blocks[2].header_hash, blocks[0].header_hash}
+        await store.precompress_blocks(blocks[1:2], keep_previous=True)
+        assert set(store.precompressed_blocks.keys()) == {blocks[0].header_hash, blocks[1].header_hash}
+
+
+@pytest.mark.asyncio
+async def test_add_full_blocks(tmp_dir, bt, db_version):
+    blocks = bt.get_consecutive_blocks(10)
+
+    async with DBConnection(db_version) as db_wrapper, DBConnection(db_version) as db_wrapper_2:
+
+        # Use a different file for the blockchain
+        coin_store_2 = await CoinStore.create(db_wrapper_2)
+        store_2 = await BlockStore.create(db_wrapper_2)
+        async with open_blockchain(coin_store_2, store_2, tmp_dir) as bc:
+            store = await BlockStore.create(db_wrapper)
+            for block in blocks:
+                await _validate_and_add_block(bc, block)
+            await store.precompress_blocks(blocks[:3])
+            await store.add_full_blocks([(block, bc.block_record(block.header_hash)) for block in blocks], True)
+            assert store.precompressed_blocks == {}
+
+            # start over with an empty cache, to read from the database
+            store.block_cache = LRUCache(1000)
+            assert await store.get_blocks_by_hash([block.header_hash for block in blocks]) == blocks
+            for block in blocks:
+                assert await store.get_block_record(block.header_hash) == bc.block_record(block.header_hash)
+            assert await store.get_peak() == (blocks[-1].header_hash, blocks[-1].height)
+            if db_version == 2:
+                assert await store.get_block_bytes_in_range(0, 9) == [bytes(b) for b in blocks]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert(tmp_dir, bt, db_version):
+    blocks = bt.get_consecutive_blocks(10)
+
+    async with DBConnection(db_version) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        store = await BlockStore.create(db_wrapper)
+        async with open_blockchain(coin_store, store, tmp_dir) as bc:
+            async with db_wrapper.writer():
+                async with store.bulk_insert():
+                    for block in blocks[:5]:
+                        await _validate_and_add_block(bc, block)
+                    if db_version == 1:
+                        assert store.pending_blocks is None
+                    else:
+                        assert store.pending_blocks is not None and len(store.pending_blocks) == 5
+                        # only the writer sees the blocks before they're inserted
+                        header_hash = blocks[4].header_hash
+                        assert await store.get_block_record(header_hash) == bc.block_record(header_hash)
+                        assert await asyncio.create_task(store.get_block_record(header_hash)) is None
+
+                        # a block that's rolled back is dropped, with the peak it set
+                        block_record = bc.block_record(header_hash)
+                        await store.add_full_block(blocks[5].header_hash, blocks[5], block_record)
+                        await store.set_in_chain([(blocks[5].header_hash,)])
+                        await store.set_peak(blocks[5].header_hash)
+                        store.rollback_cache_block(blocks[5].header_hash)
+                        assert store.pending_peak == header_hash
+
+                        await store.flush_blocks()
+                        assert store.pending_blocks == {}
+                    for block in blocks[5:]:
+                        await _validate_and_add_block(bc, block)
+            assert store.pending_blocks is None
+
+            store.block_cache = LRUCache(1000)
+            assert await store.get_blocks_by_hash([block.header_hash for block in blocks]) == blocks
+            for block in blocks:
+                assert await store.get_block_record(block.header_hash) == bc.block_record(block.header_hash)
+            assert await store.get_peak() == (blocks[-1].header_hash, blocks[-1].height)
+            if db_version == 2:
+                assert [block.header_hash for block in await store.get_full_blocks_at(list(range(10)))] == [
+                    block.header_hash for block in blocks
+                ]
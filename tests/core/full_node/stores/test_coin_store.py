@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import List, Optional, Set, Tuple
 
@@ -47,6 +48,12 @@ def get_future_reward_coins(block: FullBlock) -> Tuple[Coin, Coin]:
     return pool_coin, farmer_coin
 
 
+def reward_coins(height: int) -> Set[Coin]:
+    return {
+        Coin(std_hash(height.to_bytes(4, byteorder="big") + bytes([i])), std_hash(b"2"), uint64(100)) for i in range(2)
+    }
+
+
 class TestCoinStoreWithBlocks:
     @pytest.mark.asyncio
     async def test_basic_coin_store(self, db_version, bt):
@@ -371,6 +378,7 @@ class TestCoinStoreWithBlocks:
                 assert peak.height == initial_block_count - 10 + reorg_length - 1
             finally:
                 b.shut_down()
+                b.close()
 
     @pytest.mark.asyncio
     async def test_get_puzzle_hash(self, tmp_dir, db_version, bt):
@@ -400,6 +408,7 @@ class TestCoinStoreWithBlocks:
             assert len(coins_pool) == num_blocks - 2
 
             b.shut_down()
+            b.close()
 
     @pytest.mark.asyncio
     async def test_get_coin_states(self, tmp_dir, db_version):
@@ -440,3 +449,58 @@ class TestCoinStoreWithBlocks:
             assert len(await coin_store.get_coin_states_by_ids(True, coins, 300)) == 302
             assert len(await coin_store.get_coin_states_by_ids(True, coins, 603)) == 0
             assert len(await coin_store.get_coin_states_by_ids(True, bad_coins, 0)) == 0
+
+    @pytest.mark.asyncio
+    async def test_coin_record_cache(self, db_version):
+        async with DBConnection(db_version) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper)
+            additions = await coin_store.new_block(uint32(1), uint64(12321312), reward_coins(1), [], [])
+            for record in additions:
+                assert coin_store.coin_record_cache.get(record.name) == record
+                assert await coin_store.get_coin_record(record.name) == record
+
+            await coin_store.new_block(uint32(2), uint64(12321332), reward_coins(2), [], [additions[0].name])
+            cached = await coin_store.get_coin_record(additions[0].name)
+            assert cached is not None and cached.spent_block_index == 2
+
+            # the cache agrees with the database
+            names = [record.name for record in additions]
+            cached_records = await coin_store.get_coin_records(names)
+            coin_store.clear_cache()
+            assert set(await coin_store.get_coin_records(names)) == set(cached_records)
+
+            await coin_store.new_block(uint32(3), uint64(12321352), reward_coins(3), [], [additions[1].name])
+            await coin_store.rollback_to_block(1)
+            for name in names:
+                record = await coin_store.get_coin_record(name)
+                assert record is not None and not record.spent
+            for coin in reward_coins(2):
+                assert await coin_store.get_coin_record(coin.name()) is None
+
+    @pytest.mark.asyncio
+    async def test_coin_record_cache_transaction(self, db_version):
+        async with DBConnection(db_version) as db_wrapper:
+            coin_store = await CoinStore.create(db_wrapper)
+            names = [coin.name() for coin in reward_coins(1)]
+
+            async def get_records() -> List[Optional[CoinRecord]]:
+                return [await coin_store.get_coin_record(name) for name in names]
+
+            # the records of a pending transaction are only seen by its writer
+            async with db_wrapper.writer():
+                await coin_store.new_block(uint32(1), uint64(12321312), reward_coins(1), [], [])
+                assert None not in await get_records()
+                assert await asyncio.create_task(get_records()) == [None, None]
+            assert None not in await asyncio.create_task(get_records())
+
+            # and they are dropped when it's rolled back
+            with pytest.raises(RuntimeError):
+                async with db_wrapper.writer():
+                    await coin_store.new_block(uint32(2), uint64(12321332), reward_coins(2), [], [names[0]])
+                    record = await coin_store.get_coin_record(names[0])
+                    assert record is not None and record.spent
+                    raise RuntimeError("rollback")
+            record = await coin_store.get_coin_record(names[0])
+            assert record is not None and not record.spent
+            for coin in reward_coins(2):
+                assert await coin_store.get_coin_record(coin.name()) is None
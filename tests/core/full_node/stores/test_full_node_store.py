@@ -44,6 +44,7 @@ async def empty_blockchain(request):
     yield bc1
     await db_wrapper.close()
     bc1.shut_down()
+    bc1.close()
     db_path.unlink()
 
 
@@ -53,6 +54,7 @@ async def empty_blockchain_with_original_constants(request):
     yield bc1
     await db_wrapper.close()
     bc1.shut_down()
+    bc1.close()
     db_path.unlink()
 
 
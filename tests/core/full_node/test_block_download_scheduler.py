@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+from typing import List, Optional, Tuple, Union
+
+import pytest
+
+from taco.full_node.block_download_scheduler import BlockDownloadScheduler
+from taco.protocols.full_node_protocol import RejectBlocks, RequestBlocks, RespondBlocks
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.full_block import FullBlock
+
+BATCH_SIZE = 32
+
+
+@dataclasses.dataclass
+class FakePeer:
+    """
+    Stands in for a WSTacoConnection, responding to RequestBlocks after a delay
+    """
+
+    peer_node_id: bytes32
+    blocks: List[FullBlock]
+    delay: float
+    reject: bool = False
+    closed: bool = False
+    bytes_read: int = 0
+    requests: int = 0
+
+    @property
+    def peer_host(self) -> str:
+        return self.peer_node_id.hex()[:8]
+
+    async def close(self, ban_time: int = 0) -> None:
+        self.closed = True
+
+    async def request_blocks(
+        self, request: RequestBlocks, timeout: int
+    ) -> Optional[Union[RespondBlocks, RejectBlocks]]:
+        self.requests += 1
+        if self.delay > timeout:
+            await asyncio.sleep(timeout)
+            return None
+        await asyncio.sleep(self.delay)
+        if self.reject:
+            return RejectBlocks(request.start_height, request.end_height)
+        blocks = self.blocks[request.start_height : request.end_height + 1]
+        self.bytes_read += 1000 * len(blocks)
+        return RespondBlocks(request.start_height, request.end_height, blocks)
+
+
+async def download(
+    scheduler: BlockDownloadScheduler,
+) -> List[Optional[Tuple[FakePeer, List[FullBlock]]]]:
+    queue: asyncio.Queue[Optional[Tuple[FakePeer, List[FullBlock]]]] = asyncio.Queue(maxsize=4)
+    results: List[Optional[Tuple[FakePeer, List[FullBlock]]]] = []
+
+    async def consume() -> None:
+        while True:
+            item = await queue.get()
+            results.append(item)
+            if item is None:
+                return
+
+    await asyncio.gather(scheduler.run(queue), consume())  # type: ignore[arg-type]
+    return results
+
+
+def check_in_order(results: List[Optional[Tuple[FakePeer, List[FullBlock]]]], blocks: List[FullBlock]) -> None:
+    assert results[-1] is None
+    start = 0
+    for result in results[:-1]:
+        assert result is not None
+        _, batch = result
+        end = min(len(blocks) - 1, start + BATCH_SIZE)
+        assert batch == blocks[start : end + 1]
+        start += BATCH_SIZE
+    assert start >= len(blocks) - 1
+
+
+@pytest.mark.asyncio
+async def test_download_from_several_peers(default_400_blocks: List[FullBlock]) -> None:
+    blocks = default_400_blocks
+    peers = [
+        FakePeer(bytes32([1] * 32), blocks, 0.01),
+        FakePeer(bytes32([2] * 32), blocks, 0.05),
+        FakePeer(bytes32([3] * 32), blocks, 0.02),
+    ]
+    scheduler = BlockDownloadScheduler(0, len(blocks) - 1, BATCH_SIZE, lambda: peers)  # type: ignore
+    results = await download(scheduler)
+    check_in_order(results, blocks)
+    # every peer was used, the fastest one the most
+    assert all(peer.requests > 0 for peer in peers)
+    assert peers[0].requests > peers[1].requests
+    assert all(bandwidth > 0 for bandwidth in scheduler.bandwidth().values())
+
+
+@pytest.mark.asyncio
+async def test_failing_peers(default_400_blocks: List[FullBlock]) -> None:
+    blocks = default_400_blocks
+    rejecting = FakePeer(bytes32([1] * 32), blocks, 0.0, reject=True)
+    timing_out = FakePeer(bytes32([2] * 32), blocks, 5)
+    good = FakePeer(bytes32([3] * 32), blocks, 0.01)
+    peers = [rejecting, timing_out, good]
+    scheduler = BlockDownloadScheduler(
+        0, len(blocks) - 1, BATCH_SIZE, lambda: peers, request_timeout=1, max_failures=2  # type: ignore
+    )
+    results = await download(scheduler)
+    check_in_order(results, blocks)
+    assert rejecting.requests == 2
+    assert timing_out.closed
+    # the ranges the failing peers were given were downloaded from the good one
+    assert all(result[0] is good for result in results[:-1] if result is not None)
+
+
+@pytest.mark.asyncio
+async def test_straggler(default_400_blocks: List[FullBlock]) -> None:
+    blocks = default_400_blocks
+    slow = FakePeer(bytes32([1] * 32), blocks, 3)
+    fast = FakePeer(bytes32([2] * 32), blocks, 0.01)
+    peers = [slow, fast]
+    scheduler = BlockDownloadScheduler(
+        0, len(blocks) - 1, BATCH_SIZE, lambda: peers, straggler_min_seconds=0.1  # type: ignore
+    )
+    results = await asyncio.wait_for(download(scheduler), timeout=2)
+    check_in_order(results, blocks)
+
+
+@pytest.mark.asyncio
+async def test_no_peers() -> None:
+    scheduler = BlockDownloadScheduler(0, 100, BATCH_SIZE, lambda: [])
+    assert await download(scheduler) == [None]
@@ -1,5 +1,6 @@
 import pytest
 import struct
+from taco.full_node import block_height_map
 from taco.full_node.block_height_map import BlockHeightMap, SesCache
 from taco.types.blockchain_format.sub_epoch_summary import SubEpochSummary
 from taco.util.db_wrapper import DBWrapper2
@@ -7,7 +8,7 @@ from taco.util.db_wrapper import DBWrapper2
 from tests.util.db_connection import DBConnection
 from taco.types.blockchain_format.sized_bytes import bytes32
 from typing import Optional
-from taco.util.ints import uint8
+from taco.util.ints import uint8, uint32
 from taco.util.files import write_file_async
 
 
@@ -129,6 +130,8 @@ class TestBlockHeightMap:
             for height in reversed(range(10)):
                 assert height_map.get_hash(height) == gen_block_hash(height)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_height_to_hash_long_chain(self, tmp_dir, db_version):
 
@@ -144,6 +147,8 @@ class TestBlockHeightMap:
             for height in reversed(range(10000)):
                 assert height_map.get_hash(height) == gen_block_hash(height)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_save_restore(self, tmp_dir, db_version):
 
@@ -164,7 +169,7 @@ class TestBlockHeightMap:
 
             await height_map.maybe_flush()
 
-            del height_map
+            height_map.close()
 
             # To ensure we're actually loading from cache, and not the DB, clear
             # the table (but we still need the peak). We need at least 20 blocks
@@ -189,6 +194,8 @@ class TestBlockHeightMap:
                     with pytest.raises(KeyError) as _:
                         height_map.get_ses(height)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_restore_entire_chain(self, tmp_dir, db_version):
 
@@ -224,6 +231,8 @@ class TestBlockHeightMap:
                     with pytest.raises(KeyError) as _:
                         height_map.get_ses(height)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_restore_extend(self, tmp_dir, db_version):
 
@@ -247,7 +256,7 @@ class TestBlockHeightMap:
 
             await height_map.maybe_flush()
 
-            del height_map
+            height_map.close()
 
         async with DBConnection(db_version) as db_wrapper:
             await setup_db(db_wrapper)
@@ -265,6 +274,8 @@ class TestBlockHeightMap:
                     with pytest.raises(KeyError) as _:
                         height_map.get_ses(height)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_height_to_hash_with_orphans(self, tmp_dir, db_version):
 
@@ -281,6 +292,8 @@ class TestBlockHeightMap:
             for height in range(10):
                 assert height_map.get_hash(height) == gen_block_hash(height)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_height_to_hash_update(self, tmp_dir, db_version):
 
@@ -303,6 +316,8 @@ class TestBlockHeightMap:
 
             assert height_map.get_hash(10) == gen_block_hash(100)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_update_ses(self, tmp_dir, db_version):
 
@@ -323,6 +338,8 @@ class TestBlockHeightMap:
             assert height_map.get_ses(10) == gen_ses(10)
             assert height_map.get_hash(10) == gen_block_hash(10)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_height_to_ses(self, tmp_dir, db_version):
 
@@ -350,6 +367,8 @@ class TestBlockHeightMap:
             with pytest.raises(KeyError) as _:
                 height_map.get_ses(9)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_rollback(self, tmp_dir, db_version):
 
@@ -388,6 +407,8 @@ class TestBlockHeightMap:
             with pytest.raises(KeyError) as _:
                 height_map.get_ses(8)
 
+            height_map.close()
+
     @pytest.mark.asyncio
     async def test_rollback2(self, tmp_dir, db_version):
 
@@ -420,3 +441,49 @@ class TestBlockHeightMap:
             assert height_map.get_ses(6) == gen_ses(6)
             with pytest.raises(KeyError) as _:
                 height_map.get_ses(8)
+
+            height_map.close()
+
+    @pytest.mark.asyncio
+    async def test_rollback_clears_file(self, tmp_dir, db_version):
+
+        async with DBConnection(db_version) as db_wrapper:
+
+            await setup_db(db_wrapper)
+            await setup_chain(db_wrapper, 10)
+
+            height_map = await BlockHeightMap.create(tmp_dir, db_wrapper)
+            height_map.rollback(5)
+            height_map.close()
+
+            # the heights past the fork are cleared in the file itself
+            with open(tmp_dir / "height-to-hash", "rb") as f:
+                content = f.read()
+            for height in range(6):
+                assert content[height * 32 : height * 32 + 32] == gen_block_hash(height)
+            assert content[6 * 32 :] == bytes(len(content) - 6 * 32)
+
+    @pytest.mark.asyncio
+    async def test_grow_file(self, tmp_dir, db_version, monkeypatch):
+
+        monkeypatch.setattr(block_height_map, "HEIGHT_TO_HASH_CHUNK", 16)
+        async with DBConnection(db_version) as db_wrapper:
+
+            await setup_db(db_wrapper)
+            await setup_chain(db_wrapper, 10)
+
+            height_map = await BlockHeightMap.create(tmp_dir, db_wrapper)
+            for height in range(11, 100):
+                height_map.update_height(uint32(height), gen_block_hash(height), None)
+            for height in range(100):
+                assert height_map.get_hash(uint32(height)) == gen_block_hash(height)
+            assert not height_map.contains_height(uint32(100))
+            height_map.close()
+
+            # the file is grown a chunk at a time
+            with open(tmp_dir / "height-to-hash", "rb") as f:
+                content = f.read()
+            assert len(content) == 7 * 16 * 32
+            for height in range(100):
+                assert content[height * 32 : height * 32 + 32] == gen_block_hash(height)
+            assert content[100 * 32 :] == bytes(len(content) - 100 * 32)
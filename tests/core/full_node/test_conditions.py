@@ -96,6 +96,7 @@ async def check_spend_bundle_validity(
 
         # we must call `shut_down` or the executor in `Blockchain` doesn't stop
         blockchain.shut_down()
+        blockchain.close()
 
 
 async def check_conditions(
@@ -23,6 +23,7 @@ from taco.server.outbound_message import Message, NodeType
 from taco.simulator.simulator_protocol import FarmNewBlockProtocol
 from taco.types.blockchain_format.classgroup import ClassgroupElement
 from taco.types.blockchain_format.program import Program, SerializedProgram
+from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.blockchain_format.vdf import CompressibleVDFField, VDFProof
 from taco.types.coin_spend import CoinSpend
 from taco.types.condition_opcodes import ConditionOpcode
@@ -31,6 +32,7 @@ from taco.types.full_block import FullBlock
 from taco.types.mempool_inclusion_status import MempoolInclusionStatus
 from taco.types.peer_info import PeerInfo, TimestampedPeerInfo
 from taco.types.spend_bundle import SpendBundle
+from taco.types.transaction_queue_entry import TransactionQueueEntry
 from taco.types.unfinished_block import UnfinishedBlock
 from taco.util.errors import Err
 from taco.util.hash import std_hash
@@ -38,6 +40,7 @@ from taco.util.ints import uint8, uint16, uint32, uint64
 from taco.util.recursive_replace import recursive_replace
 from taco.util.vdf_prover import get_vdf_info_and_proof
 from taco.util.errors import ConsensusError
+from taco.util.generator_tools import get_block_header
 from taco.wallet.transaction_record import TransactionRecord
 from taco.simulator.block_tools import get_signage_point, test_constants
 from tests.blockchain.blockchain_test_utils import (
@@ -1051,6 +1054,81 @@ class TestFullNodeProtocol:
         await asyncio.sleep(1)
         assert incoming_queue.qsize() == 0
 
+    @pytest.mark.asyncio
+    async def test_transaction_batch(self, wallet_nodes, monkeypatch):
+        full_node_1, full_node_2, server_1, server_2, wallet_a, wallet_receiver, bt = wallet_nodes
+        full_node = full_node_1.full_node
+        blocks = await full_node_1.get_all_full_blocks()
+        reward_puzzle_hash = wallet_a.get_new_puzzlehash()
+        blocks = bt.get_consecutive_blocks(
+            4,
+            block_list_input=blocks,
+            guarantee_transaction_block=True,
+            farmer_reward_puzzle_hash=reward_puzzle_hash,
+            pool_reward_puzzle_hash=reward_puzzle_hash,
+        )
+        for block in blocks:
+            await full_node.respond_block(fnp.RespondBlock(block))
+        coins = [
+            coin
+            for block in blocks
+            for coin in block.get_included_reward_coins()
+            if coin.puzzle_hash == reward_puzzle_hash
+        ]
+        assert len(coins) >= 4
+        spend_bundles = [
+            wallet_a.generate_signed_transaction(1123, wallet_receiver.get_new_puzzlehash(), coin) for coin in coins
+        ]
+
+        class FakePeer:
+            def __init__(self) -> None:
+                self.peer_node_id = bytes32(token_bytes(32))
+                self.closed = False
+
+            async def close(self) -> None:
+                self.closed = True
+
+        async def handle_batch(peers: List[FakePeer], batch: List[SpendBundle]) -> None:
+            entries = [
+                TransactionQueueEntry(spend_bundle, None, spend_bundle.name(), peer, True)
+                for peer, spend_bundle in zip(peers, batch)
+            ]
+            # the handler releases the semaphore once per transaction
+            for _ in entries:
+                await full_node.respond_transaction_semaphore.acquire()
+            await full_node._handle_transaction_batch(entries)
+
+        # the whole batch is pre-validated at once
+        peers = [FakePeer(), FakePeer()]
+        await handle_batch(peers, spend_bundles[:2])
+        for spend_bundle in spend_bundles[:2]:
+            assert full_node.mempool_manager.get_spendbundle(spend_bundle.name()) is not None
+        assert not any(peer.closed for peer in peers)
+
+        # when pre-validating the batch fails, each transaction is pre-validated on its own and only the peer of the
+        # transaction that fails is disconnected
+        bad_spend_bundle = spend_bundles[3]
+        pre_validate_spendbundle = full_node.mempool_manager.pre_validate_spendbundle
+
+        async def failing_pre_validate_spendbundles(*args):
+            raise RuntimeError("batch failed")
+
+        async def failing_pre_validate_spendbundle(new_spend, new_spend_bytes, spend_name):
+            if spend_name == bad_spend_bundle.name():
+                raise RuntimeError("bad transaction")
+            return await pre_validate_spendbundle(new_spend, new_spend_bytes, spend_name)
+
+        monkeypatch.setattr(full_node.mempool_manager, "pre_validate_spendbundles", failing_pre_validate_spendbundles)
+        monkeypatch.setattr(full_node.mempool_manager, "pre_validate_spendbundle", failing_pre_validate_spendbundle)
+        peers = [FakePeer(), FakePeer()]
+        await handle_batch(peers, [bad_spend_bundle, spend_bundles[2]])
+        assert peers[0].closed
+        assert not peers[1].closed
+        assert full_node.mempool_manager.get_spendbundle(bad_spend_bundle.name()) is None
+        assert full_node.mempool_manager.get_spendbundle(spend_bundles[2].name()) is not None
+        # it can be resubmitted
+        assert not full_node.mempool_manager.seen(bad_spend_bundle.name())
+
     @pytest.mark.asyncio
     async def test_request_block(self, wallet_nodes):
         full_node_1, full_node_2, server_1, server_2, wallet_a, wallet_receiver, bt = wallet_nodes
@@ -1093,6 +1171,51 @@ class TestFullNodeProtocol:
         res = await full_node_1.request_block(fnp.RequestBlock(blocks[-1].height - 1, True))
         assert res.type != ProtocolMessageTypes.reject_block.value
 
+    @pytest.mark.asyncio
+    async def test_request_block_header(self, wallet_nodes):
+        full_node_1, full_node_2, server_1, server_2, wallet_a, wallet_receiver, bt = wallet_nodes
+        blocks = await full_node_1.get_all_full_blocks()
+
+        blocks = bt.get_consecutive_blocks(
+            3,
+            block_list_input=blocks,
+            guarantee_transaction_block=True,
+            farmer_reward_puzzle_hash=wallet_a.get_new_puzzlehash(),
+            pool_reward_puzzle_hash=wallet_a.get_new_puzzlehash(),
+        )
+        spend_bundle = wallet_a.generate_signed_transaction(
+            1123,
+            wallet_receiver.get_new_puzzlehash(),
+            list(blocks[-1].get_included_reward_coins())[0],
+        )
+        blocks = bt.get_consecutive_blocks(
+            1, block_list_input=blocks, guarantee_transaction_block=True, transaction_data=spend_bundle
+        )
+
+        for block in blocks:
+            await full_node_1.full_node.respond_block(fnp.RespondBlock(block))
+
+        # Don't have height
+        res = await full_node_1.request_block_header(wallet_protocol.RequestBlockHeader(uint32(1248921)))
+        assert res.type == ProtocolMessageTypes.reject_header_request.value
+
+        # A block with a generator, the filter has the additions and removals of the spend
+        block = blocks[-1]
+        assert block.transactions_generator is not None
+        res = await full_node_1.request_block_header(wallet_protocol.RequestBlockHeader(block.height))
+        assert res.type == ProtocolMessageTypes.respond_block_header.value
+        header_block = wallet_protocol.RespondBlockHeader.from_bytes(res.data).header_block
+        removals = [coin.name() for coin in spend_bundle.removals()]
+        assert header_block == get_block_header(block, spend_bundle.additions(), removals)
+        assert std_hash(header_block.transactions_filter) == block.foliage_transaction_block.filter_hash
+
+        # A block without a generator
+        block = blocks[-2]
+        assert block.transactions_generator is None
+        res = await full_node_1.request_block_header(wallet_protocol.RequestBlockHeader(block.height))
+        header_block = wallet_protocol.RespondBlockHeader.from_bytes(res.data).header_block
+        assert header_block == get_block_header(block, [], [])
+
     @pytest.mark.asyncio
     async def test_request_blocks(self, wallet_nodes):
         full_node_1, full_node_2, server_1, server_2, wallet_a, wallet_receiver, bt = wallet_nodes
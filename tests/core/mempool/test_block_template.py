@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import List
+
+from blspy import G2Element
+
+from taco.consensus.cost_calculator import NPCResult
+from taco.full_node.block_template import BlockTemplate
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.mempool_item import MempoolItem
+from taco.types.spend_bundle import SpendBundle
+from taco.util.ints import uint32, uint64
+
+
+def make_item(idx: int, fee: int, cost: int) -> MempoolItem:
+    return MempoolItem(
+        SpendBundle([], G2Element()),
+        uint64(fee),
+        NPCResult(None, None, uint64(cost)),
+        uint64(cost),
+        bytes32([idx] * 32),
+        [],
+        uint32(0),
+    )
+
+
+def selected_names(template: BlockTemplate) -> List[bytes32]:
+    return [item.name for item in template.selected_items()]
+
+
+def test_empty() -> None:
+    template = BlockTemplate(100, 1000)
+    assert template.create_bundle() is None
+
+
+def test_orders_by_fee_per_cost() -> None:
+    template = BlockTemplate(100, 1000)
+    items = [make_item(1, 10, 10), make_item(2, 50, 10), make_item(3, 30, 10)]
+    for item in items:
+        template.add_item(item)
+    assert selected_names(template) == [items[1].name, items[2].name, items[0].name]
+    assert template.cost_sum == 30
+    assert template.fee_sum == 90
+
+
+def test_stops_at_first_miss() -> None:
+    template = BlockTemplate(100, 1000)
+    items = [make_item(1, 600, 60), make_item(2, 450, 50), make_item(3, 80, 10)]
+    for item in items:
+        template.add_item(item)
+    # the second item doesn't fit, so the (small) third item isn't considered either
+    assert selected_names(template) == [items[0].name]
+
+    # adding another small item after the miss doesn't change the selection
+    template.add_item(make_item(4, 10, 10))
+    assert selected_names(template) == [items[0].name]
+
+
+def test_knapsack_fill() -> None:
+    template = BlockTemplate(100, 1000, knapsack_fill=True)
+    items = [make_item(1, 600, 60), make_item(2, 450, 50), make_item(3, 80, 10)]
+    for item in items:
+        template.add_item(item)
+    assert selected_names(template) == [items[0].name, items[2].name]
+
+    template.add_item(make_item(4, 10, 10))
+    assert selected_names(template) == [items[0].name, items[2].name, bytes32([4] * 32)]
+
+
+def test_fee_limit() -> None:
+    template = BlockTemplate(100, 100)
+    template.add_item(make_item(1, 90, 10))
+    template.add_item(make_item(2, 20, 10))
+    assert selected_names(template) == [bytes32([1] * 32)]
+
+
+def test_add_better_item_evicts_worse() -> None:
+    template = BlockTemplate(100, 1000)
+    low = make_item(1, 60, 60)
+    template.add_item(low)
+    assert selected_names(template) == [low.name]
+
+    high = make_item(2, 500, 50)
+    template.add_item(high)
+    assert selected_names(template) == [high.name]
+
+
+def test_remove_item() -> None:
+    template = BlockTemplate(100, 1000)
+    items = [make_item(1, 600, 60), make_item(2, 450, 50)]
+    for item in items:
+        template.add_item(item)
+    assert selected_names(template) == [items[0].name]
+
+    template.remove_item(items[0].name)
+    assert selected_names(template) == [items[1].name]
+
+    # removing an unknown item is a no-op
+    template.remove_item(bytes32([9] * 32))
+    assert selected_names(template) == [items[1].name]
+
+
+def test_incremental_aggregate() -> None:
+    template = BlockTemplate(100, 1000)
+    template.add_item(make_item(1, 50, 10))
+    first = template.create_bundle()
+    assert first is not None
+    assert template.create_bundle() == first
+
+    template.add_item(make_item(2, 40, 10))
+    second = template.create_bundle()
+    assert second is not None
+    assert second[0] == SpendBundle.aggregate([first[0], SpendBundle([], G2Element())])
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import random
+from typing import Dict, List, Tuple
+
+from taco.full_node.fee_rate_index import BinaryPrefixTree, FeeRateCostIndex, fee_rate_key, key_fee_rate
+from taco.types.blockchain_format.sized_bytes import bytes32
+
+
+def test_binary_prefix_tree() -> None:
+    tree = BinaryPrefixTree()
+    for i in range(10):
+        tree.add(i, i)
+    tree.add(2**64 - 1, 5)
+    assert tree.total() == 50
+    assert tree.lower_bound(1) == 1
+    assert tree.lower_bound(6) == 3
+    assert tree.lower_bound(7) == 4
+    assert tree.lower_bound(46) == 2**64 - 1
+    assert tree.lower_bound(51) is None
+    tree.add(3, -3)
+    assert tree.lower_bound(6) == 4
+    assert tree.total() == 47
+
+
+def test_fee_rate_keys_preserve_order() -> None:
+    rng = random.Random(1337)
+    fee_rates = sorted([0.0, 1e-300, 1e-12, 5.0, 5.0000001, 1e300] + [2 ** rng.uniform(-30, 70) for _ in range(1000)])
+    keys = [fee_rate_key(fee_rate) for fee_rate in fee_rates]
+    assert keys == sorted(keys)
+    assert [key_fee_rate(key) for key in keys] == fee_rates
+
+
+def test_fee_rate_at_cost() -> None:
+    index = FeeRateCostIndex()
+    for i in range(5):
+        index.add(bytes32([i] * 32), float(i + 1), 10)
+    assert index.total_cost == 50
+    assert index.fee_rate_at_cost(0) == 0
+    assert index.fee_rate_at_cost(1) == 1.0
+    assert index.fee_rate_at_cost(10) == 1.0
+    assert index.fee_rate_at_cost(11) == 2.0
+    assert index.fee_rate_at_cost(50) == 5.0
+    assert index.fee_rate_at_cost(51) is None
+
+    index.remove(bytes32([0] * 32))
+    assert index.fee_rate_at_cost(10) == 2.0
+    index.update_fee_rate(bytes32([4] * 32), 0.5)
+    assert index.fee_rate_at_cost(10) == 0.5
+    assert [name for name, _, _ in index.lowest()][0] == bytes32([4] * 32)
+
+
+def test_random_against_linear_scan() -> None:
+    rng = random.Random(42)
+    index = FeeRateCostIndex()
+    entries: Dict[bytes32, Tuple[float, int]] = {}
+    for _ in range(2000):
+        if len(entries) > 0 and rng.random() < 0.3:
+            name = rng.choice(list(entries.keys()))
+            index.remove(name)
+            del entries[name]
+        else:
+            name = bytes32(rng.getrandbits(256).to_bytes(32, "big"))
+            # many items share a fee rate or have very close ones
+            fee_rate = rng.choice([0.0, rng.random() * 10, float(rng.randint(1, 20)), 1 + rng.random() * 1e-9])
+            cost = rng.randint(1, 100)
+            index.add(name, fee_rate, cost)
+            entries[name] = (fee_rate, cost)
+
+        target = rng.randint(1, index.total_cost + 1)
+        sorted_entries: List[Tuple[float, int]] = sorted(entries.values())
+        expected = None
+        cumulative = 0
+        for fee_rate, cost in sorted_entries:
+            cumulative += cost
+            if cumulative >= target:
+                expected = fee_rate
+                break
+        assert index.fee_rate_at_cost(target) == expected
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import pytest
+from blspy import G2Element
+
+from taco.consensus.cost_calculator import NPCResult
+from taco.full_node.block_template import BlockTemplate
+from taco.full_node.coin_store import CoinStore
+from taco.full_node.mempool import Mempool
+from taco.full_node.mempool_manager import MempoolManager
+from taco.types.blockchain_format.coin import Coin
+from taco.types.blockchain_format.program import SerializedProgram
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.coin_spend import CoinSpend
+from taco.types.mempool_inclusion_status import MempoolInclusionStatus
+from taco.types.mempool_item import MempoolItem
+from taco.types.spend_bundle import SpendBundle
+from taco.util.errors import Err
+from taco.util.ints import uint32, uint64
+from tests.core.consensus.test_pot_iterations import test_constants
+from tests.util.db_connection import DBConnection
+
+MAX_BLOCK_COST = 20
+NIL = SerializedProgram.from_bytes(b"\x80")
+
+
+def make_coin(idx: int) -> Coin:
+    return Coin(bytes32([idx] * 32), bytes32([0] * 32), uint64(1000000))
+
+
+def make_item(coin: Coin, fee: int, cost: int) -> MempoolItem:
+    spend_bundle = SpendBundle([CoinSpend(coin, NIL, NIL)], G2Element())
+    # every item creates a single coin, that can be spent by another item
+    additions: List[Coin] = [Coin(coin.name(), bytes32([0] * 32), uint64(coin.amount - fee))]
+    return MempoolItem(
+        spend_bundle,
+        uint64(fee),
+        NPCResult(None, None, uint64(cost)),
+        uint64(cost),
+        spend_bundle.name(),
+        additions,
+        uint32(0),
+    )
+
+
+def make_bundle_item(removals: List[Coin], additions: List[Coin], fee: int, cost: int) -> MempoolItem:
+    spend_bundle = SpendBundle([CoinSpend(coin, NIL, NIL) for coin in removals], G2Element())
+    return MempoolItem(
+        spend_bundle,
+        uint64(fee),
+        NPCResult(None, None, uint64(cost)),
+        uint64(cost),
+        spend_bundle.name(),
+        additions,
+        uint32(0),
+    )
+
+
+def make_mempool(max_size_in_cost: int = 100) -> Mempool:
+    return Mempool(max_size_in_cost, uint64(5), uint64(MAX_BLOCK_COST), BlockTemplate(MAX_BLOCK_COST, 10000000000000))
+
+
+def test_links() -> None:
+    mempool = make_mempool()
+    parent = make_item(make_coin(1), 1, 10)
+    child = make_item(parent.additions[0], 100, 10)
+    grandchild = make_item(child.additions[0], 100, 10)
+    for item in [parent, child, grandchild]:
+        mempool.add_to_pool(item)
+
+    assert mempool.get_unconfirmed_coin(parent.additions[0].name()) == parent.additions[0]
+    assert mempool.get_unconfirmed_coin(make_coin(1).name()) is None
+    assert mempool.parents[child.name] == {parent.name}
+    assert mempool.get_ancestors(grandchild.name) == {parent.name, child.name}
+    assert mempool.get_descendants(parent.name) == {child.name, grandchild.name}
+    assert mempool.get_ancestors(parent.name) == set()
+
+
+def test_remove_parent_removes_descendants() -> None:
+    mempool = make_mempool()
+    parent = make_item(make_coin(1), 1, 10)
+    child = make_item(parent.additions[0], 100, 10)
+    grandchild = make_item(child.additions[0], 100, 10)
+    for item in [parent, child, grandchild]:
+        mempool.add_to_pool(item)
+
+    mempool.remove_from_pool([parent.name])
+    assert mempool.spends == {}
+    assert mempool.additions == {}
+    assert mempool.parents == {}
+    assert mempool.children == {}
+    assert mempool.total_mempool_cost == 0
+
+
+def test_confirm_additions() -> None:
+    mempool = make_mempool()
+    parent = make_item(make_coin(1), 1, 10)
+    child = make_item(parent.additions[0], 100, 10)
+    mempool.add_to_pool(parent)
+    mempool.add_to_pool(child)
+
+    # the parent got included in a block, the child no longer depends on it
+    mempool.confirm_additions([parent.additions[0].name()])
+    assert mempool.parents == {}
+    assert mempool.children == {}
+    mempool.remove_from_pool([parent.name])
+    assert list(mempool.spends.keys()) == [child.name]
+
+
+def test_block_template_selects_package() -> None:
+    mempool = make_mempool()
+    parent = make_item(make_coin(1), 10, 10)
+    child = make_item(parent.additions[0], 1000, 10)
+    other = make_item(make_coin(2), 300, 10)
+    for item in [parent, other, child]:
+        mempool.add_to_pool(item)
+
+    # on its own fee per cost the parent ranks last, but with its child it beats the other item
+    assert mempool.block_template is not None
+    assert [item.name for item in mempool.block_template.selected_items()] == [parent.name, child.name]
+    result = mempool.block_template.create_bundle()
+    assert result is not None
+    assert result[2] == [make_coin(1), parent.additions[0]]
+
+
+def test_eviction_keeps_parent_of_high_fee_child() -> None:
+    mempool = make_mempool(30)
+    parent = make_item(make_coin(1), 10, 10)
+    child = make_item(parent.additions[0], 1000, 10)
+    other = make_item(make_coin(2), 30, 10)
+    for item in [parent, child, other]:
+        mempool.add_to_pool(item)
+
+    assert mempool.get_eviction_fee_rate(parent) == 1010 / 20
+    mempool.add_to_pool(make_item(make_coin(3), 50, 10))
+    assert other.name not in mempool.spends
+    assert parent.name in mempool.spends
+    assert child.name in mempool.spends
+
+
+def test_eviction_removes_descendants() -> None:
+    mempool = make_mempool(30)
+    parent = make_item(make_coin(1), 10, 10)
+    child = make_item(parent.additions[0], 10, 10)
+    other = make_item(make_coin(2), 300, 10)
+    for item in [parent, child, other]:
+        mempool.add_to_pool(item)
+
+    new_item = make_item(make_coin(3), 500, 10)
+    mempool.add_to_pool(new_item)
+    assert set(mempool.spends.keys()) == {other.name, new_item.name}
+
+
+def replace(mempool: Mempool, new_item: MempoolItem, conflicts: List[MempoolItem], remove_first: bool) -> None:
+    # the mempool manager removes the conflicts first, the mempool doesn't depend on the order
+    if remove_first:
+        mempool.remove_from_pool([item.name for item in conflicts])
+        assert mempool.add_to_pool(new_item) is None
+    else:
+        assert mempool.add_to_pool(new_item) is None
+        mempool.remove_from_pool([item.name for item in conflicts])
+
+
+@pytest.mark.parametrize("remove_first", [True, False])
+def test_replace_creating_the_same_coin(remove_first: bool) -> None:
+    mempool = make_mempool()
+    coin = make_coin(1)
+    created = Coin(coin.name(), bytes32([0] * 32), uint64(999990))
+    old = make_bundle_item([coin], [created], 10, 10)
+    mempool.add_to_pool(old)
+    new = make_bundle_item([coin, make_coin(2)], [created], 1010, 10)
+    replace(mempool, new, [old], remove_first)
+
+    assert set(mempool.spends.keys()) == {new.name}
+    assert mempool.additions[created.name()] == new.name
+    assert mempool.get_unconfirmed_coin(created.name()) == created
+    # items spending the coin depend on the replacement
+    child = make_item(created, 100, 10)
+    mempool.add_to_pool(child)
+    assert mempool.parents[child.name] == {new.name}
+
+
+@pytest.mark.parametrize("remove_first", [True, False])
+def test_replace_spending_its_own_ephemeral_coin(remove_first: bool) -> None:
+    mempool = make_mempool()
+    coin = make_coin(1)
+    ephemeral = Coin(coin.name(), bytes32([0] * 32), uint64(999990))
+    old = make_bundle_item([coin], [ephemeral], 10, 10)
+    mempool.add_to_pool(old)
+    created = Coin(ephemeral.name(), bytes32([0] * 32), uint64(999900))
+    new = make_bundle_item([coin, make_coin(2), ephemeral], [ephemeral, created], 1100, 10)
+    replace(mempool, new, [old], remove_first)
+
+    assert set(mempool.spends.keys()) == {new.name}
+    assert mempool.parents == {}
+    assert mempool.children == {}
+    assert mempool.additions == {ephemeral.name(): new.name, created.name(): new.name}
+
+
+def test_eviction_never_overfills() -> None:
+    mempool = make_mempool(30)
+    parent = make_item(make_coin(1), 1, 10)
+    child = make_item(parent.additions[0], 1, 10)
+    other = make_item(make_coin(2), 1, 10)
+    for item in [parent, child, other]:
+        mempool.add_to_pool(item)
+
+    # its ancestors can't be evicted, and evicting everything else doesn't make enough room
+    grandchild = make_item(child.additions[0], 1000, 20)
+    assert mempool.add_to_pool(grandchild) is Err.INVALID_FEE_LOW_FEE
+    assert set(mempool.spends.keys()) == {parent.name, child.name, other.name}
+    assert mempool.total_mempool_cost == 30
+
+    grandchild = make_item(child.additions[0], 1000, 10)
+    assert mempool.add_to_pool(grandchild) is None
+    assert set(mempool.spends.keys()) == {parent.name, child.name, grandchild.name}
+    assert mempool.total_mempool_cost == 30
+
+
+def test_check_add_to_pool() -> None:
+    mempool = make_mempool(30)
+    parent = make_item(make_coin(1), 1, 20)
+    conflict = make_item(make_coin(2), 1, 10)
+    for item in [parent, conflict]:
+        mempool.add_to_pool(item)
+
+    # fits once the conflict is gone
+    replacement = make_bundle_item([make_coin(2)], [], 100, 10)
+    assert mempool.check_add_to_pool(replacement) is None
+    assert mempool.check_add_to_pool(make_item(make_coin(3), 100, 20), [conflict.name]) is None
+    # its parent can't be evicted
+    child = make_bundle_item([make_coin(2), parent.additions[0]], [], 100, 20)
+    assert mempool.check_add_to_pool(child, [conflict.name]) is Err.INVALID_FEE_LOW_FEE
+    assert set(mempool.spends.keys()) == {parent.name, conflict.name}
+
+
+@pytest.mark.asyncio
+async def test_failed_replacement_keeps_the_mempool(monkeypatch: pytest.MonkeyPatch) -> None:
+    async with DBConnection(db_version=2) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        mempool_manager = MempoolManager(coin_store, test_constants, single_threaded=True)
+        mempool_manager.mempool = make_mempool(30)
+        parent = make_item(make_coin(1), 1, 20)
+        conflict = make_item(make_coin(2), 1, 10)
+        for item in [parent, conflict]:
+            mempool_manager.mempool.add_to_pool(item)
+
+        # the replacement of the conflict is valid, but it doesn't fit next to its parent
+        replacement = make_bundle_item([make_coin(2), parent.additions[0]], [], 100, 20)
+
+        async def validate_spend_bundle(
+            new_spend: SpendBundle, npc_result: NPCResult, spend_name: bytes32
+        ) -> Tuple[Optional[Err], Optional[MempoolItem], List[bytes32]]:
+            return None, replacement, [conflict.name]
+
+        monkeypatch.setattr(mempool_manager, "validate_spend_bundle", validate_spend_bundle)
+        _, status, err = await mempool_manager.add_spend_bundle(
+            replacement.spend_bundle, replacement.npc_result, replacement.name
+        )
+        assert status == MempoolInclusionStatus.FAILED
+        assert err is Err.INVALID_FEE_LOW_FEE
+        assert set(mempool_manager.mempool.spends.keys()) == {parent.name, conflict.name}
+        assert mempool_manager.mempool.total_mempool_cost == 30
+
+        mempool_manager.shut_down()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import List, Tuple
+
+import pytest
+
+from taco.consensus.block_record import BlockRecord
+from taco.consensus.blockchain import StateChangeSummary
+from taco.consensus.coinbase import create_farmer_coin, create_pool_coin
+from taco.full_node.coin_store import CoinStore
+from taco.full_node.mempool_manager import MempoolManager, has_time_locks
+from taco.simulator.wallet_tools import WalletTool
+from taco.types.blockchain_format.classgroup import ClassgroupElement
+from taco.types.blockchain_format.coin import Coin
+from taco.types.blockchain_format.sized_bytes import bytes32, bytes100
+from taco.types.mempool_inclusion_status import MempoolInclusionStatus
+from taco.types.spend_bundle import SpendBundle
+from taco.types.spend_bundle_conditions import Spend, SpendBundleConditions
+from taco.util.ints import uint8, uint32, uint64, uint128
+from tests.core.consensus.test_pot_iterations import test_constants
+from tests.util.db_connection import DBConnection
+
+
+def make_block_record(height: uint32, timestamp: uint64, header_hash: bytes32) -> BlockRecord:
+    return BlockRecord(
+        header_hash,
+        bytes32(b"b" * 32),  # prev_hash
+        height,
+        uint128(0),  # weight
+        uint128(0),  # total_iters
+        uint8(0),  # signage_point_index
+        ClassgroupElement(bytes100(b"1" * 100)),  # challenge_vdf_output
+        None,  # infused_challenge_vdf_output
+        bytes32(b"f" * 32),  # reward_infusion_new_challenge
+        bytes32(b"c" * 32),  # challenge_block_info_hash
+        uint64(0),  # sub_slot_iters
+        bytes32(b"d" * 32),  # pool_puzzle_hash
+        bytes32(b"e" * 32),  # farmer_puzzle_hash
+        uint64(0),  # required_iters
+        uint8(0),  # deficit
+        False,  # overflow
+        uint32(height - 1),  # prev_transaction_block_height
+        timestamp,
+        None,  # prev_transaction_block_hash
+        uint64(0),  # fees
+        None,  # reward_claims_incorporated
+        None,  # finished_challenge_slot_hashes
+        None,  # finished_infused_challenge_slot_hashes
+        None,  # finished_reward_slot_hashes
+        None,  # sub_epoch_summary_included
+    )
+
+
+def test_has_time_locks() -> None:
+    coin_id = bytes32(b"1" * 32)
+    puzzle_hash = bytes32(b"2" * 32)
+    assert not has_time_locks(None)
+    assert not has_time_locks(SpendBundleConditions([Spend(coin_id, puzzle_hash, None, 0, [], [])], 0, 0, 0, [], 0))
+    assert has_time_locks(SpendBundleConditions([], 0, 10, 0, [], 0))
+    assert has_time_locks(SpendBundleConditions([], 0, 0, 10, [], 0))
+    assert has_time_locks(SpendBundleConditions([Spend(coin_id, puzzle_hash, 1, 0, [], [])], 0, 0, 0, [], 0))
+    assert has_time_locks(SpendBundleConditions([Spend(coin_id, puzzle_hash, None, 1, [], [])], 0, 0, 0, [], 0))
+
+
+async def make_mempool(coin_store: CoinStore, timestamp: uint64) -> Tuple[MempoolManager, List[SpendBundle]]:
+    """
+    A mempool at the peak at height 3, with an item spending the farmer reward of each of the blocks 1 to 3.
+    """
+    mempool_manager = MempoolManager(coin_store, test_constants, single_threaded=True)
+    wallet_tool = WalletTool(test_constants)
+
+    coins: List[Coin] = []
+    for height in range(1, 4):
+        coin = create_farmer_coin(
+            uint32(height), wallet_tool.get_new_puzzlehash(), uint64(250000000), test_constants.GENESIS_CHALLENGE
+        )
+        coins.append(coin)
+        # every block has at least the farmer and the pool reward
+        pool_coin = create_pool_coin(
+            uint32(height), wallet_tool.get_new_puzzlehash(), uint64(1750000000), test_constants.GENESIS_CHALLENGE
+        )
+        await coin_store.new_block(uint32(height), timestamp, {coin, pool_coin}, [], [])
+    await mempool_manager.new_peak(make_block_record(uint32(3), timestamp, bytes32([3] * 32)), None)
+
+    spend_bundles: List[SpendBundle] = []
+    for coin in coins:
+        spend_bundle = wallet_tool.generate_signed_transaction(
+            uint64(coin.amount // 2), wallet_tool.get_new_puzzlehash(), coin
+        )
+        npc_result = await mempool_manager.pre_validate_spendbundle(spend_bundle, None, spend_bundle.name())
+        _, status, _ = await mempool_manager.add_spend_bundle(spend_bundle, npc_result, spend_bundle.name())
+        assert status == MempoolInclusionStatus.SUCCESS
+        spend_bundles.append(spend_bundle)
+    return mempool_manager, spend_bundles
+
+
+@pytest.mark.asyncio
+async def test_reorg_only_revalidates_affected_items() -> None:
+    async with DBConnection(db_version=2) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        timestamp = uint64(1631794488)
+        mempool_manager, spend_bundles = await make_mempool(coin_store, timestamp)
+        untouched = [mempool_manager.get_mempool_item(spend_bundle.name()) for spend_bundle in spend_bundles[:2]]
+
+        # reorg out the block at height 3, the coin it created no longer exists
+        rolled_back = await coin_store.rollback_to_block(2)
+        new_peak = make_block_record(uint32(3), uint64(timestamp + 20), bytes32([4] * 32))
+        await mempool_manager.new_peak(new_peak, None, StateChangeSummary(new_peak, uint32(2), rolled_back, [], []))
+
+        assert mempool_manager.get_mempool_item(spend_bundles[2].name()) is None
+        # the other items weren't re-validated, they are the very same objects
+        for spend_bundle, item in zip(spend_bundles, untouched):
+            assert mempool_manager.get_mempool_item(spend_bundle.name()) is item
+
+        mempool_manager.shut_down()
+
+
+@pytest.mark.asyncio
+async def test_reorg_without_summary_rebuilds_mempool() -> None:
+    async with DBConnection(db_version=2) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        timestamp = uint64(1631794488)
+        mempool_manager, spend_bundles = await make_mempool(coin_store, timestamp)
+
+        # like after a long sync, the changes to the coin set aren't known
+        await coin_store.rollback_to_block(2)
+        new_peak = make_block_record(uint32(3), uint64(timestamp + 20), bytes32([4] * 32))
+        await mempool_manager.new_peak(new_peak, None)
+
+        assert mempool_manager.get_mempool_item(spend_bundles[2].name()) is None
+        for spend_bundle in spend_bundles[:2]:
+            assert mempool_manager.get_mempool_item(spend_bundle.name()) is not None
+
+        mempool_manager.shut_down()
+
+
+@pytest.mark.asyncio
+async def test_reorg_to_non_transaction_block() -> None:
+    async with DBConnection(db_version=2) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        timestamp = uint64(1631794488)
+        mempool_manager, spend_bundles = await make_mempool(coin_store, timestamp)
+
+        # the reorg is to a peak that isn't a transaction block, the mempool skips it
+        rolled_back = await coin_store.rollback_to_block(2)
+        new_peak = dataclasses.replace(make_block_record(uint32(3), timestamp, bytes32([4] * 32)), timestamp=None)
+        await mempool_manager.new_peak(new_peak, None, StateChangeSummary(new_peak, uint32(2), rolled_back, [], []))
+        assert mempool_manager.get_mempool_item(spend_bundles[2].name()) is not None
+
+        # the summary of the next transaction block only extends the chain, it doesn't have the rolled back coins
+        new_peak = make_block_record(uint32(4), uint64(timestamp + 20), bytes32([5] * 32))
+        await mempool_manager.new_peak(new_peak, None, StateChangeSummary(new_peak, uint32(3), [], [], []))
+
+        assert mempool_manager.get_mempool_item(spend_bundles[2].name()) is None
+        for spend_bundle in spend_bundles[:2]:
+            assert mempool_manager.get_mempool_item(spend_bundle.name()) is not None
+
+        mempool_manager.shut_down()
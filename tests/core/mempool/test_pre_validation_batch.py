@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from blspy import G2Element
+
+from taco.consensus.coinbase import create_farmer_coin
+from taco.consensus.cost_calculator import NPCResult
+from taco.full_node.coin_store import CoinStore
+from taco.full_node.mempool_manager import MempoolManager, validate_clvm_and_signature
+from taco.simulator.wallet_tools import WalletTool
+from taco.types.spend_bundle import SpendBundle
+from taco.util.errors import Err
+from taco.util.ints import uint32, uint64
+from tests.core.consensus.test_pot_iterations import test_constants
+from tests.util.db_connection import DBConnection
+
+
+def npc_summary(npc_result: Optional[NPCResult]) -> Tuple[Optional[int], int, List[Tuple[bytes, List[Any]]]]:
+    # the order of the CREATE_COIN conditions in the spends isn't deterministic
+    assert npc_result is not None and npc_result.conds is not None
+    spends = [(bytes(spend.coin_id), sorted(spend.create_coin)) for spend in npc_result.conds.spends]
+    return npc_result.error, npc_result.cost, spends
+
+
+@pytest.mark.asyncio
+async def test_pre_validate_spendbundles() -> None:
+    async with DBConnection(db_version=2) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        mempool_manager = MempoolManager(coin_store, test_constants, single_threaded=True)
+        wallet_tool = WalletTool(test_constants)
+
+        spend_bundles: List[SpendBundle] = []
+        for height in range(1, 4):
+            coin = create_farmer_coin(
+                uint32(height), wallet_tool.get_new_puzzlehash(), uint64(250000000), test_constants.GENESIS_CHALLENGE
+            )
+            spend_bundles.append(
+                wallet_tool.generate_signed_transaction(
+                    uint64(coin.amount // 2), wallet_tool.get_new_puzzlehash(), coin
+                )
+            )
+        # same spends, without a signature
+        invalid = SpendBundle(spend_bundles[1].coin_spends, G2Element())
+        spend_bundles.insert(1, invalid)
+
+        results = await mempool_manager.pre_validate_spendbundles(
+            [(spend_bundle, None, spend_bundle.name()) for spend_bundle in spend_bundles]
+        )
+        assert len(results) == len(spend_bundles)
+        assert results[1] == (Err.BAD_AGGREGATE_SIGNATURE, None)
+        for spend_bundle, (err, npc_result) in zip(spend_bundles, results):
+            if spend_bundle is invalid:
+                continue
+            assert err is None
+            expected_err, expected_bytes, _ = validate_clvm_and_signature(
+                bytes(spend_bundle),
+                test_constants.MAX_BLOCK_COST_CLVM,
+                test_constants.COST_PER_BYTE,
+                test_constants.AGG_SIG_ME_ADDITIONAL_DATA,
+            )
+            assert expected_err is None
+            assert npc_summary(npc_result) == npc_summary(NPCResult.from_bytes(expected_bytes))
+
+        assert await mempool_manager.pre_validate_spendbundles([]) == []
+        mempool_manager.shut_down()
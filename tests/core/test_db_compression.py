@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+from contextlib import closing
+from typing import List
+
+import pytest
+
+from taco.cmds.db_compress_func import compress_v2
+from taco.full_node.block_compression import CREATE_DICTIONARY_TABLE, BlockCompressor, train_dictionary
+from taco.full_node.block_store import BlockStore
+from taco.types.full_block import FullBlock
+from taco.util.db_wrapper import DBWrapper2
+from tests.core.test_db_validation import make_db
+from tests.util.temp_file import TempFile
+
+
+def make_samples(count: int) -> List[bytes]:
+    rng = random.Random(1337)
+    common = bytes(rng.getrandbits(8) for _ in range(3000))
+    return [common[: rng.randint(1000, 3000)] + os.urandom(100) + common[rng.randint(0, 1000) :] for _ in range(count)]
+
+
+def test_compressor_without_dictionary() -> None:
+    compressor = BlockCompressor()
+    assert compressor.dict_id == 0
+    data = make_samples(1)[0]
+    assert compressor.decompress(compressor.compress(data)) == data
+
+
+def test_compressor_with_dictionary() -> None:
+    samples = make_samples(1000)
+    dict_id, dictionary = train_dictionary(samples, 16384)
+    plain = BlockCompressor()
+    compressor = BlockCompressor([(dict_id, dictionary)])
+    assert compressor.dict_id == dict_id
+
+    # blocks compressed before the dictionary was added are still readable
+    assert compressor.decompress(plain.compress(samples[0])) == samples[0]
+    compressed = compressor.compress(samples[1])
+    assert compressor.decompress(compressed) == samples[1]
+    assert len(compressed) < len(plain.compress(samples[1]))
+
+    # a newer dictionary is used to compress, older ones can still decompress
+    new_id, new_dictionary = train_dictionary(samples, 16384, [dict_id])
+    assert new_id != dict_id
+    newer = BlockCompressor([(dict_id, dictionary), (new_id, new_dictionary)])
+    assert newer.dict_id == new_id
+    assert newer.decompress(compressed) == samples[1]
+    with pytest.raises(ValueError, match="unknown zstd dictionary"):
+        compressor.decompress(newer.compress(samples[2]))
+
+
+def test_load_without_table() -> None:
+    with closing(sqlite3.connect(":memory:")) as conn:
+        assert BlockCompressor.load(conn).dict_id == 0
+        conn.execute(CREATE_DICTIONARY_TABLE)
+        assert BlockCompressor.load(conn).dict_id == 0
+
+
+@pytest.mark.asyncio
+async def test_db_compress(default_1000_blocks: List[FullBlock]) -> None:
+    with TempFile() as db_file:
+        await make_db(db_file, default_1000_blocks)
+        compress_v2(db_file, sample_size=500, dictionary_size=16384)
+
+        db_wrapper = await DBWrapper2.create(database=db_file, reader_count=1, db_version=2)
+        try:
+            block_store = await BlockStore.create(db_wrapper)
+            assert block_store.compressor.dict_id != 0
+            heights = [block.height for block in default_1000_blocks]
+            assert await block_store.get_full_blocks_at(heights) == default_1000_blocks
+        finally:
+            await db_wrapper.close()
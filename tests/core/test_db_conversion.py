@@ -73,12 +73,15 @@ class TestDbUpgrade:
                     hint_store1 = None
 
                 bc = await Blockchain.create(coin_store1, block_store1, test_constants, Path("."), reserved_cores=0)
-
-                for block in blocks:
-                    # await _validate_and_add_block(bc, block)
-                    results = PreValidationResult(None, uint64(1), None, False)
-                    result, err, _ = await bc.receive_block(block, results)
-                    assert err is None
+                try:
+                    for block in blocks:
+                        # await _validate_and_add_block(bc, block)
+                        results = PreValidationResult(None, uint64(1), None, False)
+                        result, err, _ = await bc.receive_block(block, results)
+                        assert err is None
+                finally:
+                    bc.shut_down()
+                    bc.close()
             finally:
                 await db_wrapper1.close()
 
@@ -140,11 +140,14 @@ async def make_db(db_file: Path, blocks: List[FullBlock]) -> None:
         coin_store = await CoinStore.create(db_wrapper)
 
         bc = await Blockchain.create(coin_store, block_store, test_constants, Path("."), reserved_cores=0)
-
-        for block in blocks:
-            results = PreValidationResult(None, uint64(1), None, False)
-            result, err, _ = await bc.receive_block(block, results)
-            assert err is None
+        try:
+            for block in blocks:
+                results = PreValidationResult(None, uint64(1), None, False)
+                result, err, _ = await bc.receive_block(block, results)
+                assert err is None
+        finally:
+            bc.shut_down()
+            bc.close()
     finally:
         await db_wrapper.close()
 
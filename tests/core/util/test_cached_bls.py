@@ -1,7 +1,10 @@
+from pathlib import Path
+
+import pytest
 from blspy import AugSchemeMPL, G1Element
 from taco.util import cached_bls
+from taco.util.cached_bls import PAIRING_ENTRY_SIZE, BLSCache
 from taco.util.hash import std_hash
-from taco.util.lru_cache import LRUCache
 
 
 def test_cached_bls():
@@ -29,7 +32,7 @@ def test_cached_bls():
     assert cached_bls.aggregate_verify(pks, msgs, agg_sig)
 
     # Use a small cache which can not accommodate all pairings
-    local_cache = LRUCache(n_keys // 2)
+    local_cache = BLSCache(n_keys // 2 * PAIRING_ENTRY_SIZE)
     # Verify signatures and cache pairings one at a time
     for pk, msg, sig in zip(pks_half, msgs_half, sigs_half):
         assert cached_bls.aggregate_verify([pk], [msg], sig, True, local_cache)
@@ -52,3 +55,52 @@ def test_cached_bls_repeat_pk():
     assert AugSchemeMPL.aggregate_verify([G1Element.from_bytes(pk) for pk in pks], msgs, agg_sig)
 
     assert cached_bls.aggregate_verify(pks, msgs, agg_sig, force_cache=True)
+
+
+def make_signatures(n_keys: int):
+    sks = [AugSchemeMPL.key_gen(bytes([i]) * 32) for i in range(n_keys)]
+    pks = [bytes(sk.get_g1()) for sk in sks]
+    msgs = [("msg-%d" % (i,)).encode() for i in range(n_keys)]
+    agg_sig = AugSchemeMPL.aggregate([AugSchemeMPL.sign(sk, msg) for sk, msg in zip(sks, msgs)])
+    return pks, msgs, agg_sig
+
+
+def test_bls_cache_size_and_stats():
+    pks, msgs, agg_sig = make_signatures(6)
+    cache = BLSCache(4 * PAIRING_ENTRY_SIZE + PAIRING_ENTRY_SIZE // 2)
+    assert cache.max_size == 4 * PAIRING_ENTRY_SIZE
+
+    assert cached_bls.aggregate_verify(pks[:3], msgs[:3], AugSchemeMPL.aggregate([]), True, cache) is False
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert cached_bls.aggregate_verify(pks, msgs, agg_sig, True, cache)
+    assert (cache.hits, cache.misses) == (3, 6)
+    # only the most recently used pairings are kept
+    assert len(cache) == 4
+    assert [key for key, _ in cache.items()] == [std_hash(pk + msg) for pk, msg in zip(pks[2:], msgs[2:])]
+
+    cache.resize(2 * PAIRING_ENTRY_SIZE)
+    assert [key for key, _ in cache.items()] == [std_hash(pk + msg) for pk, msg in zip(pks[4:], msgs[4:])]
+
+
+@pytest.mark.asyncio
+async def test_bls_cache_save_load(tmp_path: Path):
+    pks, msgs, agg_sig = make_signatures(5)
+    cache = BLSCache()
+    assert cached_bls.aggregate_verify(pks, msgs, agg_sig, True, cache)
+    path = tmp_path / "bls-pairing-cache"
+    await cache.save(path)
+
+    warm_cache = BLSCache()
+    assert warm_cache.load(tmp_path / "missing") == 0
+    assert warm_cache.load(path) == 5
+    assert [(key, bytes(pairing)) for key, pairing in warm_cache.items()] == [
+        (key, bytes(pairing)) for key, pairing in cache.items()
+    ]
+    assert cached_bls.aggregate_verify(pks, msgs, agg_sig, False, warm_cache)
+    assert (warm_cache.hits, warm_cache.misses) == (5, 0)
+
+    # a file that doesn't match its hash isn't loaded
+    contents = bytearray(path.read_bytes())
+    contents[-1] ^= 1
+    path.write_bytes(contents)
+    assert BLSCache().load(path) == 0
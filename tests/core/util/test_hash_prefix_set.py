@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import random
+
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.util.hash_prefix_set import HashPrefixSet
+
+
+def rand_hash() -> bytes32:
+    return bytes32(random.getrandbits(256).to_bytes(32, "big"))
+
+
+def test_hash_prefix_set() -> None:
+    random.seed(1337)
+    hashes = [rand_hash() for _ in range(100)]
+    others = [rand_hash() for _ in range(100)]
+    prefix_set = HashPrefixSet(hashes[:50])
+    assert len(prefix_set) == 50
+
+    # one at a time, in a small batch and in a large one
+    prefix_set.add(hashes[50])
+    prefix_set.add(hashes[50])
+    prefix_set.add_many(hashes[51:55])
+    prefix_set.add_many(hashes[:100])
+    assert len(prefix_set) == 100
+    assert list(prefix_set.prefixes) == sorted(prefix_set.prefixes)
+
+    assert all(prefix_set.may_contain(h) for h in hashes)
+    assert not any(prefix_set.may_contain(h) for h in others)
+    # only the first 8 bytes are compared
+    assert prefix_set.may_contain(bytes32(hashes[0][:8] + bytes(24)))
+    assert not HashPrefixSet().may_contain(hashes[0])
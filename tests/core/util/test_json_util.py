@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from blspy import G2Element
+
+from taco.types.blockchain_format.coin import Coin
+from taco.types.blockchain_format.program import Program
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.coin_record import CoinRecord
+from taco.types.coin_spend import CoinSpend
+from taco.types.spend_bundle import SpendBundle
+from taco.util.ints import uint8, uint32, uint64, uint128
+from taco.util.json_util import JsonWithExtraFields, dict_to_json_bytes, dict_to_json_str
+from taco.util.streamable import Streamable, UnsupportedType, streamable
+from taco.wallet.util.wallet_types import WalletType
+
+
+@streamable
+@dataclass(frozen=True)
+class JsonInner(Streamable):
+    a: Tuple[str, uint32, bool]
+    b: bytes
+
+
+@streamable
+@dataclass(frozen=True)
+class JsonOuter(Streamable):
+    z: uint128
+    y: Optional[JsonInner]
+    x: List[JsonInner]
+    w: bytes32
+    v: Program
+    u: str
+
+
+@streamable
+@dataclass(frozen=True)
+class JsonEmpty(Streamable):
+    pass
+
+
+coin = Coin(bytes32([1] * 32), bytes32([2] * 32), uint64(1000))
+spend_bundle = SpendBundle([CoinSpend(coin, Program.to(1), Program.to([]))], G2Element())
+outer = JsonOuter(
+    uint128(2**100),
+    None,
+    [JsonInner(("foo", uint32(1), True), b"\x13\x37"), JsonInner(("bär\n", uint32(0), False), b"")],
+    bytes32([3] * 32),
+    Program.to([1, 2]),
+    'quote"',
+)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        outer,
+        JsonEmpty(),
+        CoinRecord(coin, uint32(10), uint32(0), True, uint64(1650000000)),
+        # overrides to_json_dict()
+        spend_bundle,
+        {"outer": outer, "list": [outer, outer], "empty": [], "nested": {}, "tuple": (uint8(1), None)},
+        {"floats": [1.5, float("nan"), float("inf")], "wallet_type": WalletType.CAT, "bytes": b"\x01", "bool": True},
+        {1: "int key", 2: None},
+        JsonWithExtraFields(CoinRecord(coin, uint32(10), uint32(11), False, uint64(1)), {"spent": True}),
+        JsonWithExtraFields(outer, {"u": "overridden", "a": [outer]}),
+        JsonWithExtraFields(spend_bundle, {"a": 1}),
+        [],
+        {},
+        "string",
+    ],
+)
+def test_dict_to_json_bytes(obj: Any) -> None:
+    assert dict_to_json_bytes(obj) == dict_to_json_str(obj).encode()
+
+
+def test_dict_to_json_bytes_extra_fields() -> None:
+    record = CoinRecord(coin, uint32(10), uint32(11), False, uint64(1))
+    assert json.loads(dict_to_json_bytes(JsonWithExtraFields(record, {"spent": True}))) == {
+        **record.to_json_dict(),
+        "spent": True,
+    }
+
+
+def test_dict_to_json_bytes_errors() -> None:
+    @dataclass(frozen=True)
+    class NotStreamable:
+        a: float
+
+    @streamable
+    @dataclass(frozen=True)
+    class WithUnsupported(Streamable):
+        a: uint8
+
+    # the field is checked when it's created, not when it's converted
+    unsupported = WithUnsupported(uint8(1))
+    object.__setattr__(unsupported, "a", 1.5)
+    with pytest.raises(UnsupportedType):
+        dict_to_json_str(unsupported)
+    with pytest.raises(UnsupportedType):
+        dict_to_json_bytes(unsupported)
+
+    for obj in [NotStreamable(1.5), object(), {bytes32([0] * 32): 1}]:
+        with pytest.raises((TypeError, AttributeError)):
+            dict_to_json_str(obj)
+        with pytest.raises((TypeError, AttributeError)):
+            dict_to_json_bytes(obj)
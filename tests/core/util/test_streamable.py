@@ -3,7 +3,7 @@ from __future__ import annotations
 import io
 import re
 from dataclasses import dataclass, field, fields
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, get_type_hints
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Type, get_type_hints
 
 import pytest
 from blspy import G1Element
@@ -17,7 +17,7 @@ from taco.types.blockchain_format.program import Program
 from taco.types.blockchain_format.sized_bytes import bytes4, bytes32
 from taco.types.full_block import FullBlock
 from taco.types.weight_proof import SubEpochChallengeSegment
-from taco.util.ints import uint8, uint32, uint64
+from taco.util.ints import int16, uint8, uint32, uint64, uint128
 from taco.util.streamable import (
     ConversionError,
     DefinitionError,
@@ -26,6 +26,7 @@ from taco.util.streamable import (
     ParameterMissingError,
     Streamable,
     UnsupportedType,
+    fixed_size_runs,
     function_to_parse_one_item,
     function_to_stream_one_item,
     is_type_List,
@@ -680,6 +681,91 @@ def test_streamable_empty() -> None:
     assert A.from_bytes(bytes(A())) == A()
 
 
+@streamable
+@dataclass(frozen=True)
+class FixedSizeRuns(Streamable):
+    a: uint32
+    b: bool
+    c: uint128
+    d: bytes32
+    e: Optional[uint8]
+    f: int16
+    g: uint64
+    h: bool
+
+
+def test_fixed_size_runs() -> None:
+    assert fixed_size_runs(FixedSizeRuns.streamable_fields()) == [[0, 1, 2, 3], [4], [5, 6, 7]]
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        FixedSizeRuns(uint32(0), False, uint128(0), bytes32([0] * 32), None, int16(-(2**15)), uint64(0), False),
+        FixedSizeRuns(
+            uint32(2**32 - 1),
+            True,
+            uint128(2**128 - 1),
+            bytes32([255] * 32),
+            uint8(7),
+            int16(2**15 - 1),
+            uint64(2**64 - 1),
+            True,
+        ),
+        FixedSizeRuns(uint32(5), True, uint128(2**64 + 3), bytes32([1] * 32), uint8(0), int16(-1), uint64(9), False),
+    ],
+)
+def test_generated_functions(obj: FixedSizeRuns) -> None:
+    # the bytes and objects are the same as the ones of streaming and parsing the fields one at a time
+    f = io.BytesIO()
+    for item in FixedSizeRuns.streamable_fields():
+        item.stream_function(getattr(obj, item.name), f)
+    assert bytes(obj) == f.getvalue()
+    f.seek(0)
+    values = {item.name: item.parse_function(f) for item in FixedSizeRuns.streamable_fields()}
+    parsed = FixedSizeRuns.from_bytes(bytes(obj))
+    assert parsed == obj == FixedSizeRuns(**values)
+    for item in FixedSizeRuns.streamable_fields():
+        assert type(getattr(parsed, item.name)) is type(getattr(obj, item.name))
+
+
+def test_generated_parse_errors() -> None:
+    blob = bytes(FixedSizeRuns(uint32(1), True, uint128(2), bytes32([3] * 32), None, int16(4), uint64(5), True))
+    # a bool can only be 0 or 1
+    with pytest.raises(ValueError, match="Bool byte must be 0 or 1"):
+        FixedSizeRuns.from_bytes(blob[:4] + b"\x02" + blob[5:])
+    with pytest.raises(ValueError, match="Bool byte must be 0 or 1"):
+        FixedSizeRuns.from_bytes(blob[:-1] + b"\xff")
+    # truncated in the first run, the uint32 and the uint128
+    with pytest.raises(ValueError, match="uint32"):
+        FixedSizeRuns.from_bytes(blob[:3])
+    with pytest.raises(ValueError, match="uint128"):
+        FixedSizeRuns.from_bytes(blob[:20])
+    # truncated at a bool, like parse_bool()
+    with pytest.raises(AssertionError):
+        FixedSizeRuns.from_bytes(blob[:4])
+    with pytest.raises(AssertionError):
+        FixedSizeRuns.from_bytes(blob[:-1])
+
+
+def test_own_parse_and_stream() -> None:
+    @streamable
+    @dataclass(frozen=True)
+    class OwnFunctions(Streamable):
+        a: uint32
+        b: uint32
+
+        @classmethod
+        def parse(cls, f: BinaryIO) -> OwnFunctions:
+            return cls(uint32(7), uint32(8))
+
+        def stream(self, f: BinaryIO) -> None:
+            f.write(b"own")
+
+    assert bytes(OwnFunctions(uint32(1), uint32(2))) == b"own"
+    assert OwnFunctions.parse(io.BytesIO(b"")) == OwnFunctions(uint32(7), uint32(8))
+
+
 def test_parse_bool() -> None:
     assert not parse_bool(io.BytesIO(b"\x00"))
     assert parse_bool(io.BytesIO(b"\x01"))
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+from pathlib import Path
 from typing import TYPE_CHECKING, Callable, List
 
 import aiosqlite
@@ -432,3 +433,57 @@ async def test_cancelled_reader_does_not_cancel_writer() -> None:
             assert await query_value(connection=writer) == 1
 
         assert await query_value(connection=writer) == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(database=tmp_path / "db.sqlite", reader_count=2, metrics=True)
+    try:
+        await setup_table(db_wrapper)
+        values: List[int] = []
+        await asyncio.gather(*(sum_counter(db_wrapper, values) for _ in range(5)))
+        assert values == [0] * 5
+
+        assert db_wrapper.metrics is not None
+        metrics = db_wrapper.metrics.to_json_dict()
+        assert metrics["totals"]["writer_wait"]["count"] == 1
+        assert metrics["totals"]["reader_wait"]["count"] == 5
+        assert metrics["totals"]["reader_hold"]["count"] == 5
+        # the statements are attributed to the module using the connections
+        store = metrics["stores"]["test_db_wrapper"]
+        assert store["statement"]["count"] == metrics["totals"]["statement"]["count"] >= 7
+        assert store["statement"]["max_ms"] >= store["statement"]["p50_ms"] > 0
+
+        db_wrapper.metrics.reset()
+        assert db_wrapper.metrics.to_json_dict()["stores"] == {}
+    finally:
+        await db_wrapper.close()
+
+
+@pytest.mark.asyncio
+async def test_adaptive_reader_pool(tmp_path: Path) -> None:
+    db_wrapper = await DBWrapper2.create(database=tmp_path / "db.sqlite", reader_count=1, max_reader_count=3)
+    try:
+        await setup_table(db_wrapper)
+        assert db_wrapper.reader_count == 1
+
+        async def slow_reader() -> None:
+            async with db_wrapper.reader_no_transaction() as connection:
+                await query_value(connection=connection)
+                await asyncio.sleep(DBWrapper2.READER_GROW_WAIT * 2)
+
+        # the second reader has to wait for the first one, which adds a connection
+        await asyncio.gather(slow_reader(), slow_reader())
+        await asyncio.gather(*db_wrapper._pool_tasks)
+        assert db_wrapper.reader_count == 2
+
+        # once no reader has waited for a while, the pool shrinks back
+        db_wrapper._last_reader_wait -= DBWrapper2.READER_SHRINK_IDLE
+        db_wrapper._last_pool_resize -= DBWrapper2.READER_SHRINK_IDLE
+        values: List[int] = []
+        await sum_counter(db_wrapper, values)
+        assert db_wrapper.reader_count == 1
+        await sum_counter(db_wrapper, values)
+        assert db_wrapper.reader_count == 1
+    finally:
+        await db_wrapper.close()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import itertools
 import random
 from typing import Generator, Iterator, List, Optional
 
@@ -23,7 +24,7 @@ from taco.types.blockchain_format.vdf import VDFInfo, VDFProof
 from taco.types.end_of_slot_bundle import EndOfSubSlotBundle
 from taco.types.full_block import FullBlock
 from taco.types.header_block import HeaderBlock
-from taco.util.full_block_utils import block_info_from_block, generator_from_block, header_block_from_block
+from taco.util.full_block_utils import BlockView, block_info_from_block, generator_from_block, header_block_from_block
 from taco.util.generator_tools import get_block_header
 from taco.util.ints import uint8, uint32, uint64, uint128
 
@@ -270,3 +271,22 @@ async def test_header_block():
         hb: HeaderBlock = get_block_header(block, [], [])
         hb_bytes = header_block_from_block(memoryview(bytes(block)))
         assert HeaderBlock.from_bytes(hb_bytes) == hb
+
+
+def test_block_view() -> None:
+    # a sample of the combinations test_parser() covers
+    for block in itertools.islice(get_full_blocks(), 0, None, 97):
+        view = BlockView(bytes(block))
+        # the first fields accessed are the ones at the end of the block
+        assert view.transactions_generator_ref_list == block.transactions_generator_ref_list
+        assert view.header_hash == block.header_hash
+        assert view.prev_header_hash == block.prev_header_hash
+        assert view.height == block.height
+        assert view.weight == block.weight
+        assert view.is_transaction_block() == block.is_transaction_block()
+        for field in FullBlock.streamable_fields():
+            assert view.field(field.name) == getattr(block, field.name)
+        assert view.get_included_reward_coins() == block.get_included_reward_coins()
+        assert view.header_block() == get_block_header(block, [], [])
+        assert view.to_full_block() == block
+        assert bytes(view) == bytes(block)
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List, Optional, Set
+from typing import List, Optional, Set, Tuple
 from unittest.mock import MagicMock
 
 import pytest
+from blspy import AugSchemeMPL
 from aiosqlite import Error as AIOSqliteError
 from colorlog import getLogger
 
@@ -16,21 +17,38 @@ from taco.full_node.weight_proof import WeightProofHandler
 from taco.protocols import full_node_protocol, wallet_protocol
 from taco.protocols.protocol_message_types import ProtocolMessageTypes
 from taco.protocols.shared_protocol import Capability
-from taco.protocols.wallet_protocol import RequestAdditions, RespondAdditions, RespondBlockHeaders, SendTransaction
+from taco.protocols.wallet_protocol import (
+    CoinState,
+    RequestAdditions,
+    RequestRemovals,
+    RespondAdditions,
+    RespondBlockHeaders,
+    RespondRemovals,
+    SendTransaction,
+)
 from taco.server.outbound_message import Message, make_msg
 from taco.simulator.block_tools import test_constants
 from taco.simulator.simulator_protocol import FarmNewBlockProtocol
 from taco.simulator.time_out_assert import time_out_assert, time_out_assert_not_none
+from taco.types.blockchain_format.coin import Coin, hash_coin_ids
 from taco.types.blockchain_format.program import Program
 from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.types.peer_info import PeerInfo
 from taco.util.block_cache import BlockCache
 from taco.util.hash import std_hash
 from taco.util.ints import uint16, uint32, uint64
+from taco.util.merkle_set import MerkleSet
 from taco.wallet.nft_wallet.nft_wallet import NFTWallet
 from taco.wallet.transaction_record import TransactionRecord
 from taco.wallet.util.compute_memos import compute_memos
-from taco.wallet.util.wallet_sync_utils import PeerRequestException
+from taco.wallet.util.peer_request_cache import PeerRequestCache
+from taco.wallet.util.wallet_sync_utils import (
+    PeerRequestException,
+    aggregate_verify_bytes,
+    request_and_validate_additions,
+    request_and_validate_removals,
+    subscribe_in_chunks,
+)
 from taco.wallet.util.wallet_types import AmountWithPuzzlehash
 from taco.wallet.wallet_coin_record import WalletCoinRecord
 from taco.wallet.wallet_weight_proof_handler import get_wp_fork_point
@@ -1349,3 +1367,141 @@ class TestWalletSync:
         await asyncio.sleep(3)
         assert wallet_node.wallet_state_manager.blockchain.get_peak_height() != fake_peak_height
         log.info(f"height {wallet_node.wallet_state_manager.blockchain.get_peak_height()}")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_outstanding", [1, 3])
+async def test_subscribe_in_chunks(max_outstanding: int) -> None:
+    items = [bytes32(i.to_bytes(32, "big")) for i in range(10)]
+    in_flight = 0
+    most_in_flight = 0
+    received: List[bytes32] = []
+
+    async def subscribe(chunk: List[bytes32]) -> List[CoinState]:
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        # the later chunks are answered first
+        await asyncio.sleep(0.01 * (10 - len(received)))
+        in_flight -= 1
+        return [CoinState(Coin(ph, ph, uint64(1)), None, None) for ph in chunk]
+
+    async def receive(states: List[CoinState]) -> bool:
+        received.extend(state.coin.puzzle_hash for state in states)
+        return True
+
+    assert await subscribe_in_chunks(items, subscribe, receive, 3, max_outstanding)
+    assert received == items
+    assert most_in_flight == max_outstanding
+
+    # a failure stops the sync, the outstanding subscriptions are cancelled
+    received = []
+    chunks_sent = 0
+
+    async def subscribe_slowly(chunk: List[bytes32]) -> List[CoinState]:
+        nonlocal chunks_sent
+        chunks_sent += 1
+        await asyncio.sleep(0.01 if chunk[0] == items[0] else 10)
+        return []
+
+    async def fail(states: List[CoinState]) -> bool:
+        return False
+
+    assert not await asyncio.wait_for(subscribe_in_chunks(items, subscribe_slowly, fail, 3, max_outstanding), 5)
+    assert chunks_sent == max_outstanding
+
+
+class ProofsPeer:
+    """
+    Answers additions and removals requests for a single block, like the full node does
+    """
+
+    def __init__(self, additions: List[Coin], removals: List[Coin]) -> None:
+        self.additions = additions
+        self.removals = {coin.name(): coin for coin in removals}
+        self.additions_set = MerkleSet()
+        for puzzle_hash in set(coin.puzzle_hash for coin in additions):
+            self.additions_set.add_already_hashed(puzzle_hash)
+            self.additions_set.add_already_hashed(hash_coin_ids(self.coins_with(puzzle_hash)))
+        self.removals_set = MerkleSet()
+        for name in self.removals:
+            self.removals_set.add_already_hashed(name)
+        self.requests: List[int] = []
+
+    def coins_with(self, puzzle_hash: bytes32) -> List[bytes32]:
+        return [coin.name() for coin in self.additions if coin.puzzle_hash == puzzle_hash]
+
+    async def request_additions(self, request: RequestAdditions) -> RespondAdditions:
+        assert request.puzzle_hashes is not None
+        self.requests.append(len(request.puzzle_hashes))
+        coins: List[Tuple[bytes32, List[Coin]]] = []
+        proofs: List[Tuple[bytes32, bytes, Optional[bytes]]] = []
+        for puzzle_hash in request.puzzle_hashes:
+            _, proof = self.additions_set.is_included_already_hashed(puzzle_hash)
+            coin_list = [coin for coin in self.additions if coin.puzzle_hash == puzzle_hash]
+            coins.append((puzzle_hash, coin_list))
+            if len(coin_list) == 0:
+                proofs.append((puzzle_hash, proof, None))
+            else:
+                _, proof_2 = self.additions_set.is_included_already_hashed(hash_coin_ids(self.coins_with(puzzle_hash)))
+                proofs.append((puzzle_hash, proof, proof_2))
+        return RespondAdditions(request.height, request.header_hash, coins, proofs)
+
+    async def request_removals(self, request: RequestRemovals) -> RespondRemovals:
+        assert request.coin_names is not None
+        self.requests.append(len(request.coin_names))
+        coins: List[Tuple[bytes32, Optional[Coin]]] = []
+        proofs: List[Tuple[bytes32, bytes]] = []
+        for name in request.coin_names:
+            _, proof = self.removals_set.is_included_already_hashed(name)
+            coins.append((name, self.removals.get(name)))
+            proofs.append((name, proof))
+        return RespondRemovals(request.height, request.header_hash, coins, proofs)
+
+
+@pytest.mark.asyncio
+async def test_request_and_validate_proofs_in_batches() -> None:
+    header_hash = bytes32([1] * 32)
+    puzzle_hashes = [std_hash(bytes([i])) for i in range(4)]
+    additions = [Coin(bytes32([i] * 32), ph, uint64(i)) for i, ph in enumerate(puzzle_hashes[:3])]
+    # two coins with the same puzzle hash
+    additions.append(Coin(bytes32([9] * 32), puzzle_hashes[0], uint64(9)))
+    removals = additions[1:3]
+    peer = ProofsPeer(additions, removals)
+    cache = PeerRequestCache()
+    additions_root = peer.additions_set.get_root()
+    removals_root = peer.removals_set.get_root()
+
+    # one request for all the puzzle hashes, the fourth one has an exclusion proof
+    assert await request_and_validate_additions(peer, cache, uint32(5), header_hash, puzzle_hashes, additions_root)
+    assert peer.requests == [4]
+    assert all(cache.in_additions_in_block(header_hash, ph) for ph in puzzle_hashes)
+    assert await request_and_validate_additions(peer, cache, uint32(5), header_hash, puzzle_hashes, additions_root)
+    assert peer.requests == [4]
+
+    names = [coin.name() for coin in additions]
+    assert await request_and_validate_removals(peer, cache, uint32(5), header_hash, names, removals_root)
+    assert peer.requests == [4, 4]
+    assert await request_and_validate_removals(peer, cache, uint32(5), header_hash, names[:2], removals_root)
+    assert peer.requests == [4, 4]
+
+    # proofs that don't match the root aren't cached
+    cache = PeerRequestCache()
+    assert not await request_and_validate_additions(peer, cache, uint32(5), header_hash, puzzle_hashes, removals_root)
+    assert not await request_and_validate_removals(peer, cache, uint32(5), header_hash, names, additions_root)
+    assert not any(cache.in_additions_in_block(header_hash, ph) for ph in puzzle_hashes)
+    assert not any(cache.in_removals_in_block(header_hash, name) for name in names)
+
+    cache.add_to_removals_in_block(header_hash, names[0], uint32(5))
+    cache.clear_after_height(4)
+    assert not cache.in_removals_in_block(header_hash, names[0])
+
+
+def test_aggregate_verify_bytes() -> None:
+    sks = [AugSchemeMPL.key_gen(bytes([i] * 32)) for i in range(3)]
+    messages = [bytes([i]) * 32 for i in range(3)]
+    sigs = [AugSchemeMPL.sign(sk, m) for sk, m in zip(sks, messages)]
+    pks = [bytes(sk.get_g1()) for sk in sks]
+    assert aggregate_verify_bytes(pks, messages, [bytes(sig) for sig in sigs])
+    assert not aggregate_verify_bytes(pks, messages[::-1], [bytes(sig) for sig in sigs])
+    assert aggregate_verify_bytes([], [], [])
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import multiprocessing
+
+import pytest
+from blspy import AugSchemeMPL
+
+from taco.consensus.coinbase import create_puzzlehash_for_pk
+from taco.util.ints import uint32
+from taco.wallet.derive_keys import master_sk_to_wallet_sk, master_sk_to_wallet_sk_unhardened
+from taco.wallet.util import batch_derivation
+from taco.wallet.util.batch_derivation import derive_keys
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("in_workers", [False, True])
+async def test_derive_keys(monkeypatch: pytest.MonkeyPatch, in_workers: bool) -> None:
+    private_key = AugSchemeMPL.key_gen(bytes([1] * 32))
+    start_index = 7
+    end_index = 7 + 2 * batch_derivation.DERIVATION_BATCH_SIZE + 3
+    if in_workers:
+        monkeypatch.setattr(batch_derivation, "MIN_PARALLEL_DERIVATIONS", 0)
+        monkeypatch.setattr(batch_derivation.os, "cpu_count", lambda: 2)
+
+    hardened, unhardened = await derive_keys(private_key, start_index, end_index, multiprocessing.get_context("spawn"))
+
+    assert len(hardened) == len(unhardened) == end_index - start_index
+    for index, (pubkey, puzzle_hash) in enumerate(hardened, start_index):
+        assert pubkey == master_sk_to_wallet_sk(private_key, uint32(index)).get_g1()
+        assert puzzle_hash == create_puzzlehash_for_pk(pubkey)
+    for index, (pubkey, puzzle_hash) in enumerate(unhardened, start_index):
+        assert pubkey == master_sk_to_wallet_sk_unhardened(private_key, uint32(index)).get_g1()
+        assert puzzle_hash == create_puzzlehash_for_pk(pubkey)
+
+
+@pytest.mark.asyncio
+async def test_derive_keys_empty_range() -> None:
+    assert await derive_keys(AugSchemeMPL.key_gen(bytes([1] * 32)), 5, 5) == ([], [])
@@ -5,6 +5,7 @@ from secrets import token_bytes
 import pytest
 from blspy import AugSchemeMPL
 
+from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.util.ints import uint32
 from taco.wallet.derivation_record import DerivationRecord
 from taco.wallet.util.wallet_types import WalletType
@@ -72,3 +73,27 @@ class TestPuzzleStore:
             await db.set_used_up_to(249)
 
             assert await db.get_unused_derivation_path() == 250
+
+    @pytest.mark.asyncio
+    async def test_puzzle_hash_index(self):
+        async with DBConnection(1) as wrapper:
+            db = await WalletPuzzleStore.create(wrapper)
+            record = DerivationRecord(
+                uint32(0),
+                bytes32(token_bytes(32)),
+                AugSchemeMPL.key_gen(token_bytes(32)).get_g1(),
+                WalletType.STANDARD_WALLET,
+                uint32(1),
+                False,
+            )
+            assert not db.puzzle_hash_index.may_contain(record.puzzle_hash)
+            await db.add_derivation_paths([record])
+            assert db.puzzle_hash_index.may_contain(record.puzzle_hash)
+
+            # the index of a new store is loaded from the db
+            db = await WalletPuzzleStore.create(wrapper)
+            assert db.puzzle_hash_index.may_contain(record.puzzle_hash)
+            assert await db.record_for_puzzle_hash(record.puzzle_hash) == record
+            assert await db.index_for_puzzle_hash_and_wallet(record.puzzle_hash, uint32(1)) == 0
+            assert await db.get_derivation_record_for_puzzle_hash(record.puzzle_hash) == record
+            assert await db.index_for_puzzle_hash_and_wallet(bytes32(token_bytes(32)), uint32(1)) is None
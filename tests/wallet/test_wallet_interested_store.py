@@ -2,6 +2,7 @@ from secrets import token_bytes
 import pytest
 
 from taco.types.blockchain_format.coin import Coin
+from taco.types.blockchain_format.sized_bytes import bytes32
 from taco.util.ints import uint64
 
 from taco.wallet.wallet_interested_store import WalletInterestedStore
@@ -37,3 +38,19 @@ class TestWalletInterestedStore:
             await store.remove_interested_puzzle_hash(puzzle_hash)
             assert (await store.get_interested_puzzle_hash_wallet_id(puzzle_hash)) is None
             assert len(await store.get_interested_puzzle_hashes()) == 0
+
+    @pytest.mark.asyncio
+    async def test_index(self):
+        async with DBConnection(1) as db_wrapper:
+            store = await WalletInterestedStore.create(db_wrapper)
+            puzzle_hash = bytes32(token_bytes(32))
+            other_puzzle_hash = bytes32(token_bytes(32))
+            assert not store.puzzle_hash_index.may_contain(puzzle_hash)
+            await store.add_interested_puzzle_hash(puzzle_hash, 2)
+            assert store.puzzle_hash_index.may_contain(puzzle_hash)
+
+            # the index of a new store is loaded from the db
+            store = await WalletInterestedStore.create(db_wrapper)
+            assert store.puzzle_hash_index.may_contain(puzzle_hash)
+            assert (await store.get_interested_puzzle_hash_wallet_id(puzzle_hash)) == 2
+            assert (await store.get_interested_puzzle_hash_wallet_id(other_puzzle_hash)) is None
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import dataclasses
+from secrets import token_bytes
+from typing import Optional
+
+import pytest
+
+from taco.types.blockchain_format.sized_bytes import bytes32
+from taco.types.header_block import HeaderBlock
+from taco.util.generator_tools import get_block_header
+from taco.util.ints import uint32, uint64
+from taco.wallet.util.wallet_sync_utils import foliage_transaction_block_matches
+from taco.wallet.wallet_proof_store import WalletProofStore
+from tests.util.db_connection import DBConnection
+from tests.util.test_full_block_utils import get_full_blocks
+
+full_block = next(block for block in get_full_blocks() if block.foliage_transaction_block is not None)
+
+
+def make_header_block(height: int, timestamp: Optional[int] = 1000) -> HeaderBlock:
+    block = get_block_header(full_block, [], [])
+    foliage_transaction_block = None
+    if timestamp is not None:
+        assert block.foliage_transaction_block is not None
+        foliage_transaction_block = dataclasses.replace(block.foliage_transaction_block, timestamp=uint64(timestamp))
+    return dataclasses.replace(
+        block,
+        reward_chain_block=dataclasses.replace(block.reward_chain_block, height=uint32(height)),
+        # a different foliage, so a different header hash
+        foliage=dataclasses.replace(
+            block.foliage,
+            prev_block_hash=bytes32(token_bytes(32)),
+            foliage_transaction_block_hash=None
+            if foliage_transaction_block is None
+            else foliage_transaction_block.get_hash(),
+        ),
+        foliage_transaction_block=foliage_transaction_block,
+    )
+
+
+@pytest.mark.asyncio
+async def test_header_blocks() -> None:
+    async with DBConnection(2) as db_wrapper:
+        store = await WalletProofStore.create(db_wrapper)
+        blocks = [make_header_block(height, 1000 + height) for height in range(5)]
+        assert await store.get_header_block(uint32(2)) is None
+        assert await store.get_timestamp(uint32(2)) is None
+
+        await store.add_header_blocks(blocks)
+        await store.add_header_blocks([make_header_block(5, None)])
+        assert await store.get_header_block(uint32(2)) == blocks[2]
+        assert await store.contains_header_block(blocks[2].header_hash)
+        assert not await store.contains_header_block(bytes32(token_bytes(32)))
+        assert await store.get_timestamp(uint32(2)) == 1002
+        # not a transaction block
+        assert await store.get_header_block(uint32(5)) is not None
+        assert await store.get_timestamp(uint32(5)) is None
+
+        # the latest block of a height is the one of the current chain
+        other_block = make_header_block(2, 2002)
+        await store.add_header_blocks([other_block])
+        assert await store.get_header_block(uint32(2)) == other_block
+        assert await store.contains_header_block(blocks[2].header_hash)
+
+        await store.rollback_to_block(2)
+        assert await store.get_header_block(uint32(2)) == other_block
+        assert await store.get_header_block(uint32(3)) is None
+        assert not await store.contains_header_block(blocks[4].header_hash)
+
+        # the count is loaded again
+        store = await WalletProofStore.create(db_wrapper)
+        assert store.num_blocks == 4
+
+
+@pytest.mark.asyncio
+async def test_proofs() -> None:
+    async with DBConnection(2) as db_wrapper:
+        store = await WalletProofStore.create(db_wrapper)
+        header_hash_1 = bytes32(token_bytes(32))
+        header_hash_2 = bytes32(token_bytes(32))
+        names = [bytes32(token_bytes(32)) for _ in range(1000)]
+        assert await store.get_proofs(header_hash_1, names, False) == set()
+
+        await store.add_proofs([(header_hash_1, name, False, uint32(10)) for name in names[:950]])
+        await store.add_proofs([(header_hash_1, names[0], True, uint32(10))])
+        await store.add_proofs([(header_hash_2, names[999], False, uint32(11))])
+
+        # more names than the sqlite variable limit
+        assert await store.get_proofs(header_hash_1, names, False) == set(names[:950])
+        assert await store.get_proofs(header_hash_1, names, True) == {names[0]}
+        assert await store.get_proofs(header_hash_2, names, False) == {names[999]}
+
+        await store.rollback_to_block(10)
+        assert await store.get_proofs(header_hash_2, names, False) == set()
+        assert await store.get_proofs(header_hash_1, names[:2], False) == set(names[:2])
+
+
+@pytest.mark.asyncio
+async def test_bounds() -> None:
+    async with DBConnection(2) as db_wrapper:
+        store = await WalletProofStore.create(db_wrapper, max_blocks=3, max_proofs=10)
+        blocks = [make_header_block(height) for height in range(5)]
+        for block in blocks:
+            await store.add_header_blocks([block])
+        assert store.num_blocks == 3
+        assert [await store.contains_header_block(block.header_hash) for block in blocks] == [
+            False,
+            False,
+            True,
+            True,
+            True,
+        ]
+        # adding a block again keeps it
+        await store.add_header_blocks([blocks[2]])
+        await store.add_header_blocks([make_header_block(5)])
+        assert await store.contains_header_block(blocks[2].header_hash)
+        assert not await store.contains_header_block(blocks[3].header_hash)
+
+        header_hash = bytes32(token_bytes(32))
+        names = [bytes32(token_bytes(32)) for _ in range(15)]
+        await store.add_proofs([(header_hash, name, False, uint32(1)) for name in names])
+        assert store.num_proofs == 10
+        assert await store.get_proofs(header_hash, names, False) == set(names[5:])
+
+
+def test_foliage_transaction_block_matches() -> None:
+    block = make_header_block(1)
+    assert foliage_transaction_block_matches(block)
+    assert not foliage_transaction_block_matches(make_header_block(1, None))
+    assert block.foliage_transaction_block is not None
+    other_transaction_block = dataclasses.replace(block.foliage_transaction_block, timestamp=uint64(1))
+    assert not foliage_transaction_block_matches(
+        dataclasses.replace(block, foliage_transaction_block=other_transaction_block)
+    )
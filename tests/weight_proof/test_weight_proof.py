@@ -1,4 +1,9 @@
+import dataclasses
+import random
 import sys
+import tempfile
+from concurrent.futures.process import ProcessPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import aiosqlite
@@ -16,10 +21,16 @@ from taco.util.generator_tools import get_block_header
 
 from taco.consensus.pot_iterations import calculate_iterations_quality
 from taco.full_node.weight_proof import (
+    VDFBatchValidator,
     WeightProofHandler,
     _map_sub_epoch_summaries,
+    _sub_epoch_segments_vdfs,
+    _validate_sub_epoch_summaries,
     _validate_summaries_weight,
+    init_validation_worker,
+    validate_sub_epoch_sampling,
 )
+from taco.types.blockchain_format.classgroup import ClassgroupElement
 from taco.types.full_block import FullBlock
 from taco.types.header_block import HeaderBlock
 from taco.util.ints import uint32, uint64
@@ -418,6 +429,8 @@ class TestWeightProof:
         valid, fork_point, _ = await wpf_not_synced.validate_weight_proof(new_wp)
         assert valid
         assert fork_point == 0
+        wpf_synced.shut_down()
+        wpf_not_synced.shut_down()
 
     @pytest.mark.asyncio
     async def test_weight_proof_extend_new_ses(self, default_1000_blocks):
@@ -450,6 +463,9 @@ class TestWeightProof:
         valid, fork_point, _ = await wpf.validate_weight_proof(new_wp)
         assert valid
         assert fork_point != 0
+        wpf.shut_down()
+        wpf_synced.shut_down()
+        wpf_not_synced.shut_down()
 
     @pytest.mark.asyncio
     async def test_weight_proof_extend_multiple_ses(self, default_1000_blocks):
@@ -470,11 +486,86 @@ class TestWeightProof:
         # extend proof with 100 blocks
         summaries[last_ses_height] = last_ses
         summaries[before_last_ses_height] = before_last_ses
+        wpf.shut_down()
         wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries))
         new_wp = await wpf._create_proof_of_weight(blocks[-1].header_hash)
-        valid, fork_point, _ = await wpf.validate_weight_proof(new_wp)
+        progress: List[Tuple[int, int]] = []
+        valid, fork_point, _ = await wpf.validate_weight_proof(new_wp, lambda *counts: progress.append(counts))
         assert valid
         assert fork_point != 0
+        assert len(progress) > 0
+        assert progress[-1][0] == progress[-1][1]
+        wpf.shut_down()
+        wpf_verify.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_weight_proof_extend_previous_proof(self, default_1000_blocks):
+        blocks = default_1000_blocks
+        header_cache, height_to_hash, sub_blocks, summaries = await load_blocks_dont_validate(blocks)
+        last_ses_height = sorted(summaries.keys())[-1]
+        wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries))
+        wp = await wpf.get_proof_of_weight(blocks[last_ses_height + 1].header_hash)
+        assert wp is not None
+        # there's no sub epoch summary past it, the proof for a later tip is created from this one
+        assert wpf._extendable_proof(sub_blocks[blocks[-1].header_hash]) is wp
+        extended_wp = await wpf.get_proof_of_weight(blocks[-1].header_hash)
+        assert extended_wp is not None
+        assert extended_wp.recent_chain_data[0] == wp.recent_chain_data[0]
+
+        wpf_fresh = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries))
+        fresh_wp = await wpf_fresh.get_proof_of_weight(blocks[-1].header_hash)
+        assert extended_wp == fresh_wp
+
+        # the serialized proofs are kept for the tips asked for
+        serialized = await wpf.get_serialized_proof_of_weight(blocks[-1].header_hash)
+        assert serialized == bytes(fresh_wp)
+        assert await wpf.get_serialized_proof_of_weight(blocks[-1].header_hash) is serialized
+        wpf.shut_down()
+        wpf_fresh.shut_down()
+
+    @pytest.mark.asyncio
+    async def test_vdf_batch_validator(self, default_1000_blocks):
+        blocks = default_1000_blocks
+        header_cache, height_to_hash, sub_blocks, summaries = await load_blocks_dont_validate(blocks)
+        wpf = WeightProofHandler(test_constants, BlockCache(sub_blocks, header_cache, height_to_hash, summaries))
+        wp = await wpf.get_proof_of_weight(blocks[-1].header_hash)
+        assert wp is not None
+        wpf.shut_down()
+
+        ses_list, sub_epoch_weight_list = _validate_sub_epoch_summaries(test_constants, wp)
+        assert ses_list is not None
+        rng = random.Random(ses_list[-2].get_hash())
+        assert validate_sub_epoch_sampling(rng, sub_epoch_weight_list, wp)
+        vdfs = []
+        for vdf_list in _sub_epoch_segments_vdfs(test_constants, rng, wp.sub_epoch_segments, ses_list):
+            assert vdf_list is not None
+            vdfs.extend(vdf_list)
+        assert len(vdfs) > 2
+
+        with ProcessPoolExecutor(
+            2, initializer=init_validation_worker, initargs=(test_constants, "vdf_worker")
+        ) as executor, tempfile.NamedTemporaryFile() as shutdown_file:
+            progress: List[Tuple[int, int]] = []
+            validator = VDFBatchValidator(
+                executor, Path(shutdown_file.name), lambda *counts: progress.append(counts), batch_size=2
+            )
+            assert validator.add(vdfs)
+            assert await validator.finish()
+            assert progress[-1] == (len(vdfs), len(vdfs))
+            assert [validated for validated, _ in progress] == sorted(validated for validated, _ in progress)
+
+            # a VDF with the wrong output fails the validation
+            vdf_proof, classgroup, vdf_info = vdfs[0]
+            bad_vdf = (
+                vdf_proof,
+                classgroup,
+                dataclasses.replace(vdf_info, output=ClassgroupElement.get_default_element()),
+            )
+            validator = VDFBatchValidator(executor, Path(shutdown_file.name), batch_size=2)
+            validator.add([bad_vdf] + vdfs)
+            assert not await validator.finish()
+            assert validator.failed
+            assert validator.validated < len(vdfs) + 1
 
     @pytest.mark.skip("used for debugging")
     @pytest.mark.asyncio
@@ -2,7 +2,6 @@
 
 import sqlite3
 import sys
-import zstd
 import click
 from functools import partial
 from pathlib import Path
@@ -15,6 +14,7 @@ from chia_rs import run_generator, MEMPOOL_MODE
 
 from taco.types.blockchain_format.program import Program
 from taco.consensus.default_constants import DEFAULT_CONSTANTS
+from taco.full_node.block_compression import BlockCompressor
 from taco.wallet.puzzles.rom_bootstrap_generator import get_generator
 from taco.util.full_block_utils import block_info_from_block, generator_from_block
 from taco.util.condition_tools import pkm_pairs
@@ -78,6 +78,7 @@ def main(file: Path, mempool_mode: bool, start: int, end: Optional[int], call: O
         call_f = callable_for_module_function_path(call)
 
     c = sqlite3.connect(file)
+    compressor = BlockCompressor.load(c)
 
     end_limit_sql = "" if end is None else f"and height <= {end} "
 
@@ -91,9 +92,9 @@ def main(file: Path, mempool_mode: bool, start: int, end: Optional[int], call: O
         height: int = r[1]
         block: Union[BlockInfo, FullBlock]
         if verify_signatures:
-            block = FullBlock.from_bytes(zstd.decompress(r[2]))
+            block = FullBlock.from_bytes(compressor.decompress(r[2]))
         else:
-            block = block_info_from_block(zstd.decompress(r[2]))
+            block = block_info_from_block(compressor.decompress(r[2]))
 
         if block.transactions_generator is None:
             sys.stderr.write(f" no-generator. block {height}\r")
@@ -103,7 +104,7 @@ def main(file: Path, mempool_mode: bool, start: int, end: Optional[int], call: O
         generator_blobs = []
         for h in block.transactions_generator_ref_list:
             ref = c.execute("SELECT block FROM full_blocks WHERE height=? and in_main_chain=1", (h,))
-            generator = generator_from_block(zstd.decompress(ref.fetchone()[0]))
+            generator = generator_from_block(compressor.decompress(ref.fetchone()[0]))
             assert generator is not None
             generator_blobs.append(bytes(generator))
             ref.close()
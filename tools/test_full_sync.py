@@ -7,18 +7,19 @@ import cProfile
 import logging
 import os
 import shutil
+import sqlite3
 import tempfile
 import time
-from contextlib import contextmanager
+from contextlib import closing, contextmanager
 from pathlib import Path
 from typing import Callable, Iterator, List, Optional
 
 import aiosqlite
 import click
-import zstd
 
 from taco.cmds.init_funcs import taco_init
 from taco.consensus.default_constants import DEFAULT_CONSTANTS
+from taco.full_node.block_compression import BlockCompressor
 from taco.full_node.full_node import FullNode
 from taco.protocols import full_node_protocol
 from taco.server.outbound_message import Message, NodeType
@@ -32,6 +33,11 @@ from taco.util.ints import uint16
 from tools.test_constants import test_constants as TEST_CONSTANTS
 
 
+def load_compressor(file: Path) -> BlockCompressor:
+    with closing(sqlite3.connect(file)) as conn:
+        return BlockCompressor.load(conn)
+
+
 class ExitOnError(logging.Handler):
     def __init__(self):
         super().__init__()
@@ -165,6 +171,7 @@ async def run_sync_test(
             counter = 0
             monotonic = height
             prev_hash = None
+            compressor = load_compressor(file)
             async with aiosqlite.connect(file) as in_db:
                 await in_db.execute("pragma query_only")
                 rows = await in_db.execute(
@@ -182,7 +189,7 @@ async def run_sync_test(
                 async for r in rows:
                     batch_start_time = time.monotonic()
                     with enable_profiler(profile, height):
-                        block = FullBlock.from_bytes(zstd.decompress(r[2]))
+                        block = FullBlock.from_bytes(compressor.decompress(r[2]))
                         block_batch.append(block)
 
                         assert block.height == monotonic
@@ -361,6 +368,7 @@ async def run_sync_checkpoint(
 
         print()
         height = 0
+        compressor = load_compressor(file)
         async with aiosqlite.connect(file) as in_db:
             await in_db.execute("pragma query_only")
             rows = await in_db.execute(
@@ -370,7 +378,7 @@ async def run_sync_checkpoint(
             block_batch = []
 
             async for r in rows:
-                block = FullBlock.from_bytes(zstd.decompress(r[0]))
+                block = FullBlock.from_bytes(compressor.decompress(r[0]))
                 block_batch.append(block)
 
                 if len(block_batch) < 32: